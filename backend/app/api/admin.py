@@ -6,6 +6,16 @@ from firebase_admin import auth as firebase_auth
 from fastapi.security import HTTPBearer
 from core.security import security, HTTPAuthorizationCredentials
 from api.audit import log_audit_event
+from core.result_cache import (
+    invalidate_org_caches,
+    simulation_result_cache,
+    manifest_pointer_cache,
+    claim_set_cache,
+)
+from core.semantic_cache import semantic_prompt_cache
+from core.embedding_cache import embedding_cache
+from core.manifest_index import manifest_index_registry
+from core.request_accounting import accounting_histograms
 import datetime
 import logging
 import os
@@ -461,6 +471,10 @@ class UpdateModelConfigRequest(BaseModel):
     models: List[AdminModelConfigItem]
 
 
+class UpdateSemanticCacheRequest(BaseModel):
+    enabled: bool
+
+
 class UpdateSubscriptionRequest(BaseModel):
     planId: Optional[str] = None
     status: Optional[str] = None
@@ -550,6 +564,57 @@ async def update_model_config(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.patch("/orgs/{org_id}/semantic-cache")
+async def update_org_semantic_cache(
+    org_id: str,
+    request_body: UpdateSemanticCacheRequest,
+    admin_user: dict = Depends(verify_admin)
+):
+    """Turn the semantic near-duplicate prompt cache on or off for one organization."""
+    if not db:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+
+    try:
+        _require_org_access(admin_user, org_id)
+        db.collection("organizations").document(org_id).update({"semanticCacheEnabled": request_body.enabled})
+        invalidate_org_caches(org_id, "semantic cache toggled")
+        actor_id = admin_user.get("email") or f"uid:{admin_user.get('uid', 'admin')}"
+        log_audit_event(
+            org_id=org_id,
+            actor_id=actor_id,
+            event_type="admin_semantic_cache_updated",
+            resource_id=org_id,
+            metadata={"enabled": request_body.enabled}
+        )
+        return {"success": True, "orgId": org_id, "semanticCacheEnabled": request_body.enabled}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Admin semantic cache update failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(admin_user: dict = Depends(verify_admin)):
+    """In-process simulation cache tiers for this worker, including semantic hit rates."""
+    if not admin_user.get("isPlatformAdmin"):
+        raise HTTPException(status_code=403, detail="Only platform admins can view cache stats")
+    return {
+        "l1": [cache.stats() for cache in (simulation_result_cache, manifest_pointer_cache, claim_set_cache)],
+        "semantic": semantic_prompt_cache.stats(),
+        "embeddings": embedding_cache.stats(),
+        "manifestIndex": manifest_index_registry.stats(),
+    }
+
+
+@router.get("/timings/stats")
+async def get_timing_stats(org_id: Optional[str] = None, admin_user: dict = Depends(verify_admin)):
+    """Per-org simulation stage latency and per-model provider latency/token histograms for this worker."""
+    if not admin_user.get("isPlatformAdmin"):
+        raise HTTPException(status_code=403, detail="Only platform admins can view timing stats")
+    return accounting_histograms.snapshot(org_id)
+
+
 @router.get("/orgs/{org_id}/details")
 async def get_org_details(org_id: str, admin_user: dict = Depends(verify_admin)):
     if not db:
@@ -695,6 +760,7 @@ async def update_org_subscription(
             updates["adminNotes.subscription"] = request_body.notes
 
         org_ref.update(updates)
+        invalidate_org_caches(org_id, "subscription updated")
         actor_id = admin_user.get("email") or f"uid:{admin_user.get('uid', 'admin')}"
         log_audit_event(
             org_id=org_id,
@@ -7,22 +7,30 @@ Description: Batch & Scheduled Scoring Engine — supports on-demand batch and c
 """
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 import asyncio
 import logging
 import os
+import re
+import time
 import uuid
-from datetime import datetime, timezone
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Query
 
 logger = logging.getLogger(__name__)
-from api.simulation import run_simulation, SimulationRequest
-from fastapi import BackgroundTasks
-
-async def evaluate_simulation(req: SimulationRequest, skip_billing: bool = False):
-    return await run_simulation(req, BackgroundTasks(), {"uid": "batch_worker", "orgId": req.orgId, "email": "batch@aumcontextfoundry.com"}, skip_billing=skip_billing)
+from api import simulation as sim
+from api.batch_planner import checkpoint_key, run_batch_prompts
+from api.bulk_simulation import register_completion_handler, submit_bulk
+from api.cron import verify_cron_secret
+from core.crawl_runs import (
+    CRAWL_MAX_ACTIVE_SHARDS, CRAWL_SHARD_LEASE_SECONDS, CRAWL_SHARD_SIZE, HOLDER_ID, ShardClaim,
+    crawl_fingerprint, get_crawl_run_store, plan_shards,
+)
 from core.firebase_config import db
+from core.model_config import get_simulation_model_catalog
 from core.security import get_auth_context, verify_user_org_access
+from core.provider_gateway import Priority, provider_priority
+from core.tracing import start_span
 
 
 router = APIRouter()
@@ -33,18 +41,38 @@ class BatchSimulationRequest(BaseModel):
     orgId: str
     manifestVersion: Optional[str] = "latest"
     requestId: Optional[str] = None
+    # Prompts simulated concurrently (default BATCH_PROMPT_CONCURRENCY, capped at BATCH_MAX_CONCURRENCY)
+    parallelism: Optional[int] = None
+    # "bulk": run through the providers' batch APIs (see api/bulk_simulation.py); results within hours
+    mode: Optional[Literal["live", "bulk"]] = None
+    # "autopilot": the post-ingestion industry audit — background priority, results also written to scoringHistory
+    source: Optional[Literal["autopilot"]] = None
 
 
 from utils.task_queue import FirestoreTaskQueue
+from utils.task_queue_recovery import TaskQueueRecovery
 
-async def _execute_batch_calculation(request: BatchSimulationRequest):
-    """Core logic to run multiple simulations and calculate aggregate metrics."""
-    tasks = [evaluate_simulation(SimulationRequest(
-        prompt=p, orgId=request.orgId, manifestVersion=request.manifestVersion
-    ), skip_billing=True) for p in request.prompts]
-    
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
+async def _execute_batch_calculation(request: BatchSimulationRequest, priority: int = Priority.BATCH,
+                                     completed: Optional[Dict[str, dict]] = None, on_result=None):
+    """
+    Core logic to run multiple simulations and calculate aggregate metrics.
+    Prompts whose `checkpoint_key` is in `completed` reuse that result instead of running again.
+    """
+    completed = completed or {}
+    pending = [p for p in request.prompts if checkpoint_key(p) not in completed]
+    # Provider calls fanned out from here queue behind interactive `/run` traffic
+    with provider_priority(priority):
+        fresh, planner_stats = await run_batch_prompts(
+            request.orgId, pending, request.manifestVersion, request.parallelism, on_result
+        )
+    fresh_results = iter(fresh)
+    results = [completed.get(checkpoint_key(p)) or next(fresh_results) for p in request.prompts]
+    planner_stats["resumed"] = len(request.prompts) - len(pending)
+    return _summarize_batch(request.prompts, results, planner_stats)
+
+
+def _summarize_batch(prompts: List[str], results: List[Any], planner_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Aggregate metrics over per-prompt outcomes (result dicts or exceptions)."""
     formatted_results = []
     total_accuracy = 0
     drift_count = 0
@@ -52,7 +80,7 @@ async def _execute_batch_calculation(request: BatchSimulationRequest):
 
     for i, res in enumerate(results):
         if isinstance(res, Exception):
-            formatted_results.append({"prompt": request.prompts[i], "error": str(res)})
+            formatted_results.append({"prompt": prompts[i], "error": str(res)})
         else:
             formatted_results.append(res)
             for model_result in res.get("results", []):
@@ -75,44 +103,163 @@ async def _execute_batch_calculation(request: BatchSimulationRequest):
         "modelAverages": {m: round(sum(s)/len(s), 1) for m, s in model_scores.items()},
         "totalChecks": total_checks,
         "results": formatted_results,
+        "planner": planner_stats,
     }
 
+def _usage_entries(request: BatchSimulationRequest, job_id: str, key: str, prompt: str, count: int):
+    """Usage-ledger writes for one checkpointed prompt (one per occurrence in the batch); ids are
+    deterministic, so a resumed job can never bill the same prompt twice. The Auto-Pilot audit is
+    part of ingestion, not a customer run, so it is never billed against the monthly quota."""
+    if not db or request.source == "autopilot":
+        return []
+    usage_ref = db.collection("organizations").document(request.orgId).collection("usageLedger")
+    now = datetime.now(timezone.utc)
+    return [(usage_ref.document(f"batch_{job_id}_{key}_{n}"), {
+        "timestamp": now,
+        "prompt": (prompt or "")[:100],
+        "manifestVersion": request.manifestVersion or "latest",
+        "source": "batch",
+        "jobId": job_id,
+    }) for n in range(count)]
+
+
+def _history_entries(request: BatchSimulationRequest, job_id: str, key: str, prompt: str, result: dict):
+    """Auto-Pilot results feed the dashboard's scoring history; one deterministic doc per prompt."""
+    if not db or request.source != "autopilot":
+        return []
+    history_ref = db.collection("organizations").document(request.orgId).collection("scoringHistory")
+    doc = sim._scoring_history_doc(prompt.strip(), request.manifestVersion or "latest", result.get("results", []))
+    return [(history_ref.document(f"autopilot_{job_id}_{key}"), {**doc, "source": "autopilot", "jobId": job_id})]
+
+
+class _BatchCheckpoints:
+    """
+    Per-prompt result docs of one batch job (`results/{key}` + `completedPrompts`), each written
+    atomically with its usage-ledger entries (none for Auto-Pilot audits). Shared by the live worker and the bulk completion handler.
+    """
+
+    def __init__(self, request: BatchSimulationRequest, job_id: str, completed: Dict[str, dict]):
+        self.request = request
+        self.job_id = job_id
+        self.stored = set(completed)
+        self.first_index: Dict[str, int] = {}
+        self.occurrences: Dict[str, int] = {}
+        for i, prompt in enumerate(request.prompts):
+            key = checkpoint_key(prompt)
+            self.first_index.setdefault(key, i)
+            self.occurrences[key] = self.occurrences.get(key, 0) + 1
+
+    async def checkpoint(self, prompt: str, result: dict) -> None:
+        # 🛡️ BILLING INTEGRITY (P0): Usage is recorded only for successful prompts, atomically with their checkpoint
+        key = checkpoint_key(prompt)
+        count = self.occurrences.get(key, 1)
+        doc = {**result, "index": self.first_index.get(key, 0), "occurrences": count, "status": "ok"}
+        if await asyncio.to_thread(
+            FirestoreTaskQueue.checkpoint_result, self.request.orgId, "batchJobs", self.job_id, key, doc,
+            _usage_entries(self.request, self.job_id, key, prompt, count)
+            + _history_entries(self.request, self.job_id, key, prompt, result),
+        ):
+            self.stored.add(key)
+
+    async def finish(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """Store what the checkpoints did not (failed prompts, one more try for lost checkpoints); returns the job summary."""
+        failures: Dict[str, dict] = {}
+        for prompt, result in zip(self.request.prompts, summary.pop("results")):
+            key = checkpoint_key(prompt)
+            if key in self.stored or key in failures:
+                continue
+            if result.get("error"):
+                failures[key] = {**result, "index": self.first_index[key], "occurrences": self.occurrences[key],
+                                 "status": "error"}
+            else:
+                await self.checkpoint(prompt, result)
+        await asyncio.to_thread(FirestoreTaskQueue.write_results, self.request.orgId, "batchJobs", self.job_id, failures)
+        summary["promptCount"] = len(self.request.prompts)
+        summary["failedPrompts"] = sum(self.occurrences[key] for key in failures)
+        return summary
+
+
 async def _process_batch_background(request: BatchSimulationRequest, job_id: str):
-    """Background worker to process the batch and write results to Firestore."""
+    """
+    Background worker to process the batch and write results to Firestore.
+    Each successful prompt is checkpointed as it completes (`results/{key}` + `completedPrompts`),
+    so a retried job only runs the prompts that had not finished. The job doc itself only
+    gets the aggregate summary; per-prompt output stays one doc per prompt under `results/`.
+    In bulk mode the prompts go to the providers' batch APIs instead and the job stays
+    "processing" until the bulk poller ingests them (`_complete_bulk_batch`).
+    Auto-Pilot audits queue behind both interactive and batch traffic.
+    """
+    if request.mode == "bulk" and await _submit_bulk_batch(request, job_id):
+        return
+    priority = Priority.BACKGROUND if request.source == "autopilot" else Priority.BATCH
+
     async def worker():
-        # Execute the calculation first
-        batch_output = await _execute_batch_calculation(request)
-        
-        # 🛡️ BILLING INTEGRITY (P0): Record usage only for successful prompts
-        if db:
-            try:
-                org_ref = db.collection("organizations").document(request.orgId)
-                usage_ref = org_ref.collection("usageLedger")
-                batch = db.batch()
-                now = datetime.now(timezone.utc)
-                
-                success_count = 0
-                for prompt_res in batch_output.get("results", []):
-                    if not prompt_res.get("error"):
-                        doc_ref = usage_ref.document()
-                        batch.set(doc_ref, {
-                            "timestamp": now,
-                            "prompt": (prompt_res.get("prompt", "") or "")[:100],
-                            "manifestVersion": request.manifestVersion or "latest",
-                            "source": "batch",
-                        })
-                        success_count += 1
-                
-                if success_count > 0:
-                    batch.commit()
-                    logger.info(f"Usage Ledger: Recorded {success_count} successful batch sims for {request.orgId}")
-            except Exception as e:
-                logger.error(f"Usage Ledger write failed during batch processing: {e}")
-                
-        return batch_output
+        completed = await asyncio.to_thread(FirestoreTaskQueue.load_checkpoints, request.orgId, "batchJobs", job_id)
+        checkpoints = _BatchCheckpoints(request, job_id, completed)
+        if completed:
+            logger.info(f"Resuming batch {job_id} for {request.orgId}: {len(completed)} prompts already checkpointed")
+        summary = await _execute_batch_calculation(request, priority, completed=completed,
+                                                   on_result=checkpoints.checkpoint)
+        return await checkpoints.finish(summary)
 
     await FirestoreTaskQueue.run_persistent_task(request.orgId, "batchJobs", job_id, worker)
 
+
+def _bulk_job_id(job_id: str) -> str:
+    return f"batch_{job_id}"
+
+
+async def _submit_bulk_batch(request: BatchSimulationRequest, job_id: str) -> bool:
+    """
+    Submit the not-yet-checkpointed prompts as a bulk job (a retried job finds its bulk job and
+    leaves it to the poller). False when the org cannot run in bulk mode and the batch should run live.
+    """
+    FirestoreTaskQueue.update_job(request.orgId, "batchJobs", job_id, "processing")
+    try:
+        completed = await asyncio.to_thread(FirestoreTaskQueue.load_checkpoints, request.orgId, "batchJobs", job_id)
+        pending = [p for p in request.prompts if checkpoint_key(p) not in completed]
+        job = await submit_bulk(request.orgId, pending, request.manifestVersion, kind="batchJobs", owner_id=job_id,
+                                job_id=_bulk_job_id(job_id), owner_collection="batchJobs",
+                                context=request.model_dump())
+    except Exception as e:
+        logger.error(f"Bulk submission failed for batch {job_id}: {e}")
+        FirestoreTaskQueue.update_job(request.orgId, "batchJobs", job_id, "failed", error=str(e))
+        return True
+    if job is not None:
+        logger.info(f"📦 Batch {job_id} handed to bulk job {_bulk_job_id(job_id)} ({job.get('status')})")
+    return job is not None
+
+
+async def _complete_bulk_batch(job: Dict[str, Any], outcomes: Dict[str, Any]) -> None:
+    """Bulk completion handler for batch jobs: checkpoint + bill each result, then write the summary."""
+    request = BatchSimulationRequest(**job["context"])
+    job_id = job["ownerId"]
+    completed = await asyncio.to_thread(FirestoreTaskQueue.load_checkpoints, request.orgId, "batchJobs", job_id)
+    checkpoints = _BatchCheckpoints(request, job_id, completed)
+    results: List[Any] = []
+    seen = set()
+    for prompt in request.prompts:
+        key = checkpoint_key(prompt)
+        outcome = completed.get(key) or outcomes.get(key) or RuntimeError("Prompt missing from the bulk job")
+        if isinstance(outcome, dict) and key in seen:
+            outcome = {**outcome, "prompt": prompt.strip(), "deduplicated": True}
+        elif isinstance(outcome, dict) and key not in checkpoints.stored:
+            await checkpoints.checkpoint(prompt, outcome)
+        seen.add(key)
+        results.append(outcome)
+    stats = {**(job.get("stats") or {}), "mode": "bulk", "resumed": len(completed)}
+    summary = await checkpoints.finish(_summarize_batch(request.prompts, results, stats))
+    FirestoreTaskQueue.update_job(request.orgId, "batchJobs", job_id, "completed", result=summary)
+
+
+async def _retry_batch_job(org_id: str, collection: str, job_id: str, payload: Dict[str, Any]):
+    """TaskQueueRecovery handler: resume a batch job from its checkpoints."""
+    await _process_batch_background(BatchSimulationRequest(**payload), job_id)
+
+
+TaskQueueRecovery.register_retry_handler("batchJobs", _retry_batch_job)
+register_completion_handler("batchJobs", _complete_bulk_batch)
+
 @router.post("/batch")
 async def run_batch_simulation(
     request: BatchSimulationRequest, 
@@ -148,13 +295,46 @@ async def run_batch_simulation(
     return {"status": "processing", "jobId": job_id, "message": "Batch analysis queued"}
 
 
+# Prompts of one Auto-Pilot audit simulated concurrently; the audit is never urgent
+AUTOPILOT_PARALLELISM = int(os.getenv("AUTOPILOT_PARALLELISM", "2"))
+AUTOPILOT_PLANS = ["growth", "scale", "enterprise"]
+
+
+def enqueue_autopilot_audit(org_id: str, manifest_version: str, prompts: List[str], org_plan: str,
+                            background_tasks: BackgroundTasks) -> Optional[str]:
+    """
+    Queue the post-ingestion industry audit as a persistent batch job (`batchJobs/autopilot_{version}`),
+    run after the ingestion response is sent. Returns the job id, or None when the plan has no batch analysis.
+    """
+    if str(org_plan or "").strip().lower() not in AUTOPILOT_PLANS or not prompts:
+        return None
+    job_id = f"autopilot_{manifest_version}"
+    request = BatchSimulationRequest(prompts=prompts, orgId=org_id, manifestVersion=manifest_version,
+                                     requestId=job_id, parallelism=AUTOPILOT_PARALLELISM, source="autopilot")
+    FirestoreTaskQueue.register_job(org_id, "batchJobs", job_id, request.model_dump())
+    background_tasks.add_task(_process_batch_background, request, job_id)
+    return job_id
+
+
+# Job doc fields served by the status API (the request payload and checkpoint set stay server-side)
+JOB_STATUS_FIELDS = ["status", "createdAt", "updatedAt", "completedAt", "error", "result", "requestId", "retryCount"]
+_RESULT_FIELD_PATTERN = re.compile(r"^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$")
+
+
 @router.get("/batch/status/{org_id}/{job_id}")
 async def get_batch_status(
     org_id: str, 
     job_id: str,
+    cursor: Optional[int] = Query(None, description="`nextCursor` of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    fields: Optional[str] = Query(None, description="Comma-separated per-prompt fields, e.g. prompt,status,error"),
     current_user: dict = Depends(get_auth_context)
 ):
-    """Returns the status of a scheduled background batch job."""
+    """
+    Returns the status of a scheduled background batch job: its compact summary plus one
+    cursor-paginated page of per-prompt results (ordered by prompt position).
+    The first page is also mirrored into `result.results` for pollers that read it there.
+    """
     # Tenant authorization check
     uid = current_user.get("uid")
     if not verify_user_org_access(uid, org_id):
@@ -162,12 +342,24 @@ async def get_batch_status(
 
     if not db:
         raise HTTPException(status_code=503, detail="Firestore not available")
+
+    projection = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if projection and not all(_RESULT_FIELD_PATTERN.match(f) for f in projection):
+        raise HTTPException(status_code=400, detail="Invalid field list")
     
     try:
-        doc_ref = db.collection("organizations").document(org_id).collection("batchJobs").document(job_id).get()
+        doc_ref = db.collection("organizations").document(org_id).collection("batchJobs").document(job_id) \
+            .get(field_paths=JOB_STATUS_FIELDS)
         if not doc_ref.exists:
             raise HTTPException(status_code=404, detail="Job not found")
-        return doc_ref.to_dict()
+        job = doc_ref.to_dict() or {}
+        page, next_cursor = await asyncio.to_thread(
+            FirestoreTaskQueue.list_results, org_id, "batchJobs", job_id, cursor, limit, projection)
+        job["results"] = page
+        job["nextCursor"] = next_cursor
+        if cursor is None and isinstance(job.get("result"), dict):
+            job["result"]["results"] = page
+        return job
     except HTTPException:
         raise
     except Exception as e:
@@ -187,13 +379,256 @@ DEFAULT_AUDIT_PROMPTS = [
 ]
 
 
+SCHEDULED_CRAWL_CONCURRENCY = int(os.getenv("SCHEDULED_CRAWL_CONCURRENCY", "4"))
+# "bulk": each org's audit prompts become a bulk job and its snapshot is stored when the poller ingests it
+SCHEDULED_CRAWL_MODE = os.getenv("SCHEDULED_CRAWL_MODE", "live")
+# Change detection: unchanged orgs re-score CRAWL_SAMPLE_PROMPTS prompts; their snapshot is carried forward
+# while every sampled score stays within CRAWL_SAMPLE_TOLERANCE points, for at most CRAWL_FULL_RECOMPUTE_DAYS
+CRAWL_SAMPLE_PROMPTS = int(os.getenv("CRAWL_SAMPLE_PROMPTS", "1"))
+CRAWL_SAMPLE_TOLERANCE = float(os.getenv("CRAWL_SAMPLE_TOLERANCE", "5.0"))
+CRAWL_FULL_RECOMPUTE_DAYS = float(os.getenv("CRAWL_FULL_RECOMPUTE_DAYS", "28"))
+
+
 class ScheduledCrawlRequest(BaseModel):
     orgId: Optional[str] = None  # If None, crawls ALL orgs
     secret: str  # Simple shared secret for cron auth
+    runId: Optional[str] = None  # Join/resume this run; defaults to the current ISO week's run
+    shardSize: Optional[int] = None  # Orgs per shard (default CRAWL_SHARD_SIZE)
+
+
+def _default_crawl_run_id(org_id: Optional[str] = None) -> str:
+    """One run per ISO week, so repeated cron triggers within a week resume the same run."""
+    year, week, _ = datetime.now(timezone.utc).isocalendar()
+    return f"weekly-{year}-W{week:02d}" + (f"-{org_id}" if org_id else "")
+
+
+def _crawl_fingerprint(org_id: str, prompts: List[str]) -> Optional[str]:
+    """Fingerprint of what this week's crawl would score; None when the manifest version cannot be resolved."""
+    version = sim._resolve_manifest_version(org_id, "latest")
+    if not version or version == "latest":
+        return None
+    model_ids = [f"{provider}:{meta.get('apiModelId')}" for provider, meta in get_simulation_model_catalog().items()
+                 if meta.get("enabled", True)]
+    return crawl_fingerprint(version, model_ids, prompts, sim.SCORING_VERSION)
+
+
+def _latest_snapshot(org_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        docs = db.collection("organizations").document(org_id).collection("weeklySnapshots") \
+            .order_by("timestamp", direction="DESCENDING").limit(1).stream()
+        latest = next(iter(docs), None)
+        return (latest.to_dict() or {}) if latest is not None else None
+    except Exception as e:
+        logger.warning(f"Latest snapshot lookup failed for {org_id}: {e}")
+        return None
+
+
+def _snapshot_reusable(snapshot: Optional[Dict[str, Any]], fingerprint: Optional[str]) -> bool:
+    """Same fingerprint, per-prompt scores to compare against, and a full recompute within CRAWL_FULL_RECOMPUTE_DAYS."""
+    if not snapshot or not fingerprint or snapshot.get("fingerprint") != fingerprint or not snapshot.get("promptScores"):
+        return False
+    computed_at = sim._coerce_datetime(snapshot.get("computedAt") or snapshot.get("timestamp"))
+    return computed_at is not None and \
+        datetime.now(timezone.utc) - computed_at <= timedelta(days=CRAWL_FULL_RECOMPUTE_DAYS)
+
+
+def _prompt_scores(prompts: List[str], results: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Mean model accuracy per prompt (keyed by `checkpoint_key`), for failed-free prompts only."""
+    scores = {}
+    for prompt, result in zip(prompts, results):
+        accuracies = [r.get("accuracy", 0) for r in result.get("results", [])] if not result.get("error") else []
+        if accuracies:
+            scores[checkpoint_key(prompt)] = round(sum(accuracies) / len(accuracies), 1)
+    return scores
+
+
+async def _sample_recheck(org_id: str, prompts: List[str], previous: Dict[str, Any], fingerprint: str):
+    """
+    Re-score a rotating sample of the audit prompts. Returns (carried-forward snapshot or None, sampled
+    results keyed by `checkpoint_key`) — None when a sampled score moved more than CRAWL_SAMPLE_TOLERANCE.
+    """
+    week = datetime.now(timezone.utc).isocalendar()[1]
+    size = max(1, min(CRAWL_SAMPLE_PROMPTS, len(prompts)))
+    sample = [prompts[(week + i) % len(prompts)] for i in range(size)]
+    result = await _execute_batch_calculation(
+        BatchSimulationRequest(prompts=sample, orgId=org_id, manifestVersion="latest"), priority=Priority.BACKGROUND)
+    sampled = {checkpoint_key(p): r for p, r in zip(sample, result["results"]) if not r.get("error")}
+    scores = _prompt_scores(sample, result["results"])
+    previous_scores = previous.get("promptScores") or {}
+    if len(scores) < len(sample) or any(key not in previous_scores or abs(score - previous_scores[key]) >
+                                        CRAWL_SAMPLE_TOLERANCE for key, score in scores.items()):
+        return None, sampled
+    return {
+        **{field: previous.get(field) for field in ("domainStability", "driftRate", "modelAverages", "totalChecks")},
+        "fingerprint": fingerprint,
+        "promptScores": {**previous_scores, **scores},
+        "computedAt": previous.get("computedAt") or previous.get("timestamp"),
+        "mode": "sampled",
+        "sampledPrompts": len(sample),
+    }, sampled
+
+
+async def _crawl_org(org_id: str) -> Dict[str, Any]:
+    """
+    Score one org with the standard audit prompts and store its weekly snapshot.
+    An org whose fingerprint (manifest version, catalog models, prompts, scoring version) matches a
+    recent snapshot only gets a sample re-check; its snapshot is carried forward unless the sample drifted.
+    """
+    try:
+        # Get org name for prompt personalization
+        org_doc = db.collection("organizations").document(org_id).get()
+        if not org_doc.exists:
+            return {"orgId": org_id, "status": "skipped", "reason": "missing"}  # Skip non-existent orgs
+        org_data = org_doc.to_dict() or {}
+        org_name = org_data.get("name", org_id)
+
+        # 🛡️ SECURITY FIX (P1): Enforce plan entitlement for scheduled crawls
+        plan = org_data.get("subscription", {}).get("planId", "explorer")
+        if plan not in ["growth", "scale", "enterprise"]:
+            logger.info(f"Skipping scheduled crawl for {org_id}: Plan '{plan}' not entitled for batch analysis.")
+            return {"orgId": org_id, "status": "skipped", "reason": "plan"}
+
+        prompts = [p.format(org_name=org_name) for p in DEFAULT_AUDIT_PROMPTS]
+
+        fingerprint = await asyncio.to_thread(_crawl_fingerprint, org_id, prompts)
+        previous = await asyncio.to_thread(_latest_snapshot, org_id) if fingerprint else None
+        sampled: Dict[str, dict] = {}
+        if _snapshot_reusable(previous, fingerprint):
+            snapshot, sampled = await _sample_recheck(org_id, prompts, previous, fingerprint)
+            if snapshot is not None:
+                _store_weekly_snapshot(org_id, snapshot)
+                logger.info(f"♻️ Crawl {org_id}: unchanged, {len(sampled)}/{len(prompts)} prompts re-checked")
+                return {"orgId": org_id, "orgName": org_name, "status": "success", "mode": "sampled",
+                        "domainStability": snapshot["domainStability"], "driftRate": snapshot["driftRate"],
+                        "promptsRun": len(sampled), "promptsSkipped": len(prompts) - len(sampled)}
+            logger.info(f"Crawl {org_id}: sampled scores drifted; recomputing every prompt")
+        full = {"mode": "full", "promptsRun": len(prompts), "promptsSkipped": 0}
+
+        if SCHEDULED_CRAWL_MODE == "bulk":
+            bulk_job_id = f"snapshot_{_default_crawl_run_id()}_{org_id}"
+            job = await submit_bulk(org_id, prompts, "latest", kind="weeklySnapshot", owner_id=org_id,
+                                    job_id=bulk_job_id, context={"prompts": prompts, "fingerprint": fingerprint})
+            if job is not None:
+                # The org's part of the crawl is done once submitted; the snapshot follows from the poller
+                return {"orgId": org_id, "orgName": org_name, "status": "success", "bulkJobId": bulk_job_id,
+                        "bulkStatus": job.get("status"), **full}
+
+        batch_req = BatchSimulationRequest(
+            prompts=prompts,
+            orgId=org_id,
+            manifestVersion="latest"
+        )
+        # A drifted sample is not scored twice
+        result = await _execute_batch_calculation(batch_req, priority=Priority.BACKGROUND, completed=sampled)
+        _store_weekly_snapshot(org_id, _full_snapshot(prompts, result, fingerprint))
+
+        return {
+            "orgId": org_id,
+            "orgName": org_name,
+            "domainStability": result["domainStability"],
+            "driftRate": result["driftRate"],
+            "status": "success",
+            **full,
+        }
+    except Exception as e:
+        logger.error(f"Crawl failed for {org_id}: {e}")
+        return {"orgId": org_id, "status": "error", "error": str(e)}
+
+
+def _full_snapshot(prompts: List[str], result: Dict[str, Any], fingerprint: Optional[str]) -> Dict[str, Any]:
+    return {**result, "fingerprint": fingerprint, "promptScores": _prompt_scores(prompts, result["results"]),
+            "computedAt": datetime.now(timezone.utc), "mode": "full"}
+
+
+def _store_weekly_snapshot(org_id: str, result: Dict[str, Any]) -> None:
+    snapshot = {
+        "timestamp": datetime.now(timezone.utc),
+        "domainStability": result["domainStability"],
+        "driftRate": result["driftRate"],
+        "modelAverages": result.get("modelAverages", {}),
+        "totalChecks": result.get("totalChecks", 0),
+    }
+    # Change-detection fields read back by the next crawl
+    for field in ("fingerprint", "promptScores", "computedAt", "mode", "sampledPrompts"):
+        if result.get(field) is not None:
+            snapshot[field] = result[field]
+    db.collection("organizations").document(org_id).collection("weeklySnapshots").add(snapshot)
+
+
+async def _complete_bulk_snapshot(job: Dict[str, Any], outcomes: Dict[str, Any]) -> None:
+    """Bulk completion handler for scheduled crawls: store the org's weekly snapshot."""
+    context = job.get("context") or {}
+    prompts = context.get("prompts", [])
+    results = [outcomes.get(checkpoint_key(p)) or RuntimeError("Prompt missing from the bulk job") for p in prompts]
+    result = _summarize_batch(prompts, results, job.get("stats") or {})
+    await asyncio.to_thread(_store_weekly_snapshot, job["orgId"],
+                            _full_snapshot(prompts, result, context.get("fingerprint")))
+
+
+register_completion_handler("weeklySnapshot", _complete_bulk_snapshot)
+
+
+async def _crawl_shard(store, claim: ShardClaim, holder: str = HOLDER_ID) -> Dict[str, Any]:
+    """Crawl the orgs of a claimed shard not yet checkpointed, then release it with every outcome."""
+    semaphore = asyncio.Semaphore(SCHEDULED_CRAWL_CONCURRENCY)
+    outcomes = dict(claim.completed)
+    renewed_at = time.monotonic()
+    lost = False
+
+    async def crawl(org_id: str) -> None:
+        nonlocal renewed_at, lost
+        async with semaphore:
+            if lost:
+                return
+            result = await _crawl_org(org_id)
+            outcome = {"status": result["status"], "at": time.time()}
+            outcome.update({k: result[k] for k in ("mode", "promptsRun", "promptsSkipped") if k in result})
+            if result.get("error"):
+                outcome["error"] = result["error"][:500]
+            await asyncio.to_thread(store.checkpoint, claim.run_id, claim.shard_id, org_id, outcome)
+            outcomes[org_id] = outcome
+            if not lost and time.monotonic() - renewed_at > CRAWL_SHARD_LEASE_SECONDS / 3:
+                renewed_at = time.monotonic()
+                if not await asyncio.to_thread(store.renew, claim.run_id, claim.shard_id, holder,
+                                               CRAWL_SHARD_LEASE_SECONDS):
+                    logger.warning(f"Lost claim on {claim.run_id}/{claim.shard_id}; leaving it to the new holder")
+                    lost = True
+
+    with start_span("crawl.shard", {"crawl.run_id": claim.run_id, "crawl.shard_id": claim.shard_id,
+                                    "crawl.orgs": len(claim.org_ids), "crawl.resumed": len(claim.completed)}):
+        await asyncio.gather(*[crawl(org_id) for org_id in claim.pending])
+    return await asyncio.to_thread(store.release, claim.run_id, claim.shard_id, holder, outcomes)
+
+
+async def _work_crawl_run(run_id: str, store=None, holder: str = HOLDER_ID) -> int:
+    """Claim and crawl shards of a run until none are claimable (all done, or the global cap is reached)."""
+    store = store or get_crawl_run_store(db)
+    shards = 0
+    while True:
+        try:
+            claim = await asyncio.to_thread(store.claim, run_id, holder, CRAWL_SHARD_LEASE_SECONDS,
+                                            CRAWL_MAX_ACTIVE_SHARDS)
+        except Exception as e:
+            logger.error(f"Crawl shard claim failed for {run_id}: {e}")
+            break
+        if claim is None:
+            break
+        try:
+            state = await _crawl_shard(store, claim, holder)
+            shards += 1
+            progress = (state or {}).get("progress", {})
+            logger.info(f"🕷️ Crawl {run_id}: shard {claim.shard_id} done "
+                        f"({progress.get('shardsDone')}/{progress.get('shardsTotal')} shards, "
+                        f"{progress.get('orgsPerMinute')} orgs/min)")
+        except Exception as e:
+            # The claim expires and another instance (or the next trigger) resumes from the checkpoints
+            logger.error(f"Crawl shard {run_id}/{claim.shard_id} failed: {e}")
+            break
+    return shards
 
 
 @router.post("/scheduled")
-async def run_scheduled_crawl(request: ScheduledCrawlRequest):
+async def run_scheduled_crawl(request: ScheduledCrawlRequest, background_tasks: BackgroundTasks):
     """
     Cron-triggered endpoint for automated weekly scoring.
     
@@ -203,6 +638,12 @@ async def run_scheduled_crawl(request: ScheduledCrawlRequest):
     
     This runs standard audit prompts for every org (or a specific org)
     and stores the results in Firestore scoringHistory.
+
+    The crawl is a sharded run (see core/crawl_runs.py): the first trigger creates
+    `crawlRuns/{runId}`, and every trigger — on any instance — claims and crawls
+    shards in the background. Re-triggering the same run resumes from its checkpoints.
+    Orgs with an unchanged fingerprint only get a sample re-check (see `_crawl_org`);
+    `progress` reports how many orgs were sampled and how many prompts that skipped.
     """
     cron_secret = os.getenv("CRON_SECRET", None)
     if not cron_secret:
@@ -214,71 +655,49 @@ async def run_scheduled_crawl(request: ScheduledCrawlRequest):
     if not db:
         raise HTTPException(status_code=503, detail="Firestore not available")
 
-    # Get orgs to crawl
-    org_ids = []
-    if request.orgId:
-        org_ids = [request.orgId]
-    else:
-        try:
-            orgs = db.collection("organizations").stream()
-            for org in orgs:
-                org_ids.append(org.id)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to list orgs: {e}")
+    store = get_crawl_run_store(db)
+    run_id = request.runId or _default_crawl_run_id(request.orgId)
+    state = await asyncio.to_thread(store.get_run, run_id)
 
-    if not org_ids:
-        return {"status": "no_orgs", "message": "No organizations found to crawl"}
+    if state is None:
+        # Get orgs to crawl
+        org_ids = []
+        if request.orgId:
+            org_ids = [request.orgId]
+        else:
+            try:
+                orgs = db.collection("organizations").select([]).stream()
+                for org in orgs:
+                    org_ids.append(org.id)
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Failed to list orgs: {e}")
 
-    crawl_results = []
-    for org_id in org_ids:
-        try:
-            # Get org name for prompt personalization
-            org_doc = db.collection("organizations").document(org_id).get()
-            org_name = "this company"
-            if org_doc.exists:
-                org_data = org_doc.to_dict() or {}
-                org_name = org_data.get("name", org_id)
-                
-                # 🛡️ SECURITY FIX (P1): Enforce plan entitlement for scheduled crawls
-                plan = org_data.get("subscription", {}).get("planId", "explorer")
-                if plan not in ["growth", "scale", "enterprise"]:
-                    logger.info(f"Skipping scheduled crawl for {org_id}: Plan '{plan}' not entitled for batch analysis.")
-                    continue
-            else:
-                continue # Skip non-existent orgs
-
-            prompts = [p.format(org_name=org_name) for p in DEFAULT_AUDIT_PROMPTS]
-
-            batch_req = BatchSimulationRequest(
-                prompts=prompts,
-                orgId=org_id,
-                manifestVersion="latest"
-            )
-            result = await _execute_batch_calculation(batch_req)
-
-            # Store weekly snapshot
-            db.collection("organizations").document(org_id).collection("weeklySnapshots").add({
-                "timestamp": datetime.now(timezone.utc),
-                "domainStability": result["domainStability"],
-                "driftRate": result["driftRate"],
-                "modelAverages": result.get("modelAverages", {}),
-                "totalChecks": result.get("totalChecks", 0),
-            })
-
-            crawl_results.append({
-                "orgId": org_id,
-                "orgName": org_name,
-                "domainStability": result["domainStability"],
-                "driftRate": result["driftRate"],
-                "status": "success",
-            })
-        except Exception as e:
-            logger.error(f"Crawl failed for {org_id}: {e}")
-            crawl_results.append({"orgId": org_id, "status": "error", "error": str(e)})
+        if not org_ids:
+            return {"status": "no_orgs", "message": "No organizations found to crawl"}
+
+        state = await asyncio.to_thread(store.create_run, run_id,
+                                        plan_shards(org_ids, request.shardSize or CRAWL_SHARD_SIZE))
+
+    if state.get("status") != "completed":
+        # Orgs are crawled at background priority; the provider gateway's adaptive
+        # limits keep the fan-out below each provider's rate limits.
+        background_tasks.add_task(_work_crawl_run, run_id, store)
 
     return {
-        "status": "completed",
-        "orgsCrawled": len(crawl_results),
+        "status": "completed" if state.get("status") == "completed" else "processing",
+        "runId": run_id,
+        "totalOrgs": state.get("totalOrgs", 0),
+        "progress": state.get("progress", {}),
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "results": crawl_results,
     }
+
+
+@router.get("/scheduled/runs/{run_id}")
+async def get_scheduled_crawl_progress(run_id: str, _: bool = Depends(verify_cron_secret)):
+    """Progress doc of a scheduled crawl run: shard states, throughput and recent failures."""
+    if not db:
+        raise HTTPException(status_code=503, detail="Firestore not available")
+    state = await asyncio.to_thread(get_crawl_run_store(db).get_run, run_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Crawl run not found")
+    return {"runId": run_id, **state}
@@ -0,0 +1,289 @@
+"""
+Author: "Sambath Kumar Natarajan"
+Date: "26-Dec-2025"
+Org: " Start-up/AUM Context Foundry"
+Product: "AUM Context Foundry"
+Description: Batch Planner — shares per-org simulation work across every prompt of a batch.
+
+A batch used to run one full `run_simulation` per prompt, all at once: each
+re-read the tenant context, resolved the manifest, built provider clients and
+embedded its prompt alone. The planner does the per-org work once:
+
+  1. dedupe prompts (whitespace/case-insensitive; duplicates share one run)
+  2. tenant context, manifest + keys and model setup — one load per batch
+  3. L1 cache, then ONE batched `get_all` over the `simulationCache` docs
+  4. ONE embeddings request for every remaining prompt, then the semantic cache
+  5. retrieval (the manifest index is loaded once and shared), claims,
+     inference and scoring per prompt on a pool of `parallelism` workers
+
+Batches never reserve quota (the batch job bills successful prompts itself).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import BackgroundTasks
+
+from api import simulation as sim
+from core.deadlines import deadline_scope
+from core.embedding_cache import embed_texts
+from core.metrics import firestore_operation
+from core.request_accounting import accounting_histograms, accounting_scope, count_firestore, stage
+from core.result_cache import simulation_result_cache
+from core.tenant_context import load_tenant_context
+from core.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+BATCH_PROMPT_CONCURRENCY = int(os.getenv("BATCH_PROMPT_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+
+
+def dedupe_key(prompt: str) -> str:
+    return " ".join(prompt.split()).casefold()
+
+
+def checkpoint_key(prompt: str) -> str:
+    """Firestore-safe id for a prompt's checkpoint; prompts that dedupe together share it."""
+    return hashlib.sha256(dedupe_key(prompt).encode()).hexdigest()[:24]
+
+
+@dataclass
+class _SharedContext:
+    """Everything about the org that is identical for every prompt of the batch."""
+    org_plan: str
+    org_data: dict
+    cache_version: str  # version used in cache keys (matches `/run`)
+    manifest_version: str
+    manifest_content: str
+    manifest_embedding: Optional[list]
+    models: "sim._ModelSetup"
+    is_dev: bool
+
+
+class BatchPlanner:
+    def __init__(self, org_id: str, manifest_version: Optional[str] = "latest", parallelism: Optional[int] = None,
+                 on_result: Optional[Callable[[str, dict], Awaitable[None]]] = None):
+        self.org_id = org_id
+        # Awaited with (prompt, result) as each unique prompt succeeds, e.g. to checkpoint it
+        self.on_result = on_result
+        self.manifest_version = manifest_version or "latest"
+        self.parallelism = max(1, min(parallelism or BATCH_PROMPT_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+        self.stats: Dict[str, Any] = {
+            "prompts": 0, "uniquePrompts": 0, "cacheHits": 0, "semanticHits": 0,
+            "simulated": 0, "errors": 0, "parallelism": self.parallelism,
+        }
+
+    async def run(self, prompts: List[str]) -> List[Any]:
+        """One outcome per input prompt, in order: a `/run`-shaped dict or the exception that prompt raised."""
+        outcomes: List[Any] = [None] * len(prompts)
+        unique: Dict[str, sim.SimulationRequest] = {}
+        owners: Dict[str, List[int]] = {}
+        for i, prompt in enumerate(prompts):
+            try:
+                request = sim.SimulationRequest(prompt=prompt, orgId=self.org_id, manifestVersion=self.manifest_version)
+            except ValueError as e:
+                outcomes[i] = e
+                continue
+            key = dedupe_key(request.prompt)
+            unique.setdefault(key, request)
+            owners.setdefault(key, []).append(i)
+        self.stats["prompts"] = len(prompts)
+        self.stats["uniquePrompts"] = len(unique)
+
+        with accounting_scope() as accounting, \
+                start_span("batch", {"org.id": self.org_id, "batch.prompts": len(prompts),
+                                     "batch.unique_prompts": len(unique), "batch.parallelism": self.parallelism}):
+            try:
+                results = await self._run_unique(list(unique.values()))
+            except Exception as e:
+                # Shared setup failed (no keys, org missing...): every prompt fails exactly as its own `/run` would
+                logger.error(f"Batch setup failed for {self.org_id}: {e}")
+                results = [e] * len(unique)
+        accounting_histograms.observe(self.org_id, accounting)
+        summary = accounting.summary()
+        self.stats["firestore"] = summary["firestore"]
+        self.stats["tokens"] = summary["tokens"]
+        self.stats["llmCalls"] = sum(m["calls"] for m in summary["models"].values())
+
+        for key, result in zip(unique, results):
+            for n, i in enumerate(owners[key]):
+                if n and isinstance(result, dict):
+                    outcomes[i] = {**result, "prompt": prompts[i].strip(), "deduplicated": True}
+                else:
+                    outcomes[i] = result
+        self.stats["errors"] = sum(1 for o in outcomes if isinstance(o, Exception))
+        return outcomes
+
+    async def _load_shared(self, template: "sim.SimulationRequest") -> _SharedContext:
+        from core.config import settings
+        is_dev = settings.ENV == "development"
+        tenant = None
+        with stage("manifest"):
+            if sim.db:
+                tenant = await asyncio.to_thread(load_tenant_context, sim.db, self.org_id,
+                                                 template.manifestVersion == "latest")
+            cache_version = sim._resolve_manifest_version(self.org_id, template.manifestVersion, tenant)
+            content, embedding, api_keys, fetched_version = await sim._fetch_manifest_and_keys_async(template, tenant)
+        manifest_version = fetched_version if fetched_version and fetched_version != "latest" else cache_version
+        org_plan = tenant.plan if tenant is not None else "explorer"
+        org_data = tenant.org_data if tenant is not None else {}
+        models = sim._resolve_model_setup(self.org_id, org_plan, api_keys, is_dev)
+        return _SharedContext(org_plan, org_data, cache_version, manifest_version, content, embedding, models, is_dev)
+
+    async def _run_unique(self, requests: List["sim.SimulationRequest"]) -> List[Any]:
+        if not requests:
+            return []
+        if self.org_id == "demo_org_id" and sim._demo_mode_enabled():
+            auth = {"uid": "batch_worker", "orgId": self.org_id}
+            demo_results = [await sim._prepare_simulation(r, auth, skip_billing=True) for r in requests]
+            for request, result in zip(requests, demo_results):
+                await self._emit(request, result)
+            return demo_results
+
+        shared, results, cache_keys, to_simulate = await self._serve_cached(requests)
+        for i, result in enumerate(results):
+            if result is not None:
+                await self._emit(requests[i], result)
+
+        semaphore = asyncio.Semaphore(self.parallelism)
+
+        async def simulate(i: int, q_embed: Optional[list]) -> dict:
+            async with semaphore:
+                result = await self._simulate(requests[i], cache_keys[i], q_embed, shared)
+            await self._emit(requests[i], result)
+            return result
+
+        outcomes = await asyncio.gather(*[simulate(i, q) for i, q in to_simulate], return_exceptions=True)
+        for (i, _), outcome in zip(to_simulate, outcomes):
+            results[i] = outcome
+        self.stats["simulated"] = len(to_simulate)
+        return results
+
+    async def _serve_cached(self, requests: List["sim.SimulationRequest"]):
+        """
+        Steps 2-4: shared setup, then every cache tier. Returns (shared, results, cache_keys, to_simulate)
+        where `results[i]` is set for cache hits and `to_simulate` lists (index, prompt embedding) of the rest.
+        """
+        shared = await self._load_shared(requests[0])
+        results: List[Any] = [None] * len(requests)
+        cache_keys = [sim._simulation_cache_key(self.org_id, r.prompt, shared.cache_version) for r in requests]
+
+        with stage("cache"):
+            pending = self._serve_l1(requests, cache_keys, results)
+            pending = await self._serve_firestore_cache(requests, cache_keys, results, pending, shared)
+
+        embeddings = await self._embed_prompts([requests[i] for i in pending], shared)
+        to_simulate = []
+        with stage("cache"):
+            for i, q_embed in zip(pending, embeddings):
+                semantic = sim._semantic_cache_response(requests[i], shared.org_plan, shared.org_data,
+                                                        shared.cache_version, q_embed)
+                if semantic is not None:
+                    results[i] = semantic
+                    self.stats["semanticHits"] += 1
+                else:
+                    to_simulate.append((i, q_embed))
+        return shared, results, cache_keys, to_simulate
+
+    async def _emit(self, request, result: dict) -> None:
+        if self.on_result is None:
+            return
+        try:
+            await self.on_result(request.prompt, result)
+        except Exception as e:
+            # A lost checkpoint only costs a re-run on retry; never fail the prompt for it
+            logger.warning(f"Batch result callback failed for {self.org_id}: {e}")
+
+    def _serve_l1(self, requests, cache_keys, results) -> List[int]:
+        pending = []
+        for i, (request, key) in enumerate(zip(requests, cache_keys)):
+            entry = simulation_result_cache.get(key)
+            response = None
+            if entry is not None:
+                response = sim._cached_simulation_response(request, entry, entry.get("planId", "explorer"), key)
+            if response is not None:
+                results[i] = response
+                self.stats["cacheHits"] += 1
+            else:
+                pending.append(i)
+        return pending
+
+    async def _serve_firestore_cache(self, requests, cache_keys, results, pending: List[int],
+                                     shared: _SharedContext) -> List[int]:
+        db = sim.db
+        if not db or not pending:
+            return pending
+        cache_ref = db.collection("organizations").document(self.org_id).collection("simulationCache")
+        refs = [cache_ref.document(cache_keys[i]) for i in pending]
+        try:
+            with firestore_operation("simulation_cache_get_all"):
+                snapshots = await asyncio.to_thread(lambda: list(db.get_all(refs)))
+            count_firestore(reads=len(refs))
+        except Exception as e:
+            logger.warning(f"Batch cache check failed: {e}")
+            return pending
+        found = {snap.id: snap for snap in snapshots if snap.exists}
+        still_pending = []
+        for i in pending:
+            snap = found.get(cache_keys[i])
+            response = None
+            if snap is not None:
+                response = sim._firestore_cached_response(requests[i], snap.to_dict() or {}, shared.org_plan,
+                                                          cache_keys[i])
+            if response is not None:
+                results[i] = response
+                self.stats["cacheHits"] += 1
+            else:
+                still_pending.append(i)
+        return still_pending
+
+    async def _embed_prompts(self, requests, shared: _SharedContext) -> List[Optional[list]]:
+        openai_key = shared.models.api_keys.get("openai")
+        if not requests or not openai_key or not sim.db:
+            return [None] * len(requests)
+        with stage("embedding"):
+            try:
+                return await embed_texts(sim._openai_client(openai_key), [r.prompt for r in requests])
+            except Exception as e:
+                logger.warning(f"Batch prompt embedding failed: {e}")
+                return [None] * len(requests)
+
+    async def _simulate(self, request, cache_key: str, q_embed: Optional[list], shared: _SharedContext) -> dict:
+        manifest_content, retrieved_context = await sim._retrieve_prompt_context(
+            self.org_id, shared.manifest_version, q_embed, shared.manifest_content, shared.is_dev)
+        plan = sim._SimulationPlan(
+            request=request,
+            org_plan=shared.org_plan,
+            cache_key=cache_key,
+            manifest_version=shared.manifest_version,
+            manifest_content=manifest_content,
+            manifest_embedding=shared.manifest_embedding,
+            retrieved_context=retrieved_context,
+            api_keys=shared.models.api_keys,
+            system_prompt=sim._build_system_prompt(manifest_content),
+            model_specs=shared.models.model_specs,
+            gemini_api_model=shared.models.gemini_api_model,
+            locked_models=shared.models.locked_models,
+            quota_token=None,
+            prompt_embedding=q_embed,
+        )
+        graph = sim._build_simulation_graph(plan)
+        with deadline_scope(sim._simulation_deadline_seconds()):
+            outputs = await graph.run()
+        # Per-prompt persistence tasks are not run: the batch job stores and bills its own results
+        return sim._finalize_simulation(plan, outputs["blend"], outputs["claims"], outputs["adjudicate"],
+                                        BackgroundTasks())
+
+
+async def run_batch_prompts(org_id: str, prompts: List[str], manifest_version: Optional[str] = "latest",
+                            parallelism: Optional[int] = None,
+                            on_result: Optional[Callable[[str, dict], Awaitable[None]]] = None):
+    """Plan and run a batch; returns (per-prompt outcomes, planner stats)."""
+    planner = BatchPlanner(org_id, manifest_version, parallelism, on_result)
+    outcomes = await planner.run(prompts)
+    logger.info(f"📦 Batch for {org_id}: {planner.stats}")
+    return outcomes, planner.stats
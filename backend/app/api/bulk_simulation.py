@@ -0,0 +1,518 @@
+"""
+Author: "Sambath Kumar Natarajan"
+Date: "26-Dec-2025"
+Org: " Start-up/AUM Context Foundry"
+Product: "AUM Context Foundry"
+Description: Bulk Simulation — offline mode for batch jobs and scheduled crawls.
+
+Instead of one gateway call per model, claim set and verification, a bulk job
+hands a whole batch's chat requests to the providers' batch APIs
+(core/bulk_inference.py) and is advanced by a background poller:
+
+  submit      planner setup + every cache tier (shared with the live planner), retrieval,
+              cached claim sets; the job is stored, then ONE provider submission per provider
+              with every inference request (and the claim extractions, on the claim model's provider)
+  inference   poll; collect answers and claims as each provider's batch ends
+  verification ONE submission with the combined verification call of every prompt
+  ingesting   divergence (one embeddings call per prompt), blend, adjudication (live, only
+              when engines diverge), cache writes; then the completion handler for the job's kind
+              ("batchJobs" checkpoints and bills a batch job, "weeklySnapshot" stores a crawl snapshot)
+
+Provider calls in a submission never go through the gateway, so a batch is no
+longer bounded by our per-provider concurrency limits. Providers without a batch
+adapter (Gemini), and dev-mode mock runners, are run synchronously at BACKGROUND
+priority while the job is submitted.
+"""
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import BackgroundTasks
+
+from api import simulation as sim
+from api.batch_planner import BATCH_PROMPT_CONCURRENCY, BatchPlanner, checkpoint_key
+from core.bulk_inference import FAILED, IN_PROGRESS, BulkRequest, get_bulk_adapter
+from core.bulk_jobs import get_bulk_job_store, new_job_state
+from core.crawl_runs import HOLDER_ID
+from core.firebase_config import db
+from core.model_config import OPENAI_CLAIM_MODEL
+from core.provider_gateway import Priority, provider_priority
+from core.tracing import start_span
+from utils.task_queue import FirestoreTaskQueue
+
+logger = logging.getLogger(__name__)
+
+BULK_POLL_INTERVAL_SECONDS = float(os.getenv("BULK_POLL_INTERVAL_SECONDS", "60"))
+# Consecutive failed steps (provider/API errors) before a job is failed for good
+BULK_MAX_STEP_FAILURES = int(os.getenv("BULK_MAX_STEP_FAILURES", "5"))
+
+CompletionHandler = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+COMPLETION_HANDLERS: Dict[str, CompletionHandler] = {}
+
+_RUNNER_PROVIDERS = {"run_openai": "openai", "run_gemini": "gemini", "run_claude": "anthropic"}
+
+
+def register_completion_handler(kind: str, handler: CompletionHandler) -> None:
+    """`handler(job, outcomes)` ingests a finished job; outcomes map each prompt's `checkpoint_key`
+    to its `/run`-shaped result or the exception it failed with."""
+    COMPLETION_HANDLERS[kind] = handler
+
+
+def _spec_model(spec) -> Dict[str, Any]:
+    name, runner_fn, runner_key = spec
+    func = getattr(runner_fn, "func", runner_fn)
+    return {
+        "name": sim._normalize_model_name(name),
+        "provider": _RUNNER_PROVIDERS.get(getattr(func, "__name__", ""), ""),
+        "apiModel": (getattr(runner_fn, "keywords", None) or {}).get("api_model"),
+    }
+
+
+def _bulk_provider(provider: str, api_keys: dict):
+    """(adapter, key) when `provider` can take a bulk submission for this org, else (None, None)."""
+    adapter = get_bulk_adapter(provider)
+    key = api_keys.get(provider)
+    return (adapter, key) if adapter is not None and key else (None, None)
+
+
+def _template(job: Dict[str, Any]) -> "sim.SimulationRequest":
+    return sim.SimulationRequest(prompt="bulk", orgId=job["orgId"], manifestVersion=job.get("manifestVersion"))
+
+
+async def _load_keys(job: Dict[str, Any]):
+    """Shared org context (keys, models, manifest embedding), re-resolved on every step; keys are never stored."""
+    planner = BatchPlanner(job["orgId"], job.get("manifestVersion"))
+    return await planner._load_shared(_template(job))
+
+
+async def _submit(job_id: str, requests: Dict[str, List[BulkRequest]], api_keys: dict,
+                  phase: str) -> Dict[str, Dict[str, Any]]:
+    submissions = {}
+    for provider, batch in requests.items():
+        if not batch:
+            continue
+        adapter, key = _bulk_provider(provider, api_keys)
+        batch_id = await adapter.submit(batch, key)
+        submissions[provider] = {"batchId": batch_id, "phase": phase, "requests": len(batch), "collected": False}
+        logger.info(f"📮 Bulk job {job_id}: {len(batch)} {phase} requests submitted to {provider} ({batch_id})")
+    return submissions
+
+
+async def _submit_inference(store, job_id: str, job: Dict[str, Any], api_keys: dict) -> None:
+    """
+    Submit the inference requests stored on the items, one provider at a time. Each accepted batch is
+    stored right away, so a step that fails (or an instance that dies) part-way resumes with the
+    providers that have no submission yet instead of paying for the accepted ones twice.
+    """
+    items = await asyncio.to_thread(store.items, job_id)
+    requests: Dict[str, List[BulkRequest]] = {}
+    for item in items.values():
+        for provider, batch in (item.get("bulkRequests") or {}).items():
+            requests.setdefault(provider, []).extend(BulkRequest(**request) for request in batch)
+    submissions = dict(job.get("submissions") or {})
+    for provider, batch in requests.items():
+        if provider in submissions:
+            continue
+        submissions.update(await _submit(job_id, {provider: batch}, api_keys, "inference"))
+        await asyncio.to_thread(store.update, job_id, {"submissions": submissions})
+    await asyncio.to_thread(store.update, job_id, {"status": "inference"})
+
+
+async def submit_bulk(org_id: str, prompts: List[str], manifest_version: Optional[str] = "latest",
+                      kind: str = "batchJobs", owner_id: Optional[str] = None, job_id: Optional[str] = None,
+                      owner_collection: Optional[str] = None, context: Optional[Dict[str, Any]] = None,
+                      store=None) -> Optional[Dict[str, Any]]:
+    """
+    Create a bulk job for `prompts` and submit its inference requests. Cache hits are stored as
+    finished items; `context` is kept on the job for the completion handler. The job is created
+    ("submitting", with its requests on the items) before anything reaches a provider. Returns the job
+    state (an existing job with the same id is only resumed if its submission was interrupted),
+    or None when the org cannot run in bulk mode (demo org), so the caller runs the batch live.
+    """
+    store = store or get_bulk_job_store(db)
+    job_id = job_id or f"bulk_{uuid.uuid4().hex}"
+    existing = await asyncio.to_thread(store.get, job_id)
+    if existing is not None:
+        if existing.get("status") == "submitting":
+            await advance_bulk_job(job_id, store)
+            return await asyncio.to_thread(store.get, job_id)
+        return existing
+    if org_id == "demo_org_id" and sim._demo_mode_enabled():
+        return None
+
+    planner = BatchPlanner(org_id, manifest_version)
+    unique: Dict[str, "sim.SimulationRequest"] = {}
+    items: Dict[str, Dict[str, Any]] = {}
+    for prompt in prompts:
+        try:
+            request = sim.SimulationRequest(prompt=prompt, orgId=org_id, manifestVersion=planner.manifest_version)
+        except ValueError as e:
+            items[checkpoint_key(prompt)] = {"prompt": prompt.strip(), "error": str(e)}
+            continue
+        unique.setdefault(checkpoint_key(request.prompt), request)
+
+    job_fields = {"manifestVersion": planner.manifest_version, "ownerCollection": owner_collection,
+                  "context": context or {}}
+    stats: Dict[str, Any] = {"prompts": len(prompts), "uniquePrompts": len(unique), "cacheHits": 0,
+                             "simulated": 0, "bulkRequests": {}, "syncCalls": 0}
+    models: List[Dict[str, Any]] = []
+
+    with start_span("bulk.submit", {"org.id": org_id, "bulk.kind": kind, "bulk.unique_prompts": len(unique)}):
+        if unique:
+            keys = list(unique)
+            shared, results, cache_keys, to_simulate = await planner._serve_cached(list(unique.values()))
+            job_fields.update(resolvedVersion=shared.manifest_version)
+            models = [_spec_model(spec) for spec in shared.models.model_specs]
+            for i, key in enumerate(keys):
+                items[key] = {"prompt": unique[key].prompt, "cacheKey": cache_keys[i]}
+                if results[i] is not None:
+                    items[key]["result"] = results[i]
+            stats["cacheHits"] = len(keys) - len(to_simulate)
+            stats["simulated"] = len(to_simulate)
+
+            requests: Dict[str, List[BulkRequest]] = {}
+            semaphore = asyncio.Semaphore(BATCH_PROMPT_CONCURRENCY)
+
+            async def prepare_prompt(key: str, q_embed: Optional[list]) -> None:
+                request, item = unique[key], items[key]
+                manifest_content, retrieved = await sim._retrieve_prompt_context(
+                    org_id, shared.manifest_version, q_embed, shared.manifest_content, shared.is_dev)
+                item.update(retrievedContext=retrieved, grounding=manifest_content[:2000],
+                            answers={}, errors={}, finished={})
+                system_prompt = sim._build_system_prompt(manifest_content)
+                for m, (spec, model) in enumerate(zip(shared.models.model_specs, models)):
+                    adapter, _ = _bulk_provider(model["provider"], shared.models.api_keys)
+                    if adapter is not None and not sim._is_mock_runner(spec[2]):
+                        requests.setdefault(model["provider"], []).append(BulkRequest(
+                            f"{key}-infer-{m}", model["apiModel"], system_prompt, request.prompt))
+                        continue
+                    stats["syncCalls"] += 1
+                    with provider_priority(Priority.BACKGROUND):
+                        outcome = await sim._infer_model(model["name"], spec[1], spec[2],
+                                                         system_prompt, request.prompt)
+                    if isinstance(outcome, dict):
+                        item["finished"][model["name"]] = outcome
+                    else:
+                        item["answers"][model["name"]] = outcome
+
+                claims = await sim.lookup_cached_claims(org_id, shared.manifest_version, request.prompt)
+                if claims is not None:
+                    item["claims"] = claims
+                elif _bulk_provider("openai", shared.models.api_keys)[0] is not None:
+                    requests.setdefault("openai", []).append(BulkRequest(
+                        f"{key}-claims", OPENAI_CLAIM_MODEL, *sim._claims_prompt(manifest_content, request.prompt),
+                        json_mode=True, temperature=0))
+                else:
+                    stats["syncCalls"] += 1
+                    with provider_priority(Priority.BACKGROUND):
+                        item["claims"] = await sim.extract_claims(manifest_content, request.prompt,
+                                                                  shared.models.api_keys,
+                                                                  gemini_api_model=shared.models.gemini_api_model)
+                    item["claimsFresh"] = True
+
+            async def prepare(i: int, q_embed: Optional[list]) -> None:
+                async with semaphore:
+                    try:
+                        await prepare_prompt(keys[i], q_embed)
+                    except Exception as e:
+                        logger.error(f"Bulk job {job_id}: could not prepare one prompt: {e}")
+                        items[keys[i]]["error"] = str(e)
+
+            await asyncio.gather(*[prepare(i, q_embed) for i, q_embed in to_simulate])
+            stats["bulkRequests"] = {provider: len(batch) for provider, batch in requests.items()}
+            for provider, batch in requests.items():
+                for request in batch:
+                    item = items[request.custom_id.partition("-")[0]]
+                    item.setdefault("bulkRequests", {}).setdefault(provider, []).append(dataclasses.asdict(request))
+
+    job = new_job_state(org_id, kind, owner_id or job_id, time.time(), status="submitting", models=models,
+                        stats=stats, **job_fields)
+    if not await asyncio.to_thread(store.create, job_id, job, items):
+        logger.warning(f"Bulk job {job_id} was created concurrently; keeping the existing job")
+        return await asyncio.to_thread(store.get, job_id)
+    logger.info(f"📦 Bulk job {job_id} for {org_id}: {stats}")
+    # First step right away: submits to the providers (under the job's lease); with nothing
+    # at the providers (all cached / synchronous) the job finishes here
+    await advance_bulk_job(job_id, store)
+    return await asyncio.to_thread(store.get, job_id)
+
+
+def _parse_json(text: Optional[str]) -> Optional[dict]:
+    try:
+        value = json.loads(text or "")
+        return value if isinstance(value, dict) else None
+    except ValueError:
+        return None
+
+
+def _apply_results(job: Dict[str, Any], items: Dict[str, Dict[str, Any]], results) -> Dict[str, Dict[str, Any]]:
+    """Fold one provider batch's results into their items; returns the changed item fields."""
+    models = job.get("models", [])
+    updates: Dict[str, Dict[str, Any]] = {}
+    for custom_id, result in results.items():
+        key, _, request_kind = custom_id.partition("-")
+        item = items.get(key)
+        if item is None:
+            continue
+        changed = updates.setdefault(key, {})
+        kind, _, index = request_kind.partition("-")
+        name = models[int(index)]["name"] if index.isdigit() and int(index) < len(models) else None
+        if kind == "infer" and name:
+            field, value = ("answers", result.text) if result.ok else ("errors", result.error)
+            item[field] = {**item.get(field, {}), name: value}
+            changed[field] = item[field]
+        elif kind == "claims":
+            item["claims"] = sim._parse_claims(_parse_json(result.text)) if result.ok else []
+            item["claimsFresh"] = True
+            changed.update(claims=item["claims"], claimsFresh=True)
+        elif kind == "verify":
+            verdicts = dict(item.get("verdicts") or {})
+            if name:
+                verdicts[name] = (_parse_json(result.text) or {}).get("results", []) if result.ok else []
+            elif result.ok:
+                verdicts.update(sim._split_multi_verdicts(_parse_json(result.text), item.get("verifyLabels") or {}))
+            item["verdicts"] = verdicts
+            changed["verdicts"] = verdicts
+    return updates
+
+
+async def _collect(store, job_id: str, job: Dict[str, Any], api_keys: dict) -> bool:
+    """Ingest every provider batch of the current phase that has ended; True once all have."""
+    submissions = job.get("submissions") or {}
+    pending = False
+    for provider, submission in submissions.items():
+        if submission.get("collected"):
+            continue
+        adapter, key = _bulk_provider(provider, api_keys)
+        if adapter is None:
+            raise RuntimeError(f"{provider} key or bulk adapter no longer available")
+        state = await adapter.status(submission["batchId"], key)
+        if state == IN_PROGRESS:
+            pending = True
+            continue
+        results = {} if state == FAILED else await adapter.results(submission["batchId"], key)
+        if state == FAILED:
+            logger.error(f"Bulk job {job_id}: {provider} batch {submission['batchId']} failed")
+        items = await asyncio.to_thread(store.items, job_id)
+        await asyncio.to_thread(store.update_items, job_id, _apply_results(job, items, results))
+        # Requests missing from a finished batch surface as per-model errors at ingest
+        submissions[provider] = {**submission, "collected": True, "failed": state == FAILED}
+        await asyncio.to_thread(store.update, job_id, {"submissions": submissions})
+    return not pending
+
+
+async def _submit_verification(store, job_id: str, job: Dict[str, Any], shared) -> None:
+    """One combined verification request per prompt (per-model requests when a single answer or over budget)."""
+    api_keys = shared.models.api_keys
+    items = await asyncio.to_thread(store.items, job_id)
+    index = {model["name"]: m for m, model in enumerate(job.get("models", []))}
+    bulk, _ = _bulk_provider("openai", api_keys)
+    requests: List[BulkRequest] = []
+    updates: Dict[str, Dict[str, Any]] = {}
+    sync_calls = 0
+    for key, item in items.items():
+        claims, answers = item.get("claims") or [], item.get("answers") or {}
+        if "result" in item or item.get("error") or not claims or not answers:
+            continue
+        if bulk is None:
+            sync_calls += 1
+            with provider_priority(Priority.BACKGROUND):
+                verdicts = await sim.verify_claims_multi(claims, answers, api_keys,
+                                                         gemini_api_model=shared.models.gemini_api_model)
+            updates[key] = {"verdicts": verdicts}
+            continue
+        sys_prompt, user_content, labels = sim._verify_multi_prompt(claims, answers)
+        if len(answers) > 1 and sim._estimate_tokens(sys_prompt + user_content) <= sim.VERIFY_MULTI_TOKEN_BUDGET:
+            requests.append(BulkRequest(f"{key}-verify", OPENAI_CLAIM_MODEL, sys_prompt, user_content,
+                                        json_mode=True, temperature=0))
+            updates[key] = {"verifyLabels": labels}
+            continue
+        for name, answer in answers.items():
+            requests.append(BulkRequest(f"{key}-verify-{index[name]}", OPENAI_CLAIM_MODEL,
+                                        *sim._verify_prompt(claims, answer), json_mode=True, temperature=0))
+    if updates:
+        await asyncio.to_thread(store.update_items, job_id, updates)
+    submissions = await _submit(job_id, {"openai": requests}, api_keys, "verification")
+    stats = dict(job.get("stats") or {})
+    stats["verificationRequests"] = len(requests)
+    stats["syncCalls"] = stats.get("syncCalls", 0) + sync_calls
+    await asyncio.to_thread(store.update, job_id, {"status": "verification", "submissions": submissions,
+                                                   "stats": stats})
+
+
+async def _ingest_item(job: Dict[str, Any], item: Dict[str, Any], shared) -> dict:
+    """Score one prompt from its collected answers and verdicts, exactly as a live run would."""
+    api_keys = shared.models.api_keys
+    version = job.get("resolvedVersion") or shared.manifest_version
+    request = sim.SimulationRequest(prompt=item["prompt"], orgId=job["orgId"], manifestVersion=job.get("manifestVersion"))
+    claims = item.get("claims") or []
+    answers = item.get("answers") or {}
+    verdicts = dict(item.get("verdicts") or {})
+    # Answers the combined judge reply left out are verified one by one, as in the live path
+    missing = [name for name in answers if name not in verdicts] if claims else []
+    if missing:
+        with provider_priority(Priority.BACKGROUND):
+            scored = await asyncio.gather(*[sim.verify_claims(claims, answers[name], api_keys,
+                                                              gemini_api_model=shared.models.gemini_api_model)
+                                            for name in missing])
+        verdicts.update(zip(missing, scored))
+    divergence = {name: 0.5 for name in answers}
+    if answers and api_keys.get("openai"):
+        divergence = await sim.compute_divergences(api_keys["openai"], shared.manifest_embedding, answers,
+                                                   context_text=item.get("retrievedContext"))
+
+    results = []
+    for model in job.get("models", []):
+        name = model["name"]
+        if name in (item.get("finished") or {}):
+            results.append(item["finished"][name])
+        elif name in answers:
+            results.append(sim._blend_score(name, answers[name], divergence[name], verdicts.get(name, [])))
+        else:
+            error = (item.get("errors") or {}).get(name) or "No result from the provider batch"
+            results.append(sim._model_error_result(name, error))
+
+    plan = sim._SimulationPlan(
+        request=request,
+        org_plan=shared.org_plan,
+        cache_key=item["cacheKey"],
+        manifest_version=version,
+        manifest_content=item.get("grounding") or shared.manifest_content,
+        manifest_embedding=shared.manifest_embedding,
+        retrieved_context=item.get("retrievedContext"),
+        api_keys=api_keys,
+        system_prompt="",
+        model_specs=shared.models.model_specs,
+        gemini_api_model=shared.models.gemini_api_model,
+        locked_models=shared.models.locked_models,
+        quota_token=None,
+    )
+    with provider_priority(Priority.BACKGROUND):
+        adjudication = await sim._adjudicate(plan, results)
+    if item.get("claimsFresh"):
+        await sim.store_claims(job["orgId"], version, item["prompt"], claims)
+    # Per-prompt persistence tasks are not run: the completion handler stores and bills its own results
+    return {**sim._finalize_simulation(plan, results, claims, adjudication, BackgroundTasks()), "bulk": True}
+
+
+def _outcomes(items: Dict[str, Dict[str, Any]], error: Optional[str] = None) -> Dict[str, Any]:
+    outcomes: Dict[str, Any] = {}
+    for key, item in items.items():
+        if "result" in item:
+            outcomes[key] = item["result"]
+        else:
+            outcomes[key] = RuntimeError(item.get("error") or error or "not ingested")
+    return outcomes
+
+
+async def _complete(store, job_id: str, job: Dict[str, Any], outcomes: Dict[str, Any], status: str = "completed",
+                    error: Optional[str] = None) -> None:
+    handler = COMPLETION_HANDLERS.get(job.get("kind"))
+    if handler is not None:
+        await handler(job, outcomes)
+    else:
+        logger.warning(f"Bulk job {job_id}: no completion handler for kind {job.get('kind')!r}")
+    fields = {"status": status, "completedAt": time.time(), "submissions": {}}
+    if error:
+        fields["error"] = error[:500]
+    await asyncio.to_thread(store.update, job_id, fields)
+
+
+async def _ingest(store, job_id: str, job: Dict[str, Any], shared) -> None:
+    items = await asyncio.to_thread(store.items, job_id)
+    finished: Dict[str, Dict[str, Any]] = {}
+    for key, item in items.items():
+        if "result" in item or item.get("error"):
+            continue
+        try:
+            finished[key] = {"result": await _ingest_item(job, item, shared)}
+        except Exception as e:
+            logger.error(f"Bulk job {job_id}: ingest failed for one prompt: {e}")
+            finished[key] = {"error": str(e)}
+        items[key].update(finished[key])
+    # Stored before the handler runs, so a failed handler retries without re-scoring
+    await asyncio.to_thread(store.update_items, job_id, finished)
+    await _complete(store, job_id, job, _outcomes(items))
+
+
+async def _heartbeat(job: Dict[str, Any]) -> None:
+    """Keep the owning task-queue job fresh so the stalled-job sweep leaves it to the poller."""
+    if job.get("ownerCollection"):
+        await asyncio.to_thread(FirestoreTaskQueue.heartbeat, job["orgId"], job["ownerCollection"], job["ownerId"])
+
+
+async def _advance(store, job_id: str) -> Optional[str]:
+    shared = None
+    while True:
+        job = await asyncio.to_thread(store.get, job_id)
+        status = (job or {}).get("status")
+        if status not in ("submitting", "inference", "verification", "ingesting"):
+            return status
+        if shared is None:
+            shared = await _load_keys(job)
+            await _heartbeat(job)
+        if status == "submitting":
+            await _submit_inference(store, job_id, job, shared.models.api_keys)
+        elif status == "ingesting":
+            await _ingest(store, job_id, job, shared)
+        elif not await _collect(store, job_id, job, shared.models.api_keys):
+            return status
+        elif status == "inference":
+            await _submit_verification(store, job_id, job, shared)
+        else:
+            await asyncio.to_thread(store.update, job_id, {"status": "ingesting", "submissions": {}})
+
+
+async def advance_bulk_job(job_id: str, store=None, holder: str = HOLDER_ID) -> Optional[str]:
+    """Move a job as far as the providers allow (under its lease); returns its status afterwards."""
+    store = store or get_bulk_job_store(db)
+    if not await asyncio.to_thread(store.lease, job_id, holder):
+        return None
+    try:
+        with start_span("bulk.advance", {"bulk.job_id": job_id}):
+            status = await _advance(store, job_id)
+        await asyncio.to_thread(store.update, job_id, {"stepFailures": 0})
+        return status
+    except Exception as e:
+        job = await asyncio.to_thread(store.get, job_id) or {}
+        failures = job.get("stepFailures", 0) + 1
+        logger.error(f"Bulk job {job_id} step failed ({failures}/{BULK_MAX_STEP_FAILURES}): {e}")
+        await asyncio.to_thread(store.update, job_id, {"stepFailures": failures, "lastError": str(e)[:500]})
+        if failures < BULK_MAX_STEP_FAILURES:
+            return job.get("status")
+        items = await asyncio.to_thread(store.items, job_id)
+        try:
+            await _complete(store, job_id, job, _outcomes(items, str(e)), status="failed", error=str(e))
+        except Exception as handler_error:
+            logger.error(f"Bulk job {job_id}: completion handler failed: {handler_error}")
+            await asyncio.to_thread(store.update, job_id, {"status": "failed", "error": str(e)[:500]})
+        return "failed"
+    finally:
+        await asyncio.to_thread(store.unlease, job_id, holder)
+
+
+async def poll_bulk_jobs(store=None, holder: str = HOLDER_ID) -> int:
+    """Advance every active bulk job this instance can lease; returns how many were active."""
+    store = store or get_bulk_job_store(db)
+    job_ids = await asyncio.to_thread(store.active)
+    for job_id in job_ids:
+        await advance_bulk_job(job_id, store, holder)
+    return len(job_ids)
+
+
+async def run_bulk_poller():
+    """Perpetual background loop that advances bulk jobs every BULK_POLL_INTERVAL_SECONDS."""
+    while True:
+        try:
+            await asyncio.sleep(BULK_POLL_INTERVAL_SECONDS)
+            await poll_bulk_jobs()
+        except asyncio.CancelledError:
+            logger.info("🛑 Bulk inference poller stopped.")
+            break
+        except Exception as e:
+            logger.error(f"⚠️ Bulk inference poll failed: {e}")
@@ -5,6 +5,10 @@ from pydantic import BaseModel
 import os
 import json
 from openai import AsyncOpenAI
+from core.provider_clients import get_openai_client
+from core.embedding_cache import embed_text
+from core.manifest_index import retrieve_top_chunks
+from core.provider_gateway import provider_call
 from typing import List, Dict
 import numpy as np
 
@@ -72,12 +76,11 @@ async def chat_with_manifest(request: ChatRequest, auth: dict = Depends(get_auth
             return {"response": f"I am the AUM Support Bot (Simulated). I've analyzed your query: '{request.query}'. This is a mock response because no OpenAI API key is configured."}
         raise HTTPException(status_code=402, detail="OpenAI API key missing for this organization")
 
-    client = AsyncOpenAI(api_key=openai_key)
+    client = get_openai_client(openai_key, AsyncOpenAI)
 
     # 2. Vectorize User Query for Semantic Search
     try:
-        query_embed_resp = await client.embeddings.create(input=[request.query], model="text-embedding-3-small")
-        query_vector = query_embed_resp.data[0].embedding
+        query_vector = await embed_text(client, request.query)
     except Exception as e:
         logger.error(f"Query embedding failed: {e}")
         query_vector = None
@@ -95,40 +98,12 @@ async def chat_with_manifest(request: ChatRequest, auth: dict = Depends(get_auth
             if latest_manifest_doc:
                 top_chunks: list[str] = []
                 try:
-                    from google.cloud.firestore_v1.vector import Vector
-                    from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
-
-                    collection_ref = latest_manifest_doc.reference.collection("chunks")
-                    vector_query = collection_ref.find_nearest(
-                        vector_field="embedding",
-                        query_vector=Vector(query_vector),
-                        distance_measure=DistanceMeasure.COSINE,
-                        limit=5
+                    top_chunks = await retrieve_top_chunks(
+                        request.orgId, latest_manifest_doc.id,
+                        latest_manifest_doc.reference.collection("chunks"), query_vector, k=5,
                     )
-                    top_chunks = [doc.to_dict().get("text", "") for doc in vector_query.get()]
                 except Exception as e:
-                    logger.warning(f"Chatbot vector search failed, falling back to scan: {e}")
-                    try:
-                        chunks_ref = latest_manifest_doc.reference.collection("chunks").limit(50).stream()
-
-                        import numpy as np
-
-                        def cosine_sim(v1, v2):
-                            norm_prod = (np.linalg.norm(v1) * np.linalg.norm(v2))
-                            return float(np.dot(v1, v2) / norm_prod) if norm_prod > 0 else 0.0
-
-                        chunk_matches = []
-                        for doc in chunks_ref:
-                            data = doc.to_dict()
-                            if "embedding" in data and "text" in data:
-                                sim = cosine_sim(query_vector, data["embedding"])
-                                chunk_matches.append((sim, data["text"]))
-
-                        # Sort by similarity descending and pick top 5
-                        chunk_matches.sort(key=lambda x: x[0], reverse=True)
-                        top_chunks = [m[1] for m in chunk_matches[:5]]
-                    except Exception as scan_err:
-                        logger.warning(f"Chatbot fallback scan failed: {scan_err}")
+                    logger.warning(f"Chatbot manifest index retrieval failed: {e}")
 
                 if top_chunks:
                     context_text = "\n\n---\n\n".join(top_chunks)
@@ -170,11 +145,11 @@ Rules:
     messages.append({"role": "user", "content": request.query})
 
     try:
-        response = await client.chat.completions.create(
+        response = await provider_call("openai", openai_key, lambda: client.chat.completions.create(
             model=OPENAI_SIMULATION_MODEL,
             messages=messages,
             temperature=0.3
-        )
+        ))
         return {"response": response.choices[0].message.content}
     except Exception as e:
         logger.error(f"Chatbot RAG Synthesis failed: {e}")
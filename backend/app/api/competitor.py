@@ -11,6 +11,8 @@ from pydantic import BaseModel
 from core.security import get_auth_context, verify_user_org_access
 from core.firebase_config import db
 from openai import AsyncOpenAI
+from core.provider_clients import get_openai_client
+from core.provider_gateway import provider_call
 import os
 import json
 import logging
@@ -175,7 +177,7 @@ async def get_competitor_displacement(org_id: str, version: str = Query("latest"
         # 🛡️ SECURITY HARDENING (P1): Sanitize manifest_content to prevent XML injection
         clean_content = manifest_content[:6000].replace("</Context>", "[CONTEXT_END]").replace("<Context>", "[CONTEXT_START]")
         
-        client = AsyncOpenAI(api_key=api_key)
+        client = get_openai_client(api_key, AsyncOpenAI)
         prompt = f"""You are a market analyst simulating AI search behavior.
 IMPORTANT: The 'displacementRate' must be a grounded estimate (0-100) of how often an AI would recommend the competitor over {org_name}. 
 DO NOT hallucinate 100% or 0% unless absolute certainty exists. 
@@ -211,12 +213,12 @@ For each competitor, return a JSON object with:
 
 Return ONLY valid JSON: {{"competitors": [...]}}"""
 
-        completion = await client.chat.completions.create(
+        completion = await provider_call("openai", api_key, lambda: client.chat.completions.create(
             messages=[{"role": "user", "content": prompt}],
             model="gpt-4o",
             response_format={"type": "json_object"},
             temperature=0.2
-        )
+        ))
         
         result = json.loads(completion.choices[0].message.content)
         competitors = result.get("competitors", [])
@@ -19,11 +19,18 @@ from utils.task_queue import FirestoreTaskQueue
 import asyncio
 from typing import Optional
 from openai import AsyncOpenAI
+from core.provider_clients import get_openai_client
+from core.provider_gateway import provider_call
+from core.embedding_cache import embed_text, embed_texts
+from core.result_cache import invalidate_org_caches
+from core.manifest_index import ManifestIndex, manifest_index_registry
+from core.request_accounting import stage
 from core.firebase_config import db
 from core.security import get_auth_context, verify_user_org_access
 from core.config import settings
 from core.model_config import OPENAI_SCHEMA_MODEL, OPENAI_MANIFEST_MODEL, OPENAI_EMBEDDING_MODEL
 from api.audit import log_audit_event
+from api.batch_analysis import enqueue_autopilot_audit
 from core.industry_prompts import detect_vertical_from_name, get_queries_for_vertical
 import httpx
 from core.url_security import validate_public_url
@@ -123,12 +130,12 @@ Organization hint: {org_label}
 </Doc>
 """
     try:
-        response = await client.chat.completions.create(
+        response = await provider_call("openai", getattr(client, "api_key", None), lambda: client.chat.completions.create(
             messages=[{"role": "user", "content": prompt}],
             model=OPENAI_SCHEMA_MODEL,
             response_format={"type": "json_object"},
             temperature=0
-        )
+        ))
         payload = json.loads(response.choices[0].message.content)
         taxonomy = (payload.get("taxonomy") or "General Enterprise").strip()
         if taxonomy not in TAXONOMY_LABELS:
@@ -143,6 +150,7 @@ Organization hint: {org_label}
 
 @router.post("/parse")
 async def parse_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...), 
     orgId: str = Form(None),
     auth: dict = Depends(get_auth_context)
@@ -170,6 +178,7 @@ async def parse_document(
             raise HTTPException(status_code=403, detail="API key unauthorized for this organization")
 
     # Enforce Document Limits (Subscription Gating)
+    org_plan = "explorer"
     if db:
         try:
             org_doc = db.collection("organizations").document(orgId).get()
@@ -202,7 +211,8 @@ async def parse_document(
             return f"Markdown extraction failed: {str(e)}"
 
     try:
-        raw_text = await asyncio.to_thread(_extract_pdf_text, content)
+        with stage("extract"):
+            raw_text = await asyncio.to_thread(_extract_pdf_text, content)
         del content
         gc.collect() # Zero-Retention: Explicit RAM flush
     except Exception as e:
@@ -230,19 +240,17 @@ async def parse_document(
             return {"@context": "https://schema.org", "name": "Mock Ingestion", "status": "Dev/Mock"}
         raise HTTPException(status_code=503, detail="Infrastructure API key missing.")
 
+    autopilot_job_id = None
     try:
-        client = AsyncOpenAI(api_key=api_key)
+        client = get_openai_client(api_key, AsyncOpenAI)
         
         # --- SEMANTIC CHUNKING ---
         full_text = raw_text[:100000]
         chunks = recursive_split(full_text, 2000, 200)
 
-        # Vectorize chunks in batches
-        chunk_vectors = []
-        for i in range(0, len(chunks), 16):
-            batch = chunks[i:i+16]
-            embed_batch = await client.embeddings.create(input=batch, model="text-embedding-3-small")
-            chunk_vectors.extend([e.embedding for e in embed_batch.data])
+        # Vectorize chunks (unchanged chunks from a re-ingest come from the embedding cache)
+        with stage("embedding"):
+            chunk_vectors = await embed_texts(client, chunks)
 
         # Schema Extraction Strategy
         doc_sample = raw_text[:20000]
@@ -265,15 +273,15 @@ async def parse_document(
             "Respond ONLY with the JSON-LD object.\n"
             f"<Doc>\n{doc_sample}\n</Doc>"
         )
-        completion = await client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model=OPENAI_SCHEMA_MODEL,
-            response_format={ "type": "json_object" }
-        )
-        schema_data = json.loads(completion.choices[0].message.content)
-        schema_vector_resp = await client.embeddings.create(input=[json.dumps(schema_data)], model="text-embedding-3-small")
-        schema_vector = schema_vector_resp.data[0].embedding
-        industry_taxonomy, industry_tags = await classify_industry_taxonomy(client, doc_sample, schema_data, hint_org_name)
+        with stage("schema"):
+            completion = await provider_call("openai", api_key, lambda: client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=OPENAI_SCHEMA_MODEL,
+                response_format={ "type": "json_object" }
+            ))
+            schema_data = json.loads(completion.choices[0].message.content)
+            schema_vector = await embed_text(client, json.dumps(schema_data))
+            industry_taxonomy, industry_tags = await classify_industry_taxonomy(client, doc_sample, schema_data, hint_org_name)
         
         # Markdown Manifest Generation (llms.txt)
         manifest_prompt = (
@@ -283,11 +291,12 @@ async def parse_document(
             "DO NOT hallucinate, invent, or include any information not present in the document.\n\n"
             f"<Doc>\n{doc_sample}\n</Doc>"
         )
-        manifest_completion = await client.chat.completions.create(
-            messages=[{"role": "user", "content": manifest_prompt}],
-            model=OPENAI_MANIFEST_MODEL
-        )
-        llms_txt_content = manifest_completion.choices[0].message.content
+        with stage("manifest"):
+            manifest_completion = await provider_call("openai", api_key, lambda: client.chat.completions.create(
+                messages=[{"role": "user", "content": manifest_prompt}],
+                model=OPENAI_MANIFEST_MODEL
+            ))
+            llms_txt_content = manifest_completion.choices[0].message.content
 
         # --- ATOMIC BATCH PERSISTENCE ---
         if db:
@@ -325,24 +334,26 @@ async def parse_document(
                 # txn.set(l_ref, doc_payload)
                 return True
 
-            success = update_manifest(transaction, manifest_ref, latest_ref, schema_data, schema_vector, manifest_id, len(chunks), llms_txt_content)
+            with stage("persist"):
+                success = update_manifest(transaction, manifest_ref, latest_ref, schema_data, schema_vector, manifest_id, len(chunks), llms_txt_content)
             
-            # Explicit batching for chunks to bypass 500-op limit on transactions
-            if success:
-                batch = db.batch()
-                for i, (txt, vec) in enumerate(zip(chunks, chunk_vectors)):
-                    c_ref = manifest_ref.collection("chunks").document(str(i))
-                    batch.set(c_ref, {
-                        "text": txt, 
-                        "embedding": vec, 
-                        "index": i,
-                        "expiresAt": datetime.datetime.now(timezone.utc) + timedelta(hours=24)
-                    })
-                    if (i + 1) % 400 == 0:
-                        batch.commit()
-                        batch = db.batch()
-                batch.commit()
+                # Explicit batching for chunks to bypass 500-op limit on transactions
+                if success:
+                    batch = db.batch()
+                    for i, (txt, vec) in enumerate(zip(chunks, chunk_vectors)):
+                        c_ref = manifest_ref.collection("chunks").document(str(i))
+                        batch.set(c_ref, {
+                            "text": txt, 
+                            "embedding": vec, 
+                            "index": i,
+                            "expiresAt": datetime.datetime.now(timezone.utc) + timedelta(hours=24)
+                        })
+                        if (i + 1) % 400 == 0:
+                            batch.commit()
+                            batch = db.batch()
+                    batch.commit()
 
+            if success:
                 # 🛡️ FINAL LINK: Only now point 'latest' to the new manifest
                 success_payload = {
                     "content": llms_txt_content, "schemaData": schema_data, "embedding": schema_vector,
@@ -352,6 +363,10 @@ async def parse_document(
                     "industryTaxonomy": industry_taxonomy, "industryTags": industry_tags,
                 }
                 db.collection("organizations").document(orgId).collection("manifests").document("latest").set(success_payload)
+                invalidate_org_caches(orgId, "manifest ingested")
+                # Prime the retrieval index from the vectors just built: the first queries
+                # against this version (the Auto-Pilot audit below) skip the chunk read
+                manifest_index_registry.put(orgId, manifest_id, ManifestIndex(chunks, chunk_vectors))
 
 
             extracted_name = schema_data.get("name")
@@ -370,9 +385,11 @@ async def parse_document(
             # --- AUTO-PILOT: TRIGGER AUTOMATED INDUSTRY AUDIT ---
             industry_vertical = detect_vertical_from_name(extracted_name or hint_org_name)
             automated_queries = get_queries_for_vertical(industry_vertical)
-            logger.info(f"🚀 Triggering Auto-Pilot audit for {extracted_name} in vertical: {industry_vertical} ({len(automated_queries)} queries)")
-            # In a production system, this would be a background task (e.g., Celery/Cloud Tasks)
-            # For now, we log the intent to satisfy the enterprise requirement
+            if success:
+                autopilot_job_id = enqueue_autopilot_audit(orgId, manifest_id, automated_queries, org_plan,
+                                                           background_tasks)
+            if autopilot_job_id:
+                logger.info(f"🚀 Auto-Pilot audit {autopilot_job_id} queued for {extracted_name} in vertical: {industry_vertical} ({len(automated_queries)} queries)")
             
         return {
             "rawText": raw_text[:20000], 
@@ -382,6 +399,7 @@ async def parse_document(
             "sourceUrl": None,
             "industryTaxonomy": industry_taxonomy,
             "industryTags": industry_tags,
+            "autoPilotJobId": autopilot_job_id,
         }
 
         
@@ -496,28 +514,29 @@ async def _process_url_ingestion_task(url: str, orgId: str, uid: str = None):
     except Exception as e:
         logger.warning(f"Failed to set resource limit: {e}")
 
-    raw_text = ""
-    try:
-        headers = {"User-Agent": "Mozilla/5.0 (compatible; AUMContextFoundry/1.0; +https://aumcontextfoundry.com/bot)"}
-        async with httpx.AsyncClient(timeout=30, follow_redirects=True, headers=headers) as hclient:
-            jina_url = f"https://r.jina.ai/{url}"
-            jina_resp = await hclient.get(jina_url)
-            if jina_resp.status_code < 400 and len(jina_resp.text.strip()) > 100:
-                raw_text = jina_resp.text
-            else:
-                resp = await hclient.get(url)
-                if resp.status_code >= 400:
-                    raise Exception(f"URL returned HTTP {resp.status_code}")
-                if BS4_AVAILABLE:
-                    soup = BeautifulSoup(resp.text, "html.parser")
-                    for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
-                        tag.decompose()
-                    raw_text = soup.get_text(separator="\n", strip=True)
+    with stage("fetch"):
+        raw_text = ""
+        try:
+            headers = {"User-Agent": "Mozilla/5.0 (compatible; AUMContextFoundry/1.0; +https://aumcontextfoundry.com/bot)"}
+            async with httpx.AsyncClient(timeout=30, follow_redirects=True, headers=headers) as hclient:
+                jina_url = f"https://r.jina.ai/{url}"
+                jina_resp = await hclient.get(jina_url)
+                if jina_resp.status_code < 400 and len(jina_resp.text.strip()) > 100:
+                    raw_text = jina_resp.text
                 else:
-                    import re as _re
-                    raw_text = _re.sub(r"<[^>]+>", " ", resp.text)
-    except Exception as e:
-        raise Exception(f"Extraction failed: {str(e)}")
+                    resp = await hclient.get(url)
+                    if resp.status_code >= 400:
+                        raise Exception(f"URL returned HTTP {resp.status_code}")
+                    if BS4_AVAILABLE:
+                        soup = BeautifulSoup(resp.text, "html.parser")
+                        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
+                            tag.decompose()
+                        raw_text = soup.get_text(separator="\n", strip=True)
+                    else:
+                        import re as _re
+                        raw_text = _re.sub(r"<[^>]+>", " ", resp.text)
+        except Exception as e:
+            raise Exception(f"Extraction failed: {str(e)}")
 
     if len(raw_text.strip()) < 100:
         raise Exception("Meaningless content extracted from URL.")
@@ -538,15 +557,12 @@ async def _process_url_ingestion_task(url: str, orgId: str, uid: str = None):
     if not api_key:
         raise Exception("Infrastructure API key missing.")
 
-    oai = AsyncOpenAI(api_key=api_key)
+    oai = get_openai_client(api_key, AsyncOpenAI)
     full_text = raw_text[:100000]
     chunks = recursive_split(full_text, 2000, 200)
 
-    chunk_vectors = []
-    for i in range(0, len(chunks), 16):
-        batch = chunks[i:i+16]
-        embed_batch = await oai.embeddings.create(input=batch, model=OPENAI_EMBEDDING_MODEL)
-        chunk_vectors.extend([e.embedding for e in embed_batch.data])
+    with stage("embedding"):
+        chunk_vectors = await embed_texts(oai, chunks, model=OPENAI_EMBEDDING_MODEL)
 
     doc_sample = raw_text[:20000]
     if len(raw_text) > 30000:
@@ -557,29 +573,30 @@ async def _process_url_ingestion_task(url: str, orgId: str, uid: str = None):
         f"Source: {url}\n"
         f"<Doc>\n{doc_sample}\n</Doc>"
     )
-    schema_completion = await oai.chat.completions.create(
-        messages=[{"role": "user", "content": schema_prompt}],
-        model=OPENAI_SCHEMA_MODEL,
-        response_format={"type": "json_object"}
-    )
-    schema_data = json.loads(schema_completion.choices[0].message.content)
-    schema_vector_resp = await oai.embeddings.create(input=[json.dumps(schema_data)], model=OPENAI_EMBEDDING_MODEL)
-    schema_vector = schema_vector_resp.data[0].embedding
-    industry_taxonomy, industry_tags = await classify_industry_taxonomy(oai, doc_sample, schema_data, hint_org_name)
+    with stage("schema"):
+        schema_completion = await provider_call("openai", api_key, lambda: oai.chat.completions.create(
+            messages=[{"role": "user", "content": schema_prompt}],
+            model=OPENAI_SCHEMA_MODEL,
+            response_format={"type": "json_object"}
+        ))
+        schema_data = json.loads(schema_completion.choices[0].message.content)
+        schema_vector = await embed_text(oai, json.dumps(schema_data), model=OPENAI_EMBEDDING_MODEL)
+        industry_taxonomy, industry_tags = await classify_industry_taxonomy(oai, doc_sample, schema_data, hint_org_name)
 
     manifest_prompt = (
         f"Generate 'llms.txt' AI Protocol Manifest.\nSource URL: {url}\n"
         f"<Doc>\n{doc_sample}\n</Doc>"
     )
-    manifest_completion = await oai.chat.completions.create(
-        messages=[{"role": "user", "content": manifest_prompt}],
-        model=OPENAI_MANIFEST_MODEL
-    )
-    llms_txt_content = manifest_completion.choices[0].message.content
+    with stage("manifest"):
+        manifest_completion = await provider_call("openai", api_key, lambda: oai.chat.completions.create(
+            messages=[{"role": "user", "content": manifest_prompt}],
+            model=OPENAI_MANIFEST_MODEL
+        ))
+        llms_txt_content = manifest_completion.choices[0].message.content
 
     manifest_id = f"manifest_{uuid.uuid4().hex[:12]}"
     manifest_ref = db.collection("organizations").document(orgId).collection("manifests").document(manifest_id)
-    
+
     @firestore.transactional
     def write_manifest(txn, m_ref, data, vector, id_val, total_chunks, manifest_md):
         expiry = datetime.datetime.now(timezone.utc) + timedelta(hours=24)
@@ -592,20 +609,24 @@ async def _process_url_ingestion_task(url: str, orgId: str, uid: str = None):
         txn.set(m_ref, payload)
         return payload
 
-    transaction = db.transaction()
-    success_payload = write_manifest(transaction, manifest_ref, schema_data, schema_vector, manifest_id, len(chunks), llms_txt_content)
+    with stage("persist"):
+        transaction = db.transaction()
+        success_payload = write_manifest(transaction, manifest_ref, schema_data, schema_vector, manifest_id, len(chunks), llms_txt_content)
+
+        if success_payload:
+            batch_w = db.batch()
+            for i, (txt, vec) in enumerate(zip(chunks, chunk_vectors)):
+                c_ref = manifest_ref.collection("chunks").document(str(i))
+                batch_w.set(c_ref, {"text": txt, "embedding": vec, "index": i,
+                                   "expiresAt": datetime.datetime.now(timezone.utc) + timedelta(hours=24)})
+                if (i + 1) % 400 == 0:
+                    batch_w.commit()
+                    batch_w = db.batch()
+            batch_w.commit()
 
     if success_payload:
-        batch_w = db.batch()
-        for i, (txt, vec) in enumerate(zip(chunks, chunk_vectors)):
-            c_ref = manifest_ref.collection("chunks").document(str(i))
-            batch_w.set(c_ref, {"text": txt, "embedding": vec, "index": i,
-                               "expiresAt": datetime.datetime.now(timezone.utc) + timedelta(hours=24)})
-            if (i + 1) % 400 == 0:
-                batch_w.commit()
-                batch_w = db.batch()
-        batch_w.commit()
         db.collection("organizations").document(orgId).collection("manifests").document("latest").set(success_payload)
+        invalidate_org_caches(orgId, "manifest ingested")
 
     extracted_name = schema_data.get("name")
     if extracted_name and extracted_name.strip():
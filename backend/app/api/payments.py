@@ -27,6 +27,7 @@ except ImportError:
     logger.warning("razorpay SDK not installed")
 
 from core.firebase_config import db
+from core.result_cache import invalidate_org_caches
 
 
 # ============================================================================
@@ -262,6 +263,7 @@ async def verify_payment(request: VerifyPaymentRequest, auth: dict = Depends(get
                     "subscription.currentPeriodEnd": now + timedelta(days=30),
                 }
             )
+            invalidate_org_caches(request.orgId, "plan changed")
 
             # Update the payment record status
             try:
@@ -430,6 +432,7 @@ async def razorpay_webhook(request: Request):
                 
                 if success:
                     logger.info(f"✅ Webhook: Org {org_id} upgraded to {plan_id} via {event}")
+                    invalidate_org_caches(org_id, "plan changed")
 
         return {"status": "ok"}
     except HTTPException:
@@ -32,6 +32,7 @@ from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel, field_validator
 from core import firebase_config
 from core.config import settings
+from core.provider_clients import get_shared_http_client
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -43,6 +44,7 @@ router = APIRouter()
 _cache: dict[str, tuple[dict, datetime]] = {}
 _CACHE_TTL_H = 6
 _CACHE_MAX_ENTRIES = 1_000   # ~80KB RAM at average result size
+_cache_stats = {"hits": 0, "misses": 0}
 
 # ---------------------------------------------------------------------------
 # Simple in-process rate limiter: { client_ip -> [timestamps] }
@@ -105,11 +107,17 @@ def _cache_get(key: str) -> Optional[dict]:
     if key in _cache:
         result, expires = _cache[key]
         if datetime.now(timezone.utc) < expires:
+            _cache_stats["hits"] += 1
             return result
         del _cache[key]
+    _cache_stats["misses"] += 1
     return None
 
 
+def quick_scan_cache_stats() -> dict:
+    return {**_cache_stats, "entries": len(_cache)}
+
+
 def _cache_set(key: str, result: dict) -> None:
     if len(_cache) >= _CACHE_MAX_ENTRIES:
         # Evict the entry with the earliest expiry
@@ -246,18 +254,20 @@ async def _run_gpt_scan(company: str, domain: str, api_key: str) -> dict:
     domain_hint = f" (website: {domain})" if domain else ""
     prompt = _PROMPT_TEMPLATE.format(company=company, domain_hint=domain_hint)
 
-    async with httpx.AsyncClient(timeout=25.0) as client:
-        resp = await client.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-            json={
-                "model": "gpt-4o",
-                "messages": [{"role": "user", "content": prompt}],
-                "response_format": {"type": "json_object"},
-                "temperature": 0,
-                "max_tokens": 350,
-            },
-        )
+    # Shared keep-alive pool: repeat scans skip the TLS handshake to api.openai.com
+    client = get_shared_http_client("quick_scan")
+    resp = await client.post(
+        "https://api.openai.com/v1/chat/completions",
+        headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+        json={
+            "model": "gpt-4o",
+            "messages": [{"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"},
+            "temperature": 0,
+            "max_tokens": 350,
+        },
+        timeout=25.0,
+    )
 
     if resp.status_code == 429:
         raise RuntimeError("OpenAI rate limit hit on platform key")
@@ -6,6 +6,8 @@ import os
 import uuid
 from datetime import datetime
 from openai import AsyncOpenAI
+from core.provider_clients import get_openai_client
+from core.provider_gateway import provider_call
 from fastapi import Depends, APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import Optional, List
@@ -204,7 +206,7 @@ async def _process_seo_audit(request: SEOAuditRequest, job_id: str):
                         manifest_content = (manifest_doc.to_dict() or {}).get("content", "")[:2000]
 
                     if openai_key and manifest_content:
-                        client = AsyncOpenAI(api_key=openai_key)
+                        client = get_openai_client(openai_key, AsyncOpenAI)
                         geo_prompt = f"""You are an AI search readiness auditor. Compare the page content below against the organization's verified manifest.
 
 Page Title: {title}
@@ -216,12 +218,12 @@ Org Manifest:
 
 Rate AI Search Readiness 0-100: how well would AI engines like GPT-4o, Gemini 3 Flash, and Claude 4.5 Sonnet represent this company based only on this page?
 Return JSON: {{"geo_score": 0-100, "recommendation": "one sentence improvement tip"}}"""
-                        resp = await client.chat.completions.create(
+                        resp = await provider_call("openai", openai_key, lambda: client.chat.completions.create(
                             messages=[{"role": "user", "content": geo_prompt}],
                             model=OPENAI_SIMULATION_MODEL,
                             response_format={"type": "json_object"},
                             temperature=0
-                        )
+                        ))
                         llm_result = json.loads(resp.choices[0].message.content)
                         llm_geo_score = max(0, min(100, int(llm_result.get("geo_score", geo_score))))
                         geo_score = round((structural_geo_score * 0.4) + (llm_geo_score * 0.6))
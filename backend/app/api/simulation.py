@@ -15,6 +15,7 @@ import numpy as np
 import hashlib
 import asyncio
 from functools import partial
+from dataclasses import dataclass
 from fastapi import Depends, BackgroundTasks
 from datetime import datetime, timedelta, timezone
 
@@ -24,61 +25,22 @@ from core.security import get_auth_context, verify_user_org_access
 from openai import AsyncOpenAI
 from core.firebase_config import db
 from core.utils import count_usage_since, sanitize_for_prompt
-from google.cloud import firestore
-
-RESERVATION_SHARDS = 50  # supports ~50 writes/sec/org without hot-doc contention
-
-def _reservation_shard_id(org_id: str, prompt: str) -> str:
-    digest = hashlib.sha256(f"{org_id}:{prompt}".encode("utf-8")).hexdigest()
-    shard = int(digest, 16) % RESERVATION_SHARDS
-    return f"shard_{shard}"
-
-def _reservation_cycle_key(cycle_start: datetime) -> str:
-    return cycle_start.isoformat() if hasattr(cycle_start, "isoformat") else str(cycle_start)
+from core.provider_clients import get_openai_client, get_gemini_client, get_anthropic_client
+from core.stage_graph import StageGraph
+from core.result_cache import simulation_result_cache, manifest_pointer_cache, claim_set_cache
+from core.semantic_cache import semantic_prompt_cache, semantic_threshold
+from core.tenant_context import TenantContext, load_tenant_context
+from core.quota_leases import QuotaToken, get_quota_manager
+from core.embedding_cache import embed_text, embed_texts
+from core.manifest_index import retrieve_top_chunks
+from core.provider_gateway import Priority, current_priority, provider_call
+from core.circuit_breaker import CircuitOpenError
+from core.metrics import firestore_operation
+from core.request_accounting import (
+    RequestAccounting, accounting_histograms, accounting_scope, count_firestore, stage as timed_stage,
+)
+from core.deadlines import deadline_scope, remaining as deadline_remaining
 
-@firestore.transactional
-def _reserve_quota_txn(txn, org_ref, org_id, cycle_start, plan_limit, reservation_shard_id: str):
-    """
-    🛡️ SECURITY HARDENING (P0): Atomic check-and-reserve.
-    Prevents race conditions where concurrent requests bypass quota.
-    """
-    # 1. Get org doc within transaction
-    org_snap = org_ref.get(transaction=txn)
-    if not org_snap.exists:
-        raise HTTPException(status_code=404, detail="Organization not found")
-    
-    # 2. Count current usage (canonical) + active reservations for this cycle
-    usage = count_usage_since(db, org_id, cycle_start)
-    cycle_key = _reservation_cycle_key(cycle_start)
-    total_reserved = 0
-    for i in range(RESERVATION_SHARDS):
-        shard_ref = org_ref.collection("usageReservations").document(f"shard_{i}")
-        shard_snap = shard_ref.get(transaction=txn)
-        if shard_snap.exists:
-            shard = shard_snap.to_dict() or {}
-            if shard.get("cycleStart") == cycle_key:
-                total_reserved += int(shard.get("count", 0))
-
-    if usage + total_reserved + 1 > plan_limit:
-        raise HTTPException(status_code=402, detail=f"Quota exceeded: {usage}/{plan_limit} sims used.")
-
-    # 3. Increment reservation counter (sharded to avoid hot org doc writes)
-    now = datetime.now(timezone.utc)
-    reservation_ref = org_ref.collection("usageReservations").document(reservation_shard_id)
-    current_snap = reservation_ref.get(transaction=txn)
-    if current_snap.exists and (current_snap.to_dict() or {}).get("cycleStart") == cycle_key:
-        txn.set(reservation_ref, {
-            "count": firestore.Increment(1),
-            "updatedAt": now,
-            "cycleStart": cycle_key,
-        }, merge=True)
-    else:
-        txn.set(reservation_ref, {
-            "count": 1,
-            "updatedAt": now,
-            "cycleStart": cycle_key,
-        }, merge=True)
-    return True
 from fastapi.responses import StreamingResponse
 import io
 import csv
@@ -109,11 +71,23 @@ except ImportError:
     CLAUDE_AVAILABLE = False
     logger.warning("anthropic not installed, Claude 4.5 Sonnet will be skipped")
 
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 router = APIRouter()
 
 
+def _openai_client(api_key: str):
+    """Pooled AsyncOpenAI client for this key (see core.provider_clients)."""
+    return get_openai_client(api_key, AsyncOpenAI)
+
+
+def _gemini_client(api_key: str):
+    return get_gemini_client(api_key, genai.Client)
+
+
+def _claude_client(api_key: str):
+    return get_anthropic_client(api_key, anthropic.AsyncAnthropic)
+
+
 def _demo_mode_enabled() -> bool:
     from core.config import settings
     return settings.ENV == "development" and getattr(settings, "ALLOW_MOCK_AUTH", False)
@@ -151,12 +125,18 @@ async def extract_claims(manifest_content: str, question: str, api_keys: dict, g
     These are the claims a shortlisting AI engine SHOULD make about this company
     when answering the buyer's question — not atomic facts, but competitive proof points.
     """
-    from core.utils import sanitize_for_prompt
+    sys_prompt, user_content = _claims_prompt(manifest_content, question)
+    try:
+        result = await _claim_json_call(sys_prompt, user_content, api_keys, gemini_api_model)
+        return _parse_claims(result)
+    except Exception as e:
+        logger.error(f"Claim extraction failed: {e}")
+        return []
+
+
+def _claims_prompt(manifest_content: str, question: str):
+    """(system, user) messages of the claim-extraction call (shared with bulk mode)."""
     manifest_content = sanitize_for_prompt(manifest_content)
-    
-    openai_key = api_keys.get("openai")
-    gemini_key = api_keys.get("gemini")
-    
     prompt = (
         "You are preparing a competitive evaluation dossier for an enterprise procurement team. "
         "From the company context below, extract the 5-6 strongest POSITIONING ASSERTIONS that "
@@ -168,34 +148,145 @@ async def extract_claims(manifest_content: str, question: str, api_keys: dict, g
         "Return JSON array of strings under key 'claims'. Short, factual, specific.\n\n"
         f"BUYER QUESTION: {question}"
     )
-    
-    try:
-        if openai_key:
-            client = AsyncOpenAI(api_key=openai_key)
-            resp = await client.chat.completions.create(
-                messages=[{"role": "system", "content": prompt}, {"role": "user", "content": manifest_content[:6000]}],
+    return prompt, f"Document:\n{manifest_content[:6000]}"
+
+
+def _parse_claims(result: Optional[dict]) -> list:
+    if result is None:
+        return []
+    claims = result.get("claims", result.get("facts", []))
+    return claims[:6] if isinstance(claims, list) else []
+
+
+CLAIM_CACHE_FIRESTORE_TTL = timedelta(days=7)
+
+
+def _claim_cache_id(manifest_version: str, prompt: str) -> str:
+    """Document id for a claim set: hash of resolved manifest version + normalized prompt."""
+    normalized_prompt = " ".join(prompt.lower().split())
+    return hashlib.sha256(f"{manifest_version}\n{normalized_prompt}".encode("utf-8")).hexdigest()
+
+
+async def get_or_extract_claims(org_id: str, manifest_version: str, manifest_content: str, question: str,
+                                api_keys: dict, gemini_api_model: Optional[str] = None) -> list:
+    """
+    Claim extraction runs at temperature 0, so a claim set is reusable for the same
+    (org, resolved manifest version, normalized prompt). Lookup order: in-process LRU,
+    then `organizations/{org}/claimCache/{id}`, then `extract_claims`. Empty results
+    (extraction failures) are never cached.
+    """
+    claims = await lookup_cached_claims(org_id, manifest_version, question)
+    if claims is not None:
+        return claims
+    claims = await extract_claims(manifest_content, question, api_keys, gemini_api_model=gemini_api_model)
+    await store_claims(org_id, manifest_version, question, claims)
+    return claims
+
+
+def _claim_cache_ref(org_id: str, manifest_version: str, question: str):
+    if db and manifest_version and manifest_version != "latest":
+        doc_id = _claim_cache_id(manifest_version, question)
+        return db.collection("organizations").document(org_id).collection("claimCache").document(doc_id)
+    return None
+
+
+async def lookup_cached_claims(org_id: str, manifest_version: str, question: str) -> Optional[list]:
+    """Cached claim set (in-process LRU, then Firestore `claimCache`), or None on a miss."""
+    l1_key = f"{org_id}:{_claim_cache_id(manifest_version, question)}"
+    cached = claim_set_cache.get(l1_key)
+    if cached is not None:
+        return list(cached)
+
+    cache_ref = _claim_cache_ref(org_id, manifest_version, question)
+    if cache_ref is not None:
+        try:
+            with firestore_operation("claim_cache_get"):
+                snap = await asyncio.to_thread(cache_ref.get)
+            count_firestore(reads=1)
+            if snap.exists:
+                claims = (snap.to_dict() or {}).get("claims")
+                if isinstance(claims, list) and claims:
+                    claim_set_cache.set(l1_key, org_id, claims)
+                    logger.info(f"Claim cache HIT for {org_id} ({manifest_version}).")
+                    return list(claims)
+        except Exception as e:
+            logger.warning(f"Claim cache read failed: {e}")
+    return None
+
+
+async def store_claims(org_id: str, manifest_version: str, question: str, claims: list) -> None:
+    """Cache a freshly extracted claim set in both tiers; empty sets (extraction failures) are skipped."""
+    if not claims:
+        return
+    claim_set_cache.set(f"{org_id}:{_claim_cache_id(manifest_version, question)}", org_id, claims)
+    cache_ref = _claim_cache_ref(org_id, manifest_version, question)
+    if cache_ref is not None:
+        now = datetime.now(timezone.utc)
+        try:
+            with firestore_operation("claim_cache_set"):
+                await asyncio.to_thread(cache_ref.set, {
+                    "claims": claims,
+                    "manifestVersion": manifest_version,
+                    "prompt": question,
+                    "createdAt": now,
+                    "expiresAt": now + CLAIM_CACHE_FIRESTORE_TTL,
+                })
+            count_firestore(writes=1)
+        except Exception as e:
+            logger.warning(f"Claim cache write failed: {e}")
+
+
+_VERIFY_RUBRIC = """For each POSITIONING ASSERTION below, evaluate whether the AI response:
+- "visible": The AI mentions this assertion (explicitly or with equivalent evidence) as a reason to consider this vendor.
+- "displaced": The AI credited this strength to a COMPETITOR instead, or positioned a competitor above this company for this assertion.
+- "absent": The AI did not mention this company or this assertion at all — the company is invisible for this claim."""
+
+# Combined verification is skipped (per-model calls instead) above this prompt size.
+VERIFY_MULTI_TOKEN_BUDGET = int(os.getenv("VERIFY_MULTI_TOKEN_BUDGET", "12000"))
+
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap ~4 chars/token estimate; good enough for budget gating."""
+    return len(text) // 4 + 1
+
+
+async def _claim_json_call(sys_prompt: str, user_content: str, api_keys: dict, gemini_api_model: Optional[str] = None) -> Optional[dict]:
+    """
+    Deterministic JSON call on the claim model: OpenAI first, Gemini when OpenAI is not
+    configured or its circuit breaker is open. None if no provider is configured;
+    CircuitOpenError if every configured provider's breaker is open.
+    """
+    openai_key = api_keys.get("openai")
+    gemini_key = api_keys.get("gemini") if GEMINI_AVAILABLE else None
+    circuit_error: Optional[CircuitOpenError] = None
+    if openai_key:
+        client = _openai_client(openai_key)
+        try:
+            resp = await provider_call("openai", openai_key, lambda: client.chat.completions.create(
+                messages=[{"role": "system", "content": sys_prompt},
+                          {"role": "user", "content": user_content}],
                 model=OPENAI_CLAIM_MODEL,
                 response_format={"type": "json_object"},
                 temperature=0,
-            )
-            result = json.loads(resp.choices[0].message.content or "{}")
-        elif gemini_key and GEMINI_AVAILABLE:
-            api_model = gemini_api_model or API_MODEL_MAPPING.get(GEMINI_SIMULATION_MODEL, GEMINI_SIMULATION_MODEL)
-            client = genai.Client(api_key=gemini_key)
-            resp = await client.aio.models.generate_content(
-                model=api_model,
-                contents=[f"{prompt}\n\nDocument:\n{manifest_content[:6000]}"],
-                config={'response_mime_type': 'application/json'}
-            )
-            result = json.loads(resp.text)
-        else:
-            return []
-            
-        claims = result.get("claims", result.get("facts", []))
-        return claims[:6] if isinstance(claims, list) else []
-    except Exception as e:
-        logger.error(f"Claim extraction failed: {e}")
-        return []
+            ), model=OPENAI_CLAIM_MODEL)
+            return json.loads(resp.choices[0].message.content or "{}")
+        except CircuitOpenError as e:
+            if not gemini_key:
+                raise
+            logger.warning(f"⚡ {e}; falling back to Gemini for claim scoring")
+            circuit_error = e
+    if gemini_key:
+        api_model = gemini_api_model or API_MODEL_MAPPING.get(GEMINI_SIMULATION_MODEL, GEMINI_SIMULATION_MODEL)
+        client = _gemini_client(gemini_key)
+        resp = await provider_call("gemini", gemini_key, lambda: client.aio.models.generate_content(
+            model=api_model,
+            contents=[f"{sys_prompt}\n\n{user_content}"],
+            config={'response_mime_type': 'application/json'}
+        ), model=api_model)
+        return json.loads(resp.text)
+    if circuit_error is not None:
+        raise circuit_error
+    return None
 
 
 async def verify_claims(claims: list, ai_response: str, api_keys: dict, gemini_api_model: Optional[str] = None) -> list:
@@ -205,39 +296,11 @@ async def verify_claims(claims: list, ai_response: str, api_keys: dict, gemini_a
     the way a shortlisting engine should? Not hallucination detection — buyer-displacement scoring.
     """
     if not claims: return []
-    openai_key = api_keys.get("openai")
-    gemini_key = api_keys.get("gemini")
-    
-    sys_prompt = """You are scoring an AI engine's response from the perspective of an enterprise procurement committee.
-
-For each POSITIONING ASSERTION below, evaluate whether the AI response:
-- "visible": The AI mentions this assertion (explicitly or with equivalent evidence) as a reason to consider this vendor.
-- "displaced": The AI credited this strength to a COMPETITOR instead, or positioned a competitor above this company for this assertion.
-- "absent": The AI did not mention this company or this assertion at all — the company is invisible for this claim.
-
-Return JSON: {"results": [{"claim": "...", "verdict": "visible|displaced|absent", "detail": "brief evidence from the AI response"}]}"""
 
+    sys_prompt, user_content = _verify_prompt(claims, ai_response)
     try:
-        if openai_key:
-            client = AsyncOpenAI(api_key=openai_key)
-            resp = await client.chat.completions.create(
-                messages=[{"role": "system", "content": sys_prompt}, 
-                          {"role": "user", "content": f"POSITIONING ASSERTIONS:\n{json.dumps(claims)}\n\nAI RESPONSE:\n{ai_response}"}],
-                model=OPENAI_CLAIM_MODEL,
-                response_format={"type": "json_object"},
-                temperature=0,
-            )
-            result = json.loads(resp.choices[0].message.content or "{}")
-        elif gemini_key and GEMINI_AVAILABLE:
-            api_model = gemini_api_model or API_MODEL_MAPPING.get(GEMINI_SIMULATION_MODEL, GEMINI_SIMULATION_MODEL)
-            client = genai.Client(api_key=gemini_key)
-            resp = await client.aio.models.generate_content(
-                model=api_model,
-                contents=[f"{sys_prompt}\n\nPOSITIONING ASSERTIONS:\n{json.dumps(claims)}\n\nAI RESPONSE:\n{ai_response}"],
-                config={'response_mime_type': 'application/json'}
-            )
-            result = json.loads(resp.text)
-        else:
+        result = await _claim_json_call(sys_prompt, user_content, api_keys, gemini_api_model)
+        if result is None:
             return []
         return result.get("results", [])
     except Exception as e:
@@ -245,63 +308,186 @@ Return JSON: {"results": [{"claim": "...", "verdict": "visible|displaced|absent"
         return []
 
 
+def _verify_prompt(claims: list, ai_response: str):
+    """(system, user) messages of the single-answer verification call."""
+    sys_prompt = f"""You are scoring an AI engine's response from the perspective of an enterprise procurement committee.
 
-async def compute_divergence(api_key: str, manifest_embedding: list, answer: str) -> float:
-    """Embedding-based divergence (0 = identical, 1 = divergent)."""
+{_VERIFY_RUBRIC}
+
+Return JSON: {{"results": [{{"claim": "...", "verdict": "visible|displaced|absent", "detail": "brief evidence from the AI response"}}]}}"""
+    return sys_prompt, f"POSITIONING ASSERTIONS:\n{json.dumps(claims)}\n\nAI RESPONSE:\n{ai_response}"
+
+
+def _verify_multi_prompt(claims: list, answers: Dict[str, str]):
+    """(system, user, {label: model}) of the combined verification call; labels hide model names from the judge."""
+    labels = {f"answer_{i + 1}": model for i, model in enumerate(answers)}
+    answers_block = "\n\n".join(f"[{label}]\n{answers[model]}" for label, model in labels.items())
+    user_content = f"POSITIONING ASSERTIONS:\n{json.dumps(claims)}\n\nAI RESPONSES:\n{answers_block}"
+
+    sys_prompt = f"""You are scoring several AI engines' responses from the perspective of an enterprise procurement committee.
+Each response is labelled ({", ".join(labels)}). Score every response independently against ALL assertions.
+
+{_VERIFY_RUBRIC}
+
+Return JSON: {{"answers": {{"<label>": [{{"claim": "...", "verdict": "visible|displaced|absent", "detail": "brief evidence from that response"}}]}}}}"""
+    return sys_prompt, user_content, labels
+
+
+def _split_multi_verdicts(result: Optional[dict], labels: Dict[str, str]) -> Dict[str, list]:
+    """Per-model verdicts from a combined verification reply; models missing from it are left out."""
+    scored = (result or {}).get("answers") or {}
+    by_model: Dict[str, list] = {}
+    for label, model in labels.items():
+        verdicts = scored.get(label)
+        if isinstance(verdicts, list):
+            by_model[model] = verdicts
+    return by_model
+
+
+async def verify_claims_multi(claims: list, answers: Dict[str, str], api_keys: dict, gemini_api_model: Optional[str] = None) -> Dict[str, list]:
+    """
+    Score every model answer against the shared assertions in ONE structured call.
+    Answers are labelled answer_1..N so model names never leak into the judge prompt;
+    verdicts are split back per model. Falls back to per-model `verify_claims` when the
+    combined payload exceeds VERIFY_MULTI_TOKEN_BUDGET or an answer is missing from the reply.
+    """
+    if not claims or not answers:
+        return {model: [] for model in answers}
+
+    async def _per_model(models: List[str]) -> Dict[str, list]:
+        verdicts = await asyncio.gather(*[
+            verify_claims(claims, answers[m], api_keys, gemini_api_model=gemini_api_model) for m in models
+        ])
+        return dict(zip(models, verdicts))
+
+    if len(answers) == 1:
+        return await _per_model(list(answers))
+
+    sys_prompt, user_content, labels = _verify_multi_prompt(claims, answers)
+    if _estimate_tokens(sys_prompt + user_content) > VERIFY_MULTI_TOKEN_BUDGET:
+        logger.info(f"Combined verification over budget ({VERIFY_MULTI_TOKEN_BUDGET} tokens); verifying per model.")
+        return await _per_model(list(answers))
+
+    by_model: Dict[str, list] = {}
     try:
-        if not manifest_embedding:
-            return 0.5
-            
-        client = AsyncOpenAI(api_key=api_key)
-        answer_resp = await client.embeddings.create(input=[answer], model="text-embedding-3-small")
-        sim = cosine_sim(
-            np.array(manifest_embedding),
-            np.array(answer_resp.data[0].embedding)
-        )
-        return 1.0 - sim
+        result = await _claim_json_call(sys_prompt, user_content, api_keys, gemini_api_model)
+        if result is None:
+            return {model: [] for model in answers}
+        by_model = _split_multi_verdicts(result, labels)
+    except Exception as e:
+        logger.error(f"Combined claim verification failed: {e}")
+
+    missing = [model for model in answers if model not in by_model]
+    if missing:
+        by_model.update(await _per_model(missing))
+    return by_model
+
+
+_EMBED_ERROR_DIVERGENCE = 0.85
+
+
+def batch_divergence(reference: np.ndarray, answers: np.ndarray) -> np.ndarray:
+    """Vectorized 1 - cosine(reference, answer_i) for a (n, dim) answer matrix."""
+    ref_norm = np.linalg.norm(reference)
+    ans_norms = np.linalg.norm(answers, axis=1)
+    denom = ans_norms * ref_norm
+    sims = np.divide(answers @ reference, denom, out=np.zeros(len(answers)), where=denom > 0)
+    return 1.0 - sims
+
+
+async def compute_divergences(api_key: str, manifest_embedding: Optional[list], answers: Dict[str, str],
+                              context_text: Optional[str] = None) -> Dict[str, float]:
+    """
+    Embedding-based divergence for every answer (0 = identical, 1 = divergent).
+
+    All texts are embedded in ONE `embeddings.create` request: the retrieved context
+    (when given, it replaces `manifest_embedding` as the reference) followed by each
+    non-empty answer. Texts already in the embedding cache are not re-sent.
+    Divergence is then a single vectorized NumPy pass.
+    """
+    inputs: List[str] = []
+    if context_text:
+        inputs.append(context_text[:8000])
+    elif not manifest_embedding:
+        return {name: 0.5 for name in answers}
+
+    embeddable = [name for name, answer in answers.items() if answer and answer.strip()]
+    divergences = {name: _EMBED_ERROR_DIVERGENCE for name in answers}
+    if not embeddable:
+        return divergences
+    inputs.extend(answers[name] for name in embeddable)
+
+    try:
+        client = _openai_client(api_key)
+        vectors = await embed_texts(client, inputs)
+        matrix = np.asarray(vectors, dtype=np.float64)
+        if context_text:
+            reference, answer_matrix = matrix[0], matrix[1:]
+        else:
+            reference, answer_matrix = np.asarray(manifest_embedding, dtype=np.float64), matrix
+        for name, value in zip(embeddable, batch_divergence(reference, answer_matrix)):
+            divergences[name] = float(value)
     except Exception as e:
         logger.error(f"Embedding error: {e}")
-        return 0.85
+    return divergences
+
+
+async def compute_divergence(api_key: str, manifest_embedding: list, answer: str) -> float:
+    """Embedding-based divergence (0 = identical, 1 = divergent) for a single answer."""
+    result = await compute_divergences(api_key, manifest_embedding, {"answer": answer})
+    return result["answer"]
+
+
+async def embed_reference(api_key: Optional[str], manifest_embedding: Optional[list],
+                          context_text: Optional[str] = None) -> Optional[list]:
+    """Embedding of the retrieved context, or the stored manifest embedding when there is none."""
+    if not context_text or not api_key:
+        return manifest_embedding
+    try:
+        client = _openai_client(api_key)
+        return await embed_text(client, context_text[:8000])
+    except Exception as e:
+        logger.warning(f"Simulation context re-embedding failed: {e}")
+        return manifest_embedding
 
 
 # ============================================================================
 # MODEL RUNNERS
 # ============================================================================
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), reraise=True)
+# Retries, backoff, per-provider concurrency and per-model circuit breakers are handled
+# by core.provider_gateway.
 async def run_openai(api_key: str, system_prompt: str, user_prompt: str, api_model: Optional[str] = None) -> str:
     api_model = api_model or API_MODEL_MAPPING.get(OPENAI_SIMULATION_MODEL, OPENAI_SIMULATION_MODEL)
-    client = AsyncOpenAI(api_key=api_key)
-    completion = await client.chat.completions.create(
+    client = _openai_client(api_key)
+    completion = await provider_call("openai", api_key, lambda: client.chat.completions.create(
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ],
         model=api_model,
         temperature=0.2,
-    )
+    ), model=api_model)
     return completion.choices[0].message.content or ""
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), reraise=True)
 async def run_gemini(api_key: str, system_prompt: str, user_prompt: str, api_model: Optional[str] = None) -> str:
     if not GEMINI_AVAILABLE:
         raise Exception("google-genai not installed")
     api_model = api_model or API_MODEL_MAPPING.get(GEMINI_SIMULATION_MODEL, GEMINI_SIMULATION_MODEL)
     # The new google-genai SDK uses client.aio for async
-    client = genai.Client(api_key=api_key)
-    response = await client.aio.models.generate_content(
+    client = _gemini_client(api_key)
+    response = await provider_call("gemini", api_key, lambda: client.aio.models.generate_content(
         model=api_model,
         contents=[f"{system_prompt}\n\nQuestion: {user_prompt}"]
-    )
+    ), model=api_model)
     return response.text or ""
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10), reraise=True)
 async def run_claude(api_key: str, system_prompt: str, user_prompt: str, api_model: Optional[str] = None) -> str:
     if not CLAUDE_AVAILABLE:
         raise Exception("anthropic not installed")
     api_model = api_model or API_MODEL_MAPPING.get(CLAUDE_SIMULATION_MODEL, CLAUDE_SIMULATION_MODEL)
-    client = anthropic.AsyncAnthropic(api_key=api_key)
-    response = await client.messages.create(
+    client = _claude_client(api_key)
+    response = await provider_call("anthropic", api_key, lambda: client.messages.create(
         model=api_model,
         max_tokens=1000,
         temperature=0.2,
@@ -309,7 +495,7 @@ async def run_claude(api_key: str, system_prompt: str, user_prompt: str, api_mod
         messages=[
             {"role": "user", "content": user_prompt}
         ]
-    )
+    ), model=api_model)
     return response.content[0].text if response.content else ""
 
 
@@ -327,6 +513,8 @@ class SimulationRequest(BaseModel):
     claudeChecked: bool = True
     # Explicit snippet override (dev/test only)
     manifestSnippet: Optional[str] = None
+    # Attach the per-stage latency / Firestore / token accounting block to the response
+    includeTimings: bool = False
 
     @field_validator("prompt")
     @classmethod
@@ -368,24 +556,38 @@ def _coerce_datetime(value: object) -> Optional[datetime]:
     return None
 
 
-def _resolve_manifest_version(org_id: str, version: str) -> str:
+def _resolve_manifest_version(org_id: str, version: str, tenant: Optional[TenantContext] = None) -> str:
     if version != "latest" or not db:
         return version
-    try:
-        latest_doc = db.collection("organizations").document(org_id).collection("manifests").document("latest").get()
-        if latest_doc.exists:
-            latest_data = latest_doc.to_dict() or {}
-            candidate = latest_data.get("version")
-            if candidate and candidate != "latest":
-                return candidate
-    except Exception as e:
-        logger.warning(f"Manifest resolution failed for latest pointer: {e}")
+    pointer = manifest_pointer_cache.get(org_id)
+    if pointer:
+        return pointer
+    if tenant is not None and not tenant.load_failed:
+        # The request's tenant context already holds the latest pointer doc
+        candidate = tenant.latest_version
+        if candidate:
+            manifest_pointer_cache.set(org_id, org_id, candidate)
+            return candidate
+    else:
+        try:
+            latest_doc = db.collection("organizations").document(org_id).collection("manifests").document("latest").get()
+            count_firestore(reads=1)
+            if latest_doc.exists:
+                latest_data = latest_doc.to_dict() or {}
+                candidate = latest_data.get("version")
+                if candidate and candidate != "latest":
+                    manifest_pointer_cache.set(org_id, org_id, candidate)
+                    return candidate
+        except Exception as e:
+            logger.warning(f"Manifest resolution failed for latest pointer: {e}")
 
     try:
         manifests = db.collection("organizations").document(org_id).collection("manifests") \
             .order_by("createdAt", direction="DESCENDING").limit(1).stream()
         newest = next(manifests, None)
+        count_firestore(reads=1)
         if newest:
+            manifest_pointer_cache.set(org_id, org_id, newest.id)
             return newest.id
     except Exception as e:
         logger.warning(f"Manifest resolution fallback failed: {e}")
@@ -415,8 +617,8 @@ def _count_usage_since(org_id: str, cycle_start: datetime) -> int:
 # MULTI-MODEL EVALUATION ENDPOINT
 # ============================================================================
 
-def _fetch_manifest_and_keys(request: SimulationRequest):
-    """Fetch context manifest and API keys from Firestore."""
+def _fetch_manifest_and_keys(request: SimulationRequest, tenant: Optional[TenantContext] = None):
+    """Fetch context manifest and API keys, reusing the request's tenant context when loaded."""
     manifest_content = ""
     manifest_embedding = None
     api_keys: Dict[str, str] = {}
@@ -427,28 +629,35 @@ def _fetch_manifest_and_keys(request: SimulationRequest):
 
     if db:
         try:
+            if tenant is None:
+                tenant = load_tenant_context(db, request.orgId, request.manifestVersion == "latest")
             org_ref = db.collection("organizations").document(request.orgId)
-            org_doc = org_ref.get()
-            if not org_doc.exists:
+            if not tenant.org_exists and not tenant.load_failed:
                 if not is_dev:
                     raise HTTPException(status_code=404, detail="Organization not found")
                 else:
                     logger.info(f"🧪 Dev-mode: Org {request.orgId} not found, using mock keys.")
             else:
-                org_data = org_doc.to_dict() or {}
-                # 🛡️ SECURITY HARDENING (P0): pop apiKeys FIRST before any other use to prevent log leaks
-                api_keys = org_data.pop("apiKeys", {})
+                api_keys = dict(tenant.api_keys)
 
             # FETCH MANIFEST (Latest or Versioned)
             doc_data = None
             if request.manifestVersion == "latest":
-                manifests = org_ref.collection("manifests").order_by("createdAt", direction="DESCENDING").limit(1).stream()
-                latest = next(manifests, None)
-                if latest:
-                    doc_data = latest.to_dict()
-                    resolved_version = latest.id
+                if tenant.latest_manifest and tenant.latest_manifest.get("content"):
+                    # 'latest' is written last on ingest and carries the full manifest payload
+                    doc_data = tenant.latest_manifest
+                    resolved_version = tenant.latest_version or "latest"
+                else:
+                    manifests = org_ref.collection("manifests").order_by("createdAt", direction="DESCENDING").limit(1).stream()
+                    latest = next(manifests, None)
+                    count_firestore(reads=1)
+                    if latest:
+                        doc_data = latest.to_dict()
+                        resolved_version = latest.id
             else:
-                version_doc = org_ref.collection("manifests").document(request.manifestVersion).get()
+                with firestore_operation("manifest_get"):
+                    version_doc = org_ref.collection("manifests").document(request.manifestVersion).get()
+                count_firestore(reads=1)
                 if version_doc.exists:
                     doc_data = version_doc.to_dict()
                     resolved_version = version_doc.id
@@ -473,16 +682,12 @@ def _fetch_manifest_and_keys(request: SimulationRequest):
     return manifest_content, manifest_embedding, api_keys, resolved_version
 
 
-async def _fetch_manifest_and_keys_async(request: SimulationRequest):
+async def _fetch_manifest_and_keys_async(request: SimulationRequest, tenant: Optional[TenantContext] = None):
     """Run Firestore-bound manifest/key retrieval off the event loop."""
-    return await asyncio.to_thread(_fetch_manifest_and_keys, request)
+    return await asyncio.to_thread(_fetch_manifest_and_keys, request, tenant)
 
 
-async def _score_model(model_name: str, runner_fn, runner_key: str, api_keys: dict,
-                 system_prompt: str, user_prompt: str, manifest_embedding: list,
-                 claims: list, eps_div: float, gemini_api_model: Optional[str] = None) -> dict:
-    """Score a single model's response against the manifest."""
-    
+def _normalize_model_name(model_name: str) -> str:
     # 🛡️ NORMALIZATION HARDENING: Ensure frontier display names are used in metadata
     normalized_name = model_name.strip()
     raw_name = normalized_name.lower()
@@ -495,163 +700,340 @@ async def _score_model(model_name: str, runner_fn, runner_key: str, api_keys: di
             normalized_name = "Gemini 3 Flash"
         elif "claude" in raw_name and ("sonnet" in raw_name or "haiku" in raw_name):
             normalized_name = "Claude 4.5 Sonnet"
+    return normalized_name
+
+
+def _is_mock_runner(runner_key: Optional[str]) -> bool:
+    from core.config import settings
+    return settings.ENV in ["development", "testing"] and not runner_key
+
+
+def _mock_model_result(normalized_name: str, user_prompt: str) -> dict:
+    logger.info(f"🧪 Dev-mode: Simulated response for {normalized_name}")
+    import random
+    accuracy = round(random.uniform(75, 98), 1)
+    return {
+        "model": normalized_name,
+        "answer": f"This is a simulated response from {normalized_name} for the prompt: '{user_prompt}'. In a real environment, this would be generated using your API keys.",
+        "accuracy": accuracy,
+        "hasHallucination": accuracy < 80,
+        "claimResults": [{"claim": "Mock Claim 1", "verdict": "supported", "detail": "Simulated verification"}],
+        "claimScore": "1/1 claims supported",
+    }
+
+
+# Interactive `/run` budget; batch/cron work queues behind it so it gets a longer one.
+SIM_DEADLINE_SECONDS = float(os.getenv("SIM_DEADLINE_SECONDS", "45"))
+SIM_BATCH_DEADLINE_SECONDS = float(os.getenv("SIM_BATCH_DEADLINE_SECONDS", "180"))
+# Time kept back from inference for divergence, verification and adjudication
+SIM_SCORING_RESERVE_SECONDS = float(os.getenv("SIM_SCORING_RESERVE_SECONDS", "10"))
+
+
+def _simulation_deadline_seconds() -> float:
+    return SIM_DEADLINE_SECONDS if current_priority() == Priority.INTERACTIVE else SIM_BATCH_DEADLINE_SECONDS
+
+
+def _model_timeout_result(normalized_name: str) -> dict:
+    """Flagged placeholder for a model that missed the request deadline (never cached)."""
+    return {
+        **_model_error_result(normalized_name, "Model did not respond before the request deadline"),
+        "timedOut": True,
+        "status": "timed_out",
+    }
+
+
+def _model_unavailable_result(normalized_name: str, error: CircuitOpenError) -> dict:
+    """Fail-fast placeholder for a model whose circuit breaker is open (never cached or billed)."""
+    return {
+        **_model_error_result(normalized_name, error),
+        "circuitOpen": True,
+        "status": "unavailable",
+    }
+
+
+def _model_error_result(normalized_name: str, error: Exception) -> dict:
+    return {
+        "model": normalized_name,
+        "answer": "",
+        "accuracy": 0,
+        "hasDisplacement": True,
+        "hasHallucination": True,  # backward-compat
+        "error": str(error),
+    }
+
+
+# Bump whenever scoring (prompts, blend weights, verdict rubric) changes: scheduled crawls then recompute every org
+SCORING_VERSION = "1.2.0"
+
+
+def _blend_score(normalized_name: str, answer: str, divergence: float, claim_results: list) -> dict:
+    """Visibility Score blend for one answer from its divergence and claim verdicts."""
+    # === ENTERPRISE BUYER POSITIONING SCORE ===
+    # Measures: how visibly did the AI engine surface this company as a shortlistable vendor?
+    claim_score = None
+    visible = 0
+    displaced = 0
+    total = 0
+
+    if claim_results:
+        visible = sum(1 for c in claim_results if c.get("verdict") == "visible")
+        displaced = sum(1 for c in claim_results if c.get("verdict") == "displaced")
+        absent = sum(1 for c in claim_results if c.get("verdict") == "absent")
+        total = len(claim_results)
+        # Weighted positioning score: visible=1.0, absent=0.3 (not catastrophic), displaced=0.0
+        weighted_visible = visible + (absent * 0.3)
+        claim_score = f"{visible}/{total} assertions visible to enterprise buyers"
+
+    # Visibility Score blend: 40% semantic proximity, 60% positioning visibility
+    if total > 0:
+        positioning_rate = weighted_visible / total
+        semantic_accuracy = max(0.0, 1.0 - divergence)
+        blended = (0.4 * semantic_accuracy) + (0.6 * positioning_rate)
+        accuracy = round(blended * 100, 1)
+
+        # Visibility Score status mapping (enterprise framing)
+        if accuracy > 85: status = "strong_presence"
+        elif accuracy > 65: status = "partial_presence"
+        else: status = "displaced"
+
+        # Displacement detection: company is being bypassed in buyer shortlists
+        # Triggered when competitors are recommended in place of us (displaced > 0)
+        # OR when fewer than 40% of key positioning assertions appear
+        has_drift = (displaced > 0) or (positioning_rate < 0.4)
+    else:
+        accuracy = round(max(0.0, 1.0 - divergence) * 100, 1)
+        status = "strong_presence" if accuracy > 75 else "displaced"
+        has_drift = accuracy < 40
+
+    return {
+        "model": normalized_name,
+        "answer": answer,
+        "accuracy": accuracy,
+        "status": status,
+        # hasDisplacement: true when competitor is recommended instead of us,
+        # or when fewer than 40% of key positioning assertions appear in the answer.
+        # NOT a hallucination — the model may be stating facts accurately but about a rival.
+        "hasDisplacement": has_drift,
+        "hasHallucination": has_drift,  # kept for backward-compatibility with existing Firestore history records
+        "claimResults": claim_results,
+        "claimScore": claim_score,
+        "metrics": {
+            "semantic_divergence": round(divergence, 3),
+            "claim_recall": round(visible/total, 3) if total > 0 else 1.0
+        }
+    }
+
 
+async def _infer_model(normalized_name: str, runner_fn, runner_key: Optional[str],
+                       system_prompt: str, user_prompt: str):
+    """Inference stage: the raw answer, or a finished result dict (dev mock / provider error)."""
+    if _is_mock_runner(runner_key):
+        return _mock_model_result(normalized_name, user_prompt)
+    left = deadline_remaining()
+    # Inference may not eat the time reserved for scoring the answers that did arrive
+    budget = None if left is None else max(left - SIM_SCORING_RESERVE_SECONDS, min(left, 1.0))
     try:
-        from core.config import settings
-        if settings.ENV in ["development", "testing"] and not runner_key:
-            logger.info(f"🧪 Dev-mode: Simulated response for {model_name}")
-            import random
-            accuracy = round(random.uniform(75, 98), 1)
-            return {
-                "model": normalized_name,
-                "answer": f"This is a simulated response from {normalized_name} for the prompt: '{user_prompt}'. In a real environment, this would be generated using your API keys.",
-                "accuracy": accuracy,
-                "hasHallucination": accuracy < 80,
-                "claimResults": [{"claim": "Mock Claim 1", "verdict": "supported", "detail": "Simulated verification"}],
-                "claimScore": "1/1 claims supported",
-            }
+        with deadline_scope(budget), timed_stage(f"inference:{normalized_name}"):
+            return await asyncio.wait_for(runner_fn(runner_key, system_prompt, user_prompt), budget)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏳ {normalized_name} missed the simulation deadline")
+        return _model_timeout_result(normalized_name)
+    except CircuitOpenError as e:
+        logger.warning(f"⚡ {normalized_name} skipped: {e}")
+        return _model_unavailable_result(normalized_name, e)
+    except Exception as e:
+        return _model_error_result(normalized_name, e)
 
-        answer = await runner_fn(runner_key, system_prompt, user_prompt)
 
-        openai_key = api_keys.get("openai")
-        
+async def _score_answer(normalized_name: str, answer: str, api_keys: dict, reference_embedding: Optional[list],
+                        claims: list, gemini_api_model: Optional[str] = None) -> dict:
+    """Per-model divergence + claim verification (run concurrently), then the score blend."""
+    openai_key = api_keys.get("openai")
+
+    async def _divergence() -> float:
         # Embedding-based divergence (measures how closely the AI answer relates to the Context)
-        if openai_key:
-            divergence = await compute_divergence(openai_key, manifest_embedding, answer)
-        else:
-            divergence = 0.5
-
-        # === ENTERPRISE BUYER POSITIONING SCORE ===
-        # Measures: how visibly did the AI engine surface this company as a shortlistable vendor?
-        claim_results = []
-        claim_score = None
-        visible = 0
-        displaced = 0
-        total = 0
-        
-        if claims:
-            claim_results = await verify_claims(claims, answer, api_keys, gemini_api_model=gemini_api_model)
-            visible = sum(1 for c in claim_results if c.get("verdict") == "visible")
-            displaced = sum(1 for c in claim_results if c.get("verdict") == "displaced")
-            absent = sum(1 for c in claim_results if c.get("verdict") == "absent")
-            total = len(claim_results)
-            # Weighted positioning score: visible=1.0, absent=0.3 (not catastrophic), displaced=0.0
-            weighted_visible = visible + (absent * 0.3)
-            claim_score = f"{visible}/{total} assertions visible to enterprise buyers"
-
-        # Visibility Score blend: 40% semantic proximity, 60% positioning visibility
-        if total > 0:
-            positioning_rate = weighted_visible / total
-            semantic_accuracy = max(0.0, 1.0 - divergence)
-            blended = (0.4 * semantic_accuracy) + (0.6 * positioning_rate)
-            accuracy = round(blended * 100, 1)
-            
-            # Visibility Score status mapping (enterprise framing)
-            if accuracy > 85: status = "strong_presence"
-            elif accuracy > 65: status = "partial_presence"
-            else: status = "displaced"
-            
-            # Displacement detection: company is being bypassed in buyer shortlists
-            # Triggered when competitors are recommended in place of us (displaced > 0)
-            # OR when fewer than 40% of key positioning assertions appear
-            has_drift = (displaced > 0) or (positioning_rate < 0.4)
-        else:
-            accuracy = round(max(0.0, 1.0 - divergence) * 100, 1)
-            status = "strong_presence" if accuracy > 75 else "displaced"
-            has_drift = accuracy < 40
+        if not openai_key:
+            return 0.5
+        with timed_stage("embedding"):
+            return await compute_divergence(openai_key, reference_embedding, answer)
 
-        return {
-            "model": normalized_name,
-            "answer": answer,
-            "accuracy": accuracy,
-            "status": status,
-            # hasDisplacement: true when competitor is recommended instead of us,
-            # or when fewer than 40% of key positioning assertions appear in the answer.
-            # NOT a hallucination — the model may be stating facts accurately but about a rival.
-            "hasDisplacement": has_drift,
-            "hasHallucination": has_drift,  # kept for backward-compatibility with existing Firestore history records
-            "claimResults": claim_results,
-            "claimScore": claim_score,
-            "metrics": {
-                "semantic_divergence": round(divergence, 3),
-                "claim_recall": round(visible/total, 3) if total > 0 else 1.0
-            }
-        }
+    async def _verdicts() -> list:
+        if not claims:
+            return []
+        with timed_stage("verification"):
+            return await verify_claims(claims, answer, api_keys, gemini_api_model=gemini_api_model)
+
+    try:
+        divergence, claim_results = await asyncio.gather(_divergence(), _verdicts())
+        return _blend_score(normalized_name, answer, divergence, claim_results)
     except Exception as e:
-        return {
-            "model": normalized_name,
-            "answer": "",
-            "accuracy": 0,
-            "hasDisplacement": True,
-            "hasHallucination": True,  # backward-compat
-            "error": str(e),
-        }
+        return _model_error_result(normalized_name, e)
+
+
+async def _score_model(model_name: str, runner_fn, runner_key: str, api_keys: dict,
+                 system_prompt: str, user_prompt: str, manifest_embedding: list,
+                 claims: list, eps_div: float, gemini_api_model: Optional[str] = None) -> dict:
+    """Score a single model's response against the manifest (per-model verification)."""
+    normalized_name = _normalize_model_name(model_name)
+    outcome = await _infer_model(normalized_name, runner_fn, runner_key, system_prompt, user_prompt)
+    if isinstance(outcome, dict):
+        return outcome
+    return await _score_answer(normalized_name, outcome, api_keys, manifest_embedding, claims, gemini_api_model)
+
+
+def _collect_answers(names: List[str], outcomes: list):
+    """Split inference outcomes into finished results (mock/error) and answers still to score."""
+    results: List[Optional[dict]] = [None] * len(names)
+    answers: Dict[str, str] = {}
+    answer_index: Dict[str, int] = {}
+    for i, outcome in enumerate(outcomes):
+        if isinstance(outcome, dict):
+            results[i] = outcome
+        else:
+            answers[names[i]] = outcome
+            answer_index[names[i]] = i
+    return results, answers, answer_index
+
+
+def _build_simulation_graph(plan: "_SimulationPlan", streaming: bool = False) -> StageGraph:
+    """
+    Simulation pipeline as a stage graph (retrieval already ran in `_prepare_simulation`):
+
+        claims ─┐
+        infer×N ┼─> divergence (one batched embedding) ─┐
+                └─> verify (one combined judge call) ───┴─> blend ─> adjudicate
+
+    Model inference no longer waits for claim extraction; only verification does.
+    With `streaming=True` each model gets its own `score:<i>` stage (per-model
+    verification against a shared context embedding) so results surface as they finish.
+    """
+    request = plan.request
+    api_keys = plan.api_keys
+    names = [_normalize_model_name(spec[0]) for spec in plan.model_specs]
+    infer_stages = [f"infer:{i}" for i in range(len(names))]
+    infer_args = {stage: stage.replace(":", "_") for stage in infer_stages}
+
+    def _outcomes(kwargs: dict) -> list:
+        return [kwargs[infer_args[stage]] for stage in infer_stages]
+
+    graph = StageGraph("simulation")
 
+    async def claims_stage():
+        # Hardened Claim Extraction with multi-provider fallback
+        with timed_stage("claims"):
+            return await get_or_extract_claims(request.orgId, plan.manifest_version, plan.manifest_content,
+                                               request.prompt, api_keys, gemini_api_model=plan.gemini_api_model)
 
+    graph.add("claims", claims_stage)
 
-async def _record_usage(org_id: str, prompt: str, manifest_version: str, org_plan: str, reservation_shard_id: Optional[str] = None, reservation_cycle_key: Optional[str] = None):
-    """Atomic billing record write after successful simulation completion."""
+    for i, (_, runner_fn, runner_key) in enumerate(plan.model_specs):
+        graph.add(infer_stages[i], partial(_infer_model, names[i], runner_fn, runner_key, plan.system_prompt, request.prompt))
+
+    if streaming:
+        async def reference_stage():
+            with timed_stage("embedding"):
+                return await embed_reference(api_keys.get("openai"), plan.manifest_embedding, plan.retrieved_context)
+
+        graph.add("reference", reference_stage)
+
+        score_stages = []
+        for i, stage in enumerate(infer_stages):
+            async def score_stage(outcome, claims, reference, _name=names[i]):
+                if isinstance(outcome, dict):
+                    return outcome
+                return await _score_answer(_name, outcome, api_keys, reference, claims, plan.gemini_api_model)
+
+            score_stages.append(f"score:{i}")
+            graph.add(f"score:{i}", score_stage, deps=[stage, "claims", "reference"], arg_names={stage: "outcome"})
+
+        async def blend_stage(**scored):
+            return [scored[stage.replace(":", "_")] for stage in score_stages]
+
+        graph.add("blend", blend_stage, deps=score_stages, arg_names={s: s.replace(":", "_") for s in score_stages})
+    else:
+        async def divergence_stage(**kwargs):
+            _, answers, _ = _collect_answers(names, _outcomes(kwargs))
+            if not answers or not api_keys.get("openai"):
+                return {name: 0.5 for name in answers}
+            with timed_stage("embedding"):
+                return await compute_divergences(api_keys["openai"], plan.manifest_embedding, answers,
+                                                 context_text=plan.retrieved_context)
+
+        async def verify_stage(claims, **kwargs):
+            _, answers, _ = _collect_answers(names, _outcomes(kwargs))
+            if not claims or not answers:
+                return {name: [] for name in answers}
+            with timed_stage("verification"):
+                return await verify_claims_multi(claims, answers, api_keys, gemini_api_model=plan.gemini_api_model)
+
+        async def blend_stage(divergence, verify, **kwargs):
+            results, answers, answer_index = _collect_answers(names, _outcomes(kwargs))
+            for name, answer in answers.items():
+                results[answer_index[name]] = _blend_score(name, answer, divergence[name], verify.get(name, []))
+            return results
+
+        graph.add("divergence", divergence_stage, deps=infer_stages, arg_names=infer_args)
+        graph.add("verify", verify_stage, deps=["claims", *infer_stages], arg_names=infer_args)
+        graph.add("blend", blend_stage, deps=["divergence", "verify", *infer_stages], arg_names=infer_args)
+
+    async def adjudicate_stage(blend):
+        # --- PHASE 10: MULTI-MODEL ADJUDICATION ---
+        with timed_stage("adjudication"):
+            return await _adjudicate(plan, blend)
+
+    graph.add("adjudicate", adjudicate_stage, deps=["blend"])
+    return graph
+
+
+async def _record_usage(org_id: str, prompt: str, manifest_version: str, org_plan: str, lease_id: Optional[str] = None):
+    """Billing record write after successful simulation completion (quota already spent from a lease)."""
     if not db:
         return
     try:
-        org_ref = db.collection("organizations").document(org_id)
-        org_ref.collection("usageLedger").document().set({
+        db.collection("organizations").document(org_id).collection("usageLedger").document().set({
             "timestamp": datetime.now(timezone.utc),
             "prompt": prompt[:100],
             "manifestVersion": manifest_version,
             "planId": org_plan,
+            "leaseId": lease_id,
         })
         logger.info(f"Billing: Usage recorded for org {org_id}")
-        if reservation_shard_id:
-            try:
-                @firestore.transactional
-                def _release_reservation(txn):
-                    ref = org_ref.collection("usageReservations").document(reservation_shard_id)
-                    snap = ref.get(transaction=txn)
-                    if not snap.exists:
-                        return
-                    data = snap.to_dict() or {}
-                    if reservation_cycle_key and data.get("cycleStart") != reservation_cycle_key:
-                        return
-                    current = int(data.get("count", 0))
-                    next_count = max(current - 1, 0)
-                    txn.set(ref, {
-                        "count": next_count,
-                        "updatedAt": datetime.now(timezone.utc),
-                        "cycleStart": data.get("cycleStart") or reservation_cycle_key
-                    }, merge=True)
-                _release_reservation(db.transaction())
-            except Exception as e:
-                logger.warning(f"Billing: Reservation release failed for {org_id}: {e}")
     except Exception as e:
         logger.error(f"Billing: Usage recording failed for {org_id}: {e}")
 
-async def _store_simulation_results(org_id: str, prompt: str, manifest_version: str, results: list, cache_key: str):
+def _scoring_history_doc(prompt: str, manifest_version: str, results: list) -> dict:
+    """`scoringHistory` entry (the dashboard's per-prompt series); placeholders for missed models are left out."""
+    results = [r for r in results if not (r.get("timedOut") or r.get("circuitOpen"))]
+    return {
+        "prompt": prompt,
+        "results": [{
+            "model": r["model"],
+            "accuracy": r["accuracy"],
+            "hasHallucination": r["hasHallucination"],
+            "claimScore": r.get("claimScore"),
+        } for r in results],
+        "timestamp": datetime.now(timezone.utc),
+        "version": manifest_version,
+    }
+
+
+async def _store_simulation_results(org_id: str, prompt: str, manifest_version: str, results: list, cache_key: str,
+                                    cacheable: bool = True):
     """Background task to store simulation results in cache and persistent scoring history for billing."""
     if not db:
         return
     try:
-        # 1. Update Simulation Cache
-        db.collection("organizations").document(org_id).collection("simulationCache").document(cache_key).set({
-            "results": results,
-            "timestamp": datetime.now(timezone.utc),
-            "manifestVersion": manifest_version,
-            "prompt": prompt
-        })
-        
+        # 1. Update Simulation Cache (skipped for partial results)
+        if cacheable:
+            db.collection("organizations").document(org_id).collection("simulationCache").document(cache_key).set({
+                "results": results,
+                "timestamp": datetime.now(timezone.utc),
+                "manifestVersion": manifest_version,
+                "prompt": prompt
+            })
         # 2. Record Billing / Scoring History (Atomic billing ledger)
         history_ref = db.collection("organizations").document(org_id).collection("scoringHistory")
-        history_ref.add({
-            "prompt": prompt,
-            "results": [{
-                "model": r["model"],
-                "accuracy": r["accuracy"],
-                "hasHallucination": r["hasHallucination"],
-                "claimScore": r.get("claimScore"),
-            } for r in results],
-            "timestamp": datetime.now(timezone.utc),
-            "version": manifest_version,
-        })
+        history_ref.add(_scoring_history_doc(prompt, manifest_version, results))
         logger.info(f"Background: Simulation results for cache key {cache_key} stored successfully.")
     except Exception as e:
         logger.error(f"Failed to store background simulation data: {e}")
@@ -716,7 +1098,7 @@ async def _generate_suggested_prompts_llm(api_key: str, org_name: str, manifest_
         return {"prompts": fallback}
 
     try:
-        client = AsyncOpenAI(api_key=api_key)
+        client = _openai_client(api_key)
         prompt = f"""You are helping test how well AI models know the company '{org_name}'.
 Based on the following business context, generate exactly 4 specific, factual test questions that mirror how B2B enterprise buyers compare analytics, consulting, and AI-transformation partners. These should NOT be generic SaaS questions.
 
@@ -730,12 +1112,12 @@ Rules:
 - Do NOT ask about pricing unless pricing is explicitly in the context.
 - Return ONLY a JSON object: {{"prompts": ["question1", "question2", "question3", "question4"]}}"""
 
-        completion = await client.chat.completions.create(
+        completion = await provider_call("openai", api_key, lambda: client.chat.completions.create(
             messages=[{"role": "user", "content": prompt}],
             model=OPENAI_SCHEMA_MODEL,
             response_format={"type": "json_object"},
             temperature=0.3
-        )
+        ))
         result = json.loads(completion.choices[0].message.content)
         prompts = result.get("prompts", fallback)
         return {"prompts": prompts[:4]}
@@ -744,159 +1126,136 @@ Rules:
         return {"prompts": fallback}
 
 
-@router.post("/run")
-async def run_simulation(request: SimulationRequest, background_tasks: BackgroundTasks, auth: dict = Depends(get_auth_context), skip_billing: bool = False):
-    """
-    Main Visibility Simulation Entry Point.
-    Orchestrates Claim Extraction, Multi-Model Verification, and Divergence Scoring.
-    """
-    from core.config import settings
-    is_dev = settings.ENV == "development"
-    adjudication_note = None
-    results = []
-    if auth.get("type") == "session":
-        if not verify_user_org_access(auth["uid"], request.orgId):
-            raise HTTPException(status_code=403, detail="Unauthorized")
-    else:
-        # API Key / Service Token must match orgId
-        if auth.get("orgId") != request.orgId:
-            raise HTTPException(status_code=403, detail="Unauthorized")
+def _cached_simulation_response(request: SimulationRequest, cached_data: dict, org_plan: str, cache_key: str) -> Optional[dict]:
+    """Apply the plan cache policy to a cached entry; None means run the simulation."""
+    # Cache policy: Paid plans always serve cache (cost optimization).
+    # Explorer plans only serve cache for the exact same prompt.
+    is_paid_plan = org_plan != "explorer"
+    is_same_prompt = request.prompt == cached_data.get("prompt")
+    cached_results = cached_data.get("results", [])
 
-    if is_dev and auth.get("type") == "session":
-        logger.info(f"🧪 Dev-mode: Access granted to {request.orgId} for {auth['uid']}")
+    # If upgraded to paid but cache only has 1 model, invalidate cache to run all models
+    if is_paid_plan and len(cached_results) < 3:
+        logger.info(f"Invalidating legacy single-model cache for upgraded {org_plan} org {request.orgId}")
+        return None
+    if not (is_paid_plan or is_same_prompt):
+        return None
+    logger.info(f"Cache HIT for simulation {cache_key}. Serving redundant request for $0.00.")
+    return {
+        "results": cached_results,
+        "version": cached_data.get("manifestVersion", request.manifestVersion),
+        "prompt": request.prompt,
+        "cached": True
+    }
 
-    # 🛡️ DEMO MOCKING (P0): Deterministic results for Sight Spectrum
-    if request.orgId == "demo_org_id" and _demo_mode_enabled():
-        logger.info(f"👤 Serving Mock Simulation for Demo Account: {request.prompt}")
-        
-        # Predefined enterprise-style responses to showcase brand drift
-        mock_responses = {
-            "How does SightSpectrum compare with Accenture, Tiger Analytics, Fractal, and Mu Sigma for enterprise AI and analytics transformation?": [
-                {"model": "GPT-4o", "accuracy": 62.4, "hasHallucination": False, "claimScore": "3/5 claims supported", "answer": "SightSpectrum is credible for focused enterprise analytics delivery, but larger firms such as Accenture and Fractal appear stronger on transformation-scale proof and operating-model depth."},
-                {"model": "Claude 4.5 Sonnet", "accuracy": 94.2, "hasHallucination": False, "claimScore": "5/5 claims supported", "answer": "SightSpectrum differentiates through domain-led analytics delivery in healthcare, manufacturing, and logistics, though it needs clearer enterprise transformation language to outrank large consulting competitors."},
-                {"model": "Gemini 3 Flash", "accuracy": 58.1, "hasHallucination": False, "claimScore": "3/5 claims supported", "answer": "SightSpectrum appears specialized and credible, but the public narrative is thinner than the broad enterprise transformation messaging used by larger competitors."}
-            ],
-            "Which firms are strongest in Databricks, Snowflake, and Google Cloud data modernization, and how does SightSpectrum compare?": [
-                {"model": "GPT-4o", "accuracy": 78.0, "hasHallucination": False, "claimScore": "4/5 claims supported", "answer": "SightSpectrum is competitive in cloud and data modernization, though the public proof is not as explicit as larger firms that lead with named Databricks, Snowflake, and Google Cloud programs."},
-                {"model": "Claude 4.5 Sonnet", "accuracy": 93.0, "hasHallucination": False, "claimScore": "5/5 claims supported", "answer": "SightSpectrum is strongest when buyers want focused analytics modernization rather than broad systems integration. It still needs more explicit partner and platform proof to outrank larger competitors."},
-                {"model": "Gemini 3 Flash", "accuracy": 61.0, "hasHallucination": False, "claimScore": "3/5 claims supported", "answer": "SightSpectrum appears credible in data modernization, but its enterprise cloud ecosystem narrative is under-asserted compared with larger analytics consultancies."}
-            ],
-            "Which vendors have domain expertise in CPG, BFSI, retail, and supply chain analytics, and what evidence supports SightSpectrum?": [
-                {"model": "GPT-4o", "accuracy": 86.5, "hasHallucination": False, "claimScore": "5/5", "answer": "SightSpectrum shows evidence of domain-led analytics across manufacturing, healthcare, logistics, and adjacent enterprise sectors, but it needs stronger public proof for retail, CPG, and BFSI breadth."},
-                {"model": "Claude 4.5 Sonnet", "accuracy": 95.8, "hasHallucination": False, "claimScore": "5/5", "answer": "SightSpectrum demonstrates credible domain expertise, especially where industry-specific analytics and delivery depth matter more than global transformation scale."},
-                {"model": "Gemini 3 Flash", "accuracy": 70.0, "hasHallucination": False, "claimScore": "4/5", "answer": "SightSpectrum appears specialized and domain-aware, but broader vertical proof is still less explicit than what larger consulting competitors publish."}
-            ]
-        }
-        
-        # Default fallback for custom demo prompts
-        default_results = [
-            {"model": "GPT-4o", "accuracy": 58.0, "hasHallucination": False, "claimScore": "3/5", "answer": "This answer is directionally relevant but still misses enough enterprise proof points to demonstrate narrative drift."},
-            {"model": "Claude 4.5 Sonnet", "accuracy": 93.0, "hasHallucination": False, "claimScore": "5/5", "answer": "This answer stays closely aligned to the verified enterprise context and its primary claims."},
-            {"model": "Gemini 3 Flash", "accuracy": 55.0, "hasHallucination": False, "claimScore": "3/5", "answer": "This answer remains non-fabricated but under-represents key enterprise differentiators from the manifest."}
-        ]
-        
-        results = mock_responses.get(request.prompt, default_results)
-        
-        return {
-            "results": results,
-            "version": "latest-demo",
-            "prompt": request.prompt,
-            "cached": False,
-            "demo_mode": True
-        }
 
-    # ----- 0. MANIFEST RESOLUTION & CACHE KEYING -----
-    resolved_manifest_version = _resolve_manifest_version(request.orgId, request.manifestVersion)
+def _simulation_cache_key(org_id: str, prompt: str, manifest_version: str) -> str:
+    return hashlib.sha256(f"{org_id}_{prompt}_{manifest_version}".encode('utf-8')).hexdigest()
 
-    cache_input = f"{request.orgId}_{request.prompt}_{resolved_manifest_version}".encode('utf-8')
-    cache_key = hashlib.sha256(cache_input).hexdigest()
-    
-    if db:
-        try:
-            cached_doc = db.collection("organizations").document(request.orgId).collection("simulationCache").document(cache_key).get()
-            if cached_doc.exists:
-                cached_data = cached_doc.to_dict() or {}
-                # Return if not expired (e.g. 24h)
-                timestamp = cached_data.get("timestamp")
-                if timestamp and (datetime.now(timezone.utc) - timestamp.astimezone(timezone.utc)) < timedelta(hours=24):
-                    # Check subscription cache validity
-                    org_doc_cache = db.collection("organizations").document(request.orgId).get()
-                    org_plan_cache = org_doc_cache.to_dict().get("subscription", {}).get("planId", "explorer") if org_doc_cache.exists else "explorer"
-                    # Cache policy: Paid plans always serve cache (cost optimization).
-                    # Explorer plans only serve cache for the exact same prompt.
-                    is_paid_plan = org_plan_cache != "explorer"
-                    is_same_prompt = request.prompt == cached_data.get("prompt")
-                    cached_results = cached_data.get("results", [])
-                    
-                    # If upgraded to paid but cache only has 1 model, invalidate cache to run all models
-                    if is_paid_plan and len(cached_results) < 3:
-                        logger.info(f"Invalidating legacy single-model cache for upgraded {org_plan_cache} org {request.orgId}")
-                    elif is_paid_plan or is_same_prompt:
-                        logger.info(f"Cache HIT for simulation {cache_key}. Serving redundant request for $0.00.")
-                        return {
-                            "results": cached_results,
-                            "version": cached_data.get("manifestVersion", request.manifestVersion),
-                            "prompt": request.prompt,
-                            "cached": True
-                        }
-        except Exception as e:
-            logger.warning(f"Cache check failed: {e}")
 
-    # ----- 1. FETCH SUBSCRIPTION & ENFORCE LIMITS -----
-    org_plan = "explorer" # default fallback
-    org_data = {}
-    if db:
-        try:
-            org_doc = db.collection("organizations").document(request.orgId).get()
-            if org_doc.exists:
-                org_data = org_doc.to_dict() or {}
-                org_plan = org_data.get("subscription", {}).get("planId", "explorer")
-        except Exception as e:
-            logger.error(f"Failed to fetch org plan: {e}")
+def _firestore_cached_response(request: SimulationRequest, cached_data: dict, org_plan: str,
+                               cache_key: str) -> Optional[dict]:
+    """Serve a `simulationCache` doc if younger than 24h and allowed by the plan policy (and warm L1 with it)."""
+    timestamp = cached_data.get("timestamp")
+    if not timestamp or (datetime.now(timezone.utc) - timestamp.astimezone(timezone.utc)) >= timedelta(hours=24):
+        return None
+    cached_response = _cached_simulation_response(request, cached_data, org_plan, cache_key)
+    if cached_response is not None:
+        _remember_simulation_result(request.orgId, cache_key, request.prompt, cached_response["version"],
+                                    cached_response["results"], org_plan)
+    return cached_response
 
-    # Enforce Dynamic Limits with Usage Ledger (contention-safe)
-    limits = {
-        "explorer": 1,
-        "growth": 100,
-        "scale": 500,
-        "enterprise": 2000,
-    }
-    plan_limit = org_data.get("subscription", {}).get("maxSimulations", limits.get(org_plan, 1))
 
-    reservation_shard = None
-    reservation_cycle_key = None
-    if db and not is_dev and not skip_billing:
-        org_ref = db.collection("organizations").document(request.orgId)
-        subscription = org_data.get("subscription", {})
-        cycle_start = _resolve_cycle_start(subscription)
-        
-        # 🛡️ SECURITY HARDENING (P0): Atomic quota reservation
-        try:
-            reservation_shard = _reservation_shard_id(request.orgId, request.prompt)
-            reservation_cycle_key = _reservation_cycle_key(cycle_start)
-            await asyncio.to_thread(
-                _reserve_quota_txn,
-                db.transaction(),
-                org_ref,
-                request.orgId,
-                cycle_start,
-                plan_limit,
-                reservation_shard
-            )
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Quota reservation failed: {e}")
-            raise HTTPException(status_code=500, detail="Billing system unavailable")
+def _remember_simulation_result(org_id: str, cache_key: str, prompt: str, manifest_version: str,
+                                results: list, org_plan: str) -> None:
+    simulation_result_cache.set(cache_key, org_id, {
+        "results": results,
+        "manifestVersion": manifest_version,
+        "prompt": prompt,
+        "planId": org_plan,
+    })
 
-        # Usage recording moved to background_tasks inside run_simulation logic
-        pass
 
-    # 2. FETCH CONTEXT & KEYS 
-    manifest_content, manifest_embedding, api_keys, resolved_version_from_fetch = await _fetch_manifest_and_keys_async(request)
-    if resolved_version_from_fetch and resolved_version_from_fetch != "latest":
-        resolved_manifest_version = resolved_version_from_fetch
+async def _reserve_simulation_quota(request: SimulationRequest, org_data: dict, plan_limit: int) -> QuotaToken:
+    """
+    🛡️ SECURITY HARDENING (P0): Spend one unit from this instance's quota lease.
+    Firestore is only touched when a new block has to be leased (see core/quota_leases.py).
+    """
+    cycle_start = _resolve_cycle_start(org_data.get("subscription", {}))
+    cycle_key = cycle_start.isoformat() if hasattr(cycle_start, "isoformat") else str(cycle_start)
+    try:
+        return await get_quota_manager(db).acquire(
+            request.orgId, cycle_key, plan_limit,
+            seed_committed=lambda: count_usage_since(db, request.orgId, cycle_start),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Quota reservation failed: {e}")
+        raise HTTPException(status_code=500, detail="Billing system unavailable")
 
+
+async def _refund_quota(plan: "_SimulationPlan") -> None:
+    """Give the unit back when a simulation produced nothing billable."""
+    if plan.quota_token is None:
+        return
+    token, plan.quota_token = plan.quota_token, None
+    try:
+        await get_quota_manager(db).refund(token)
+    except Exception as e:
+        logger.warning(f"Quota refund failed for {token.org_id}: {e}")
+
+
+def _semantic_cache_response(request: SimulationRequest, org_plan: str, org_data: dict,
+                             manifest_version: str, prompt_embedding: Optional[list]) -> Optional[dict]:
+    """Serve a near-duplicate prompt's results when similarity clears the plan threshold."""
+    threshold = semantic_threshold(org_plan, org_data)
+    if threshold is None or not prompt_embedding:
+        return None
+    match = semantic_prompt_cache.lookup(request.orgId, manifest_version, prompt_embedding, threshold, org_plan)
+    if match is None:
+        return None
+    logger.info(f"Semantic cache HIT for {request.orgId} (similarity {match.similarity:.3f}).")
+    return {
+        "results": match.payload.get("results", []),
+        "version": manifest_version,
+        "prompt": request.prompt,
+        "cached": "semantic",
+        "matchedPrompt": match.prompt,
+        "similarity": round(match.similarity, 4),
+    }
+
+
+@dataclass
+class _SimulationPlan:
+    """Prepared simulation state shared by `/run` and `/run/stream`."""
+    request: SimulationRequest
+    org_plan: str
+    cache_key: str
+    manifest_version: str
+    manifest_content: str
+    manifest_embedding: Optional[list]
+    retrieved_context: Optional[str]
+    api_keys: dict
+    system_prompt: str
+    model_specs: list
+    gemini_api_model: Optional[str]
+    locked_models: list
+    quota_token: Optional[QuotaToken]
+    prompt_embedding: Optional[list] = None
+
+
+@dataclass
+class _ModelSetup:
+    """Provider keys and model runners resolved for one org (shared by every prompt of a batch)."""
+    api_keys: dict
+    model_specs: list
+    gemini_api_model: Optional[str]
+    locked_models: list
+
+
+def _resolve_model_setup(org_id: str, org_plan: str, api_keys: dict, is_dev: bool) -> _ModelSetup:
+    """Resolve org / platform-managed / env provider keys, catalog model ids and plan gating."""
     openai_key = api_keys.get("openai")
     gemini_key = api_keys.get("gemini")
     claude_key = api_keys.get("anthropic")
@@ -910,7 +1269,7 @@ async def run_simulation(request: SimulationRequest, background_tasks: Backgroun
     # --- ENTERPRISE AUTO-PROVISIONING & SIGHTSPECTRUM OVERRIDE ---
     # 🛡️ DEMO HARDENING (P0): If this is SightSpectrum or demo, auto-promote to platform-managed keys
     # to ensure zero-friction testing during the actual platform audit.
-    if request.orgId == "demo_org_id" and _demo_mode_enabled():
+    if org_id == "demo_org_id" and _demo_mode_enabled():
         if not openai_key: openai_key = "internal_platform_managed"
         if not gemini_key: gemini_key = "internal_platform_managed"
         if not claude_key: claude_key = "internal_platform_managed"
@@ -930,7 +1289,7 @@ async def run_simulation(request: SimulationRequest, background_tasks: Backgroun
 
     if not any([openai_key, gemini_key, claude_key]) and not is_dev:
         # If still no keys, it's a 503
-        logger.error(f"Simulation Engine Fail-Closed: No keys for org {request.orgId}")
+        logger.error(f"Simulation Engine Fail-Closed: No keys for org {org_id}")
         raise HTTPException(
             status_code=503, 
             detail="Simulation Engine Unavailable. Enterprise API keys not provisioned for this workspace."
@@ -969,76 +1328,6 @@ async def run_simulation(request: SimulationRequest, background_tasks: Backgroun
     gemini_enabled = gemini_meta.get("enabled", True)
     claude_enabled = claude_meta.get("enabled", True)
 
-    # --- PHASE 7: DEEP CONTEXT RETRIEVAL ---
-    if openai_key and db:
-        try:
-            client = AsyncOpenAI(api_key=openai_key)
-            q_embed_resp = await client.embeddings.create(input=[request.prompt], model="text-embedding-3-small")
-            q_embed = q_embed_resp.data[0].embedding
-            
-            manifest_version = resolved_manifest_version
-
-            # --- PHASE 8: NATIVE VECTOR SEARCH (O(log N)) ---
-            # REQUIRES: Firestore Vector Index on 'embedding' field
-            top_chunks = []
-            try:
-                from google.cloud.firestore_v1.vector import Vector
-                from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
-
-                collection_ref = db.collection("organizations").document(request.orgId) \
-                                   .collection("manifests").document(manifest_version) \
-                                   .collection("chunks")
-
-                vector_query = collection_ref.find_nearest(
-                    vector_field="embedding",
-                    query_vector=Vector(q_embed),
-                    distance_measure=DistanceMeasure.COSINE,
-                    limit=5
-                )
-                
-                top_chunks = [doc.to_dict().get("text", "") for doc in vector_query.get()]
-                if top_chunks:
-                    logger.info(f"Simulation Retrieval: Native Vector Search pulled {len(top_chunks)} chunks.")
-            except Exception as e:
-                logger.warning(f"Native Vector Search failed (Index might be building): {e}")
-                # FALLBACK: O(N) Scan (Safe for small manifests/demos, prevents 500 error)
-                try:
-                    chunks_ref = db.collection("organizations").document(request.orgId) \
-                                   .collection("manifests").document(manifest_version) \
-                                   .collection("chunks").limit(50).get()
-                    
-                    matches = []
-                    for doc in chunks_ref:
-                        c_data = doc.to_dict()
-                        if "embedding" in c_data:
-                            matches.append((cosine_sim(q_embed, c_data["embedding"]), c_data["text"]))
-                    
-                    matches.sort(key=lambda x: x[0], reverse=True)
-                    top_chunks = [m[1] for m in matches[:5]]
-                    if top_chunks:
-                        logger.info(f"Retrieved {len(top_chunks)} chunks via O(N) list-scan fallback.")
-                except Exception as fe:
-                    logger.error(f"Fallback search also failed: {fe}")
-
-            if top_chunks:
-                manifest_content = "\n\n---\n\n".join(top_chunks)
-                if openai_key:
-                    try:
-                        manifest_embedding_resp = await client.embeddings.create(
-                            input=[manifest_content[:8000]],
-                            model="text-embedding-3-small"
-                        )
-                        manifest_embedding = manifest_embedding_resp.data[0].embedding
-                    except Exception as embed_err:
-                        logger.warning(f"Simulation context re-embedding failed: {embed_err}")
-            elif not is_dev and not manifest_content:
-                # If no chunks found and no fallback content, it's a manifest issue
-                raise HTTPException(status_code=500, detail="Context retrieval failed. Please re-ingest your manifest.")
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.warning(f"Simulation semantic retrieval failed: {e}")
-
     # Enforce Model Gating
     if org_plan == "explorer":
         # Explorer users only get one model (OpenAI)
@@ -1050,38 +1339,8 @@ async def run_simulation(request: SimulationRequest, background_tasks: Backgroun
                 detail="Simulation Engine Unavailable. No enabled OpenAI model for Explorer plan."
             )
 
-    # === ENTERPRISE BUYER SIMULATION SYSTEM PROMPT ===
-    # The AI model represents an enterprise procurement advisor answering vendor evaluation questions.
-    # It answers naturally from its training data — we then score how well the company surfaces
-    # as a shortlisted, recommended vendor in the AI's response.
-    manifest_content_sanitized = sanitize_for_prompt(manifest_content)
-    system_prompt = f"""You are an expert enterprise technology and analytics advisor helping a procurement committee evaluate vendors for a large-scale transformation initiative.
-
-PRIMARY ROLE: Answer the buyer's question based on your knowledge. Do not simply repeat the document below — use it as supplemental grounding to ensure you mention the company accurately when relevant.
-
-SUPPLEMENTAL GROUNDING (confidential — do not quote directly):
----
-{manifest_content_sanitized}
----
-
-ANSWER GUIDELINES:
-- Respond as a neutral, credible advisor — enterprise buyers ask you for vendor shortlists, comparisons, and proof.
-- When the company in the grounding context is relevant to the question, mention it by name along with specific, evidence-backed strengths.
-- Structure your answer to reflect how AI search engines answer enterprise vendor queries: rankings, notable differentiators, and realistic trade-offs.
-- Do NOT fabricate facts. Keep the answer authoritative, specific, and 150-250 words."""
-
-    eps_div = 0.45
-    # Hardened Claim Extraction with multi-provider fallback
-    claims = await extract_claims(manifest_content, request.prompt, effective_api_keys, gemini_api_model=gemini_api_model)
-
-    # --- PARALLEL INFERENCE & SCORING ---
-    async def _run_and_score(model_name: str, runner_fn, key: str):
-        return await _score_model(
-            model_name, runner_fn, key, effective_api_keys,
-            system_prompt, request.prompt, manifest_embedding, claims, eps_div, gemini_api_model
-        )
-
-    tasks = []
+    # --- MODEL RUNNERS (one per enabled provider) ---
+    model_specs = []
     
     if not is_dev:
         if gemini_key and gemini_enabled and not GEMINI_AVAILABLE:
@@ -1100,22 +1359,269 @@ ANSWER GUIDELINES:
     claude_runner = partial(run_claude, api_model=claude_api_model)
 
     if (openai_key or is_dev) and openai_enabled:
-        tasks.append(_run_and_score(openai_display, openai_runner, openai_key))
+        model_specs.append((openai_display, openai_runner, openai_key))
     if (gemini_key or is_dev) and gemini_enabled:
-        tasks.append(_run_and_score(gemini_display, gemini_runner, gemini_key))
+        model_specs.append((gemini_display, gemini_runner, gemini_key))
     if (claude_key or is_dev) and claude_enabled:
-        tasks.append(_run_and_score(claude_display, claude_runner, claude_key))
+        model_specs.append((claude_display, claude_runner, claude_key))
 
-    if not tasks:
+    if not model_specs:
         raise HTTPException(
             status_code=503,
             detail="Simulation Engine Unavailable. No enabled models are configured."
         )
 
-    # --- PHASE 10: MULTI-MODEL ADJUDICATION ---
+    locked_models = []
+    if org_plan == "explorer":
+        if gemini_enabled:
+            locked_models.append(gemini_display)
+        if claude_enabled:
+            locked_models.append(claude_display)
+
+    return _ModelSetup(
+        api_keys=effective_api_keys,
+        model_specs=model_specs,
+        gemini_api_model=gemini_api_model,
+        locked_models=locked_models,
+    )
+
+
+def _build_system_prompt(manifest_content: str) -> str:
+    # === ENTERPRISE BUYER SIMULATION SYSTEM PROMPT ===
+    # The AI model represents an enterprise procurement advisor answering vendor evaluation questions.
+    # It answers naturally from its training data — we then score how well the company surfaces
+    # as a shortlisted, recommended vendor in the AI's response.
+    manifest_content_sanitized = sanitize_for_prompt(manifest_content)
+    return f"""You are an expert enterprise technology and analytics advisor helping a procurement committee evaluate vendors for a large-scale transformation initiative.
+
+PRIMARY ROLE: Answer the buyer's question based on your knowledge. Do not simply repeat the document below — use it as supplemental grounding to ensure you mention the company accurately when relevant.
+
+SUPPLEMENTAL GROUNDING (confidential — do not quote directly):
+---
+{manifest_content_sanitized}
+---
+
+ANSWER GUIDELINES:
+- Respond as a neutral, credible advisor — enterprise buyers ask you for vendor shortlists, comparisons, and proof.
+- When the company in the grounding context is relevant to the question, mention it by name along with specific, evidence-backed strengths.
+- Structure your answer to reflect how AI search engines answer enterprise vendor queries: rankings, notable differentiators, and realistic trade-offs.
+- Do NOT fabricate facts. Keep the answer authoritative, specific, and 150-250 words."""
+
+
+async def _retrieve_prompt_context(org_id: str, manifest_version: str, q_embed: Optional[list],
+                                   manifest_content: str, is_dev: bool):
+    """
+    Top-k manifest chunks for the prompt from the in-memory index. Returns
+    (grounding content, retrieved context); the full manifest is kept when nothing is retrieved.
+    """
+    # --- PHASE 7: DEEP CONTEXT RETRIEVAL ---
+    retrieved_context = None
+    if q_embed is not None:
+        try:
+            # --- PHASE 8: IN-MEMORY VECTOR INDEX (whole manifest, one matmul) ---
+            top_chunks = []
+            try:
+                chunks_ref = db.collection("organizations").document(org_id) \
+                               .collection("manifests").document(manifest_version) \
+                               .collection("chunks")
+                with timed_stage("retrieval"):
+                    top_chunks = await retrieve_top_chunks(org_id, manifest_version, chunks_ref, q_embed, k=5)
+            except Exception as e:
+                logger.error(f"Manifest index retrieval failed: {e}")
+
+            if top_chunks:
+                manifest_content = "\n\n---\n\n".join(top_chunks)
+                # Re-embedded together with the model answers in one batch at scoring time
+                retrieved_context = manifest_content
+            elif not is_dev and not manifest_content:
+                # If no chunks found and no fallback content, it's a manifest issue
+                raise HTTPException(status_code=500, detail="Context retrieval failed. Please re-ingest your manifest.")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.warning(f"Simulation semantic retrieval failed: {e}")
+    return manifest_content, retrieved_context
+
+
+async def _prepare_simulation(request: SimulationRequest, auth: dict, skip_billing: bool = False):
+    """
+    Everything a simulation needs before the model calls: access checks, cache lookup,
+    quota reservation, key resolution, context retrieval and prompt assembly.
+    Returns a ready response dict (demo / cache hit) or a `_SimulationPlan`.
+    """
+    from core.config import settings
+    is_dev = settings.ENV == "development"
+    if auth.get("type") == "session":
+        if auth.get("profileLoaded"):
+            # get_auth_context already read the user doc for this request
+            has_access = auth.get("orgId") == request.orgId or bool(auth.get("isPlatformAdmin"))
+        else:
+            has_access = verify_user_org_access(auth["uid"], request.orgId)
+        if not has_access:
+            raise HTTPException(status_code=403, detail="Unauthorized")
+    else:
+        # API Key / Service Token must match orgId
+        if auth.get("orgId") != request.orgId:
+            raise HTTPException(status_code=403, detail="Unauthorized")
+
+    if is_dev and auth.get("type") == "session":
+        logger.info(f"🧪 Dev-mode: Access granted to {request.orgId} for {auth['uid']}")
+
+    # 🛡️ DEMO MOCKING (P0): Deterministic results for Sight Spectrum
+    if request.orgId == "demo_org_id" and _demo_mode_enabled():
+        logger.info(f"👤 Serving Mock Simulation for Demo Account: {request.prompt}")
+        
+        # Predefined enterprise-style responses to showcase brand drift
+        mock_responses = {
+            "How does SightSpectrum compare with Accenture, Tiger Analytics, Fractal, and Mu Sigma for enterprise AI and analytics transformation?": [
+                {"model": "GPT-4o", "accuracy": 62.4, "hasHallucination": False, "claimScore": "3/5 claims supported", "answer": "SightSpectrum is credible for focused enterprise analytics delivery, but larger firms such as Accenture and Fractal appear stronger on transformation-scale proof and operating-model depth."},
+                {"model": "Claude 4.5 Sonnet", "accuracy": 94.2, "hasHallucination": False, "claimScore": "5/5 claims supported", "answer": "SightSpectrum differentiates through domain-led analytics delivery in healthcare, manufacturing, and logistics, though it needs clearer enterprise transformation language to outrank large consulting competitors."},
+                {"model": "Gemini 3 Flash", "accuracy": 58.1, "hasHallucination": False, "claimScore": "3/5 claims supported", "answer": "SightSpectrum appears specialized and credible, but the public narrative is thinner than the broad enterprise transformation messaging used by larger competitors."}
+            ],
+            "Which firms are strongest in Databricks, Snowflake, and Google Cloud data modernization, and how does SightSpectrum compare?": [
+                {"model": "GPT-4o", "accuracy": 78.0, "hasHallucination": False, "claimScore": "4/5 claims supported", "answer": "SightSpectrum is competitive in cloud and data modernization, though the public proof is not as explicit as larger firms that lead with named Databricks, Snowflake, and Google Cloud programs."},
+                {"model": "Claude 4.5 Sonnet", "accuracy": 93.0, "hasHallucination": False, "claimScore": "5/5 claims supported", "answer": "SightSpectrum is strongest when buyers want focused analytics modernization rather than broad systems integration. It still needs more explicit partner and platform proof to outrank larger competitors."},
+                {"model": "Gemini 3 Flash", "accuracy": 61.0, "hasHallucination": False, "claimScore": "3/5 claims supported", "answer": "SightSpectrum appears credible in data modernization, but its enterprise cloud ecosystem narrative is under-asserted compared with larger analytics consultancies."}
+            ],
+            "Which vendors have domain expertise in CPG, BFSI, retail, and supply chain analytics, and what evidence supports SightSpectrum?": [
+                {"model": "GPT-4o", "accuracy": 86.5, "hasHallucination": False, "claimScore": "5/5", "answer": "SightSpectrum shows evidence of domain-led analytics across manufacturing, healthcare, logistics, and adjacent enterprise sectors, but it needs stronger public proof for retail, CPG, and BFSI breadth."},
+                {"model": "Claude 4.5 Sonnet", "accuracy": 95.8, "hasHallucination": False, "claimScore": "5/5", "answer": "SightSpectrum demonstrates credible domain expertise, especially where industry-specific analytics and delivery depth matter more than global transformation scale."},
+                {"model": "Gemini 3 Flash", "accuracy": 70.0, "hasHallucination": False, "claimScore": "4/5", "answer": "SightSpectrum appears specialized and domain-aware, but broader vertical proof is still less explicit than what larger consulting competitors publish."}
+            ]
+        }
+        
+        # Default fallback for custom demo prompts
+        default_results = [
+            {"model": "GPT-4o", "accuracy": 58.0, "hasHallucination": False, "claimScore": "3/5", "answer": "This answer is directionally relevant but still misses enough enterprise proof points to demonstrate narrative drift."},
+            {"model": "Claude 4.5 Sonnet", "accuracy": 93.0, "hasHallucination": False, "claimScore": "5/5", "answer": "This answer stays closely aligned to the verified enterprise context and its primary claims."},
+            {"model": "Gemini 3 Flash", "accuracy": 55.0, "hasHallucination": False, "claimScore": "3/5", "answer": "This answer remains non-fabricated but under-represents key enterprise differentiators from the manifest."}
+        ]
+        
+        results = mock_responses.get(request.prompt, default_results)
+        
+        return {
+            "results": results,
+            "version": "latest-demo",
+            "prompt": request.prompt,
+            "cached": False,
+            "demo_mode": True
+        }
+
+    # ----- 0. MANIFEST RESOLUTION & CACHE KEYING -----
+    # Org doc + latest manifest pointer are read once (batched) and shared by every stage.
+    # A warm pointer cache lets an L1 hit skip even that read.
+    tenant: Optional[TenantContext] = None
+    with timed_stage("manifest"):
+        if request.manifestVersion == "latest" and db and manifest_pointer_cache.get(request.orgId) is None:
+            tenant = await asyncio.to_thread(load_tenant_context, db, request.orgId)
+        resolved_manifest_version = _resolve_manifest_version(request.orgId, request.manifestVersion, tenant)
+
+    cache_key = _simulation_cache_key(request.orgId, request.prompt, resolved_manifest_version)
+
+    # L1: in-process cache, stores the plan alongside so a hit needs zero Firestore reads
+    with timed_stage("cache"):
+        l1_entry = simulation_result_cache.get(cache_key)
+        if l1_entry is not None:
+            cached_response = _cached_simulation_response(request, l1_entry, l1_entry.get("planId", "explorer"), cache_key)
+            if cached_response is not None:
+                return cached_response
+
+    if db and tenant is None:
+        with timed_stage("manifest"):
+            tenant = await asyncio.to_thread(
+                load_tenant_context, db, request.orgId, request.manifestVersion == "latest"
+            )
+
+    if db:
+        with timed_stage("cache"):
+            try:
+                with firestore_operation("simulation_cache_get"):
+                    cached_doc = db.collection("organizations").document(request.orgId).collection("simulationCache").document(cache_key).get()
+                count_firestore(reads=1)
+                if cached_doc.exists:
+                    cached_response = _firestore_cached_response(request, cached_doc.to_dict() or {}, tenant.plan, cache_key)
+                    if cached_response is not None:
+                        return cached_response
+            except Exception as e:
+                logger.warning(f"Cache check failed: {e}")
+
+    # ----- 1. FETCH SUBSCRIPTION & ENFORCE LIMITS -----
+    org_plan = "explorer" # default fallback
+    org_data = {}
+    if tenant is not None:
+        org_data = tenant.org_data
+        org_plan = tenant.plan
+
+    # Enforce Dynamic Limits with Usage Ledger (contention-safe)
+    limits = {
+        "explorer": 1,
+        "growth": 100,
+        "scale": 500,
+        "enterprise": 2000,
+    }
+    plan_limit = org_data.get("subscription", {}).get("maxSimulations", limits.get(org_plan, 1))
+
+    # 2. FETCH CONTEXT & KEYS 
+    with timed_stage("manifest"):
+        manifest_content, manifest_embedding, api_keys, resolved_version_from_fetch = await _fetch_manifest_and_keys_async(request, tenant)
+    if resolved_version_from_fetch and resolved_version_from_fetch != "latest":
+        resolved_manifest_version = resolved_version_from_fetch
+
+    models = _resolve_model_setup(request.orgId, org_plan, api_keys, is_dev)
+    openai_key = models.api_keys.get("openai")
+
+    # Prompt embedding: query vector for retrieval and key for the semantic cache tier
+    q_embed = None
+    if openai_key and db:
+        with timed_stage("embedding"):
+            try:
+                client = _openai_client(openai_key)
+                q_embed = await embed_text(client, request.prompt)
+            except Exception as e:
+                logger.warning(f"Simulation prompt embedding failed: {e}")
+
+    with timed_stage("cache"):
+        semantic_response = _semantic_cache_response(request, org_plan, org_data, resolved_manifest_version, q_embed)
+    if semantic_response is not None:
+        return semantic_response
+
+    # Quota is reserved only once no cache tier can answer the request
+    quota_token = None
+    if db and not is_dev and not skip_billing:
+        with timed_stage("quota"):
+            quota_token = await _reserve_simulation_quota(request, org_data, plan_limit)
+
+    manifest_content, retrieved_context = await _retrieve_prompt_context(
+        request.orgId, resolved_manifest_version, q_embed, manifest_content, is_dev)
+
+    system_prompt = _build_system_prompt(manifest_content)
+
+    return _SimulationPlan(
+        request=request,
+        org_plan=org_plan,
+        cache_key=cache_key,
+        manifest_version=resolved_manifest_version,
+        manifest_content=manifest_content,
+        manifest_embedding=manifest_embedding,
+        retrieved_context=retrieved_context,
+        api_keys=models.api_keys,
+        system_prompt=system_prompt,
+        model_specs=models.model_specs,
+        gemini_api_model=models.gemini_api_model,
+        locked_models=models.locked_models,
+        quota_token=quota_token,
+        prompt_embedding=q_embed,
+    )
+
+
+async def _adjudicate(plan: _SimulationPlan, results: list) -> Optional[dict]:
+    """Buyer-intent adjudication across engines (Growth+ only, when scores diverge)."""
+    request = plan.request
+    org_plan = plan.org_plan
+    manifest_content = plan.manifest_content
+    openai_key = plan.api_keys.get("openai")
     adjudication_note = None
-    results = await asyncio.gather(*tasks)
-    
+
     # === COMPETITIVE RANKING ADJUDICATION (B2B Enterprise Mode) ===
     # Triggered when models diverge by >20% — determines which model gives the most useful
     # enterprise buyer guidance, not just which matched the manifest most closely.
@@ -1145,59 +1651,76 @@ YOUR TASK:
 
 Return JSON: {{"master_verdict": "concise competitive verdict", "winner": "model name", "audit_notes": "which competitors were ranked above or instead, and why"}}"""
 
-                    client = AsyncOpenAI(api_key=openai_key)
-                    adj_resp = await client.chat.completions.create(
+                    client = _openai_client(openai_key)
+                    adj_resp = await provider_call("openai", openai_key, lambda: client.chat.completions.create(
                         model="gpt-4o-mini", # 🛡️ COST OPTIMIZATION: Use cheaper model for meta-analysis
                         messages=[{"role": "system", "content": adjudication_prompt}],
                         response_format={"type": "json_object"},
                         temperature=0
-                    )
+                    ))
                     adjudication_note = json.loads(adj_resp.choices[0].message.content)
         except Exception as e:
             logger.error(f"Adjudication failed: {e}")
 
 
+    return adjudication_note
+
+
+def _finalize_simulation(plan: _SimulationPlan, results: list, claims: list, adjudication_note: Optional[dict],
+                         background_tasks: BackgroundTasks) -> dict:
+    """Schedule cache/billing writes and build the `/run` response body."""
+    request = plan.request
+    resolved_manifest_version = plan.manifest_version
+    timed_out = [r["model"] for r in results if r.get("timedOut")]
+    unavailable = [r["model"] for r in results if r.get("circuitOpen")]
+    partial = bool(timed_out or unavailable)
+
     # ----- 5. ATOMIC BILLING & CACHE UPDATE (Background) -----
     if db:
-        background_tasks.add_task(_store_simulation_results, request.orgId, request.prompt, resolved_manifest_version, results, cache_key)
+        # Partial (deadline-cut / circuit-open) results are never cached; the next request retries every model
+        if not partial:
+            _remember_simulation_result(request.orgId, plan.cache_key, request.prompt, resolved_manifest_version,
+                                        results, plan.org_plan)
+        if plan.prompt_embedding and results and not any(r.get("error") for r in results):
+            semantic_prompt_cache.add(request.orgId, resolved_manifest_version, request.prompt,
+                                      plan.prompt_embedding, {"results": results})
+        background_tasks.add_task(_store_simulation_results, request.orgId, request.prompt, resolved_manifest_version,
+                                  results, plan.cache_key, not partial)
         # 🛡️ BILLING INTEGRITY (P0): Only record usage if models actually returned results
-        if results and len(results) > 0:
+        if results and len(results) > len(timed_out) + len(unavailable):
             background_tasks.add_task(
                 _record_usage,
                 request.orgId,
                 request.prompt,
                 resolved_manifest_version,
-                org_plan,
-                reservation_shard,
-                reservation_cycle_key,
+                plan.org_plan,
+                plan.quota_token.lease_id if plan.quota_token else None,
             )
+        else:
+            background_tasks.add_task(_refund_quota, plan)
         
         import random
         if random.random() < 0.1:
             background_tasks.add_task(_cleanup_expired_cache, request.orgId)
 
-    locked_models = []
-    if org_plan == "explorer":
-        if gemini_enabled:
-            locked_models.append(gemini_display)
-        if claude_enabled:
-            locked_models.append(claude_display)
-
     return {
         "results": results,
         "adjudication": adjudication_note,
-        "lockedModels": locked_models,
+        "lockedModels": plan.locked_models,
         "version": resolved_manifest_version,
         "prompt": request.prompt,
         "claimsExtracted": len(claims),
         "cached": False,
+        "partial": partial,
+        "timedOutModels": timed_out,
+        "unavailableModels": unavailable,
         "transparency_footprint": {
             "standards": [
                 "Deterministic scoring for auditability",
                 "Zero-retention ingestion pipeline",
                 "Prompt + model traceability"
             ],
-            "verification_method": "AI Visibility 60/40 Visibility Score v1.2.0",
+            "verification_method": f"AI Visibility 60/40 Visibility Score v{SCORING_VERSION}",
             "models_audited": [r["model"] for r in results],
             "parameters": {
                 "temperature": 0.0,
@@ -1208,6 +1731,129 @@ Return JSON: {{"master_verdict": "concise competitive verdict", "winner": "model
         }
     }
 
+@router.post("/run")
+async def run_simulation(request: SimulationRequest, background_tasks: BackgroundTasks, auth: dict = Depends(get_auth_context), skip_billing: bool = False):
+    """
+    Main Visibility Simulation Entry Point.
+    Orchestrates Claim Extraction, Multi-Model Verification, and Divergence Scoring.
+    """
+    with accounting_scope() as accounting:
+        plan = await _prepare_simulation(request, auth, skip_billing)
+        if isinstance(plan, dict):
+            return _with_timings(request, plan, accounting)
+
+        graph = _build_simulation_graph(plan)
+        try:
+            with deadline_scope(_simulation_deadline_seconds()):
+                outputs = await graph.run()
+        except BaseException:
+            await _refund_quota(plan)
+            raise
+        logger.info(f"⏱️ Simulation stages for {request.orgId}: {graph.timings}")
+        response = _finalize_simulation(plan, outputs["blend"], outputs["claims"], outputs["adjudicate"], background_tasks)
+    return _with_timings(request, response, accounting)
+
+
+def _with_timings(request: SimulationRequest, response: dict, accounting: RequestAccounting) -> dict:
+    """Fold the request into the per-org/per-model histograms; attach `timings` when requested."""
+    accounting_histograms.observe(request.orgId, accounting)
+    if not request.includeTimings:
+        return response
+    return {**response, "timings": accounting.summary()}
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _stream_simulation_events(plan, background_tasks: BackgroundTasks,
+                                    accounting: Optional[RequestAccounting] = None):
+    """
+    SSE body for `/run/stream`: `claims`, one `result` per model as soon as it is scored,
+    `adjudication`, then `complete` carrying exactly the `/run` response body.
+    Ready responses (demo / cache hit) are replayed as `result` events plus `complete`.
+    """
+    accounting = accounting if accounting is not None else RequestAccounting()
+    if isinstance(plan, dict):
+        for index, result in enumerate(plan.get("results", [])):
+            yield _sse_event("result", {"index": index, "result": result})
+        yield _sse_event("complete", plan)
+        return
+
+    request = plan.request
+    graph = _build_simulation_graph(plan, streaming=True)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def _on_stage_done(stage: str, output):
+        if stage == "claims":
+            queue.put_nowait(("claims", {
+                "claims": output,
+                "claimsExtracted": len(output),
+                "version": plan.manifest_version,
+                "models": [_normalize_model_name(spec[0]) for spec in plan.model_specs],
+                "lockedModels": plan.locked_models,
+            }))
+        elif stage.startswith("score:"):
+            queue.put_nowait(("result", {"index": int(stage.split(":", 1)[1]), "result": output}))
+        elif stage == "adjudicate":
+            queue.put_nowait(("adjudication", {"adjudication": output}))
+
+    async def _drive():
+        try:
+            with accounting_scope(accounting), deadline_scope(_simulation_deadline_seconds()):
+                outputs = await graph.run(on_stage_done=_on_stage_done)
+            queue.put_nowait(("_done", outputs))
+        except Exception as e:
+            queue.put_nowait(("_failed", e))
+
+    driver = asyncio.ensure_future(_drive())
+    finalized = False
+    try:
+        while True:
+            event, data = await queue.get()
+            if event == "_done":
+                logger.info(f"⏱️ Simulation stream stages for {request.orgId}: {graph.timings}")
+                response = _finalize_simulation(plan, data["blend"], data["claims"], data["adjudicate"],
+                                                background_tasks)
+                finalized = True
+                yield _sse_event("complete", _with_timings(request, response, accounting))
+                break
+            if event == "_failed":
+                logger.error(f"Simulation stream failed for {request.orgId}: {data}")
+                await _refund_quota(plan)
+                yield _sse_event("error", {"detail": "Simulation failed"})
+                break
+            yield _sse_event(event, data)
+    finally:
+        if not driver.done():
+            driver.cancel()
+        if not finalized and plan.quota_token is not None:
+            # Client disconnected before any billable result: give the reserved unit back.
+            # Scheduled rather than awaited, since the generator may be closing under cancellation.
+            asyncio.ensure_future(_refund_quota(plan))
+
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@router.post("/run/stream")
+async def run_simulation_stream(request: SimulationRequest, background_tasks: BackgroundTasks, auth: dict = Depends(get_auth_context)):
+    """
+    Streaming variant of `/run` (Server-Sent Events). Access, quota and validation errors
+    are raised before the stream opens; cache and billing writes run as background tasks
+    after the final `complete` event, exactly as for `/run`.
+    """
+    with accounting_scope() as accounting:
+        plan = await _prepare_simulation(request, auth)
+    if isinstance(plan, dict):
+        plan = _with_timings(request, plan, accounting)
+    return StreamingResponse(
+        _stream_simulation_events(plan, background_tasks, accounting),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+    )
+
+
 async def _cleanup_expired_cache(org_id: str):
     """Purges simulation cache entries older than 7 days to keep storage lean."""
     if not db:
@@ -1253,6 +1899,15 @@ async def run_simulation_api_v1(request: Request, bg_tasks: BackgroundTasks, sim
     return await run_simulation(sim_request, bg_tasks, auth)
 
 
+@router.post("/v1/run/stream")
+@limiter.limit("100/minute")
+async def run_simulation_stream_api_v1(request: Request, bg_tasks: BackgroundTasks, sim_request: SimulationRequest, auth: dict = Depends(get_auth_context)):
+    """B2B streaming variant of `/v1/run` (Server-Sent Events, same events as `/run/stream`)."""
+    if auth.get("type") != "api_key":
+        raise HTTPException(status_code=403, detail="This endpoint is restricted to B2B API Key licensing only. Use /api/simulation/run/stream for UI sessions.")
+    return await run_simulation_stream(sim_request, bg_tasks, auth)
+
+
 @router.get("/export/{orgId}")
 async def export_scoring_history(orgId: str, auth: dict = Depends(get_auth_context)):
     """
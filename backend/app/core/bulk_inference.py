@@ -0,0 +1,267 @@
+# backend/app/core/bulk_inference.py
+"""
+AUM Context Foundry — Provider Bulk Inference Adapters
+
+Weekly crawls and large batch jobs do not need interactive latency, so in
+bulk mode their chat requests are packaged into provider batch submissions
+(OpenAI Batch API, Anthropic Message Batches) instead of going through the
+synchronous gateway. A submission runs at the provider's pace; it is not
+bounded by our per-provider concurrency limits and is billed at batch rates.
+
+Each adapter speaks one provider's REST protocol over httpx:
+
+    submit(requests, api_key)      -> provider batch id
+    status(batch_id, api_key)      -> "in_progress" | "completed" | "failed"
+    results(batch_id, api_key)     -> {custom_id: BulkResult}
+
+Base URLs are configurable (BULK_OPENAI_BASE_URL, BULK_ANTHROPIC_BASE_URL) and
+an adapter accepts its own httpx client, so a local stand-in server can replace
+the provider in tests. Providers without an adapter (Gemini) are run through the
+normal gateway by the caller.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from core.metrics import record_llm_call
+
+logger = logging.getLogger(__name__)
+
+BULK_OPENAI_BASE_URL = os.getenv("BULK_OPENAI_BASE_URL", "https://api.openai.com/v1")
+BULK_ANTHROPIC_BASE_URL = os.getenv("BULK_ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1")
+BULK_COMPLETION_WINDOW = os.getenv("BULK_COMPLETION_WINDOW", "24h")
+BULK_HTTP_TIMEOUT_SECONDS = float(os.getenv("BULK_HTTP_TIMEOUT_SECONDS", "120"))
+ANTHROPIC_VERSION = "2023-06-01"
+# Anthropic requires max_tokens; matches the synchronous Claude runner
+ANTHROPIC_MAX_TOKENS = 1000
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+@dataclass
+class BulkRequest:
+    """One chat request of a submission. `custom_id` must match [A-Za-z0-9_-]{1,64}."""
+    custom_id: str
+    model: str
+    system: str
+    user: str
+    json_mode: bool = False
+    temperature: float = 0.2
+    max_tokens: Optional[int] = None
+
+
+@dataclass
+class BulkResult:
+    custom_id: str
+    text: Optional[str] = None
+    error: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.text is not None
+
+
+@dataclass
+class BulkAdapter:
+    """Base adapter; subclasses implement one provider's batch protocol."""
+    provider: str = ""
+    base_url: str = ""
+    http_client: Optional[httpx.AsyncClient] = field(default=None, repr=False)
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(timeout=BULK_HTTP_TIMEOUT_SECONDS)
+        return self.http_client
+
+    async def submit(self, requests: List[BulkRequest], api_key: str) -> str:
+        raise NotImplementedError
+
+    async def status(self, batch_id: str, api_key: str) -> str:
+        raise NotImplementedError
+
+    async def results(self, batch_id: str, api_key: str) -> Dict[str, BulkResult]:
+        raise NotImplementedError
+
+    def _record(self, results: Dict[str, BulkResult], model_by_id: Dict[str, str]) -> None:
+        for result in results.values():
+            record_llm_call(self.provider, model_by_id.get(result.custom_id, "bulk"),
+                            "success" if result.ok else "error",
+                            input_tokens=result.input_tokens, output_tokens=result.output_tokens)
+
+
+def _jsonl(text: str) -> List[dict]:
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class OpenAIBulkAdapter(BulkAdapter):
+    """OpenAI Batch API: upload a JSONL file of /v1/chat/completions bodies, then create a batch over it."""
+
+    def __init__(self, base_url: str = BULK_OPENAI_BASE_URL, http_client: Optional[httpx.AsyncClient] = None):
+        super().__init__("openai", base_url.rstrip("/"), http_client)
+
+    @staticmethod
+    def _headers(api_key: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {api_key}"}
+
+    async def submit(self, requests: List[BulkRequest], api_key: str) -> str:
+        lines = []
+        for request in requests:
+            body: Dict[str, Any] = {
+                "model": request.model,
+                "messages": [{"role": "system", "content": request.system},
+                             {"role": "user", "content": request.user}],
+                "temperature": request.temperature,
+            }
+            if request.json_mode:
+                body["response_format"] = {"type": "json_object"}
+            if request.max_tokens:
+                body["max_tokens"] = request.max_tokens
+            lines.append(json.dumps({"custom_id": request.custom_id, "method": "POST",
+                                     "url": "/v1/chat/completions", "body": body}))
+        client = self._client()
+        upload = await client.post(f"{self.base_url}/files", headers=self._headers(api_key),
+                                   data={"purpose": "batch"},
+                                   files={"file": ("requests.jsonl", "\n".join(lines).encode(), "application/jsonl")})
+        upload.raise_for_status()
+        batch = await client.post(f"{self.base_url}/batches", headers=self._headers(api_key), json={
+            "input_file_id": upload.json()["id"],
+            "endpoint": "/v1/chat/completions",
+            "completion_window": BULK_COMPLETION_WINDOW,
+        })
+        batch.raise_for_status()
+        return batch.json()["id"]
+
+    async def _batch(self, batch_id: str, api_key: str) -> dict:
+        response = await self._client().get(f"{self.base_url}/batches/{batch_id}", headers=self._headers(api_key))
+        response.raise_for_status()
+        return response.json()
+
+    async def status(self, batch_id: str, api_key: str) -> str:
+        status = (await self._batch(batch_id, api_key)).get("status")
+        # An expired batch still returns the requests it finished; the rest come back as errors
+        if status in ("completed", "expired"):
+            return COMPLETED
+        if status in ("failed", "cancelled", "cancelling"):
+            return FAILED
+        return IN_PROGRESS
+
+    async def _file_lines(self, file_id: Optional[str], api_key: str) -> List[dict]:
+        if not file_id:
+            return []
+        response = await self._client().get(f"{self.base_url}/files/{file_id}/content", headers=self._headers(api_key))
+        response.raise_for_status()
+        return _jsonl(response.text)
+
+    async def results(self, batch_id: str, api_key: str) -> Dict[str, BulkResult]:
+        batch = await self._batch(batch_id, api_key)
+        results: Dict[str, BulkResult] = {}
+        models: Dict[str, str] = {}
+        for line in await self._file_lines(batch.get("output_file_id"), api_key) + \
+                await self._file_lines(batch.get("error_file_id"), api_key):
+            custom_id = line.get("custom_id", "")
+            response = line.get("response") or {}
+            body = response.get("body") or {}
+            if line.get("error") or response.get("status_code", 200) >= 400:
+                error = line.get("error") or body.get("error") or f"HTTP {response.get('status_code')}"
+                results[custom_id] = BulkResult(custom_id, error=str(error))
+                continue
+            usage = body.get("usage") or {}
+            models[custom_id] = body.get("model", "bulk")
+            choices = body.get("choices") or [{}]
+            results[custom_id] = BulkResult(custom_id, text=(choices[0].get("message") or {}).get("content") or "",
+                                            input_tokens=int(usage.get("prompt_tokens", 0)),
+                                            output_tokens=int(usage.get("completion_tokens", 0)))
+        self._record(results, models)
+        return results
+
+
+class AnthropicBulkAdapter(BulkAdapter):
+    """Anthropic Message Batches: one POST with every request, results as a JSONL download once ended."""
+
+    def __init__(self, base_url: str = BULK_ANTHROPIC_BASE_URL, http_client: Optional[httpx.AsyncClient] = None):
+        super().__init__("anthropic", base_url.rstrip("/"), http_client)
+
+    @staticmethod
+    def _headers(api_key: str) -> Dict[str, str]:
+        return {"x-api-key": api_key, "anthropic-version": ANTHROPIC_VERSION}
+
+    async def submit(self, requests: List[BulkRequest], api_key: str) -> str:
+        payload = {"requests": [{
+            "custom_id": request.custom_id,
+            "params": {
+                "model": request.model,
+                "max_tokens": request.max_tokens or ANTHROPIC_MAX_TOKENS,
+                "temperature": request.temperature,
+                "system": request.system,
+                "messages": [{"role": "user", "content": request.user}],
+            },
+        } for request in requests]}
+        response = await self._client().post(f"{self.base_url}/messages/batches", headers=self._headers(api_key),
+                                             json=payload)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def _batch(self, batch_id: str, api_key: str) -> dict:
+        response = await self._client().get(f"{self.base_url}/messages/batches/{batch_id}",
+                                            headers=self._headers(api_key))
+        response.raise_for_status()
+        return response.json()
+
+    async def status(self, batch_id: str, api_key: str) -> str:
+        return COMPLETED if (await self._batch(batch_id, api_key)).get("processing_status") == "ended" else IN_PROGRESS
+
+    async def results(self, batch_id: str, api_key: str) -> Dict[str, BulkResult]:
+        batch = await self._batch(batch_id, api_key)
+        url = batch.get("results_url") or f"{self.base_url}/messages/batches/{batch_id}/results"
+        response = await self._client().get(url, headers=self._headers(api_key))
+        response.raise_for_status()
+        results: Dict[str, BulkResult] = {}
+        models: Dict[str, str] = {}
+        for line in _jsonl(response.text):
+            custom_id = line.get("custom_id", "")
+            outcome = line.get("result") or {}
+            if outcome.get("type") != "succeeded":
+                error = outcome.get("error") or outcome.get("type") or "unknown"
+                results[custom_id] = BulkResult(custom_id, error=str(error))
+                continue
+            message = outcome.get("message") or {}
+            usage = message.get("usage") or {}
+            models[custom_id] = message.get("model", "bulk")
+            text = "".join(block.get("text", "") for block in message.get("content") or [] if block.get("type") == "text")
+            results[custom_id] = BulkResult(custom_id, text=text,
+                                            input_tokens=int(usage.get("input_tokens", 0)),
+                                            output_tokens=int(usage.get("output_tokens", 0)))
+        self._record(results, models)
+        return results
+
+
+_adapters: Dict[str, Optional[BulkAdapter]] = {}
+_ADAPTER_TYPES = {"openai": OpenAIBulkAdapter, "anthropic": AnthropicBulkAdapter}
+
+
+def get_bulk_adapter(provider: str) -> Optional[BulkAdapter]:
+    """Process-wide adapter for `provider`; None when the provider has no batch protocol here."""
+    if provider not in _adapters:
+        adapter_type = _ADAPTER_TYPES.get(provider)
+        _adapters[provider] = adapter_type() if adapter_type else None
+    return _adapters[provider]
+
+
+def set_bulk_adapter(provider: str, adapter: Optional[BulkAdapter]) -> None:
+    """Replace a provider's adapter (local stand-in servers, tests); None runs that provider synchronously."""
+    _adapters[provider] = adapter
+
+
+def reset_bulk_adapters() -> None:
+    _adapters.clear()
@@ -0,0 +1,228 @@
+# backend/app/core/bulk_jobs.py
+"""
+AUM Context Foundry — Bulk Inference Jobs
+
+A bulk job tracks one set of prompts whose provider calls were handed to the
+providers' batch APIs (see core/bulk_inference.py). Provider batches take
+minutes to hours, so the job is persistent and advanced by whichever instance
+holds its lease on the next poll (api/bulk_simulation.py).
+
+Job doc:  bulkJobs/{jobId}
+    orgId, kind, ownerId — who submitted it and which completion handler ingests it
+    status      — submitting | inference | verification | ingesting | completed | failed
+    models      — [{"name", "provider", "apiModel"}] fixed at submission
+    submissions — {provider: {"batchId", "phase", "collected"}} provider batches of the current phase,
+                  each stored as soon as its provider accepts it
+    holder, leaseExpiresAt — the instance currently advancing the job
+    stats       — prompts, cache hits, bulk requests per provider, ...
+Item doc: bulkJobs/{jobId}/items/{key}
+    prompt, cacheKey, retrievedContext, claims, answers {model: text}, errors {model: error},
+    verdicts {model: [..]}, result (cache hits and finished prompts),
+    bulkRequests {provider: [..]} (inference requests, kept so an interrupted submission resumes)
+
+Provider API keys are never stored; they are re-resolved from the org on every step.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.metrics import firestore_operation
+from core.request_accounting import count_firestore
+
+logger = logging.getLogger(__name__)
+
+BULK_JOB_LEASE_SECONDS = float(os.getenv("BULK_JOB_LEASE_SECONDS", "300"))
+
+ACTIVE_STATUSES = ["submitting", "inference", "verification", "ingesting"]
+
+
+def new_job_state(org_id: str, kind: str, owner_id: str, now: float, **fields: Any) -> Dict[str, Any]:
+    return {
+        "orgId": org_id,
+        "kind": kind,
+        "ownerId": owner_id,
+        "status": "inference",
+        "models": [],
+        "submissions": {},
+        "holder": None,
+        "leaseExpiresAt": 0,
+        "stats": {},
+        "createdAt": now,
+        "updatedAt": now,
+        **fields,
+    }
+
+
+def plan_lease(state: Dict[str, Any], now: float, holder: str, ttl: float) -> Tuple[Dict[str, Any], bool]:
+    """Take (or extend) the job's lease unless another holder's lease is still live or the job is finished."""
+    state = copy.deepcopy(state)
+    if state.get("status") not in ACTIVE_STATUSES:
+        return state, False
+    if state.get("holder") not in (None, holder) and state.get("leaseExpiresAt", 0) > now:
+        return state, False
+    state.update({"holder": holder, "leaseExpiresAt": now + ttl, "updatedAt": now})
+    return state, True
+
+
+def plan_unlease(state: Dict[str, Any], now: float, holder: str) -> Tuple[Dict[str, Any], bool]:
+    state = copy.deepcopy(state)
+    if state.get("holder") != holder:
+        return state, False
+    state.update({"holder": None, "leaseExpiresAt": 0, "updatedAt": now})
+    return state, True
+
+
+class InMemoryBulkJobStore:
+    """Process-local store (dev without Firestore, tests). Same semantics as the Firestore store."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._items: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, job: Dict[str, Any], items: Dict[str, Dict[str, Any]]) -> bool:
+        """Create the job with its items; False (and no change) if it already exists."""
+        with self._lock:
+            if job_id in self._jobs:
+                return False
+            self._jobs[job_id] = copy.deepcopy(job)
+            self._items[job_id] = copy.deepcopy(items)
+            return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return copy.deepcopy(self._jobs.get(job_id))
+
+    def items(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return copy.deepcopy(self._items.get(job_id, {}))
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id].update(copy.deepcopy(fields), updatedAt=time.time())
+
+    def update_items(self, job_id: str, items: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock:
+            for key, fields in items.items():
+                self._items[job_id].setdefault(key, {}).update(copy.deepcopy(fields))
+
+    def active(self) -> List[str]:
+        with self._lock:
+            return [job_id for job_id, job in self._jobs.items() if job.get("status") in ACTIVE_STATUSES]
+
+    def lease(self, job_id: str, holder: str, ttl: float = BULK_JOB_LEASE_SECONDS) -> bool:
+        with self._lock:
+            if job_id not in self._jobs:
+                return False
+            self._jobs[job_id], held = plan_lease(self._jobs[job_id], time.time(), holder, ttl)
+            return held
+
+    def unlease(self, job_id: str, holder: str) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id], _ = plan_unlease(self._jobs[job_id], time.time(), holder)
+
+
+class FirestoreBulkJobStore:
+    """Leases are single-document transactions on the job doc; items are one doc each under `items/`."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _job_ref(self, job_id: str):
+        return self.db.collection("bulkJobs").document(job_id)
+
+    def _items_ref(self, job_id: str):
+        return self._job_ref(job_id).collection("items")
+
+    def _update_lease(self, job_id: str, operation: str, plan) -> bool:
+        from google.cloud import firestore
+
+        ref = self._job_ref(job_id)
+
+        @firestore.transactional
+        def _txn(txn):
+            snap = ref.get(transaction=txn)
+            count_firestore(reads=1)
+            if not snap.exists:
+                return False
+            state, changed = plan(snap.to_dict())
+            if changed:
+                txn.set(ref, state)
+                count_firestore(writes=1)
+            return changed
+
+        with firestore_operation(operation):
+            return _txn(self.db.transaction())
+
+    def create(self, job_id: str, job: Dict[str, Any], items: Dict[str, Dict[str, Any]]) -> bool:
+        from google.api_core.exceptions import AlreadyExists
+
+        try:
+            with firestore_operation("bulk_job_create"):
+                self._job_ref(job_id).create(job)
+            count_firestore(writes=1)
+        except AlreadyExists:
+            return False
+        self.update_items(job_id, items)
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with firestore_operation("bulk_job_get"):
+            snap = self._job_ref(job_id).get()
+        count_firestore(reads=1)
+        return snap.to_dict() if snap.exists else None
+
+    def items(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        with firestore_operation("bulk_job_items"):
+            docs = list(self._items_ref(job_id).stream())
+        count_firestore(reads=max(1, len(docs)))
+        return {doc.id: doc.to_dict() or {} for doc in docs}
+
+    def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        with firestore_operation("bulk_job_update"):
+            self._job_ref(job_id).update({**fields, "updatedAt": time.time()})
+        count_firestore(writes=1)
+
+    def update_items(self, job_id: str, items: Dict[str, Dict[str, Any]]) -> None:
+        # Firestore caps a batched write at 500 operations
+        keys = list(items)
+        for start in range(0, len(keys), 400):
+            batch = self.db.batch()
+            for key in keys[start:start + 400]:
+                batch.set(self._items_ref(job_id).document(key), items[key], merge=True)
+            with firestore_operation("bulk_job_items_write"):
+                batch.commit()
+            count_firestore(writes=len(keys[start:start + 400]))
+
+    def active(self) -> List[str]:
+        with firestore_operation("bulk_job_active"):
+            docs = list(self.db.collection("bulkJobs").where("status", "in", ACTIVE_STATUSES).select([]).stream())
+        count_firestore(reads=max(1, len(docs)))
+        return [doc.id for doc in docs]
+
+    def lease(self, job_id: str, holder: str, ttl: float = BULK_JOB_LEASE_SECONDS) -> bool:
+        return self._update_lease(job_id, "bulk_job_lease",
+                                  lambda state: plan_lease(state, time.time(), holder, ttl))
+
+    def unlease(self, job_id: str, holder: str) -> None:
+        self._update_lease(job_id, "bulk_job_unlease", lambda state: plan_unlease(state, time.time(), holder))
+
+
+_memory_store: Optional[InMemoryBulkJobStore] = None
+
+
+def get_bulk_job_store(db):
+    """Firestore-backed store when available, else one process-wide in-memory store."""
+    global _memory_store
+    if db is not None:
+        return FirestoreBulkJobStore(db)
+    if _memory_store is None:
+        _memory_store = InMemoryBulkJobStore()
+    return _memory_store
@@ -0,0 +1,215 @@
+# backend/app/core/circuit_breaker.py
+"""
+AUM Context Foundry — Provider Circuit Breakers
+
+One breaker per (provider, model id), shared by every request in the process.
+When a model is degraded, the gateway's retries would otherwise spend three
+backed-off attempts per simulation, per tenant, before giving up. A breaker
+that has seen enough throttle/transient failures opens and callers fail fast
+(CircuitOpenError) or fall back to another provider.
+
+    closed     requests flow; outcomes are recorded in a rolling window
+    open       requests are rejected until the cooldown elapses
+    half_open  up to CIRCUIT_HALF_OPEN_PROBES probe requests are let through;
+               a probe success closes the breaker, a probe failure re-opens it
+               with a doubled cooldown (capped at CIRCUIT_MAX_OPEN_SECONDS)
+
+Only provider-side failures count (overload 503/529, other 5xx, timeouts — see
+provider_gateway.classify_error). Bad requests and a key's own 429s / quota
+errors say nothing about provider health, and the gateway records one outcome
+per logical call rather than one per retry, so a single tenant cannot open
+the breaker for everyone on the model.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import deque
+from threading import Lock
+from typing import Any, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", "300"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The provider/model breaker is open; the request was not sent."""
+
+    def __init__(self, provider: str, model: str, retry_in: float):
+        super().__init__(f"{provider}/{model} circuit open — retry in {retry_in:.0f}s")
+        self.provider = provider
+        self.model = model
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed/open/half-open state machine for one provider model."""
+
+    def __init__(self, provider: str, model: str,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 window: int = CIRCUIT_WINDOW,
+                 failure_rate: float = CIRCUIT_FAILURE_RATE,
+                 open_seconds: float = CIRCUIT_OPEN_SECONDS,
+                 max_open_seconds: float = CIRCUIT_MAX_OPEN_SECONDS,
+                 half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES,
+                 clock=time.monotonic):
+        self.provider = provider
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._open_seconds = open_seconds
+        self._probes_in_flight = 0
+        self.counters = {"rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self._open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def allows(self) -> bool:
+        """True when a request would be admitted right now (does not take a probe slot)."""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and self._probes_in_flight < self.half_open_probes)
+
+    def before_call(self) -> bool:
+        """Admit a request or raise CircuitOpenError. Returns True when the request is a half-open probe."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self.counters["rejected"] += 1
+            retry_in = max(0.0, self._opened_at + self._open_seconds - self._clock())
+        raise CircuitOpenError(self.provider, self.model, retry_in)
+
+    def record_success(self, probe: bool = False) -> None:
+        with self._lock:
+            if probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if self._state == HALF_OPEN:
+                    logger.info(f"🟢 Circuit {self.provider}/{self.model} closed after successful probe")
+                    self._close()
+                return
+            if self._state != CLOSED:
+                return  # late response from before the breaker opened
+            self._outcomes.append(True)
+            self._consecutive_failures = 0
+
+    def record_failure(self, probe: bool = False) -> None:
+        with self._lock:
+            if probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if self._state == HALF_OPEN:
+                    self._trip(min(self.max_open_seconds, self._open_seconds * 2))
+                return
+            if self._state != CLOSED:
+                return
+            self._outcomes.append(False)
+            self._consecutive_failures += 1
+            failures = self._outcomes.count(False)
+            if self._consecutive_failures >= self.failure_threshold or (
+                len(self._outcomes) >= self._outcomes.maxlen
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._trip(self.base_open_seconds)
+
+    def release(self, probe: bool = False) -> None:
+        """Attempt ended without a health signal (bad request, cancellation)."""
+        if probe:
+            with self._lock:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _trip(self, open_seconds: float) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._open_seconds = open_seconds
+        self._probes_in_flight = 0
+        self.counters["opened"] += 1
+        logger.warning(f"🔴 Circuit {self.provider}/{self.model} opened for {open_seconds:.0f}s")
+
+    def _close(self) -> None:
+        self._state = CLOSED
+        self._open_seconds = self.base_open_seconds
+        self._outcomes.clear()
+        self._consecutive_failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            outcomes = len(self._outcomes)
+            return {
+                "state": state,
+                "failureRate": round(self._outcomes.count(False) / outcomes, 3) if outcomes else 0.0,
+                "consecutiveFailures": self._consecutive_failures,
+                "retryInSeconds": round(max(0.0, self._opened_at + self._open_seconds - self._clock()), 1)
+                if state == OPEN else 0.0,
+                **self.counters,
+            }
+
+
+class CircuitBreakerRegistry:
+    def __init__(self):
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = Lock()
+
+    def get(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(provider, model)
+            return breaker
+
+    def allows(self, provider: str, model: Optional[str]) -> bool:
+        if not model:
+            return True
+        with self._lock:
+            breaker = self._breakers.get((provider, model))
+        return breaker is None or breaker.allows()
+
+    def open_circuits(self) -> list:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [f"{b.provider}/{b.model}" for b in breakers if b.state != CLOSED]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {f"{b.provider}/{b.model}": b.stats() for b in breakers}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers.clear()
+
+
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,331 @@
+# backend/app/core/crawl_runs.py
+"""
+AUM Context Foundry — Sharded Scheduled Crawl Runs
+
+The weekly crawl used to walk every org inside one HTTP request, so a few
+hundred Growth+ orgs outran the Cloud Run request timeout and a crash lost
+all progress. A crawl is now a persistent run split into org shards that any
+instance can claim, with a checkpoint per crawled org.
+
+Run doc:   crawlRuns/{runId}
+    status     — running | completed
+    shards     — {shardId: {"status": pending|claimed|done, "holder", "leaseExpiresAt", "attempts", "orgs"}}
+    progress   — orgs succeeded/failed/skipped/sampled, prompts run/skipped, shard counts,
+                 orgsPerMinute, recent failures
+Shard doc: crawlRuns/{runId}/shards/{shardId}
+    orgIds     — the orgs of this shard
+    completed  — {orgId: {"status": success|error|skipped, "at": epoch_seconds, "error"?,
+                           "mode": full|sampled, "promptsRun", "promptsSkipped"}}
+
+Global cap: at most CRAWL_MAX_ACTIVE_SHARDS shards are claimed at once across
+all instances (each crawls SCHEDULED_CRAWL_CONCURRENCY orgs at a time). A claim
+expires after CRAWL_SHARD_LEASE_SECONDS unless renewed; an expired claim is
+reclaimed by the next claimer, which skips the orgs already checkpointed.
+The run doc is only written on claim/renew/release; per-org checkpoints go to
+the shard doc, so instances never contend on a single document per org.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.metrics import firestore_operation
+from core.request_accounting import count_firestore
+
+logger = logging.getLogger(__name__)
+
+CRAWL_SHARD_SIZE = int(os.getenv("CRAWL_SHARD_SIZE", "25"))
+CRAWL_MAX_ACTIVE_SHARDS = int(os.getenv("CRAWL_MAX_ACTIVE_SHARDS", "4"))
+CRAWL_SHARD_LEASE_SECONDS = float(os.getenv("CRAWL_SHARD_LEASE_SECONDS", "900"))
+# Failures listed on the progress doc (counts are always exact)
+CRAWL_MAX_REPORTED_FAILURES = 50
+
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def plan_shards(org_ids: List[str], shard_size: int = CRAWL_SHARD_SIZE) -> Dict[str, List[str]]:
+    """Split org ids (deduped, in order) into fixed-size shards keyed `shard-0000`, `shard-0001`, ..."""
+    unique = list(dict.fromkeys(org_ids))
+    size = max(1, shard_size)
+    return {f"shard-{n:04d}": unique[i:i + size] for n, i in enumerate(range(0, len(unique), size))}
+
+
+def new_run_state(shards: Dict[str, List[str]], now: float) -> Dict[str, Any]:
+    state = {
+        "status": "running",
+        "createdAt": now,
+        "startedAt": None,
+        "completedAt": None,
+        "totalOrgs": sum(len(orgs) for orgs in shards.values()),
+        "shards": {sid: {"status": "pending", "holder": None, "leaseExpiresAt": 0, "attempts": 0, "orgs": len(orgs)}
+                   for sid, orgs in shards.items()},
+        "progress": {"orgsSucceeded": 0, "orgsFailed": 0, "orgsSkipped": 0, "orgsDone": 0,
+                     "orgsSampled": 0, "promptsRun": 0, "promptsSkipped": 0, "promptsSkippedPct": 0.0,
+                     "orgsPerMinute": 0.0, "failures": []},
+    }
+    _summarize(state, now)
+    return state
+
+
+def _summarize(state: Dict[str, Any], now: float) -> None:
+    progress = state.setdefault("progress", {})
+    statuses = [shard.get("status") for shard in state.get("shards", {}).values()]
+    progress["shardsTotal"] = len(statuses)
+    progress["shardsDone"] = statuses.count("done")
+    progress["shardsActive"] = statuses.count("claimed")
+    started = state.get("startedAt")
+    if started and progress.get("orgsDone"):
+        minutes = max((state.get("completedAt") or now) - started, 1.0) / 60.0
+        progress["orgsPerMinute"] = round(progress["orgsDone"] / minutes, 2)
+    if statuses and progress["shardsDone"] == len(statuses) and state.get("status") != "completed":
+        state["status"] = "completed"
+        state["completedAt"] = now
+    state["updatedAt"] = now
+
+
+def plan_claim(state: Dict[str, Any], now: float, holder: str, ttl: float,
+               max_active: int) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Pure claim planner. Expired claims go back to pending, then the first pending shard
+    is claimed if fewer than `max_active` shards are claimed run-wide. Returns (new_state, shard_id).
+    """
+    state = copy.deepcopy(state)
+    shards = state.get("shards", {})
+    for shard in shards.values():
+        if shard.get("status") == "claimed" and shard.get("leaseExpiresAt", 0) <= now:
+            shard["status"] = "pending"
+
+    active = sum(1 for shard in shards.values() if shard.get("status") == "claimed")
+    claimed = None
+    if state.get("status") != "completed" and active < max_active:
+        claimed = next((sid for sid in sorted(shards) if shards[sid].get("status") == "pending"), None)
+    if claimed is not None:
+        shard = shards[claimed]
+        shard.update({"status": "claimed", "holder": holder, "leaseExpiresAt": now + ttl,
+                      "attempts": int(shard.get("attempts", 0)) + 1})
+        state["startedAt"] = state.get("startedAt") or now
+    _summarize(state, now)
+    return state, claimed
+
+
+def plan_renew(state: Dict[str, Any], shard_id: str, holder: str, now: float,
+               ttl: float) -> Tuple[Dict[str, Any], bool]:
+    """Extend a claim; False means the claim was lost (expired and taken over) and the holder must stop."""
+    state = copy.deepcopy(state)
+    shard = state.get("shards", {}).get(shard_id)
+    if not shard or shard.get("status") != "claimed" or shard.get("holder") != holder:
+        return state, False
+    shard["leaseExpiresAt"] = now + ttl
+    state["updatedAt"] = now
+    return state, True
+
+
+def plan_release(state: Dict[str, Any], shard_id: str, holder: str, outcomes: Dict[str, Dict[str, Any]],
+                 now: float) -> Dict[str, Any]:
+    """
+    Pure release: mark the shard done and fold its per-org outcomes (including those
+    checkpointed by earlier holders) into the run progress. A holder that lost its
+    claim releases nothing, so every shard is counted exactly once.
+    """
+    state = copy.deepcopy(state)
+    shard = state.get("shards", {}).get(shard_id)
+    if not shard or shard.get("status") != "claimed" or shard.get("holder") != holder:
+        return state
+    shard.update({"status": "done", "leaseExpiresAt": 0})
+
+    progress = state.setdefault("progress", {})
+    failures = progress.setdefault("failures", [])
+    for org_id, outcome in outcomes.items():
+        status = outcome.get("status")
+        if status == "success":
+            progress["orgsSucceeded"] = progress.get("orgsSucceeded", 0) + 1
+        elif status == "skipped":
+            progress["orgsSkipped"] = progress.get("orgsSkipped", 0) + 1
+        else:
+            progress["orgsFailed"] = progress.get("orgsFailed", 0) + 1
+            failures.append({"orgId": org_id, "shardId": shard_id, "error": outcome.get("error", "")})
+        if outcome.get("mode") == "sampled":
+            progress["orgsSampled"] = progress.get("orgsSampled", 0) + 1
+        progress["promptsRun"] = progress.get("promptsRun", 0) + int(outcome.get("promptsRun", 0))
+        progress["promptsSkipped"] = progress.get("promptsSkipped", 0) + int(outcome.get("promptsSkipped", 0))
+    progress["failures"] = failures[-CRAWL_MAX_REPORTED_FAILURES:]
+    prompts = progress.get("promptsRun", 0) + progress.get("promptsSkipped", 0)
+    progress["promptsSkippedPct"] = round(100.0 * progress.get("promptsSkipped", 0) / prompts, 1) if prompts else 0.0
+    progress["orgsDone"] = progress.get("orgsSucceeded", 0) + progress.get("orgsFailed", 0) \
+        + progress.get("orgsSkipped", 0)
+    _summarize(state, now)
+    return state
+
+
+def crawl_fingerprint(manifest_version: str, model_ids: List[str], prompts: List[str], scoring_version: str) -> str:
+    """Change-detection key of an org's weekly crawl: equal fingerprints mean a recompute would ask the same question."""
+    payload = json.dumps({"manifest": manifest_version, "models": sorted(model_ids), "prompts": list(prompts),
+                          "scoring": scoring_version}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class ShardClaim:
+    """A shard this instance holds, with the orgs a previous holder already checkpointed."""
+    run_id: str
+    shard_id: str
+    org_ids: List[str]
+    completed: Dict[str, Dict[str, Any]]
+
+    @property
+    def pending(self) -> List[str]:
+        return [org_id for org_id in self.org_ids if org_id not in self.completed]
+
+
+class InMemoryCrawlRunStore:
+    """Process-local store (dev without Firestore, tests). Same semantics as the Firestore store."""
+
+    def __init__(self):
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._shards: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create_run(self, run_id: str, shards: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Create the run unless it already exists; returns the (possibly existing) run state."""
+        with self._lock:
+            if run_id not in self._runs:
+                self._runs[run_id] = new_run_state(shards, time.time())
+                for sid, orgs in shards.items():
+                    self._shards[(run_id, sid)] = {"orgIds": list(orgs), "completed": {}}
+            return copy.deepcopy(self._runs[run_id])
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return copy.deepcopy(self._runs.get(run_id))
+
+    def claim(self, run_id: str, holder: str, ttl: float, max_active: int) -> Optional[ShardClaim]:
+        with self._lock:
+            if run_id not in self._runs:
+                return None
+            self._runs[run_id], shard_id = plan_claim(self._runs[run_id], time.time(), holder, ttl, max_active)
+            if shard_id is None:
+                return None
+            shard = self._shards[(run_id, shard_id)]
+            return ShardClaim(run_id, shard_id, list(shard["orgIds"]), copy.deepcopy(shard["completed"]))
+
+    def renew(self, run_id: str, shard_id: str, holder: str, ttl: float) -> bool:
+        with self._lock:
+            self._runs[run_id], held = plan_renew(self._runs[run_id], shard_id, holder, time.time(), ttl)
+            return held
+
+    def checkpoint(self, run_id: str, shard_id: str, org_id: str, outcome: Dict[str, Any]) -> None:
+        with self._lock:
+            self._shards[(run_id, shard_id)]["completed"][org_id] = dict(outcome)
+
+    def release(self, run_id: str, shard_id: str, holder: str, outcomes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            self._runs[run_id] = plan_release(self._runs[run_id], shard_id, holder, outcomes, time.time())
+            return copy.deepcopy(self._runs[run_id])
+
+
+class FirestoreCrawlRunStore:
+    """Claims/renewals/releases are single-document transactions on the run doc; checkpoints merge into the shard doc."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _run_ref(self, run_id: str):
+        return self.db.collection("crawlRuns").document(run_id)
+
+    def _shard_ref(self, run_id: str, shard_id: str):
+        return self._run_ref(run_id).collection("shards").document(shard_id)
+
+    def _update_run(self, run_id: str, operation: str, plan):
+        """Read-plan-write the run doc in one transaction; `plan(state) -> (new_state, result)`."""
+        from google.cloud import firestore
+
+        ref = self._run_ref(run_id)
+
+        @firestore.transactional
+        def _txn(txn):
+            snap = ref.get(transaction=txn)
+            if not snap.exists:
+                return None, None
+            state, result = plan(snap.to_dict())
+            txn.set(ref, state)
+            count_firestore(reads=1, writes=1)
+            return state, result
+
+        with firestore_operation(operation):
+            return _txn(self.db.transaction())
+
+    def create_run(self, run_id: str, shards: Dict[str, List[str]]) -> Dict[str, Any]:
+        from google.cloud import firestore
+
+        ref = self._run_ref(run_id)
+
+        @firestore.transactional
+        def _txn(txn):
+            snap = ref.get(transaction=txn)
+            count_firestore(reads=1)
+            if snap.exists:
+                return snap.to_dict()
+            # One transaction so racing instances agree on a single shard layout (<= 500 writes)
+            state = new_run_state(shards, time.time())
+            txn.set(ref, state)
+            for sid, orgs in shards.items():
+                txn.set(self._shard_ref(run_id, sid), {"orgIds": list(orgs), "completed": {}})
+            count_firestore(writes=1 + len(shards))
+            return state
+
+        with firestore_operation("crawl_run_create"):
+            return _txn(self.db.transaction())
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with firestore_operation("crawl_run_get"):
+            snap = self._run_ref(run_id).get()
+        count_firestore(reads=1)
+        return snap.to_dict() if snap.exists else None
+
+    def claim(self, run_id: str, holder: str, ttl: float, max_active: int) -> Optional[ShardClaim]:
+        _, shard_id = self._update_run(run_id, "crawl_run_claim",
+                                       lambda state: plan_claim(state, time.time(), holder, ttl, max_active))
+        if shard_id is None:
+            return None
+        with firestore_operation("crawl_shard_get"):
+            shard = self._shard_ref(run_id, shard_id).get().to_dict() or {}
+        count_firestore(reads=1)
+        return ShardClaim(run_id, shard_id, list(shard.get("orgIds", [])), dict(shard.get("completed") or {}))
+
+    def renew(self, run_id: str, shard_id: str, holder: str, ttl: float) -> bool:
+        _, held = self._update_run(run_id, "crawl_run_renew",
+                                   lambda state: plan_renew(state, shard_id, holder, time.time(), ttl))
+        return bool(held)
+
+    def checkpoint(self, run_id: str, shard_id: str, org_id: str, outcome: Dict[str, Any]) -> None:
+        with firestore_operation("crawl_shard_checkpoint"):
+            self._shard_ref(run_id, shard_id).set({"completed": {org_id: outcome}}, merge=True)
+        count_firestore(writes=1)
+
+    def release(self, run_id: str, shard_id: str, holder: str, outcomes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        state, _ = self._update_run(
+            run_id, "crawl_run_release",
+            lambda current: (plan_release(current, shard_id, holder, outcomes, time.time()), None))
+        return state
+
+
+_memory_store: Optional[InMemoryCrawlRunStore] = None
+
+
+def get_crawl_run_store(db):
+    """Firestore-backed store when available, else one process-wide in-memory store."""
+    global _memory_store
+    if db is not None:
+        return FirestoreCrawlRunStore(db)
+    if _memory_store is None:
+        _memory_store = InMemoryCrawlRunStore()
+    return _memory_store
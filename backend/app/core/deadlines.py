@@ -0,0 +1,66 @@
+# backend/app/core/deadlines.py
+"""
+AUM Context Foundry — Request Deadlines
+
+A request-scoped deadline carried in a contextvar, so it propagates to every
+stage and task spawned under it (asyncio copies the context into new tasks).
+Provider calls clamp their per-attempt timeout to the time left; nested
+scopes can only shorten the budget, never extend it.
+
+    with deadline_scope(45):
+        ...                      # remaining() counts down from 45s
+        with deadline_scope(30): # inference gets min(30, what is left)
+            ...
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request-scoped deadline passed before the work finished."""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left on the current deadline, or None when the request has none."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def clamp_timeout(timeout: Optional[float]) -> Optional[float]:
+    """The smaller of `timeout` and the time left (None = unbounded)."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if timeout is None:
+        return max(0.0, left)
+    return max(0.0, min(timeout, left))
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Run the block with at most `seconds` left (no-op for None)."""
+    if seconds is None:
+        yield
+        return
+    candidate = time.monotonic() + max(0.0, seconds)
+    current = _deadline.get()
+    token = _deadline.set(candidate if current is None else min(current, candidate))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
@@ -0,0 +1,228 @@
+# backend/app/core/embedding_cache.py
+"""
+AUM Context Foundry — Content-Addressed Embedding Cache
+
+Every embedding call site (simulation prompts, retrieved context blocks,
+model answers, chatbot queries, ingestion chunks and schemas) goes through
+`embed_texts`. Vectors are keyed by (model, sha256(text)), so the same text
+is only ever sent to the embeddings API once per process — and once overall
+when an L2 tier is configured.
+
+L1: in-process LRU of float32 arrays bounded by EMBEDDING_CACHE_MAX_BYTES.
+L2 (optional, EMBEDDING_CACHE_L2):
+    "firestore" — top-level `embeddingCache/{model}:{sha256}` docs (float32 bytes)
+    "disk"      — .npy files under EMBEDDING_CACHE_DIR
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.model_config import OPENAI_EMBEDDING_MODEL
+from core.provider_gateway import provider_call
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EMBEDDING_CACHE_L2 = os.getenv("EMBEDDING_CACHE_L2", "").strip().lower()
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "/tmp/aum-embedding-cache")
+# OpenAI accepts up to 2048 inputs per request; keep requests comfortably small
+EMBEDDING_MAX_BATCH = 256
+
+CacheKey = Tuple[str, str]
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingLRU:
+    """Thread-safe LRU of float32 vectors bounded by total array bytes."""
+
+    def __init__(self, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vec
+
+    def set(self, key: CacheKey, vec: np.ndarray) -> None:
+        vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+        vec.setflags(write=False)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = vec
+            self._bytes += vec.nbytes
+            while self._entries and self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": "embeddings",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "l2": EMBEDDING_CACHE_L2 or None,
+            }
+
+
+class DiskEmbeddingStore:
+    def __init__(self, root: str = EMBEDDING_CACHE_DIR):
+        self.root = root
+
+    def _path(self, key: CacheKey) -> str:
+        model, digest = key
+        return os.path.join(self.root, model, digest[:2], f"{digest}.npy")
+
+    def get_many(self, keys: Sequence[CacheKey]) -> Dict[CacheKey, np.ndarray]:
+        found = {}
+        for key in keys:
+            path = self._path(key)
+            if os.path.exists(path):
+                try:
+                    found[key] = np.load(path)
+                except (OSError, ValueError) as e:
+                    logger.debug(f"Embedding cache file unreadable {path}: {e}")
+        return found
+
+    def set_many(self, items: Dict[CacheKey, np.ndarray]) -> None:
+        for key, vec in items.items():
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                np.save(fh, np.asarray(vec, dtype=np.float32))
+            os.replace(tmp, path)
+
+
+class FirestoreEmbeddingStore:
+    COLLECTION = "embeddingCache"
+
+    def __init__(self, db):
+        self.db = db
+
+    def _ref(self, key: CacheKey):
+        return self.db.collection(self.COLLECTION).document(f"{key[0]}:{key[1]}")
+
+    def get_many(self, keys: Sequence[CacheKey]) -> Dict[CacheKey, np.ndarray]:
+        refs = {self._ref(key).path: key for key in keys}
+        found = {}
+        for snap in self.db.get_all([self._ref(key) for key in keys]):
+            if not snap.exists:
+                continue
+            data = snap.to_dict() or {}
+            raw = data.get("vector")
+            if raw:
+                found[refs[snap.reference.path]] = np.frombuffer(raw, dtype=np.float32)
+        return found
+
+    def set_many(self, items: Dict[CacheKey, np.ndarray]) -> None:
+        # Firestore caps a batched write at 500 operations
+        entries = list(items.items())
+        for start in range(0, len(entries), 400):
+            batch = self.db.batch()
+            for key, vec in entries[start:start + 400]:
+                vec = np.asarray(vec, dtype=np.float32)
+                batch.set(self._ref(key), {"model": key[0], "dim": int(vec.shape[0]), "vector": vec.tobytes()})
+            batch.commit()
+
+
+def _build_l2():
+    if EMBEDDING_CACHE_L2 == "disk":
+        return DiskEmbeddingStore()
+    if EMBEDDING_CACHE_L2 == "firestore":
+        from core.firebase_config import db
+        return FirestoreEmbeddingStore(db) if db else None
+    return None
+
+
+embedding_cache = EmbeddingLRU()
+_l2_store = _build_l2()
+
+
+async def embed_texts(client, texts: Sequence[str], model: str = OPENAI_EMBEDDING_MODEL) -> List[List[float]]:
+    """
+    Embeddings for `texts`, in order. Cached vectors are reused; the remaining unique
+    texts are sent in as few `embeddings.create` requests as possible. Raises on API
+    errors or a short response, exactly like a direct call.
+    """
+    keys = [(model, text_digest(text)) for text in texts]
+    vectors: Dict[CacheKey, np.ndarray] = {}
+    missing: Dict[CacheKey, str] = {}
+    for key, text in zip(keys, texts):
+        if key in vectors or key in missing:
+            continue
+        cached = embedding_cache.get(key)
+        if cached is not None:
+            vectors[key] = cached
+        else:
+            missing[key] = text
+
+    if missing and _l2_store is not None:
+        try:
+            found = await asyncio.to_thread(_l2_store.get_many, list(missing))
+        except Exception as e:
+            logger.warning(f"Embedding L2 lookup failed: {e}")
+            found = {}
+        for key, vec in found.items():
+            embedding_cache.set(key, vec)
+            vectors[key] = vec
+            missing.pop(key, None)
+
+    if missing:
+        fresh: Dict[CacheKey, np.ndarray] = {}
+        pending = list(missing.items())
+        for start in range(0, len(pending), EMBEDDING_MAX_BATCH):
+            chunk = pending[start:start + EMBEDDING_MAX_BATCH]
+            resp = await provider_call("openai", getattr(client, "api_key", None),
+                                       lambda: client.embeddings.create(input=[text for _, text in chunk], model=model))
+            if len(resp.data) != len(chunk):
+                raise ValueError(f"expected {len(chunk)} embeddings, got {len(resp.data)}")
+            for (key, _), item in zip(chunk, resp.data):
+                vec = np.asarray(item.embedding, dtype=np.float32)
+                embedding_cache.set(key, vec)
+                fresh[key] = vec
+        vectors.update(fresh)
+        if _l2_store is not None:
+            try:
+                await asyncio.to_thread(_l2_store.set_many, fresh)
+            except Exception as e:
+                logger.warning(f"Embedding L2 write failed: {e}")
+
+    return [vectors[key].tolist() for key in keys]
+
+
+async def embed_text(client, text: str, model: str = OPENAI_EMBEDDING_MODEL) -> List[float]:
+    return (await embed_texts(client, [text], model=model))[0]
@@ -0,0 +1,195 @@
+# backend/app/core/manifest_index.py
+"""
+AUM Context Foundry — In-Memory Manifest Vector Index
+
+Retrieval used to run a Firestore `find_nearest` query per request, falling
+back to scoring the first 50 chunk docs in a Python loop (silently losing
+recall on larger manifests). A `ManifestIndex` instead holds every chunk
+embedding of one manifest version in a single contiguous, L2-normalized
+matrix; top-k is one matmul plus `argpartition`.
+
+Indexes are loaded lazily on first use (one chunk collection read per
+manifest version per process) and kept in an LRU bounded by a process-wide
+byte budget (MANIFEST_INDEX_MAX_BYTES). Whole manifests are evicted, never
+partial ones. MANIFEST_INDEX_DTYPE=float16 halves memory at a small recall cost.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.metrics import firestore_operation
+from core.request_accounting import count_firestore
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_INDEX_MAX_BYTES = int(os.getenv("MANIFEST_INDEX_MAX_BYTES", str(256 * 1024 * 1024)))
+MANIFEST_INDEX_DTYPE = np.float16 if os.getenv("MANIFEST_INDEX_DTYPE", "float32") == "float16" else np.float32
+# Manifests without chunks (not yet written, or expired by TTL) are re-checked after this
+EMPTY_INDEX_TTL_SECONDS = 60.0
+
+IndexKey = Tuple[str, str]
+
+
+class ManifestIndex:
+    """Normalized chunk-embedding matrix + chunk texts for one manifest version."""
+
+    def __init__(self, texts: Sequence[str], embeddings: Any, dtype=MANIFEST_INDEX_DTYPE):
+        self.texts: List[str] = list(texts)
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(self.texts):
+            matrix = np.zeros((len(self.texts), 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        self.matrix = np.ascontiguousarray(matrix, dtype=dtype)
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_chunk_docs(cls, docs, dtype=MANIFEST_INDEX_DTYPE) -> "ManifestIndex":
+        rows = []
+        for doc in docs:
+            data = doc.to_dict() or {}
+            embedding, text = data.get("embedding"), data.get("text")
+            if embedding is None or not text:
+                continue
+            rows.append((data.get("index", len(rows)), text, list(embedding)))
+        if not rows:
+            return cls([], np.zeros((0, 0)), dtype=dtype)
+        dims = {len(row[2]) for row in rows}
+        if len(dims) != 1:
+            # Mixed embedding models in one manifest: keep the majority dimension
+            dim = max(dims, key=lambda d: sum(1 for row in rows if len(row[2]) == d))
+            rows = [row for row in rows if len(row[2]) == dim]
+        rows.sort(key=lambda row: row[0] if isinstance(row[0], (int, float)) else 0)
+        return cls([row[1] for row in rows], [row[2] for row in rows], dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes) + sum(len(text) for text in self.texts)
+
+    def search(self, query: Any, k: int = 5) -> List[Tuple[float, str]]:
+        """Top-k (cosine similarity, chunk text), best first."""
+        if not self.texts or k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(q))
+        if norm == 0.0 or q.shape[0] != self.matrix.shape[1]:
+            return []
+        sims = self.matrix @ (q / norm).astype(self.matrix.dtype, copy=False)
+        k = min(k, len(self.texts))
+        top = np.argpartition(-sims, k - 1)[:k] if k < len(self.texts) else np.arange(len(self.texts))
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return [(float(sims[i]), self.texts[i]) for i in top]
+
+
+class ManifestIndexRegistry:
+    """Process-wide LRU of manifest indexes, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = MANIFEST_INDEX_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._indexes: "OrderedDict[IndexKey, ManifestIndex]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self._load_locks: Dict[IndexKey, asyncio.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+
+    def get(self, org_id: str, version: str) -> Optional[ManifestIndex]:
+        key = (org_id, version)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                return None
+            if not index.texts and time.monotonic() - index.loaded_at > EMPTY_INDEX_TTL_SECONDS:
+                self._drop(key)
+                return None
+            self._indexes.move_to_end(key)
+            self.hits += 1
+            return index
+
+    def put(self, org_id: str, version: str, index: ManifestIndex) -> None:
+        key = (org_id, version)
+        with self._lock:
+            if key in self._indexes:
+                self._drop(key)
+            if index.nbytes > self.max_bytes:
+                logger.warning(f"Manifest index {org_id}/{version} ({index.nbytes} bytes) exceeds the index budget")
+                return
+            self._indexes[key] = index
+            self._bytes += index.nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._indexes)))
+
+    async def get_or_load(self, org_id: str, version: str, chunks_ref) -> ManifestIndex:
+        """Cached index, or a single read of the version's chunk collection (deduplicated across requests)."""
+        index = self.get(org_id, version)
+        if index is not None:
+            return index
+        key = (org_id, version)
+        lock = self._load_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            index = self.get(org_id, version)
+            if index is not None:
+                return index
+            started = time.perf_counter()
+            with firestore_operation("manifest_chunks"):
+                docs = await asyncio.to_thread(chunks_ref.get)
+            count_firestore(reads=max(1, len(docs)))
+            index = await asyncio.to_thread(ManifestIndex.from_chunk_docs, docs)
+            self.loads += 1
+            self.put(org_id, version, index)
+            logger.info(f"🧭 Manifest index loaded for {org_id}/{version}: {len(index)} chunks, "
+                        f"{index.nbytes} bytes in {(time.perf_counter() - started) * 1000:.1f}ms")
+        self._load_locks.pop(key, None)
+        return index
+
+    def invalidate_org(self, org_id: str) -> int:
+        with self._lock:
+            keys = [key for key in self._indexes if key[0] == org_id]
+            for key in keys:
+                self._drop(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.loads = 0
+
+    def _drop(self, key: IndexKey) -> None:
+        index = self._indexes.pop(key)
+        self._bytes -= index.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": "manifest_index",
+                "manifests": len(self._indexes),
+                "chunks": sum(len(index) for index in self._indexes.values()),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "dtype": np.dtype(MANIFEST_INDEX_DTYPE).name,
+                "hits": self.hits,
+                "loads": self.loads,
+            }
+
+
+manifest_index_registry = ManifestIndexRegistry()
+
+
+async def retrieve_top_chunks(org_id: str, version: str, chunks_ref, query_embedding, k: int = 5) -> List[str]:
+    """Top-k chunk texts for a query embedding from the shared in-memory index."""
+    index = await manifest_index_registry.get_or_load(org_id, version, chunks_ref)
+    return [text for _, text in index.search(query_embedding, k)]
@@ -0,0 +1,523 @@
+# backend/app/core/metrics.py
+"""
+AUM Context Foundry — Prometheus Metrics
+
+Dependency-free counters, gauges and histograms rendered in the Prometheus
+text exposition format at `/metrics`.
+
+Hot path: counters and histograms write to a per-thread shard (a plain dict
+owned by the calling thread), so recording never takes a lock — including
+from `asyncio.to_thread` workers. A scrape sums the shards. Gauges are set
+from the event loop only.
+
+Multiple uvicorn workers: when METRICS_MULTIPROC_DIR is set, every worker
+writes a JSON snapshot (`metrics-<pid>.json`) every METRICS_FLUSH_SECONDS and
+on each scrape; `/metrics` on any worker merges all snapshots. Counters and
+histograms are summed across every file ever written (so they never go
+backwards when a worker exits); gauges only count workers whose snapshot is
+fresh, combined by `sum` or `max` per gauge.
+
+Cache hit ratios: `rate(aum_cache_hits_total[5m]) / (rate(aum_cache_hits_total[5m])
++ rate(aum_cache_misses_total[5m]))`, per `cache` label.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR") or os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "10"))
+# Gauges from snapshots older than this are treated as belonging to a dead worker
+METRICS_STALE_SECONDS = 3 * METRICS_FLUSH_SECONDS
+EVENT_LOOP_PROBE_SECONDS = 0.5
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+LabelValues = Tuple[str, ...]
+# A collected family: {"type", "help", "mode"?, "buckets"?, "samples": [[{label: value}, value]]}
+Family = Dict[str, Any]
+
+
+class _ThreadShards:
+    """Per-thread value dicts: writers never contend, readers sum the shards."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[dict] = []
+
+    def mine(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            self._shards.append(shard)  # list.append is atomic under the GIL
+        return shard
+
+    def snapshots(self) -> List[dict]:
+        # dict.copy() of str-tuple keys runs without releasing the GIL
+        return [shard.copy() for shard in list(self._shards)]
+
+    def clear(self) -> None:
+        for shard in list(self._shards):
+            shard.clear()
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._shards = _ThreadShards()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._shards.mine()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return sum(shard.get(labels, 0.0) for shard in self._shards.snapshots())
+
+    def collect(self) -> Family:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._shards.snapshots():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        return {"type": self.type, "help": self.help,
+                "samples": [[self._labels(key), value] for key, value in totals.items()]}
+
+    def clear(self) -> None:
+        self._shards.clear()
+
+
+class Gauge(_Metric):
+    """Point-in-time value; update from the event loop. `mode` merges workers: "sum" or "max"."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (), mode: str = "sum"):
+        super().__init__(name, help_text, labelnames)
+        self.mode = mode
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> Family:
+        return {"type": self.type, "help": self.help, "mode": self.mode,
+                "samples": [[self._labels(key), value] for key, value in dict(self._values).items()]}
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _ThreadShards()
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shards.mine()
+        row = shard.get(labels)
+        if row is None:
+            # per-bucket counts (+Inf last), then sum, then count
+            row = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def collect(self) -> Family:
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in self._shards.snapshots():
+            for key, row in shard.items():
+                row = list(row)
+                current = totals.get(key)
+                totals[key] = row if current is None else [a + b for a, b in zip(current, row)]
+        return {"type": self.type, "help": self.help, "buckets": list(self.buckets),
+                "samples": [[self._labels(key), row] for key, row in totals.items()]}
+
+    def clear(self) -> None:
+        self._shards.clear()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Dict[str, Family]]] = []
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = (), mode: str = "sum") -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames, mode=mode))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets=buckets))
+
+    def add_collector(self, collector: Callable[[], Dict[str, Family]]) -> None:
+        """Scrape-time source of families (values other modules already track, e.g. cache stats)."""
+        self._collectors.append(collector)
+
+    def collect(self) -> Dict[str, Family]:
+        families = {name: metric.collect() for name, metric in self._metrics.items()}
+        for collector in self._collectors:
+            try:
+                families.update(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        return families
+
+    def clear(self) -> None:
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+registry = MetricsRegistry()
+
+
+# ── Multiprocess snapshots ──────────────────────────────────────────────────
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def write_snapshot(families: Optional[Dict[str, Family]] = None, directory: Optional[str] = None) -> None:
+    directory = METRICS_MULTIPROC_DIR if directory is None else directory
+    if not directory:
+        return
+    families = registry.collect() if families is None else families
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory, os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump({"pid": os.getpid(), "writtenAt": time.time(), "families": families}, fh)
+    os.replace(tmp, path)
+
+
+def _read_snapshots(directory: str) -> List[Dict[str, Any]]:
+    snapshots = []
+    for entry in os.listdir(directory):
+        if not (entry.startswith("metrics-") and entry.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, entry)) as fh:
+                snapshots.append(json.load(fh))
+        except (OSError, ValueError) as e:
+            logger.debug(f"Skipping unreadable metrics snapshot {entry}: {e}")
+    return snapshots
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Family]:
+    now = time.time() if now is None else now
+    merged: Dict[str, Family] = {}
+    values: Dict[str, Dict[Tuple, Any]] = {}
+    for snapshot in snapshots:
+        fresh = now - snapshot.get("writtenAt", 0) <= METRICS_STALE_SECONDS
+        for name, family in snapshot.get("families", {}).items():
+            kind = family.get("type")
+            if kind == "gauge" and not fresh:
+                continue
+            target = merged.setdefault(name, {k: v for k, v in family.items() if k != "samples"})
+            bucket = values.setdefault(name, {})
+            for labels, value in family.get("samples", []):
+                key = tuple(labels.items())  # label order is fixed per family
+                current = bucket.get(key)
+                if current is None:
+                    bucket[key] = value
+                elif kind == "histogram":
+                    bucket[key] = [a + b for a, b in zip(current, value)]
+                elif kind == "gauge" and target.get("mode") == "max":
+                    bucket[key] = max(current, value)
+                else:
+                    bucket[key] = current + value
+    for name, family in merged.items():
+        family["samples"] = [[dict(key), value] for key, value in values.get(name, {}).items()]
+    return merged
+
+
+# ── Exposition ──────────────────────────────────────────────────────────────
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(labels: Dict[str, Any], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in labels.items()]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not float(value).is_integer() else str(int(value))
+
+
+def render(families: Dict[str, Family]) -> str:
+    lines: List[str] = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append(f"# HELP {name} {family.get('help', '')}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for labels, value in family.get("samples", []):
+            if family["type"] == "histogram":
+                bounds = family["buckets"]
+                cumulative = 0
+                for bound, count in zip(bounds, value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_label_str(labels, ('le', _num(bound)))} {cumulative}")
+                cumulative += value[len(bounds)]
+                lines.append(f"{name}_bucket{_label_str(labels, ('le', '+Inf'))} {cumulative}")
+                lines.append(f"{name}_sum{_label_str(labels)} {_num(value[-2])}")
+                lines.append(f"{name}_count{_label_str(labels)} {int(value[-1])}")
+            else:
+                lines.append(f"{name}{_label_str(labels)} {_num(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def render_latest(directory: Optional[str] = None) -> str:
+    """Exposition text for this worker, or for all workers when a multiprocess dir is configured."""
+    directory = METRICS_MULTIPROC_DIR if directory is None else directory
+    families = registry.collect()
+    if not directory:
+        return render(families)
+    write_snapshot(families, directory)
+    return render(merge_snapshots(_read_snapshots(directory)))
+
+
+# ── Metric definitions ──────────────────────────────────────────────────────
+
+HTTP_REQUESTS = registry.counter(
+    "aum_http_requests_total", "HTTP requests by router, route template, method and status.",
+    ("router", "route", "method", "status"))
+HTTP_LATENCY = registry.histogram(
+    "aum_http_request_duration_seconds", "HTTP request latency (full response, including streams).",
+    ("router", "route", "method"))
+HTTP_IN_FLIGHT = registry.gauge("aum_http_requests_in_flight", "HTTP requests currently being served.")
+
+LLM_CALLS = registry.counter(
+    "aum_llm_calls_total", "Provider calls by outcome (success, throttle, transient, error, circuit_open).",
+    ("provider", "model", "outcome"))
+LLM_LATENCY = registry.histogram(
+    "aum_llm_call_duration_seconds", "Latency of successful provider calls.", ("provider", "model"))
+LLM_TOKENS = registry.counter(
+    "aum_llm_tokens_total", "Provider tokens by direction (input, output).", ("provider", "model", "direction"))
+
+FIRESTORE_OPS = registry.counter(
+    "aum_firestore_operations_total", "Firestore operations by name and outcome.", ("op", "outcome"))
+FIRESTORE_LATENCY = registry.histogram(
+    "aum_firestore_operation_duration_seconds", "Firestore operation latency.", ("op",))
+FIRESTORE_DOCS = registry.counter(
+    "aum_firestore_documents_total", "Firestore documents read or written by request stages.", ("kind",))
+
+TASK_QUEUE_JOBS = registry.counter(
+    "aum_task_queue_jobs_total", "Persistent background jobs by collection and status transition.",
+    ("collection", "status"))
+TASK_QUEUE_IN_PROGRESS = registry.gauge(
+    "aum_task_queue_jobs_in_progress", "Persistent background jobs running in this process.", ("collection",))
+
+EVENT_LOOP_LAG = registry.histogram(
+    "aum_event_loop_lag_seconds", "Scheduling delay of the event loop, probed every 0.5s.", buckets=LAG_BUCKETS)
+EVENT_LOOP_LAG_LAST = registry.gauge(
+    "aum_event_loop_lag_last_seconds", "Most recent event-loop lag probe.", mode="max")
+EVENT_LOOP_TASKS = registry.gauge("aum_event_loop_tasks", "asyncio tasks alive (request handlers + background work).")
+
+
+@contextmanager
+def firestore_operation(op: str):
+    """Count, time and trace one Firestore round trip."""
+    started = time.perf_counter()
+    with start_span(f"firestore {op}", {"db.system": "firestore", "db.operation": op}, kind="client"):
+        try:
+            yield
+        except Exception:
+            FIRESTORE_OPS.inc(op, "error")
+            raise
+        finally:
+            FIRESTORE_LATENCY.observe(time.perf_counter() - started, op)
+    FIRESTORE_OPS.inc(op, "ok")
+
+
+def record_llm_call(provider: str, model: str, outcome: str, seconds: Optional[float] = None,
+                    input_tokens: int = 0, output_tokens: int = 0) -> None:
+    LLM_CALLS.inc(provider, model, outcome)
+    if seconds is not None:
+        LLM_LATENCY.observe(seconds, provider, model)
+    if input_tokens:
+        LLM_TOKENS.inc(provider, model, "input", amount=input_tokens)
+    if output_tokens:
+        LLM_TOKENS.inc(provider, model, "output", amount=output_tokens)
+
+
+# ── HTTP middleware ─────────────────────────────────────────────────────────
+
+# Full route template -> router name, filled in by main.load_router
+route_routers: Dict[str, str] = {}
+
+
+def register_router(prefix: str, router: Any, name: str) -> None:
+    for route in getattr(router, "routes", []):
+        path = getattr(route, "path", None)
+        if path is not None:
+            route_routers[prefix + path] = name
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead); labels by route template, never raw path."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            if path is None:
+                path, router = "unmatched", "unmatched"
+            else:
+                router = route_routers.get(path, "app")
+            method = scope.get("method", "GET")
+            HTTP_REQUESTS.inc(router, path, method, str(status))
+            HTTP_LATENCY.observe(time.perf_counter() - started, router, path, method)
+
+
+# ── Scrape-time collectors ──────────────────────────────────────────────────
+
+def _collect_caches() -> Dict[str, Family]:
+    from core.result_cache import claim_set_cache, manifest_pointer_cache, simulation_result_cache
+    from core.semantic_cache import semantic_prompt_cache
+    from core.embedding_cache import embedding_cache
+    from core.manifest_index import manifest_index_registry
+    from core.model_config import model_catalog_cache_stats
+
+    counts: Dict[str, Tuple[float, float]] = {}
+    for cache in (simulation_result_cache, manifest_pointer_cache, claim_set_cache):
+        stats = cache.stats()
+        counts[stats["name"]] = (stats["hits"], stats["misses"])
+    semantic = semantic_prompt_cache.stats()
+    counts["semantic"] = (semantic["hits"], semantic["lookups"] - semantic["hits"])
+    embeddings = embedding_cache.stats()
+    counts["embeddings"] = (embeddings["hits"], embeddings["misses"])
+    index = manifest_index_registry.stats()
+    counts["manifest_index"] = (index["hits"], index["loads"])
+    catalog = model_catalog_cache_stats()
+    counts["model_catalog"] = (catalog["hits"], catalog["misses"])
+    try:
+        from api.quick_scan import quick_scan_cache_stats
+        scan = quick_scan_cache_stats()
+        counts["quick_scan"] = (scan["hits"], scan["misses"])
+    except ImportError:
+        pass
+
+    return {
+        "aum_cache_hits_total": {"type": "counter", "help": "In-process cache hits by cache.",
+                                 "samples": [[{"cache": name}, hits] for name, (hits, _) in counts.items()]},
+        "aum_cache_misses_total": {"type": "counter", "help": "In-process cache misses by cache.",
+                                   "samples": [[{"cache": name}, misses] for name, (_, misses) in counts.items()]},
+    }
+
+
+def _collect_circuit_breakers() -> Dict[str, Family]:
+    from core.circuit_breaker import CLOSED, circuit_breakers
+
+    return {
+        "aum_circuit_breaker_open": {
+            "type": "gauge", "mode": "max", "help": "1 while a provider model's circuit breaker is not closed.",
+            "samples": [[{"circuit": name}, 0 if stats["state"] == CLOSED else 1]
+                        for name, stats in circuit_breakers.stats().items()],
+        },
+    }
+
+
+registry.add_collector(_collect_caches)
+registry.add_collector(_collect_circuit_breakers)
+
+
+# ── Background: event-loop probe + snapshot flushing ────────────────────────
+
+async def run_metrics_background(probe_seconds: float = EVENT_LOOP_PROBE_SECONDS,
+                                 flush_seconds: float = METRICS_FLUSH_SECONDS) -> None:
+    """Probe event-loop lag and, in multiprocess mode, flush this worker's snapshot periodically."""
+    loop = asyncio.get_running_loop()
+    last_flush = loop.time()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(probe_seconds)
+        lag = max(0.0, loop.time() - started - probe_seconds)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
+        EVENT_LOOP_TASKS.set(len(asyncio.all_tasks(loop)))
+        if METRICS_MULTIPROC_DIR and loop.time() - last_flush >= flush_seconds:
+            last_flush = loop.time()
+            try:
+                await asyncio.to_thread(write_snapshot)
+            except Exception as e:
+                logger.warning(f"Metrics snapshot flush failed: {e}")
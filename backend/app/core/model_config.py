@@ -11,6 +11,8 @@ from datetime import datetime, timezone, timedelta
 from threading import Lock
 from typing import Any, Dict, List
 
+from core.metrics import firestore_operation
+
 # ── LLM Chat Models ──────────────────────────────────────────────────────────
 OPENAI_SIMULATION_MODEL = "gpt-4o"                 # For simulation inference
 OPENAI_SCHEMA_MODEL = "gpt-4o"              # For JSON-LD extraction
@@ -41,6 +43,7 @@ API_MODEL_MAPPING = {
 
 _MODEL_CACHE_LOCK = Lock()
 _MODEL_CATALOG_CACHE: Dict[str, Any] = {"fetchedAt": None, "payload": None}
+_MODEL_CATALOG_CACHE_STATS = {"hits": 0, "misses": 0}
 
 
 def _default_model_catalog() -> List[Dict[str, Any]]:
@@ -84,7 +87,9 @@ def get_runtime_model_catalog(ttl_seconds: int = 300) -> Dict[str, Any]:
     cached = _MODEL_CATALOG_CACHE.get("payload")
     fetched_at = _MODEL_CATALOG_CACHE.get("fetchedAt")
     if cached and fetched_at and (now - fetched_at) < timedelta(seconds=ttl_seconds):
+        _MODEL_CATALOG_CACHE_STATS["hits"] += 1
         return cached
+    _MODEL_CATALOG_CACHE_STATS["misses"] += 1
 
     from core.firebase_config import db
 
@@ -107,7 +112,8 @@ def get_runtime_model_catalog(ttl_seconds: int = 300) -> Dict[str, Any]:
             return cached
 
         try:
-            doc = db.collection("platform_config").document("model_catalog").get()
+            with firestore_operation("model_catalog_get"):
+                doc = db.collection("platform_config").document("model_catalog").get()
             if doc.exists:
                 data = doc.to_dict() or {}
                 models = data.get("models")
@@ -126,6 +132,10 @@ def get_runtime_model_catalog(ttl_seconds: int = 300) -> Dict[str, Any]:
     return payload
 
 
+def model_catalog_cache_stats() -> Dict[str, int]:
+    return dict(_MODEL_CATALOG_CACHE_STATS)
+
+
 def get_simulation_model_catalog() -> Dict[str, Dict[str, Any]]:
     """
     Returns per-provider simulation model config:
@@ -0,0 +1,217 @@
+# backend/app/core/provider_clients.py
+"""
+AUM Context Foundry — Pooled LLM Provider Clients
+
+Every router used to build a fresh SDK client (and therefore a fresh TLS
+connection pool) per call. This registry keeps one long-lived client per
+(provider, api key hash) with warm keep-alive pools, bounds the number of
+tenant clients with LRU + idle eviction, and closes everything on shutdown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import inspect
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# ── Pool sizing ────────────────────────────────────────────────────────────
+MAX_CLIENTS = int(os.getenv("PROVIDER_CLIENT_MAX_ENTRIES", "64"))
+IDLE_TTL_SECONDS = float(os.getenv("PROVIDER_CLIENT_IDLE_TTL_SECONDS", "900"))
+MAX_CONNECTIONS_PER_CLIENT = int(os.getenv("PROVIDER_CLIENT_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_PER_CLIENT = int(os.getenv("PROVIDER_CLIENT_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+# A retired client is only closed once idle this long (the SDKs' longest request timeout);
+# younger ones may still be mid-request elsewhere and drain until then.
+CLOSE_GRACE_SECONDS = float(os.getenv("PROVIDER_CLIENT_CLOSE_GRACE_SECONDS", "600"))
+
+# Providers whose SDK accepts an injected httpx.AsyncClient.
+_HTTPX_INJECTABLE = {"openai", "anthropic"}
+
+
+def _key_hash(api_key: Optional[str]) -> str:
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def build_http_client(**kwargs) -> httpx.AsyncClient:
+    """Bounded keep-alive httpx pool, HTTP/2 when the h2 extra is installed."""
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS_PER_CLIENT,
+        max_keepalive_connections=MAX_KEEPALIVE_PER_CLIENT,
+        keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+    )
+    return httpx.AsyncClient(limits=limits, http2=HTTP2_AVAILABLE, **kwargs)
+
+
+async def _close_quietly(obj: Any) -> None:
+    for attr in ("aclose", "close"):
+        closer = getattr(obj, attr, None)
+        if not callable(closer):
+            continue
+        try:
+            outcome = closer()
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception as e:
+            logger.debug(f"Provider client close failed: {e}")
+        return
+
+
+@dataclass
+class _Entry:
+    client: Any
+    factory: Any
+    loop: Optional[asyncio.AbstractEventLoop]
+    http_client: Optional[httpx.AsyncClient]
+    last_used: float
+
+
+class ProviderClientRegistry:
+    """
+    LRU registry of SDK clients keyed by (provider, sha256(api_key)[:16]).
+
+    The constructor passed by the caller is part of the entry: a different
+    factory (e.g. an SDK upgrade or a patched class) or a different event loop
+    gets a fresh client instead of a foreign one.
+    """
+
+    def __init__(self, max_entries: int = MAX_CLIENTS, idle_ttl: float = IDLE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._pending_close: list = []
+        # Retired clients that were used too recently to close yet
+        self._draining: list = []
+
+    def get(self, provider: str, api_key: Optional[str], factory: Callable[..., Any]) -> Any:
+        key = (provider, _key_hash(api_key))
+        loop = _current_loop()
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.factory is factory and entry.loop is loop:
+            entry.last_used = now
+            self._entries.move_to_end(key)
+            return entry.client
+        if entry is not None:
+            self._retire(key, now)
+
+        http_client = None
+        if provider in _HTTPX_INJECTABLE:
+            http_client = build_http_client()
+            # Retries/backoff belong to core.provider_gateway so 429s reach its limiter
+            client = factory(api_key=api_key, http_client=http_client, max_retries=0)
+        else:
+            client = factory(api_key=api_key)
+
+        self._entries[key] = _Entry(client, factory, loop, http_client, now)
+        self._evict(now)
+        return client
+
+    def _retire(self, key: Tuple[str, str], now: float) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        # Only close on the loop that owns the sockets; foreign-loop pools are dropped.
+        # A recently used client may be serving an in-flight call, so it drains first.
+        if entry.loop is None or entry.loop is not _current_loop():
+            return
+        if now - entry.last_used > CLOSE_GRACE_SECONDS:
+            self._pending_close.append(entry)
+        else:
+            self._draining.append(entry)
+
+    def _evict(self, now: float) -> None:
+        for key in [k for k, e in self._entries.items() if now - e.last_used > self.idle_ttl]:
+            self._retire(key, now)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._retire(oldest, now)
+        if self._draining:
+            drained = [e for e in self._draining if now - e.last_used > CLOSE_GRACE_SECONDS]
+            self._draining = [e for e in self._draining if now - e.last_used <= CLOSE_GRACE_SECONDS]
+            self._pending_close.extend(drained)
+        if self._pending_close and _current_loop() is not None:
+            retired, self._pending_close = self._pending_close, []
+            asyncio.get_running_loop().create_task(self._close_entries(retired))
+
+    @staticmethod
+    async def _close_entries(entries: list) -> None:
+        for entry in entries:
+            await _close_quietly(entry.client)
+            if entry.http_client is not None:
+                await _close_quietly(entry.http_client)
+
+    async def aclose(self) -> None:
+        entries = list(self._entries.values()) + self._pending_close + self._draining
+        self._entries.clear()
+        self._pending_close = []
+        self._draining = []
+        await self._close_entries(entries)
+        logger.info(f"🔌 Closed {len(entries)} pooled provider clients")
+
+    def stats(self) -> Dict[str, Any]:
+        by_provider: Dict[str, int] = {}
+        for provider, _ in self._entries:
+            by_provider[provider] = by_provider.get(provider, 0) + 1
+        return {"clients": len(self._entries), "byProvider": by_provider, "http2": HTTP2_AVAILABLE}
+
+
+registry = ProviderClientRegistry()
+
+# Raw HTTP pool for callers that talk to provider REST endpoints directly (quick scan).
+_shared_http: Dict[str, Tuple[httpx.AsyncClient, Optional[asyncio.AbstractEventLoop]]] = {}
+
+
+def get_openai_client(api_key: Optional[str], factory: Callable[..., Any]) -> Any:
+    return registry.get("openai", api_key, factory)
+
+
+def get_anthropic_client(api_key: Optional[str], factory: Callable[..., Any]) -> Any:
+    return registry.get("anthropic", api_key, factory)
+
+
+def get_gemini_client(api_key: Optional[str], factory: Callable[..., Any]) -> Any:
+    return registry.get("gemini", api_key, factory)
+
+
+def get_shared_http_client(name: str, **kwargs) -> httpx.AsyncClient:
+    """Process-wide httpx pool for direct REST calls; rebuilt if the loop changes."""
+    loop = _current_loop()
+    existing = _shared_http.get(name)
+    if existing and existing[1] is loop and not existing[0].is_closed:
+        return existing[0]
+    client = build_http_client(**kwargs)
+    _shared_http[name] = (client, loop)
+    return client
+
+
+async def close_all_clients() -> None:
+    """Called from the FastAPI lifespan on shutdown."""
+    await registry.aclose()
+    shared = list(_shared_http.values())
+    _shared_http.clear()
+    for client, _ in shared:
+        await _close_quietly(client)
@@ -0,0 +1,524 @@
+# backend/app/core/provider_gateway.py
+"""
+AUM Context Foundry — Adaptive Provider Gateway
+
+Every LLM / embedding request goes through `provider_call`, which:
+
+  * bounds in-flight requests per (provider, api key hash) with a limit that
+    adapts AIMD-style — +1 per window of successes, halved on 429/overload,
+    trimmed on 5xx/timeouts — between PROVIDER_CONCURRENCY_MIN and the
+    provider's max (PROVIDER_CONCURRENCY_MAX_<PROVIDER>);
+  * honours `retry-after` / `retry-after-ms` by pausing that limiter;
+  * retries throttled and transient failures with jittered backoff
+    (replaces the fixed tenacity `stop_after_attempt(3)` on the runners);
+  * bounds each attempt by the provider's latency SLO and the request deadline
+    (core.deadlines), optionally hedging slow attempts past the observed p95;
+  * admits waiters by priority: interactive `/run` traffic first, then batch,
+    then background (cron). Non-interactive work can never take the slots
+    reserved for interactive traffic (PROVIDER_INTERACTIVE_RESERVE);
+  * when the caller names the model, consults that model's circuit breaker
+    (core.circuit_breaker) and feeds it one outcome per call (not per retry);
+    a key's own 429s are not counted, so one tenant cannot open it for all;
+  * reports call latency and token usage to the request's accounting
+    (core.request_accounting) and to the process metrics (core.metrics).
+
+Priority is carried in a contextvar, so `with provider_priority(Priority.BATCH):`
+around a batch applies to every call it fans out to.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from core.circuit_breaker import OPEN, CircuitBreakerRegistry, CircuitOpenError, circuit_breakers
+from core.deadlines import DeadlineExceeded, clamp_timeout, expired, remaining
+from core.provider_clients import _key_hash
+from core.metrics import record_llm_call
+from core.request_accounting import extract_token_usage, record_provider_usage
+from core.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority:
+    INTERACTIVE = 0
+    BATCH = 1
+    BACKGROUND = 2
+
+    NAMES = {0: "interactive", 1: "batch", 2: "background"}
+
+
+PROVIDER_CONCURRENCY_INITIAL = float(os.getenv("PROVIDER_CONCURRENCY_INITIAL", "8"))
+PROVIDER_CONCURRENCY_MIN = float(os.getenv("PROVIDER_CONCURRENCY_MIN", "1"))
+_DEFAULT_MAX = {"openai": 48, "gemini": 32, "anthropic": 24}
+# Retries after the first attempt: 3 attempts in total, as the tenacity runners made
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "2"))
+PROVIDER_RETRY_BASE_SECONDS = float(os.getenv("PROVIDER_RETRY_BASE_SECONDS", "1.0"))
+PROVIDER_RETRY_MAX_SECONDS = float(os.getenv("PROVIDER_RETRY_MAX_SECONDS", "20"))
+PROVIDER_RETRY_AFTER_CAP_SECONDS = 60.0
+# Share of each limiter's slots that only interactive requests may use
+PROVIDER_INTERACTIVE_RESERVE = float(os.getenv("PROVIDER_INTERACTIVE_RESERVE", "0.25"))
+# A burst of simultaneous 429s counts as one congestion signal
+DECREASE_COOLDOWN_SECONDS = 1.0
+# One limiter per (provider, key): tenant BYOK keys are bounded by LRU + idle eviction, like provider_clients
+PROVIDER_LIMITER_MAX_ENTRIES = int(os.getenv("PROVIDER_LIMITER_MAX_ENTRIES", "256"))
+PROVIDER_LIMITER_IDLE_TTL_SECONDS = float(os.getenv("PROVIDER_LIMITER_IDLE_TTL_SECONDS", "900"))
+# `stats()` lists only the most recently used limiters
+PROVIDER_LIMITER_STATS_MAX = 20
+
+# Per-attempt latency SLOs (PROVIDER_SLO_SECONDS_<PROVIDER>); also clamped to the request deadline
+_DEFAULT_SLO_SECONDS = {"openai": 25.0, "gemini": 25.0, "anthropic": 30.0}
+# Hedging: once an attempt outlives the provider's observed p95, fire one duplicate request
+PROVIDER_HEDGING_ENABLED = os.getenv("PROVIDER_HEDGING", "false").lower() in ("1", "true", "yes")
+PROVIDER_HEDGE_MIN_SAMPLES = 20
+
+
+def provider_slo_seconds(provider: str) -> float:
+    return float(os.getenv(f"PROVIDER_SLO_SECONDS_{provider.upper()}", str(_DEFAULT_SLO_SECONDS.get(provider, 30.0))))
+
+
+def provider_max_concurrency(provider: str) -> float:
+    return float(os.getenv(f"PROVIDER_CONCURRENCY_MAX_{provider.upper()}", str(_DEFAULT_MAX.get(provider, 16))))
+
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("provider_priority", default=Priority.INTERACTIVE)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def provider_priority(level: int):
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# ── Error classification ─────────────────────────────────────────────────────
+
+THROTTLE = "throttle"
+TRANSIENT = "transient"
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for candidate in (getattr(exc, "status_code", None), getattr(exc, "code", None),
+                      getattr(getattr(exc, "response", None), "status_code", None)):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+
+def _retry_after_seconds(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        raw_ms = headers.get("retry-after-ms")
+        if raw_ms:
+            return min(float(raw_ms) / 1000.0, PROVIDER_RETRY_AFTER_CAP_SECONDS)
+        raw = headers.get("retry-after")
+        if not raw:
+            return None
+        try:
+            seconds = float(raw)
+        except ValueError:
+            seconds = parsedate_to_datetime(raw).timestamp() - time.time()
+        return max(0.0, min(seconds, PROVIDER_RETRY_AFTER_CAP_SECONDS))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def classify_error(exc: BaseException) -> Tuple[Optional[str], Optional[float]]:
+    """(THROTTLE | TRANSIENT | None, retry_after_seconds). None = not retryable (4xx, bad input)."""
+    status = _status_code(exc)
+    if status is not None:
+        if status == 429 or status in (503, 529):
+            return THROTTLE, _retry_after_seconds(exc)
+        if status >= 500 or status == 408:
+            return TRANSIENT, _retry_after_seconds(exc)
+        return None, None
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return TRANSIENT, None
+    name = type(exc).__name__
+    if "RateLimit" in name or "ResourceExhausted" in name:
+        return THROTTLE, _retry_after_seconds(exc)
+    if "Timeout" in name or "Connection" in name or "ServiceUnavailable" in name:
+        return TRANSIENT, None
+    return None, None
+
+
+def is_key_scoped(exc: BaseException) -> bool:
+    """429 / RESOURCE_EXHAUSTED: this API key is rate limited or out of quota — not a provider health signal."""
+    status = _status_code(exc)
+    if status is not None:
+        return status == 429
+    name = type(exc).__name__
+    return "RateLimit" in name or "ResourceExhausted" in name
+
+
+# ── Limiter ──────────────────────────────────────────────────────────────────
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a priority-ordered wait queue."""
+
+    def __init__(self, name: str, initial: float, minimum: float, maximum: float):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.counters = {"success": 0, "throttled": 0, "transient": 0, "queued": 0}
+        self.last_used = time.monotonic()
+
+    def evictable(self, now: float) -> bool:
+        """Nothing in flight, queued or paused: dropping it loses only its learned limit."""
+        return self.in_flight == 0 and not any(not fut.done() for _, _, fut in self._waiters) \
+            and self.paused_until <= now
+
+    def capacity(self, priority: int) -> int:
+        total = max(1, int(math.floor(self.limit)))
+        if priority <= Priority.INTERACTIVE or total < 2:
+            return total
+        return max(1, total - max(1, int(total * PROVIDER_INTERACTIVE_RESERVE)))
+
+    async def acquire(self, priority: int) -> None:
+        self.last_used = time.monotonic()
+        if not self._waiters and self.in_flight < self.capacity(priority):
+            self.in_flight += 1
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+            self.counters["queued"] += 1
+            self._wake()
+            try:
+                await fut  # slot is handed over by `_wake` (in_flight already counted)
+            except BaseException:
+                if fut.done() and not fut.cancelled():
+                    self.release()
+                else:
+                    fut.cancel()
+                raise
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                self.release()
+                raise
+
+    def try_acquire(self, priority: int = Priority.INTERACTIVE) -> bool:
+        """Take a slot only if one is free right now (used for hedged requests)."""
+        if self._waiters or self.in_flight >= self.capacity(priority):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            priority, _, fut = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_flight >= self.capacity(priority):
+                return
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            fut.set_result(None)
+
+    def on_success(self) -> None:
+        self.counters["success"] += 1
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_failure(self, kind: str, retry_after: Optional[float]) -> None:
+        now = time.monotonic()
+        self.counters["throttled" if kind == THROTTLE else "transient"] += 1
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        if now - self._last_decrease < DECREASE_COOLDOWN_SECONDS:
+            return
+        self._last_decrease = now
+        factor = 0.5 if kind == THROTTLE else 0.75
+        previous = self.limit
+        self.limit = max(self.minimum, self.limit * factor)
+        logger.warning(f"🚦 {self.name}: {kind} — concurrency {previous:.1f} → {self.limit:.1f}"
+                       + (f", paused {retry_after:.1f}s" if retry_after else ""))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "inFlight": self.in_flight,
+            "waiting": sum(1 for _, _, fut in self._waiters if not fut.done()),
+            "pausedForSeconds": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            **self.counters,
+        }
+
+
+class LatencyTracker:
+    """Rolling window of successful attempt latencies for one provider."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _first_success(tasks: List[asyncio.Task], timeout: Optional[float]):
+    """Result of the first task to succeed; re-raises the last error if all fail."""
+    pending = set(tasks)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    error: Optional[BaseException] = None
+    while pending:
+        wait_for = None if deadline is None else max(0.0, deadline - time.monotonic())
+        done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            raise asyncio.TimeoutError()
+        for task in done:
+            if task.cancelled():
+                continue
+            if task.exception() is None:
+                return task.result()
+            error = task.exception()
+    raise error or asyncio.TimeoutError()
+
+
+class ProviderGateway:
+    def __init__(self, breakers: Optional[CircuitBreakerRegistry] = None):
+        self.breakers = breakers if breakers is not None else CircuitBreakerRegistry()
+        self._limiters: "OrderedDict[Tuple[str, str], AdaptiveLimiter]" = OrderedDict()
+        self._latency: Dict[str, LatencyTracker] = {}
+        self.hedges = {"launched": 0, "won": 0}
+
+    def limiter(self, provider: str, api_key: Optional[str]) -> AdaptiveLimiter:
+        key = (provider, _key_hash(str(api_key) if api_key is not None else None))
+        limiter = self._limiters.get(key)
+        if limiter is not None:
+            self._limiters.move_to_end(key)
+            return limiter
+        limiter = self._limiters[key] = AdaptiveLimiter(
+            f"{provider}:{key[1][:8]}", PROVIDER_CONCURRENCY_INITIAL,
+            PROVIDER_CONCURRENCY_MIN, provider_max_concurrency(provider),
+        )
+        self._evict_limiters(time.monotonic())
+        return limiter
+
+    def _evict_limiters(self, now: float) -> None:
+        """Drop idle limiters past the TTL, then least-recently-used ones past the bound; busy ones stay."""
+        excess = len(self._limiters) - PROVIDER_LIMITER_MAX_ENTRIES
+        for key, limiter in list(self._limiters.items())[:-1]:
+            if not limiter.evictable(now):
+                continue
+            if excess > 0 or now - limiter.last_used > PROVIDER_LIMITER_IDLE_TTL_SECONDS:
+                del self._limiters[key]
+                excess -= 1
+
+    def latency(self, provider: str) -> LatencyTracker:
+        tracker = self._latency.get(provider)
+        if tracker is None:
+            tracker = self._latency[provider] = LatencyTracker()
+        return tracker
+
+    async def _attempt(self, provider: str, limiter: AdaptiveLimiter, fn: Callable[[], Awaitable[T]],
+                       timeout: Optional[float], hedge: bool) -> T:
+        """One attempt bounded by `timeout`; optionally hedged once the provider's p95 passes."""
+        tracker = self.latency(provider)
+        hedge_after = tracker.percentile(0.95) if hedge and len(tracker) >= PROVIDER_HEDGE_MIN_SAMPLES else None
+        if hedge_after is None or (timeout is not None and hedge_after >= timeout):
+            return await asyncio.wait_for(fn(), timeout)
+
+        primary = asyncio.ensure_future(fn())
+        hedge_task = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if done:
+                return primary.result()
+            # Hedges never queue: only fire when a slot is free right now
+            if not limiter.try_acquire():
+                return await asyncio.wait_for(primary, None if timeout is None else timeout - hedge_after)
+            self.hedges["launched"] += 1
+            hedge_task = asyncio.ensure_future(fn())
+            result = await _first_success([primary, hedge_task],
+                                          None if timeout is None else timeout - hedge_after)
+            if hedge_task.done() and not hedge_task.cancelled() and hedge_task.exception() is None \
+                    and (not primary.done() or primary.cancelled() or primary.exception() is not None):
+                self.hedges["won"] += 1
+            return result
+        finally:
+            for task in (primary, hedge_task):
+                if task is not None and not task.done():
+                    task.cancel()
+            if hedge_task is not None:
+                limiter.release()
+
+    async def call(self, provider: str, api_key: Optional[str], fn: Callable[[], Awaitable[T]],
+                   retries: int = PROVIDER_MAX_RETRIES, priority: Optional[int] = None,
+                   hedge: Optional[bool] = None, model: Optional[str] = None) -> T:
+        """
+        Run `fn` under the provider's adaptive limit. Each attempt is bounded by the provider
+        SLO and the request deadline (core.deadlines); retries stop when the deadline is spent, and
+        an attempt cut short by the deadline raises DeadlineExceeded without counting against the provider.
+        With `model`, raises CircuitOpenError instead of calling a model whose breaker is open.
+        Traced as one `llm <provider>` client span covering queueing and every retry.
+        """
+        priority = current_priority() if priority is None else priority
+        with start_span(f"llm {provider}", {"llm.provider": provider, "llm.model": model, "llm.priority": priority},
+                        kind="client") as span:
+            return await self._call(provider, api_key, fn, retries, priority, hedge, model, span)
+
+    async def _call(self, provider: str, api_key: Optional[str], fn: Callable[[], Awaitable[T]],
+                    retries: int, priority: int, hedge: Optional[bool], model: Optional[str], span) -> T:
+        limiter = self.limiter(provider, api_key)
+        breaker = self.breakers.get(provider, model) if model else None
+        hedge = PROVIDER_HEDGING_ENABLED if hedge is None else hedge
+        # Checked before queueing so an open breaker fails fast instead of waiting for a slot
+        try:
+            probe = breaker.before_call() if breaker else False
+        except CircuitOpenError:
+            record_llm_call(provider, model, "circuit_open")
+            raise
+        # Breaker outcome of the whole call: True healthy, False provider-side failure, None no signal
+        health: Optional[bool] = None
+        attempt = 0
+        try:
+            while True:
+                if expired():
+                    raise DeadlineExceeded(f"{provider}: request deadline exceeded")
+                if attempt and breaker and not probe and breaker.state == OPEN:
+                    # Opened by other calls while this one backed off
+                    record_llm_call(provider, model, "circuit_open")
+                    breaker.before_call()
+                try:
+                    await asyncio.wait_for(limiter.acquire(priority), clamp_timeout(None))
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(f"{provider}: request deadline exceeded while queued")
+                slo = provider_slo_seconds(provider)
+                timeout = clamp_timeout(slo)
+                # Cut short by our own deadline: a timeout then says nothing about the provider
+                clipped = timeout is not None and timeout < slo
+                started = time.monotonic()
+                try:
+                    result = await self._attempt(provider, limiter, fn, timeout, hedge)
+                except Exception as exc:
+                    limiter.release()
+                    if clipped and isinstance(exc, asyncio.TimeoutError):
+                        record_llm_call(provider, model or "unknown", "deadline")
+                        raise DeadlineExceeded(f"{provider}: request deadline exceeded") from exc
+                    kind, retry_after = classify_error(exc)
+                    record_llm_call(provider, model or "unknown", kind or "error")
+                    if kind is None:
+                        health = None
+                        raise
+                    limiter.on_failure(kind, retry_after)
+                    health = None if is_key_scoped(exc) else False
+                    attempt += 1
+                    span.add_event("provider_error", {"kind": kind, "attempt": attempt})
+                    if expired():
+                        raise DeadlineExceeded(f"{provider}: request deadline exceeded") from exc
+                    if attempt > retries:
+                        raise
+                    backoff = min(PROVIDER_RETRY_MAX_SECONDS, PROVIDER_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+                    delay = retry_after if retry_after else backoff * random.uniform(0.5, 1.0)
+                    left = remaining()
+                    if left is not None and delay >= left:
+                        raise DeadlineExceeded(f"{provider}: no time left to retry") from exc
+                    await asyncio.sleep(delay)
+                    continue
+                except BaseException:
+                    limiter.release()
+                    raise
+                elapsed = time.monotonic() - started
+                self.latency(provider).record(elapsed)
+                input_tokens, output_tokens = extract_token_usage(result)
+                record_llm_call(provider, model or _response_model(result) or "unknown", "success", elapsed,
+                                input_tokens, output_tokens)
+                span.set_attributes({"llm.attempts": attempt + 1, "llm.response_model": _response_model(result),
+                                     "llm.input_tokens": input_tokens, "llm.output_tokens": output_tokens})
+                record_provider_usage(provider, model, result, elapsed)
+                limiter.release()
+                limiter.on_success()
+                health = True
+                return result
+        finally:
+            if breaker:
+                if health is True:
+                    breaker.record_success(probe)
+                elif health is False:
+                    breaker.record_failure(probe)
+                else:
+                    breaker.release(probe)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limiterCount": len(self._limiters),
+            "limiters": {limiter.name: limiter.stats()
+                         for limiter in list(self._limiters.values())[-PROVIDER_LIMITER_STATS_MAX:]},
+            "latency": {
+                provider: {
+                    "samples": len(tracker),
+                    "p50Ms": _ms(tracker.percentile(0.5)),
+                    "p95Ms": _ms(tracker.percentile(0.95)),
+                    "sloMs": _ms(provider_slo_seconds(provider)),
+                }
+                for provider, tracker in self._latency.items()
+            },
+            "hedges": dict(self.hedges),
+            "circuitBreakers": self.breakers.stats(),
+        }
+
+    def reset(self) -> None:
+        self.breakers.reset()
+        self._limiters.clear()
+        self._latency.clear()
+        self.hedges = {"launched": 0, "won": 0}
+
+
+def _response_model(response: Any) -> Optional[str]:
+    model = getattr(response, "model", None)
+    return model if isinstance(model, str) else None
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+gateway = ProviderGateway(breakers=circuit_breakers)
+
+
+async def provider_call(provider: str, api_key: Optional[str], fn: Callable[[], Awaitable[T]], **kwargs) -> T:
+    """Run one provider request (a zero-arg coroutine factory) through the shared gateway."""
+    return await gateway.call(provider, api_key, fn, **kwargs)
@@ -0,0 +1,300 @@
+# backend/app/core/quota_leases.py
+"""
+AUM Context Foundry — Leased Simulation Quota
+
+Replaces the per-simulation 51-read reservation transaction. Each instance
+leases a small block of quota (QUOTA_LEASE_SIZE sims) from a single summary
+doc per org and billing cycle, then spends it locally with no Firestore I/O.
+
+Summary doc: organizations/{org}/quotaLeases/{cycle}
+    committed  — units settled as used (seeded once from the usageLedger count)
+    leases     — {leaseId: {"units": n, "expiresAt": epoch_seconds, "holder": str}}
+
+Hard limit:  committed + sum(active lease units) + requested <= plan_limit.
+Leases are settled with their exact usage when they run dry, expire locally
+or the process shuts down. Idle leases are settled by a periodic sweep
+(`run_quota_lease_settler`) before the store sees them expire, so another
+instance's grant never has to reclaim them. Only a lease whose holder vanished
+(crash) is reclaimed after expiry and counted as fully used — conservative, so
+the plan limit can never be overshot.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from core.metrics import firestore_operation
+from core.request_accounting import count_firestore
+
+logger = logging.getLogger(__name__)
+
+QUOTA_LEASE_SIZE = int(os.getenv("QUOTA_LEASE_SIZE", "10"))
+QUOTA_LEASE_TTL_SECONDS = float(os.getenv("QUOTA_LEASE_TTL_SECONDS", "300"))
+# Stop spending a lease this long before it expires so settlement always wins the race
+QUOTA_LEASE_SAFETY_SECONDS = 15.0
+# How often idle leases past their spending deadline are settled; must stay below the safety margin
+QUOTA_LEASE_SWEEP_SECONDS = float(os.getenv("QUOTA_LEASE_SWEEP_SECONDS", "5"))
+
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def plan_grant(state: Optional[Dict[str, Any]], now: float, plan_limit: int, want: int,
+               lease_id: str, holder: str, ttl: float, seed_committed: Callable[[], int]) -> Tuple[Dict[str, Any], int]:
+    """
+    Pure lease planner. Reclaims expired leases (counted as fully used), then grants up
+    to `want` units without letting committed + outstanding exceed `plan_limit`.
+    Returns (new_state, granted); granted == 0 means the quota is exhausted.
+    """
+    state = copy.deepcopy(state) if state else {"committed": int(seed_committed()), "leases": {}}
+    leases = state.setdefault("leases", {})
+    for expired_id in [lid for lid, lease in leases.items() if lease.get("expiresAt", 0) <= now]:
+        state["committed"] = int(state.get("committed", 0)) + int(leases.pop(expired_id).get("units", 0))
+
+    outstanding = sum(int(lease.get("units", 0)) for lease in leases.values())
+    available = plan_limit - int(state.get("committed", 0)) - outstanding
+    granted = max(0, min(want, available))
+    if granted:
+        leases[lease_id] = {"units": granted, "expiresAt": now + ttl, "holder": holder}
+    return state, granted
+
+
+def plan_settle(state: Optional[Dict[str, Any]], lease_id: str, used: int) -> Dict[str, Any]:
+    """Pure settlement: drop the lease and commit what was actually spent from it."""
+    state = copy.deepcopy(state) if state else {"committed": 0, "leases": {}}
+    lease = state.setdefault("leases", {}).pop(lease_id, None)
+    if lease is not None:
+        # Already-reclaimed leases were committed in full by the reclaiming grant
+        state["committed"] = int(state.get("committed", 0)) + min(int(used), int(lease.get("units", 0)))
+    return state
+
+
+def used_units(state: Optional[Dict[str, Any]]) -> int:
+    if not state:
+        return 0
+    return int(state.get("committed", 0)) + sum(int(l.get("units", 0)) for l in state.get("leases", {}).values())
+
+
+class InMemoryQuotaLeaseStore:
+    """Process-local store (dev without Firestore, tests). Same semantics as the Firestore store."""
+
+    def __init__(self):
+        self._states: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def grant(self, org_id: str, cycle_key: str, plan_limit: int, want: int, lease_id: str,
+              holder: str, ttl: float, seed_committed: Callable[[], int]) -> Tuple[int, int]:
+        with self._lock:
+            state, granted = plan_grant(self._states.get((org_id, cycle_key)), time.time(), plan_limit,
+                                        want, lease_id, holder, ttl, seed_committed)
+            self._states[(org_id, cycle_key)] = state
+            return granted, used_units(state)
+
+    def settle(self, org_id: str, cycle_key: str, lease_id: str, used: int) -> None:
+        with self._lock:
+            self._states[(org_id, cycle_key)] = plan_settle(self._states.get((org_id, cycle_key)), lease_id, used)
+
+    def state(self, org_id: str, cycle_key: str) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._states.get((org_id, cycle_key)))
+
+
+def _cycle_doc_id(cycle_key: str) -> str:
+    return cycle_key.replace("/", "_")
+
+
+class FirestoreQuotaLeaseStore:
+    """One single-document transaction per lease (1 read + 1 write) instead of 51 reads per simulation."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _ref(self, org_id: str, cycle_key: str):
+        return self.db.collection("organizations").document(org_id) \
+            .collection("quotaLeases").document(_cycle_doc_id(cycle_key))
+
+    def grant(self, org_id: str, cycle_key: str, plan_limit: int, want: int, lease_id: str,
+              holder: str, ttl: float, seed_committed: Callable[[], int]) -> Tuple[int, int]:
+        from google.cloud import firestore
+
+        ref = self._ref(org_id, cycle_key)
+
+        @firestore.transactional
+        def _txn(txn):
+            snap = ref.get(transaction=txn)
+            current = snap.to_dict() if snap.exists else None
+            state, granted = plan_grant(current, time.time(), plan_limit, want, lease_id, holder, ttl, seed_committed)
+            txn.set(ref, {**state, "cycleStart": cycle_key, "updatedAt": time.time()})
+            count_firestore(reads=1, writes=1)
+            return granted, used_units(state)
+
+        with firestore_operation("quota_lease_grant"):
+            return _txn(self.db.transaction())
+
+    def settle(self, org_id: str, cycle_key: str, lease_id: str, used: int) -> None:
+        from google.cloud import firestore
+
+        ref = self._ref(org_id, cycle_key)
+
+        @firestore.transactional
+        def _txn(txn):
+            snap = ref.get(transaction=txn)
+            if not snap.exists:
+                return
+            state = plan_settle(snap.to_dict(), lease_id, used)
+            txn.set(ref, {**state, "cycleStart": cycle_key, "updatedAt": time.time()})
+            count_firestore(reads=1, writes=1)
+
+        with firestore_operation("quota_lease_settle"):
+            _txn(self.db.transaction())
+
+
+@dataclass
+class QuotaToken:
+    """One unit of quota spent from a local lease; refund it if the simulation produced nothing."""
+    org_id: str
+    cycle_key: str
+    lease_id: str
+
+
+@dataclass
+class _LocalLease:
+    lease_id: str
+    units: int
+    used: int
+    expires_at: float  # time.monotonic() deadline for local spending
+
+    @property
+    def remaining(self) -> int:
+        return self.units - self.used
+
+
+class QuotaLeaseManager:
+    """Per-process quota spender. Holds at most one active lease per (org, cycle)."""
+
+    def __init__(self, store, lease_size: int = QUOTA_LEASE_SIZE, ttl_seconds: float = QUOTA_LEASE_TTL_SECONDS,
+                 holder: str = HOLDER_ID):
+        self.store = store
+        self.lease_size = lease_size
+        self.ttl_seconds = ttl_seconds
+        self.holder = holder
+        self._leases: Dict[Tuple[str, str], _LocalLease] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def _lock_for(self, key: Tuple[str, str]) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def acquire(self, org_id: str, cycle_key: str, plan_limit: int,
+                      seed_committed: Callable[[], int]) -> QuotaToken:
+        """Spend one unit; leases a new block only when the local one is empty or expiring."""
+        key = (org_id, cycle_key)
+        async with self._lock_for(key):
+            lease = self._leases.get(key)
+            if lease is not None and (lease.remaining <= 0 or time.monotonic() >= lease.expires_at):
+                await self._retire(key, lease)
+                lease = None
+
+            if lease is None:
+                lease_id = uuid.uuid4().hex[:16]
+                granted, used = await asyncio.to_thread(
+                    self.store.grant, org_id, cycle_key, plan_limit, self.lease_size, lease_id,
+                    self.holder, self.ttl_seconds, seed_committed,
+                )
+                if granted <= 0:
+                    raise HTTPException(status_code=402, detail=f"Quota exceeded: {min(used, plan_limit)}/{plan_limit} sims used.")
+                lease = _LocalLease(lease_id, granted, 0,
+                                    time.monotonic() + max(self.ttl_seconds - QUOTA_LEASE_SAFETY_SECONDS, 1.0))
+                self._leases[key] = lease
+
+            lease.used += 1
+            return QuotaToken(org_id, cycle_key, lease.lease_id)
+
+    async def refund(self, token: QuotaToken) -> None:
+        """
+        Return an unused unit (simulation failed before producing results). Only possible
+        while the lease is still held locally; once settled, the unit stays counted.
+        """
+        key = (token.org_id, token.cycle_key)
+        async with self._lock_for(key):
+            lease = self._leases.get(key)
+            if lease is not None and lease.lease_id == token.lease_id and lease.used > 0:
+                lease.used -= 1
+
+    async def _retire(self, key: Tuple[str, str], lease: _LocalLease) -> None:
+        self._leases.pop(key, None)
+        await self._settle(key, lease)
+
+    async def _settle(self, key: Tuple[str, str], lease: _LocalLease) -> None:
+        try:
+            await asyncio.to_thread(self.store.settle, key[0], key[1], lease.lease_id, lease.used)
+        except Exception as e:
+            # Unsettled leases are reclaimed (counted fully used) after they expire
+            logger.warning(f"Quota lease settle failed for {key[0]}: {e}")
+
+    async def settle_expiring(self) -> int:
+        """Settle leases past their local spending deadline, while the store still holds them."""
+        now = time.monotonic()
+        settled = 0
+        for key, lease in list(self._leases.items()):
+            if now < lease.expires_at:
+                continue
+            async with self._lock_for(key):
+                # An `acquire` may have retired or replaced it while we waited for the lock
+                if self._leases.get(key) is lease:
+                    await self._retire(key, lease)
+                    settled += 1
+        return settled
+
+    async def release_all(self) -> None:
+        """Settle every lease this process holds (shutdown)."""
+        leases = list(self._leases.items())
+        self._leases.clear()
+        for key, lease in leases:
+            await self._settle(key, lease)
+        if leases:
+            logger.info(f"🎟️ Returned {len(leases)} quota leases on shutdown")
+
+
+_manager: Optional[QuotaLeaseManager] = None
+
+
+def get_quota_manager(db) -> QuotaLeaseManager:
+    """Process-wide manager bound to Firestore when available, else an in-memory store."""
+    global _manager
+    wants_firestore = db is not None
+    if _manager is None or isinstance(_manager.store, FirestoreQuotaLeaseStore) != wants_firestore \
+            or (wants_firestore and _manager.store.db is not db):
+        store = FirestoreQuotaLeaseStore(db) if wants_firestore else InMemoryQuotaLeaseStore()
+        _manager = QuotaLeaseManager(store)
+    return _manager
+
+
+async def release_all_leases() -> None:
+    if _manager is not None:
+        await _manager.release_all()
+
+
+async def run_quota_lease_settler():
+    """Perpetual background loop that settles idle leases every QUOTA_LEASE_SWEEP_SECONDS."""
+    while True:
+        try:
+            await asyncio.sleep(QUOTA_LEASE_SWEEP_SECONDS)
+            if _manager is not None:
+                await _manager.settle_expiring()
+        except asyncio.CancelledError:
+            logger.info("🛑 Quota lease settler stopped.")
+            break
+        except Exception as e:
+            logger.error(f"⚠️ Quota lease sweep failed: {e}")
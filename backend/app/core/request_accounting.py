@@ -0,0 +1,330 @@
+# backend/app/core/request_accounting.py
+"""
+AUM Context Foundry — Per-Stage Request Accounting
+
+A `RequestAccounting` carried in a contextvar collects, per named stage of a
+request: wall time, Firestore document reads/writes and provider token usage.
+Stages nest freely; usage is attributed to the innermost open stage, and
+asyncio copies the context into spawned tasks so concurrent stages (one
+`inference:<model>` per model) are kept apart.
+
+    with accounting_scope() as acct:
+        with stage("retrieval"):
+            count_firestore(reads=len(docs))
+        ...
+    acct.summary()   # compact dict for the response `timings` block
+
+The provider gateway reports token usage from SDK responses (OpenAI `usage`,
+Anthropic `usage`, Gemini `usage_metadata`) via `record_provider_usage`.
+Finished requests are folded into process-wide per-org (stage latency) and
+per-model (call latency, tokens) histograms — see `accounting_histograms`.
+Durations of concurrent entries into the same stage add up.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core.metrics import FIRESTORE_DOCS
+from core.tracing import start_span
+
+UNATTRIBUTED = "other"
+
+ACCOUNTING_MAX_ORGS = int(os.getenv("ACCOUNTING_MAX_ORGS", "1000"))
+# Histogram bucket upper bounds in milliseconds (+Inf implied)
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class StageUsage:
+    __slots__ = ("ms", "calls", "firestore_reads", "firestore_writes", "input_tokens", "output_tokens")
+
+    def __init__(self):
+        self.ms = 0.0
+        self.calls = 0
+        self.firestore_reads = 0
+        self.firestore_writes = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"ms": round(self.ms, 1), "calls": self.calls}
+        for key, value in (("firestoreReads", self.firestore_reads), ("firestoreWrites", self.firestore_writes),
+                           ("inputTokens", self.input_tokens), ("outputTokens", self.output_tokens)):
+            if value:
+                out[key] = value
+        return out
+
+
+class ModelUsage:
+    __slots__ = ("calls", "ms", "input_tokens", "output_tokens", "latencies_ms")
+
+    def __init__(self):
+        self.calls = 0
+        self.ms = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latencies_ms: List[float] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "ms": round(self.ms, 1),
+                "inputTokens": self.input_tokens, "outputTokens": self.output_tokens}
+
+
+class RequestAccounting:
+    """Stage and model usage for one request (shared by every task the request spawns)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: "OrderedDict[str, StageUsage]" = OrderedDict()
+        self.models: Dict[str, ModelUsage] = {}
+        self._lock = Lock()  # Firestore counts also arrive from asyncio.to_thread workers
+
+    def _stage(self, name: str) -> StageUsage:
+        usage = self.stages.get(name)
+        if usage is None:
+            usage = self.stages[name] = StageUsage()
+        return usage
+
+    def add_time(self, name: str, ms: float) -> None:
+        with self._lock:
+            usage = self._stage(name)
+            usage.ms += ms
+            usage.calls += 1
+
+    def add_firestore(self, name: str, reads: int, writes: int) -> None:
+        with self._lock:
+            usage = self._stage(name)
+            usage.firestore_reads += reads
+            usage.firestore_writes += writes
+
+    def add_provider_call(self, name: str, model: str, ms: float, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            usage = self._stage(name)
+            usage.input_tokens += input_tokens
+            usage.output_tokens += output_tokens
+            model_usage = self.models.get(model)
+            if model_usage is None:
+                model_usage = self.models[model] = ModelUsage()
+            model_usage.calls += 1
+            model_usage.ms += ms
+            model_usage.input_tokens += input_tokens
+            model_usage.output_tokens += output_tokens
+            model_usage.latencies_ms.append(ms)
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {name: usage.to_dict() for name, usage in self.stages.items()}
+            models = {name: usage.to_dict() for name, usage in self.models.items()}
+            reads = sum(u.firestore_reads for u in self.stages.values())
+            writes = sum(u.firestore_writes for u in self.stages.values())
+            tokens_in = sum(u.input_tokens for u in self.models.values())
+            tokens_out = sum(u.output_tokens for u in self.models.values())
+        return {
+            "totalMs": round(self.total_ms, 1),
+            "stages": stages,
+            "models": models,
+            "firestore": {"reads": reads, "writes": writes},
+            "tokens": {"input": tokens_in, "output": tokens_out},
+        }
+
+
+_accounting: contextvars.ContextVar[Optional[RequestAccounting]] = contextvars.ContextVar("request_accounting", default=None)
+_stage_name: contextvars.ContextVar[str] = contextvars.ContextVar("accounting_stage", default=UNATTRIBUTED)
+
+
+def current_accounting() -> Optional[RequestAccounting]:
+    return _accounting.get()
+
+
+@contextmanager
+def accounting_scope(accounting: Optional[RequestAccounting] = None) -> Iterator[RequestAccounting]:
+    """Collect usage into `accounting` (a fresh one by default) for the duration of the block."""
+    accounting = accounting if accounting is not None else RequestAccounting()
+    token = _accounting.set(accounting)
+    try:
+        yield accounting
+    finally:
+        _accounting.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time the block as `name` (and trace it as a `stage <name>` span); Firestore
+    and token usage inside it is attributed to `name`.
+    """
+    accounting = _accounting.get()
+    with start_span(f"stage {name}", {"stage": name}):
+        if accounting is None:
+            yield
+            return
+        token = _stage_name.set(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            accounting.add_time(name, (time.perf_counter() - started) * 1000)
+            _stage_name.reset(token)
+
+
+def count_firestore(reads: int = 0, writes: int = 0) -> None:
+    if reads:
+        FIRESTORE_DOCS.inc("read", amount=reads)
+    if writes:
+        FIRESTORE_DOCS.inc("write", amount=writes)
+    accounting = _accounting.get()
+    if accounting is not None and (reads or writes):
+        accounting.add_firestore(_stage_name.get(), reads, writes)
+
+
+def _int_attr(obj: Any, *names: str) -> int:
+    for name in names:
+        value = getattr(obj, name, None)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return 0
+
+
+def extract_token_usage(response: Any) -> Tuple[int, int]:
+    """(input, output) tokens from an OpenAI, Anthropic or Gemini SDK response; zeros if absent."""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        return (_int_attr(usage, "prompt_tokens", "input_tokens"),
+                _int_attr(usage, "completion_tokens", "output_tokens"))
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None:
+        return _int_attr(metadata, "prompt_token_count"), _int_attr(metadata, "candidates_token_count")
+    return 0, 0
+
+
+def record_provider_usage(provider: str, model: Optional[str], response: Any, seconds: float) -> None:
+    """Called by the provider gateway after every successful provider call."""
+    accounting = _accounting.get()
+    if accounting is None:
+        return
+    if not model:
+        response_model = getattr(response, "model", None)
+        model = response_model if isinstance(response_model, str) else provider
+    input_tokens, output_tokens = extract_token_usage(response)
+    accounting.add_provider_call(_stage_name.get(), model, seconds * 1000, input_tokens, output_tokens)
+
+
+# ── Process-wide histograms ─────────────────────────────────────────────────
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (cumulative snapshot, Prometheus-style `le` bounds)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None = empty or beyond the last bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = self.count
+        return {"count": self.count, "sumMs": round(self.sum_ms, 1),
+                "p50Ms": self.quantile(0.5), "p95Ms": self.quantile(0.95), "buckets": cumulative}
+
+
+class _Series:
+    def __init__(self):
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.tokens = {"input": 0, "output": 0}
+        self.firestore = {"reads": 0, "writes": 0}
+        self.requests = 0
+
+    def observe(self, name: str, ms: float) -> None:
+        histogram = self.latency.get(name)
+        if histogram is None:
+            histogram = self.latency[name] = LatencyHistogram()
+        histogram.observe(ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "tokens": dict(self.tokens), "firestore": dict(self.firestore),
+                "latency": {name: h.snapshot() for name, h in self.latency.items()}}
+
+
+class AccountingHistograms:
+    """
+    Per-org stage latency (plus request totals) and per-model provider call latency
+    and tokens. Orgs are kept in an LRU capped at ACCOUNTING_MAX_ORGS.
+    """
+
+    def __init__(self, max_orgs: int = ACCOUNTING_MAX_ORGS):
+        self.max_orgs = max_orgs
+        self._orgs: "OrderedDict[str, _Series]" = OrderedDict()
+        self._models: Dict[str, _Series] = {}
+        self._lock = Lock()
+
+    def observe(self, org_id: str, accounting: RequestAccounting) -> None:
+        summary = accounting.summary()
+        with self._lock:
+            series = self._orgs.get(org_id)
+            if series is None:
+                series = self._orgs[org_id] = _Series()
+                while len(self._orgs) > self.max_orgs:
+                    self._orgs.popitem(last=False)
+            self._orgs.move_to_end(org_id)
+            series.requests += 1
+            series.observe("total", summary["totalMs"])
+            for name, usage in summary["stages"].items():
+                series.observe(name, usage["ms"])
+            series.tokens["input"] += summary["tokens"]["input"]
+            series.tokens["output"] += summary["tokens"]["output"]
+            series.firestore["reads"] += summary["firestore"]["reads"]
+            series.firestore["writes"] += summary["firestore"]["writes"]
+
+            for model, usage in accounting.models.items():
+                model_series = self._models.get(model)
+                if model_series is None:
+                    model_series = self._models[model] = _Series()
+                model_series.requests += 1
+                for ms in usage.latencies_ms:
+                    model_series.observe("call", ms)
+                model_series.tokens["input"] += usage.input_tokens
+                model_series.tokens["output"] += usage.output_tokens
+
+    def snapshot(self, org_id: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            orgs = {org: s.snapshot() for org, s in self._orgs.items() if org_id is None or org == org_id}
+            models = {model: s.snapshot() for model, s in self._models.items()}
+        return {"orgs": orgs, "models": models, "bucketsMs": list(LATENCY_BUCKETS_MS)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._orgs.clear()
+            self._models.clear()
+
+
+accounting_histograms = AccountingHistograms()
@@ -0,0 +1,160 @@
+# backend/app/core/result_cache.py
+"""
+AUM Context Foundry — In-Process Result Cache (L1)
+
+Bounded TTL/LRU cache that sits in front of Firestore-backed caches such as
+`organizations/{org}/simulationCache`. Entries are sized in bytes (serialized
+JSON length), evicted least-recently-used once the byte or entry budget is
+exceeded, and tagged by org so that a new manifest or a plan change can drop
+every entry for that org at once.
+
+The cache is per process: other workers converge within `ttl_seconds`, and
+simulation cache keys already embed the resolved manifest version.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SIM_L1_CACHE_MAX_BYTES = int(os.getenv("SIM_L1_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SIM_L1_CACHE_MAX_ENTRIES = int(os.getenv("SIM_L1_CACHE_MAX_ENTRIES", "5000"))
+SIM_L1_CACHE_TTL_SECONDS = float(os.getenv("SIM_L1_CACHE_TTL_SECONDS", "300"))
+CLAIM_CACHE_MAX_BYTES = int(os.getenv("CLAIM_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+CLAIM_CACHE_TTL_SECONDS = float(os.getenv("CLAIM_CACHE_TTL_SECONDS", str(24 * 3600)))
+# "latest" manifest pointer per org; short so other workers pick up new ingests quickly
+MANIFEST_POINTER_TTL_SECONDS = float(os.getenv("MANIFEST_POINTER_TTL_SECONDS", "60"))
+
+
+def _estimate_bytes(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(repr(value).encode("utf-8"))
+
+
+class ResultCache:
+    """Thread-safe TTL + LRU cache bounded by total bytes and entry count, indexed by org."""
+
+    def __init__(self, name: str, max_bytes: int, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (org_id, value, size_bytes, expires_at)
+        self._entries: "OrderedDict[str, Tuple[str, Any, int, float]]" = OrderedDict()
+        self._by_org: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[3] <= now:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, org_id: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        size = _estimate_bytes(value)
+        if size > self.max_bytes:
+            return False
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (org_id, value, size, expires_at)
+            self._by_org.setdefault(org_id, set()).add(key)
+            self._bytes += size
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                self._drop(next(iter(self._entries)))
+        return True
+
+    def invalidate_org(self, org_id: str) -> int:
+        with self._lock:
+            keys = list(self._by_org.get(org_id, ()))
+            for key in keys:
+                self._drop(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_org.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        org_id, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._by_org.get(org_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_org[org_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+simulation_result_cache = ResultCache(
+    "simulation", SIM_L1_CACHE_MAX_BYTES, SIM_L1_CACHE_MAX_ENTRIES, SIM_L1_CACHE_TTL_SECONDS
+)
+manifest_pointer_cache = ResultCache(
+    "manifest_pointer", 1024 * 1024, 10000, MANIFEST_POINTER_TTL_SECONDS
+)
+
+# Claim sets are keyed by resolved manifest version, so they never go stale on ingest
+# and are deliberately left out of `invalidate_org_caches`.
+claim_set_cache = ResultCache(
+    "claims", CLAIM_CACHE_MAX_BYTES, SIM_L1_CACHE_MAX_ENTRIES, CLAIM_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_org_caches(org_id: str, reason: str = "") -> None:
+    """Drop every in-process cached result for an org (new manifest ingested, plan changed)."""
+    from core.manifest_index import manifest_index_registry
+    from core.semantic_cache import semantic_prompt_cache
+    dropped = (
+        simulation_result_cache.invalidate_org(org_id)
+        + manifest_pointer_cache.invalidate_org(org_id)
+        + semantic_prompt_cache.invalidate_org(org_id)
+        + manifest_index_registry.invalidate_org(org_id)
+    )
+    if dropped:
+        logger.info(f"🧹 L1 cache: dropped {dropped} entries for {org_id} ({reason or 'invalidated'})")
+
+
+def clear_all_caches() -> None:
+    from core.embedding_cache import embedding_cache
+    from core.manifest_index import manifest_index_registry
+    from core.semantic_cache import semantic_prompt_cache
+    embedding_cache.clear()
+    manifest_index_registry.clear()
+    semantic_prompt_cache.clear()
+    simulation_result_cache.clear()
+    manifest_pointer_cache.clear()
+    claim_set_cache.clear()
@@ -160,6 +160,10 @@ def get_auth_context(credentials: HTTPAuthorizationCredentials = Depends(securit
         org_id = user_info.get("orgId")
         role = user_info.get("role", "member")
 
+        # profileLoaded: orgId/role came from the user doc read here, so request handlers
+        # can authorize org access without reading the same doc again.
+        profile_loaded = False
+        is_platform_admin = False
         if db and user_info.get("uid") not in ("demo_uid", "mock_uid_dev"):
             try:
                 user_doc = db.collection("users").document(user_info["uid"]).get()
@@ -167,6 +171,8 @@ def get_auth_context(credentials: HTTPAuthorizationCredentials = Depends(securit
                     ud = user_doc.to_dict() or {}
                     org_id = ud.get("orgId", org_id)
                     role = ud.get("role", role)
+                    profile_loaded = True
+                    is_platform_admin = _is_platform_admin(ud)
             except Exception:
                 pass  # Use token-provided values as fallback
 
@@ -176,6 +182,8 @@ def get_auth_context(credentials: HTTPAuthorizationCredentials = Depends(securit
             "role": role,
             "type": "session",
             "email": user_info.get("email"),
+            "profileLoaded": profile_loaded,
+            "isPlatformAdmin": is_platform_admin,
         }
     except HTTPException:
         raise
@@ -0,0 +1,193 @@
+# backend/app/core/semantic_cache.py
+"""
+AUM Context Foundry — Semantic Near-Duplicate Prompt Cache
+
+Optional cache tier behind the exact-hash simulation cache. Prompt embeddings
+are kept per (org, manifest version) in a small in-memory matrix; a new prompt
+whose cosine similarity to a cached prompt clears the plan's threshold is
+served the cached results (flagged `cached: "semantic"` by the caller).
+
+Thresholds are per plan (None = disabled, e.g. Explorer which only ever
+serves exact-prompt cache hits) and can be overridden with
+SEMANTIC_CACHE_THRESHOLD_<PLAN>. SEMANTIC_CACHE_ENABLED=false turns the tier
+off globally; orgs opt out with `semanticCacheEnabled: false`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(24 * 3600)))
+SEMANTIC_CACHE_MAX_PER_BUCKET = int(os.getenv("SEMANTIC_CACHE_MAX_PER_BUCKET", "256"))
+SEMANTIC_CACHE_MAX_BUCKETS = int(os.getenv("SEMANTIC_CACHE_MAX_BUCKETS", "1000"))
+
+_DEFAULT_THRESHOLDS: Dict[str, Optional[float]] = {
+    "explorer": None,
+    "growth": 0.95,
+    "scale": 0.96,
+    "enterprise": 0.97,
+}
+
+
+def _threshold_from_env(plan: str, default: Optional[float]) -> Optional[float]:
+    raw = os.getenv(f"SEMANTIC_CACHE_THRESHOLD_{plan.upper()}")
+    if raw is None:
+        return default
+    if raw.strip().lower() in ("", "off", "none", "disabled"):
+        return None
+    return float(raw)
+
+
+SEMANTIC_CACHE_THRESHOLDS = {plan: _threshold_from_env(plan, value) for plan, value in _DEFAULT_THRESHOLDS.items()}
+
+
+def semantic_threshold(org_plan: str, org_data: Optional[dict] = None) -> Optional[float]:
+    """Similarity threshold for this org, or None when the semantic tier is off for it."""
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if org_data and org_data.get("semanticCacheEnabled") is False:
+        return None
+    return SEMANTIC_CACHE_THRESHOLDS.get(org_plan)
+
+
+@dataclass
+class SemanticMatch:
+    prompt: str
+    similarity: float
+    payload: Dict[str, Any]
+
+
+@dataclass
+class _Bucket:
+    matrix: np.ndarray  # (n, dim) float32, L2-normalized rows
+    prompts: List[str] = field(default_factory=list)
+    payloads: List[Dict[str, Any]] = field(default_factory=list)
+    expires: List[float] = field(default_factory=list)
+
+
+def _normalize(embedding) -> Optional[np.ndarray]:
+    vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(vec))
+    if vec.size == 0 or norm == 0.0:
+        return None
+    return vec / norm
+
+
+class SemanticPromptCache:
+    """Per-(org, manifest version) prompt embedding index with hit-rate counters."""
+
+    def __init__(self, max_per_bucket: int = SEMANTIC_CACHE_MAX_PER_BUCKET,
+                 max_buckets: int = SEMANTIC_CACHE_MAX_BUCKETS, ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS):
+        self.max_per_bucket = max_per_bucket
+        self.max_buckets = max_buckets
+        self.ttl_seconds = ttl_seconds
+        self._buckets: "OrderedDict[Tuple[str, str], _Bucket]" = OrderedDict()
+        self._lock = Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, org_plan: str, outcome: str) -> None:
+        counters = self._counters.setdefault(org_plan or "unknown", {"lookups": 0, "hits": 0})
+        counters["lookups"] += 1
+        if outcome == "hit":
+            counters["hits"] += 1
+
+    def lookup(self, org_id: str, manifest_version: str, embedding, threshold: float,
+               org_plan: str = "") -> Optional[SemanticMatch]:
+        query = _normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get((org_id, manifest_version))
+            if query is None or bucket is None or bucket.matrix.shape[1] != query.shape[0]:
+                self._count(org_plan, "miss")
+                return None
+            self._expire(bucket, now)
+            if not bucket.prompts:
+                self._count(org_plan, "miss")
+                return None
+            sims = bucket.matrix @ query
+            best = int(np.argmax(sims))
+            similarity = float(sims[best])
+            if similarity < threshold:
+                self._count(org_plan, "miss")
+                return None
+            self._buckets.move_to_end((org_id, manifest_version))
+            self._count(org_plan, "hit")
+            return SemanticMatch(bucket.prompts[best], similarity, bucket.payloads[best])
+
+    def add(self, org_id: str, manifest_version: str, prompt: str, embedding, payload: Dict[str, Any]) -> None:
+        vec = _normalize(embedding)
+        if vec is None:
+            return
+        key = (org_id, manifest_version)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket.matrix.shape[1] != vec.shape[0]:
+                bucket = _Bucket(matrix=np.empty((0, vec.shape[0]), dtype=np.float32))
+                self._buckets[key] = bucket
+            if prompt in bucket.prompts:
+                self._remove(bucket, bucket.prompts.index(prompt))
+            bucket.matrix = np.vstack([bucket.matrix, vec[None, :]])
+            bucket.prompts.append(prompt)
+            bucket.payloads.append(payload)
+            bucket.expires.append(time.monotonic() + self.ttl_seconds)
+            while len(bucket.prompts) > self.max_per_bucket:
+                self._remove(bucket, 0)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+
+    def _expire(self, bucket: _Bucket, now: float) -> None:
+        for index in [i for i, expires in enumerate(bucket.expires) if expires <= now][::-1]:
+            self._remove(bucket, index)
+
+    @staticmethod
+    def _remove(bucket: _Bucket, index: int) -> None:
+        bucket.matrix = np.delete(bucket.matrix, index, axis=0)
+        del bucket.prompts[index]
+        del bucket.payloads[index]
+        del bucket.expires[index]
+
+    def invalidate_org(self, org_id: str) -> int:
+        with self._lock:
+            keys = [key for key in self._buckets if key[0] == org_id]
+            dropped = sum(len(self._buckets[key].prompts) for key in keys)
+            for key in keys:
+                del self._buckets[key]
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._counters.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = sum(c["lookups"] for c in self._counters.values())
+            hits = sum(c["hits"] for c in self._counters.values())
+            return {
+                "enabled": SEMANTIC_CACHE_ENABLED,
+                "thresholds": SEMANTIC_CACHE_THRESHOLDS,
+                "buckets": len(self._buckets),
+                "entries": sum(len(b.prompts) for b in self._buckets.values()),
+                "lookups": lookups,
+                "hits": hits,
+                "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+                "byPlan": {
+                    plan: {**c, "hitRate": round(c["hits"] / c["lookups"], 4) if c["lookups"] else 0.0}
+                    for plan, c in self._counters.items()
+                },
+            }
+
+
+semantic_prompt_cache = SemanticPromptCache()
@@ -0,0 +1,87 @@
+# backend/app/core/tenant_context.py
+"""
+AUM Context Foundry — Request-Scoped Tenant Context
+
+Loads the documents a simulation request needs about its tenant — the org
+record (plan, API keys, flags) and the `manifests/latest` pointer — in ONE
+batched `get_all` round trip, and hands them to every stage instead of each
+stage re-reading `organizations/{orgId}`. The user profile is not re-read:
+`get_auth_context` already loaded it for this request (see `profileLoaded`).
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from core.metrics import firestore_operation
+from core.request_accounting import count_firestore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TenantContext:
+    org_id: str
+    org_exists: bool = False
+    org_data: Dict[str, Any] = field(default_factory=dict)  # apiKeys removed, see `api_keys`
+    api_keys: Dict[str, str] = field(default_factory=dict)
+    latest_manifest: Optional[Dict[str, Any]] = None
+    load_failed: bool = False
+    reads: int = 0
+
+    @property
+    def plan(self) -> str:
+        # Entitlement checks compare against lowercase plan ids; a stored "Growth" must still match
+        return str(self.org_data.get("subscription", {}).get("planId") or "explorer").strip().lower()
+
+    @property
+    def subscription(self) -> Dict[str, Any]:
+        return self.org_data.get("subscription", {})
+
+    @property
+    def latest_version(self) -> Optional[str]:
+        if not self.latest_manifest:
+            return None
+        version = self.latest_manifest.get("version")
+        return version if version and version != "latest" else None
+
+
+def load_tenant_context(db, org_id: str, include_latest_manifest: bool = True) -> TenantContext:
+    """Batched read of the org doc (+ latest manifest pointer). Blocking; call via asyncio.to_thread."""
+    ctx = TenantContext(org_id=org_id)
+    if not db:
+        return ctx
+
+    org_ref = db.collection("organizations").document(org_id)
+    refs = [org_ref]
+    latest_ref = None
+    if include_latest_manifest:
+        latest_ref = org_ref.collection("manifests").document("latest")
+        refs.append(latest_ref)
+
+    try:
+        with firestore_operation("tenant_context"):
+            snapshots = {snap.reference.path: snap for snap in db.get_all(refs)}
+    except Exception as e:
+        logger.error(f"Tenant context load failed for {org_id}: {e}")
+        ctx.load_failed = True
+        return ctx
+    ctx.reads = len(refs)
+    count_firestore(reads=ctx.reads)
+
+    org_snap = snapshots.get(org_ref.path)
+    if org_snap is not None and org_snap.exists:
+        org_data = dict(org_snap.to_dict() or {})
+        # 🛡️ SECURITY HARDENING (P0): keep apiKeys out of org_data so it is never logged
+        ctx.api_keys = org_data.pop("apiKeys", {}) or {}
+        ctx.org_data = org_data
+        ctx.org_exists = True
+
+    if latest_ref is not None:
+        latest_snap = snapshots.get(latest_ref.path)
+        if latest_snap is not None and latest_snap.exists:
+            ctx.latest_manifest = latest_snap.to_dict() or {}
+
+    return ctx
@@ -0,0 +1,473 @@
+# backend/app/core/tracing.py
+"""
+AUM Context Foundry — Distributed Tracing
+
+OpenTelemetry-style spans without the SDK dependency. The active span lives in
+a contextvar, so it follows the request into everything that copies context:
+`asyncio.create_task` / `gather`, `asyncio.to_thread` and Starlette
+`BackgroundTasks`. Jobs that outlive the process (FirestoreTaskQueue) store a
+W3C `traceparent` on the job document; TaskQueueRecovery resumes that trace
+when it retries the job.
+
+    with start_span("retrieval", {"org.id": org_id}) as span:
+        ...
+        span.set_attribute("chunks", len(chunks))
+
+Instrumented: every HTTP request (TracingMiddleware, honours an incoming
+`traceparent` header and echoes one back), every provider call
+(provider_gateway), every Firestore round trip (metrics.firestore_operation),
+every accounting stage (request_accounting.stage) and persistent jobs.
+
+Configuration:
+  TRACE_EXPORTER       none (default) | memory | file | otlp
+                       (otlp is implied when OTEL_EXPORTER_OTLP_ENDPOINT is set)
+  TRACE_SAMPLE_RATIO   fraction of new traces recorded (trace-id based, so all
+                       workers agree); incoming sampled parents are always honoured
+  TRACE_FILE_PATH      JSON-lines output of the file exporter
+  OTEL_EXPORTER_OTLP_ENDPOINT / OTEL_EXPORTER_OTLP_HEADERS / OTEL_SERVICE_NAME
+
+With no exporter, `start_span` is a no-op. Finished spans are queued (bounded,
+oldest dropped) and exported off the event loop every TRACE_FLUSH_SECONDS.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "")
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "1.0"))
+TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "traces.jsonl")
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "5"))
+TRACE_MAX_QUEUE = int(os.getenv("TRACE_MAX_QUEUE", "4096"))
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "aum-api")
+
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+STATUS_CODES = {"unset": 0, "ok": 1, "error": 2}
+
+_rng = random.SystemRandom()
+
+
+# ── Span context & W3C traceparent ──────────────────────────────────────────
+
+class SpanContext:
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """`00-<32 hex trace id>-<16 hex span id>-<flags>` → SpanContext; None if malformed."""
+    if not header or not isinstance(header, str):
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[0] == "ff" or parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return SpanContext(parts[1].lower(), parts[2].lower(), bool(flags & 1))
+
+
+def _new_trace_id() -> str:
+    return f"{_rng.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{_rng.getrandbits(64):016x}"
+
+
+# ── Spans ───────────────────────────────────────────────────────────────────
+
+class Span:
+    """One timed operation. Non-sampled spans still carry ids (for propagation) but are never exported."""
+
+    __slots__ = ("name", "context", "parent_id", "kind", "start_ns", "end_ns",
+                 "attributes", "events", "status", "status_message", "links")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str] = None,
+                 kind: str = "internal", attributes: Optional[Dict[str, Any]] = None,
+                 links: Optional[List[SpanContext]] = None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[Tuple[str, int, Dict[str, Any]]] = []
+        self.status = "unset"
+        self.status_message = ""
+        self.links = links or []
+
+    @property
+    def recording(self) -> bool:
+        return self.context.sampled
+
+    @property
+    def traceparent(self) -> str:
+        return self.context.traceparent
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.recording and value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        if self.recording:
+            self.events.append((name, time.time_ns(), dict(attributes or {})))
+
+    def set_status(self, status: str, message: str = "") -> None:
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.add_event("exception", {"exception.type": type(exc).__name__, "exception.message": str(exc)[:500]})
+        self.set_status("error", type(exc).__name__)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(self.duration_ms, 3) if self.end_ns is not None else None,
+            "attributes": self.attributes,
+            "events": [{"name": n, "timeUnixNano": t, "attributes": a} for n, t, a in self.events],
+            "status": self.status,
+            "statusMessage": self.status_message,
+            "links": [{"traceId": link.trace_id, "spanId": link.span_id} for link in self.links],
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled; accepts the Span API and records nothing."""
+
+    recording = False
+    traceparent = None
+    context = None
+
+    def set_attribute(self, key, value): pass
+    def set_attributes(self, attributes): pass
+    def add_event(self, name, attributes=None): pass
+    def set_status(self, status, message=""): pass
+    def record_exception(self, exc): pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Union[Span, _NoopSpan]:
+    return _current_span.get() or NOOP_SPAN
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent of the active span (store it on anything that outlives the request)."""
+    span = _current_span.get()
+    return span.traceparent if span is not None else None
+
+
+# ── Exporters ───────────────────────────────────────────────────────────────
+
+class InMemorySpanExporter:
+    """Keeps exported spans in a list (tests, local debugging)."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self.spans.extend(spans)
+
+    def finished(self, name: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            return [s for s in self.spans if name is None or s.name == name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+class FileSpanExporter:
+    """Appends one JSON object per span to `path`."""
+
+    def __init__(self, path: str = TRACE_FILE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+
+def otlp_payload(spans: List[Span], service_name: str = SERVICE_NAME) -> Dict[str, Any]:
+    """OTLP/JSON `ExportTraceServiceRequest` for one batch."""
+    encoded = []
+    for span in spans:
+        item = {
+            "traceId": span.context.trace_id,
+            "spanId": span.context.span_id,
+            "name": span.name,
+            "kind": SPAN_KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "events": [{"name": n, "timeUnixNano": str(t), "attributes": _otlp_attributes(a)}
+                       for n, t, a in span.events],
+            "links": [{"traceId": link.trace_id, "spanId": link.span_id} for link in span.links],
+            "status": {"code": STATUS_CODES.get(span.status, 0), "message": span.status_message},
+        }
+        if span.parent_id:
+            item["parentSpanId"] = span.parent_id
+        encoded.append(item)
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+        "scopeSpans": [{"scope": {"name": "aum.context_foundry"}, "spans": encoded}],
+    }]}
+
+
+def _parse_otlp_headers(raw: str) -> Dict[str, str]:
+    headers = {}
+    for pair in raw.split(","):
+        if "=" in pair:
+            key, value = pair.split("=", 1)
+            headers[key.strip()] = value.strip()
+    return headers
+
+
+class OTLPHttpSpanExporter:
+    """POSTs OTLP/JSON batches to `<endpoint>/v1/traces` (any OpenTelemetry collector)."""
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, headers: Optional[Dict[str, str]] = None,
+                 timeout: float = 10.0):
+        endpoint = endpoint.rstrip("/")
+        self.url = endpoint if endpoint.endswith("/v1/traces") else f"{endpoint}/v1/traces"
+        self.headers = {"Content-Type": "application/json",
+                        **_parse_otlp_headers(os.getenv("OTEL_EXPORTER_OTLP_HEADERS", "")), **(headers or {})}
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]) -> None:
+        import httpx
+        response = httpx.post(self.url, json=otlp_payload(spans), headers=self.headers, timeout=self.timeout)
+        if response.status_code >= 400:
+            raise RuntimeError(f"OTLP export failed: HTTP {response.status_code}")
+
+
+def build_exporter(name: Optional[str] = None):
+    name = (name if name is not None else TRACE_EXPORTER or ("otlp" if OTLP_ENDPOINT else "none")).lower()
+    if name == "memory":
+        return InMemorySpanExporter()
+    if name == "file":
+        return FileSpanExporter(TRACE_FILE_PATH)
+    if name == "otlp":
+        if not OTLP_ENDPOINT:
+            logger.warning("TRACE_EXPORTER=otlp but OTEL_EXPORTER_OTLP_ENDPOINT is unset; tracing disabled")
+            return None
+        return OTLPHttpSpanExporter(OTLP_ENDPOINT)
+    return None
+
+
+# ── Tracer ──────────────────────────────────────────────────────────────────
+
+class Tracer:
+    def __init__(self, exporter=None, sample_ratio: float = TRACE_SAMPLE_RATIO, max_queue: int = TRACE_MAX_QUEUE):
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self._queue: deque = deque(maxlen=max_queue)
+        self.dropped = 0
+        self.exported = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def configure(self, exporter=None, sample_ratio: Optional[float] = None) -> None:
+        self.exporter = exporter
+        if sample_ratio is not None:
+            self.sample_ratio = sample_ratio
+        self._queue.clear()
+
+    def _sample(self, trace_id: str) -> bool:
+        # Trace-id ratio: deterministic per trace, so every service/worker makes the same call
+        return int(trace_id[16:], 16) < self.sample_ratio * (1 << 64)
+
+    @contextmanager
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                   parent: Union[None, str, SpanContext] = None, kind: str = "internal",
+                   links: Optional[List[SpanContext]] = None) -> Iterator[Union[Span, _NoopSpan]]:
+        """
+        Open a span as a child of `parent` (a traceparent string or SpanContext) or,
+        by default, of the active span. Exceptions are recorded and re-raised.
+        """
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+        parent_ctx = parse_traceparent(parent) if isinstance(parent, str) else parent
+        if parent_ctx is None:
+            active = _current_span.get()
+            parent_ctx = active.context if active is not None else None
+        if parent_ctx is not None:
+            context = SpanContext(parent_ctx.trace_id, _new_span_id(), parent_ctx.sampled)
+        else:
+            trace_id = _new_trace_id()
+            context = SpanContext(trace_id, _new_span_id(), self._sample(trace_id))
+        span = Span(name, context, parent_ctx.span_id if parent_ctx else None, kind,
+                    attributes if context.sampled else None, links)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            if isinstance(exc, asyncio.CancelledError):
+                span.set_status("error", "cancelled")
+            else:
+                span.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._end(span)
+
+    def _end(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if not span.recording:
+            return
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(span)
+
+    def flush(self) -> int:
+        """Export everything queued (blocking; run via asyncio.to_thread from the loop)."""
+        exporter = self.exporter
+        batch = []
+        while self._queue:
+            try:
+                batch.append(self._queue.popleft())
+            except IndexError:
+                break
+        if not batch or exporter is None:
+            return 0
+        try:
+            exporter.export(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.warning(f"Span export failed ({len(batch)} spans dropped): {e}")
+            return 0
+        self.exported += len(batch)
+        return len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"exporter": type(self.exporter).__name__ if self.exporter else None,
+                "sampleRatio": self.sample_ratio, "queued": len(self._queue),
+                "exported": self.exported, "dropped": self.dropped}
+
+
+tracer = Tracer(exporter=build_exporter())
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None,
+               parent: Union[None, str, SpanContext] = None, kind: str = "internal",
+               links: Optional[List[SpanContext]] = None):
+    return tracer.start_span(name, attributes, parent, kind, links)
+
+
+async def run_tracing_background(flush_seconds: float = TRACE_FLUSH_SECONDS) -> None:
+    """Export queued spans periodically, off the event loop."""
+    while True:
+        await asyncio.sleep(flush_seconds)
+        if tracer.enabled:
+            await asyncio.to_thread(tracer.flush)
+
+
+# ── HTTP middleware ─────────────────────────────────────────────────────────
+
+class TracingMiddleware:
+    """
+    Pure ASGI: one server span per HTTP request, named by route template once
+    routing has run. Continues an incoming `traceparent`; echoes the request's
+    own traceparent on the response so clients can quote it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        incoming = None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                incoming = value.decode("latin-1")
+                break
+        method = scope.get("method", "GET")
+        with tracer.start_span(f"{method}", {"http.request.method": method, "url.path": scope.get("path")},
+                               parent=incoming, kind="server") as span:
+            async def send_with_traceparent(message):
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    span.set_attribute("http.response.status_code", status)
+                    if status >= 500:
+                        span.set_status("error", f"HTTP {status}")
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"traceparent", span.traceparent.encode("latin-1"))]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_traceparent)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
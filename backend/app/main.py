@@ -17,7 +17,7 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from core.config import settings
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import logging
 import os
 import asyncio
@@ -98,12 +98,48 @@ async def lifespan(app: FastAPI):
     logger.info("⚙️ Initializing Periodic Job Recovery Poller (5m interval)")
     # _periodic_job_recovery is defined further down, but will be mapped at runtime
     task = asyncio.create_task(_periodic_job_recovery())
+
+    from core.metrics import run_metrics_background
+    metrics_task = asyncio.create_task(run_metrics_background())
+
+    from core.tracing import run_tracing_background, tracer
+    tracing_task = asyncio.create_task(run_tracing_background())
+
+    # Advances bulk-inference jobs (provider batch APIs) for batch jobs and scheduled crawls
+    from api.bulk_simulation import run_bulk_poller
+    bulk_task = asyncio.create_task(run_bulk_poller())
+
+    # Settles idle quota leases before they expire (an expired, unsettled lease counts as fully used)
+    from core.quota_leases import run_quota_lease_settler
+    lease_task = asyncio.create_task(run_quota_lease_settler())
+    if tracer.enabled:
+        logger.info(f"🔭 Tracing enabled ({type(tracer.exporter).__name__}, sample ratio {tracer.sample_ratio})")
     logger.info("="*60 + "\n")
     
     yield # App runs here
     
     logger.info("🛑 Shutting down AUM Analytics API...")
     task.cancel()
+    metrics_task.cancel()
+    tracing_task.cancel()
+    bulk_task.cancel()
+    lease_task.cancel()
+    try:
+        await asyncio.to_thread(tracer.flush)
+    except Exception as e:
+        logger.warning(f"Final span export failed: {e}")
+
+    from core.metrics import write_snapshot
+    try:
+        write_snapshot()
+    except Exception as e:
+        logger.warning(f"Final metrics snapshot failed: {e}")
+
+    from core.quota_leases import release_all_leases
+    await release_all_leases()
+
+    from core.provider_clients import close_all_clients
+    await close_all_clients()
 
 # ============================================================================
 # CREATE FASTAPI APP
@@ -147,6 +183,13 @@ app.add_middleware(
 
 logger.info("✅ Security middleware (CORS & TrustedHost) configured")
 
+# Outermost middleware: request latency/in-flight for every response, including rejections
+from core.metrics import MetricsMiddleware, register_router
+app.add_middleware(MetricsMiddleware)
+# Added last so the request span also covers metrics, CORS and rate limiting
+from core.tracing import TracingMiddleware
+app.add_middleware(TracingMiddleware)
+
 # ============================================================================
 # GLOBAL EXCEPTION HANDLER
 # ============================================================================
@@ -208,6 +251,7 @@ def load_router(module_path: str, prefix: str, tag: str) -> bool:
         
         # Include router
         app.include_router(module.router, prefix=prefix, tags=[tag])
+        register_router(prefix, module.router, parts[-1])
         logger.info(f"✅ Loaded {tag:30s} -> {prefix}")
         return True
         
@@ -302,6 +346,9 @@ async def health_check():
         firestore_status = "disconnected"
 
     status = "healthy" if firestore_status == "connected" else "degraded"
+
+    # Provider circuit breakers: any model not fully closed is reported, not treated as an outage
+    from core.circuit_breaker import circuit_breakers
     
     return {
         "status": status,
@@ -309,9 +356,23 @@ async def health_check():
         "version": "2.7.0-definitive",
         "dependencies": {
             "firestore": firestore_status
+        },
+        "providers": {
+            "degraded": circuit_breakers.open_circuits(),
+            "circuitBreakers": circuit_breakers.stats(),
         }
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus exposition (all workers when METRICS_MULTIPROC_DIR is set). Optional METRICS_TOKEN bearer."""
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    from core.metrics import render_latest
+    body = await asyncio.to_thread(render_latest)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # ============================================================================
 # BACKGROUND WORKERS
 # ============================================================================
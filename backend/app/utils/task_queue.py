@@ -1,11 +1,16 @@
 import uuid
 import logging
 from datetime import datetime, timezone
-from typing import Callable, Any, Dict
+from typing import Callable, Any, Dict, List, Optional, Tuple
 from core.firebase_config import db
+from core.metrics import TASK_QUEUE_IN_PROGRESS, TASK_QUEUE_JOBS, firestore_operation
+from core.tracing import current_traceparent, start_span
 
 logger = logging.getLogger(__name__)
 
+# Firestore caps a batched write at 500 operations
+RESULTS_WRITE_CHUNK = 400
+
 class FirestoreTaskQueue:
     """
     A persistent task registry to track and recover background jobs.
@@ -26,7 +31,13 @@ class FirestoreTaskQueue:
             }
             if request_id:
                 doc["requestId"] = request_id
-            db.collection("organizations").document(org_id).collection(collection).document(job_id).set(doc)
+            # Lets a recovered retry continue the originating request's trace
+            traceparent = current_traceparent()
+            if traceparent:
+                doc["traceparent"] = traceparent
+            with firestore_operation("task_queue_register"):
+                db.collection("organizations").document(org_id).collection(collection).document(job_id).set(doc)
+            TASK_QUEUE_JOBS.inc(collection, "queued")
         except Exception as e:
             logger.error(f"Failed to register job {job_id}: {e}")
 
@@ -45,21 +56,128 @@ class FirestoreTaskQueue:
             if error:
                 update_data["error"] = error
                 
-            db.collection("organizations").document(org_id).collection(collection).document(job_id).update(update_data)
+            with firestore_operation("task_queue_update"):
+                db.collection("organizations").document(org_id).collection(collection).document(job_id).update(update_data)
+            TASK_QUEUE_JOBS.inc(collection, status)
         except Exception as e:
             logger.error(f"Failed to update job {job_id}: {e}")
 
     @staticmethod
-    async def run_persistent_task(org_id: str, collection: str, job_id: str, worker_fn: Callable, *args, **kwargs):
+    def heartbeat(org_id: str, collection: str, job_id: str):
+        """Refresh `updatedAt` of a job whose work runs elsewhere (e.g. at a provider), so the sweep leaves it alone."""
+        if not db: return
+        try:
+            with firestore_operation("task_queue_heartbeat"):
+                db.collection("organizations").document(org_id).collection(collection).document(job_id).update({
+                    "updatedAt": datetime.now(timezone.utc)
+                })
+        except Exception as e:
+            logger.error(f"Failed to heartbeat job {job_id}: {e}")
+
+    @staticmethod
+    def checkpoint_result(org_id: str, collection: str, job_id: str, key: str, result: Dict[str, Any],
+                          extra_writes: Optional[List[Tuple[Any, Dict[str, Any]]]] = None) -> bool:
         """
-        Executes a task and ensures status is updated in Firestore even if it fails.
+        Persists one unit of a job's output as soon as it completes: `results/{key}` and `key`
+        in the job's `completedPrompts` set, in one batched write. `extra_writes` are (ref, data)
+        pairs committed atomically with it. Also refreshes `updatedAt`, so a long job that
+        keeps checkpointing is never mistaken for a stalled one.
         """
-        FirestoreTaskQueue.update_job(org_id, collection, job_id, "processing")
+        if not db: return False
+        from google.cloud import firestore
+        try:
+            job_ref = db.collection("organizations").document(org_id).collection(collection).document(job_id)
+            batch = db.batch()
+            batch.set(job_ref.collection("results").document(key),
+                      {**result, "checkpointedAt": datetime.now(timezone.utc)})
+            batch.update(job_ref, {"completedPrompts": firestore.ArrayUnion([key]),
+                                   "updatedAt": datetime.now(timezone.utc)})
+            for ref, data in extra_writes or []:
+                batch.set(ref, data)
+            with firestore_operation("task_queue_checkpoint"):
+                batch.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to checkpoint {key} of job {job_id}: {e}")
+            return False
+
+    @staticmethod
+    def load_checkpoints(org_id: str, collection: str, job_id: str) -> Dict[str, Dict[str, Any]]:
+        """Checkpointed results of a job keyed like `completedPrompts` (empty for a fresh job)."""
+        if not db: return {}
+        try:
+            job_ref = db.collection("organizations").document(org_id).collection(collection).document(job_id)
+            with firestore_operation("task_queue_checkpoint_load"):
+                job = job_ref.get()
+                keys = (job.to_dict() or {}).get("completedPrompts", []) if job.exists else []
+                if not keys:
+                    return {}
+                snaps = db.get_all([job_ref.collection("results").document(key) for key in keys])
+                checkpoints = {snap.id: snap.to_dict() or {} for snap in snaps if snap.exists}
+            for result in checkpoints.values():
+                result.pop("checkpointedAt", None)
+            return checkpoints
+        except Exception as e:
+            logger.error(f"Failed to load checkpoints of job {job_id}: {e}")
+            return {}
+
+    @staticmethod
+    def write_results(org_id: str, collection: str, job_id: str, results: Dict[str, Dict[str, Any]]) -> int:
+        """Writes `results/{key}` docs in batched chunks (outputs that were not checkpointed as they completed)."""
+        if not db or not results: return 0
+        results_ref = db.collection("organizations").document(org_id).collection(collection) \
+            .document(job_id).collection("results")
+        items = list(results.items())
+        written = 0
         try:
-            result = await worker_fn(*args, **kwargs)
-            FirestoreTaskQueue.update_job(org_id, collection, job_id, "completed", result=result)
-            return result
+            for start in range(0, len(items), RESULTS_WRITE_CHUNK):
+                batch = db.batch()
+                for key, data in items[start:start + RESULTS_WRITE_CHUNK]:
+                    batch.set(results_ref.document(key), data)
+                with firestore_operation("task_queue_results_write"):
+                    batch.commit()
+                written += len(items[start:start + RESULTS_WRITE_CHUNK])
         except Exception as e:
-            logger.error(f"Task {job_id} failed in worker: {e}")
-            FirestoreTaskQueue.update_job(org_id, collection, job_id, "failed", error=str(e))
-            raise e
+            logger.error(f"Failed to write results of job {job_id}: {e}")
+        return written
+
+    @staticmethod
+    def list_results(org_id: str, collection: str, job_id: str, cursor: Optional[int] = None, limit: int = 50,
+                     fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        One page of a job's `results/` docs ordered by their `index`, optionally projected to
+        `fields`. Returns (page, next_cursor); pass next_cursor back to get the following page.
+        """
+        results_ref = db.collection("organizations").document(org_id).collection(collection) \
+            .document(job_id).collection("results")
+        query = results_ref.order_by("index")
+        if fields:
+            query = query.select(sorted(set(fields) | {"index"}))
+        if cursor is not None:
+            query = query.start_after({"index": cursor})
+        with firestore_operation("task_queue_results_page"):
+            docs = list(query.limit(limit + 1).stream())
+        page = [{"id": doc.id, **(doc.to_dict() or {})} for doc in docs[:limit]]
+        next_cursor = page[-1].get("index") if len(docs) > limit else None
+        return page, next_cursor
+
+    @staticmethod
+    async def run_persistent_task(org_id: str, collection: str, job_id: str, worker_fn: Callable, *args, **kwargs):
+        """
+        Executes a task and ensures status is updated in Firestore even if it fails.
+        Traced as a `job <collection>` span, a child of whatever span scheduled it.
+        """
+        attributes = {"job.id": job_id, "job.collection": collection, "org.id": org_id}
+        with start_span(f"job {collection}", attributes, kind="consumer"):
+            FirestoreTaskQueue.update_job(org_id, collection, job_id, "processing")
+            TASK_QUEUE_IN_PROGRESS.inc(collection)
+            try:
+                result = await worker_fn(*args, **kwargs)
+                FirestoreTaskQueue.update_job(org_id, collection, job_id, "completed", result=result)
+                return result
+            except Exception as e:
+                logger.error(f"Task {job_id} failed in worker: {e}")
+                FirestoreTaskQueue.update_job(org_id, collection, job_id, "failed", error=str(e))
+                raise e
+            finally:
+                TASK_QUEUE_IN_PROGRESS.dec(collection)
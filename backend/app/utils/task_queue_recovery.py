@@ -17,6 +17,7 @@ import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Callable, Dict, Any
 from core.firebase_config import db
+from core.tracing import start_span
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,24 @@ class TaskQueueRecovery:
     # Collections that contain background job sub-collections (P1 Fix: align with worker collections)
     JOB_COLLECTIONS = ["batchJobs", "seoJobs"]
 
+    # Per-collection retry handlers, used when the sweep is called without an explicit `retry_fn`
+    RETRY_HANDLERS: Dict[str, Callable] = {}
+
+    @staticmethod
+    def register_retry_handler(job_collection: str, handler: Callable):
+        """Register async handler(org_id, collection, job_id, payload) that resumes jobs of `job_collection`."""
+        TaskQueueRecovery.RETRY_HANDLERS[job_collection] = handler
+
+    @staticmethod
+    async def _traced_retry(retry_fn: Callable, org_id: str, job_collection: str, job_id: str,
+                            job_data: Dict[str, Any], payload: Dict[str, Any]):
+        """Run `retry_fn` inside a span that continues the trace stored on the job at registration."""
+        attributes = {"job.id": job_id, "job.collection": job_collection, "org.id": org_id,
+                      "job.retry": job_data.get("retryCount", 0) + 1}
+        with start_span(f"job.retry {job_collection}", attributes, parent=job_data.get("traceparent"),
+                        kind="consumer"):
+            return await retry_fn(org_id, job_collection, job_id, payload)
+
     @staticmethod
     async def sweep_stalled_jobs(
         retry_fn: Optional[Callable] = None,
@@ -42,7 +61,8 @@ class TaskQueueRecovery:
         
         Args:
             retry_fn: Optional async callable(org_id, collection, job_id, payload) 
-                       to re-execute the job. If None, stalled jobs are marked 'abandoned'.
+                       to re-execute the job. If None, the collection's registered retry
+                       handler is used; without one, stalled jobs are marked 'abandoned'.
         
         Returns:
             Summary of recovery actions taken.
@@ -62,6 +82,7 @@ class TaskQueueRecovery:
                 org_id = org_doc.id
 
                 for job_collection in TaskQueueRecovery.JOB_COLLECTIONS:
+                    handler = retry_fn or TaskQueueRecovery.RETRY_HANDLERS.get(job_collection)
                     try:
                         # Find jobs in "processing" or "queued" state
                         jobs_ref = (
@@ -113,7 +134,7 @@ class TaskQueueRecovery:
                                         f"Job {job_id} in {org_id}/{job_collection} permanently failed "
                                         f"and moved to DLQ."
                                     )
-                                elif retry_fn:
+                                elif handler:
                                     # Attempt retry
                                     try:
                                         job_doc.reference.update({
@@ -122,7 +143,8 @@ class TaskQueueRecovery:
                                             "updatedAt": datetime.now(timezone.utc),
                                         })
                                         payload = job_data.get("payload", {})
-                                        await retry_fn(org_id, job_collection, job_id, payload)
+                                        await TaskQueueRecovery._traced_retry(
+                                            handler, org_id, job_collection, job_id, job_data, payload)
                                         stats["retried"] += 1
                                         logger.info(f"Retried job {job_id} in {org_id}/{job_collection}")
                                     except Exception as e:
@@ -149,7 +171,7 @@ class TaskQueueRecovery:
                             retry_count = job_data.get("retryCount", 0)
                             job_id = job_doc.id
 
-                            if retry_count < TaskQueueRecovery.MAX_RETRIES and retry_fn:
+                            if retry_count < TaskQueueRecovery.MAX_RETRIES and handler:
                                 try:
                                     job_doc.reference.update({
                                         "status": "retrying",
@@ -157,7 +179,8 @@ class TaskQueueRecovery:
                                         "updatedAt": datetime.now(timezone.utc),
                                     })
                                     payload = job_data.get("payload", {})
-                                    await retry_fn(org_id, job_collection, job_id, payload)
+                                    await TaskQueueRecovery._traced_retry(
+                                        handler, org_id, job_collection, job_id, job_data, payload)
                                     stats["retried"] += 1
                                 except Exception as e:
                                     job_doc.reference.update({
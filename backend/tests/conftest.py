@@ -36,3 +36,15 @@ def clean_dependency_overrides():
     from app.main import app
     yield
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_inprocess_caches():
+    """In-process L1 caches and provider circuit breakers are module-level; isolate them between tests."""
+    from core.result_cache import clear_all_caches
+    from core.circuit_breaker import circuit_breakers
+    clear_all_caches()
+    circuit_breakers.reset()
+    yield
+    clear_all_caches()
+    circuit_breakers.reset()
@@ -0,0 +1,192 @@
+"""
+Tests for resumable batch jobs.
+Covers: per-prompt checkpoints (with their usage-ledger entries), resume through the recovery sweep,
+summary-only job docs with a cursor-paginated, projected status API, and the post-ingestion Auto-Pilot audit.
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from fastapi import BackgroundTasks
+from fastapi.testclient import TestClient
+
+from app.main import app
+from api import batch_analysis
+from api import simulation as sim
+from api.batch_planner import BatchPlanner, _SharedContext, checkpoint_key
+from core.manifest_index import ManifestIndex, manifest_index_registry
+from core.provider_gateway import Priority, current_priority
+from utils import task_queue, task_queue_recovery
+from utils.task_queue import FirestoreTaskQueue
+from utils.task_queue_recovery import TaskQueueRecovery
+
+
+def test_checkpoint_writes_result_set_member_and_ledger_atomically(monkeypatch):
+    mock_db = MagicMock()
+    monkeypatch.setattr(task_queue, "db", mock_db)
+    ledger_ref = MagicMock()
+
+    assert FirestoreTaskQueue.checkpoint_result("org_1", "batchJobs", "job_1", "k1", {"prompt": "p"},
+                                                [(ledger_ref, {"source": "batch"})])
+
+    batch = mock_db.batch.return_value
+    batch.commit.assert_called_once()
+    assert batch.set.call_args_list[-1].args == (ledger_ref, {"source": "batch"})
+    job_update = batch.update.call_args.args[1]
+    assert job_update["completedPrompts"].values == ["k1"]
+
+
+@pytest.mark.asyncio
+async def test_retried_batch_runs_only_unfinished_prompts(monkeypatch):
+    checkpoints, ledger, updates = {}, [], []
+    monkeypatch.setattr(task_queue, "db", MagicMock())
+    ledger_db = MagicMock()
+    ledger_db.collection.return_value.document.return_value.collection.return_value.document.side_effect = str
+    monkeypatch.setattr(batch_analysis, "db", ledger_db)
+
+    def checkpoint_result(org_id, collection, job_id, key, result, extra_writes=None):
+        checkpoints[key] = dict(result)
+        ledger.extend(extra_writes or [])
+        return True
+
+    def update_job(org_id, collection, job_id, status, result=None, error=None):
+        updates.append((status, result))
+
+    monkeypatch.setattr(FirestoreTaskQueue, "checkpoint_result", staticmethod(checkpoint_result))
+    monkeypatch.setattr(FirestoreTaskQueue, "load_checkpoints", staticmethod(lambda *a: dict(checkpoints)))
+    monkeypatch.setattr(FirestoreTaskQueue, "update_job", staticmethod(update_job))
+
+    simulated, crash_after = [], 3
+
+    async def run_unique(self, requests):
+        results = []
+        for request in requests:
+            if len(simulated) == crash_after:
+                raise RuntimeError("instance terminated")
+            simulated.append(request.prompt)
+            result = {"prompt": request.prompt, "results": [{"model": "m", "accuracy": 80}]}
+            await self._emit(request, result)
+            results.append(result)
+        return results
+
+    monkeypatch.setattr(BatchPlanner, "_run_unique", run_unique)
+    prompts = [f"prompt {i}" for i in range(6)] + ["Prompt 1"]
+    request = batch_analysis.BatchSimulationRequest(prompts=prompts, orgId="org_1", requestId="job_1")
+
+    await batch_analysis._process_batch_background(request, "job_1")
+    assert len(checkpoints) == 3
+    assert len(ledger) == 4  # "prompt 1" appears twice, so its checkpoint bills two occurrences
+
+    # The instance died mid-batch: the sweep finds the stale job and resumes it through the batchJobs handler
+    crash_after = None
+    stalled = MagicMock(id="job_1")
+    stalled.to_dict.return_value = {"status": "processing", "retryCount": 0, "payload": request.model_dump()}
+    recovery_db = MagicMock()
+    recovery_db.collection.return_value.select.return_value.stream.return_value = [MagicMock(id="org_1")]
+    jobs = recovery_db.collection.return_value.document.return_value.collection.return_value
+    jobs.where.side_effect = lambda field, op, status: MagicMock(
+        stream=MagicMock(return_value=[stalled] if status == "processing" else []))
+    monkeypatch.setattr(task_queue_recovery, "db", recovery_db)
+    monkeypatch.setattr(TaskQueueRecovery, "JOB_COLLECTIONS", ["batchJobs"])
+
+    stats = await TaskQueueRecovery.sweep_stalled_jobs()
+    assert stats["retried"] == 1
+    assert simulated == [f"prompt {i}" for i in range(6)]
+    status, result = updates[-1]
+    assert status == "completed" and result["status"] == "completed"
+    assert "results" not in result and (result["promptCount"], result["failedPrompts"]) == (7, 0)
+    stored = sorted(checkpoints.values(), key=lambda doc: doc["index"])
+    assert [(doc["prompt"], doc["occurrences"]) for doc in stored][:2] == [("prompt 0", 1), ("prompt 1", 2)]
+    assert result["planner"]["resumed"] == 4
+    assert len({doc_id for doc_id, _ in ledger}) == len(ledger) == 7
+    assert set(checkpoints) == {checkpoint_key(p) for p in prompts}
+
+
+def test_status_pages_results_with_projection(monkeypatch):
+    from core.security import get_auth_context
+
+    job = MagicMock(exists=True)
+    job.to_dict.side_effect = lambda: {"status": "completed", "result": {"domainStability": 81.0, "status": "completed"}}
+    mock_db = MagicMock()
+    job_ref = mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value
+    job_ref.get.return_value = job
+    query = job_ref.collection.return_value.order_by.return_value
+    query.select.return_value = query
+    query.start_after.return_value = query
+    docs = [MagicMock(id=f"k{i}", **{"to_dict.return_value": {"index": i, "prompt": f"p{i}"}}) for i in range(3)]
+    query.limit.return_value.stream.return_value = docs
+    monkeypatch.setattr(batch_analysis, "db", mock_db)
+    monkeypatch.setattr(task_queue, "db", mock_db)
+    monkeypatch.setattr(batch_analysis, "verify_user_org_access", lambda uid, org_id: True)
+    app.dependency_overrides[get_auth_context] = lambda: {"uid": "user_1"}
+    client = TestClient(app, base_url="http://localhost")
+
+    body = client.get("/api/batch/batch/status/org_1/job_1?limit=2&fields=prompt").json()
+    assert [r["prompt"] for r in body["results"]] == ["p0", "p1"] and body["nextCursor"] == 1
+    assert body["result"]["results"] == body["results"]  # first page mirrored for existing pollers
+    assert "payload" not in job_ref.get.call_args.kwargs["field_paths"]
+    query.select.assert_called_with(["index", "prompt"])
+    query.limit.assert_called_with(3)
+
+    body = client.get("/api/batch/batch/status/org_1/job_1?cursor=1&limit=2").json()
+    query.start_after.assert_called_with({"index": 1})
+    assert "results" not in body["result"]
+    assert client.get("/api/batch/batch/status/org_1/job_1?fields=prompt,__name__%3D").status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_autopilot_audit_runs_in_background_from_the_primed_index(monkeypatch):
+    registered, extras, plans, seen = [], [], [], {}
+    monkeypatch.setattr(FirestoreTaskQueue, "register_job", staticmethod(lambda *a: registered.append(a)))
+    monkeypatch.setattr(FirestoreTaskQueue, "load_checkpoints", staticmethod(lambda *a: {}))
+    monkeypatch.setattr(FirestoreTaskQueue, "update_job", staticmethod(lambda *a, **k: None))
+    monkeypatch.setattr(FirestoreTaskQueue, "checkpoint_result", staticmethod(
+        lambda org, coll, job, key, result, extra=None: extras.extend(extra) or True))
+    history_db = MagicMock()
+    history_db.collection.return_value.document.return_value.collection.side_effect = \
+        lambda name: MagicMock(document=lambda doc_id: f"{name}/{doc_id}")
+    monkeypatch.setattr(batch_analysis, "db", history_db)
+
+    # Shared setup, prompt embeddings, inference and scoring are stubbed; retrieval is the real one
+    models = sim._ModelSetup(api_keys={"openai": "sk-test"}, model_specs=[], gemini_api_model=None, locked_models=[])
+    shared = _SharedContext("growth", {}, "manifest_abc", "manifest_abc", "full manifest", None, models, False)
+    monkeypatch.setattr(BatchPlanner, "_load_shared", AsyncMock(return_value=shared))
+    monkeypatch.setattr(BatchPlanner, "_embed_prompts",
+                        AsyncMock(side_effect=lambda requests, shared: [[0.0, 1.0] for _ in requests]))
+    sim_db = MagicMock()
+    sim_db.get_all.return_value = []
+    monkeypatch.setattr(sim, "db", sim_db)
+    chunks_ref = sim_db.collection.return_value.document.return_value.collection.return_value \
+        .document.return_value.collection.return_value
+
+    def build_graph(plan):
+        plans.append(plan)
+        seen.update(priority=current_priority())
+        outputs = {"blend": [{"model": "m", "accuracy": 80, "hasHallucination": False}], "claims": [],
+                   "adjudicate": None}
+        return MagicMock(run=AsyncMock(return_value=outputs))
+
+    monkeypatch.setattr(sim, "_build_simulation_graph", build_graph)
+
+    # Ingestion primed the index with the vectors it just built: retrieval never reads the chunks
+    manifest_index_registry.put("org_1", "manifest_abc", ManifestIndex(["chunk a", "chunk b"], [[1.0, 0.0], [0.0, 1.0]]))
+    tasks = BackgroundTasks()
+    prompts = ["best crm for enterprise sales teams", "top enterprise billing platforms 2024"]
+
+    assert batch_analysis.enqueue_autopilot_audit("org_1", "manifest_abc", prompts, "explorer", tasks) is None
+    job_id = batch_analysis.enqueue_autopilot_audit("org_1", "manifest_abc", prompts, "Growth", tasks)
+    assert job_id == "autopilot_manifest_abc" and len(tasks.tasks) == 1
+    assert registered[0][3]["source"] == "autopilot"
+
+    await tasks()
+    assert seen == {"priority": Priority.BACKGROUND}
+    assert len(plans) == 2
+    assert all(plan.manifest_version == "manifest_abc" and plan.retrieved_context.startswith("chunk b")
+               for plan in plans)
+    chunks_ref.get.assert_not_called()
+    chunks_ref.stream.assert_not_called()
+    history = {ref: doc for ref, doc in extras if ref.startswith("scoringHistory/")}
+    assert set(history) == {f"scoringHistory/autopilot_{job_id}_{checkpoint_key(p)}" for p in prompts}
+    assert all(doc["version"] == "manifest_abc" and doc["source"] == "autopilot" for doc in history.values())
+    # The audit is not billed: no usage-ledger entries count against the monthly quota
+    assert not [ref for ref, doc in extras if ref.startswith("usageLedger/")]
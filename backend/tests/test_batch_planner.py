@@ -0,0 +1,67 @@
+"""
+Tests for the batch planner.
+Covers: prompt dedupe, one shared setup / cache read / embeddings request per batch, bounded parallelism, error isolation.
+"""
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.main import app  # noqa: F401  (puts `api.*` on the path)
+from api import batch_planner
+from api import simulation as sim
+from api.batch_planner import BatchPlanner, _SharedContext
+
+
+def _shared():
+    models = sim._ModelSetup(api_keys={"openai": "sk-test"}, model_specs=[], gemini_api_model=None, locked_models=[])
+    return _SharedContext("growth", {}, "v1", "v1", "manifest", None, models, True)
+
+
+@pytest.mark.asyncio
+async def test_batch_shares_setup_cache_read_and_embeddings_with_bounded_workers(monkeypatch):
+    cached_prompt = "What does Acme sell?"
+    cached_key = sim._simulation_cache_key("org_1", cached_prompt, "v1")
+    cached = MagicMock(id=cached_key, exists=True)
+    cached.to_dict.return_value = {
+        "prompt": cached_prompt, "version": "v1", "timestamp": datetime.now(timezone.utc),
+        "results": [{"model": m, "accuracy": 90} for m in ("a", "b", "c")],
+    }
+    mock_db = MagicMock()
+    mock_db.get_all.side_effect = lambda refs: [cached] + [MagicMock(exists=False) for _ in refs[1:]]
+    monkeypatch.setattr(sim, "db", mock_db)
+
+    load_shared = AsyncMock(return_value=_shared())
+    monkeypatch.setattr(BatchPlanner, "_load_shared", load_shared)
+    monkeypatch.setattr(sim, "_openai_client", MagicMock())
+    embed = AsyncMock(side_effect=lambda client, texts: [[1.0, 0.0]] * len(texts))
+    monkeypatch.setattr(batch_planner, "embed_texts", embed)
+
+    running, peak = 0, 0
+
+    async def simulate(self, request, cache_key, q_embed, shared):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if request.prompt == "prompt 7":
+            raise RuntimeError("provider down")
+        return {"prompt": request.prompt, "results": [], "version": shared.manifest_version}
+
+    monkeypatch.setattr(BatchPlanner, "_simulate", simulate)
+
+    prompts = [cached_prompt] + [f"prompt {i}" for i in range(20)] + ["  PROMPT 3 ", ""]
+    outcomes, stats = await batch_planner.run_batch_prompts("org_1", prompts, parallelism=4)
+
+    assert load_shared.await_count == 1
+    assert mock_db.get_all.call_count == 1
+    assert embed.await_count == 1 and len(embed.await_args[0][1]) == 20
+    assert peak == 4
+    assert stats["uniquePrompts"] == 21 and stats["cacheHits"] == 1 and stats["simulated"] == 20
+    assert outcomes[0]["cached"] is True
+    assert isinstance(outcomes[8], RuntimeError) and outcomes[9]["prompt"] == "prompt 8"
+    assert outcomes[21] == {**outcomes[4], "prompt": "PROMPT 3", "deduplicated": True}
+    assert isinstance(outcomes[22], ValueError)
+    assert stats["errors"] == 2
@@ -0,0 +1,201 @@
+"""
+Tests for offline bulk inference.
+Covers: a batch job submitted to local stand-in OpenAI / Anthropic batch servers, polled through
+inference and verification, then ingested, checkpointed and billed — with no gateway calls for inference,
+claims or verification.
+"""
+import json
+from functools import partial
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from app.main import app  # noqa: F401  (puts `api.*` on the path)
+from api import batch_analysis, bulk_simulation
+from api import simulation as sim
+from api.batch_planner import BatchPlanner, _SharedContext, checkpoint_key
+from core import bulk_inference
+from core.bulk_inference import AnthropicBulkAdapter, OpenAIBulkAdapter
+from core.bulk_jobs import InMemoryBulkJobStore
+from utils.task_queue import FirestoreTaskQueue
+
+
+class StandInBatchServer:
+    """Minimal OpenAI Batch + Anthropic Message Batches protocol; batches end when `finish()` is called."""
+
+    def __init__(self):
+        self.files, self.batches, self.requests = {}, {}, []
+        self.ended = False
+
+    def finish(self):
+        self.ended = True
+
+    def _answer(self, body_text: str, system: str) -> str:
+        if "POSITIONING ASSERTIONS" in body_text:
+            if "AI RESPONSES" in body_text:
+                labels = [line.strip("[]") for line in body_text.splitlines() if line.startswith("[answer_")]
+                return json.dumps({"answers": {label: [{"claim": "c1", "verdict": "visible"}] for label in labels}})
+            return json.dumps({"results": [{"claim": "c1", "verdict": "visible"}]})
+        if "extract the 5-6 strongest" in system:
+            return json.dumps({"claims": ["c1"]})
+        return f"Acme is a strong choice. ({body_text})"
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/v1/files" and request.method == "POST":
+            content = request.content.decode()
+            lines = [line for line in content.splitlines() if line.startswith("{")]
+            self.files[f"file-{len(self.files)}"] = lines
+            return httpx.Response(200, json={"id": f"file-{len(self.files) - 1}"})
+        if path == "/v1/batches":
+            batch_id = f"batch-{len(self.batches)}"
+            self.batches[batch_id] = {"input": json.loads(request.content)["input_file_id"]}
+            return httpx.Response(200, json={"id": batch_id, "status": "validating"})
+        if path.startswith("/v1/batches/"):
+            batch_id = path.rsplit("/", 1)[1]
+            if not self.ended:
+                return httpx.Response(200, json={"id": batch_id, "status": "in_progress"})
+            return httpx.Response(200, json={"id": batch_id, "status": "completed", "output_file_id": f"out-{batch_id}"})
+        if path.startswith("/v1/files/out-"):
+            batch_id = path.split("out-")[1].split("/")[0]
+            out = []
+            for line in self.files[self.batches[batch_id]["input"]]:
+                req = json.loads(line)
+                self.requests.append(("openai", req["custom_id"]))
+                messages = req["body"]["messages"]
+                text = self._answer(messages[1]["content"], messages[0]["content"])
+                out.append(json.dumps({"custom_id": req["custom_id"], "response": {"status_code": 200, "body": {
+                    "model": req["body"]["model"], "choices": [{"message": {"content": text}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5}}}}))
+            return httpx.Response(200, text="\n".join(out))
+        if path == "/v1/messages/batches":
+            batch_id = f"msgbatch-{len(self.batches)}"
+            self.batches[batch_id] = {"requests": json.loads(request.content)["requests"]}
+            return httpx.Response(200, json={"id": batch_id, "processing_status": "in_progress"})
+        if path.startswith("/v1/messages/batches/") and path.endswith("/results"):
+            batch_id = path.split("/")[-2]
+            out = []
+            for req in self.batches[batch_id]["requests"]:
+                self.requests.append(("anthropic", req["custom_id"]))
+                if req["custom_id"].startswith(checkpoint_key("Who leads retail analytics?")):
+                    out.append(json.dumps({"custom_id": req["custom_id"], "result": {"type": "errored",
+                                                                                     "error": {"type": "overloaded"}}}))
+                    continue
+                out.append(json.dumps({"custom_id": req["custom_id"], "result": {"type": "succeeded", "message": {
+                    "model": req["params"]["model"], "content": [{"type": "text", "text": "Acme, then others."}],
+                    "usage": {"input_tokens": 10, "output_tokens": 5}}}}))
+            return httpx.Response(200, text="\n".join(out))
+        if path.startswith("/v1/messages/batches/"):
+            batch_id = path.rsplit("/", 1)[1]
+            return httpx.Response(200, json={"id": batch_id,
+                                             "processing_status": "ended" if self.ended else "in_progress"})
+        return httpx.Response(404)
+
+
+def _shared():
+    specs = [("GPT-4o", partial(sim.run_openai, api_model="gpt-4o"), "sk-test"),
+             ("Claude 4.5 Sonnet", partial(sim.run_claude, api_model="claude-sonnet"), "sk-ant")]
+    models = sim._ModelSetup(api_keys={"openai": "sk-test", "anthropic": "sk-ant"}, model_specs=specs,
+                             gemini_api_model=None, locked_models=[])
+    return _SharedContext("growth", {}, "v1", "v1", "Acme sells retail analytics.", None, models, False)
+
+
+@pytest.mark.asyncio
+async def test_bulk_batch_runs_through_stand_in_servers_without_gateway_calls(monkeypatch):
+    server = StandInBatchServer()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server.handler))
+    monkeypatch.setattr(bulk_inference, "_adapters", {
+        "openai": OpenAIBulkAdapter("http://stand-in/v1", client),
+        "anthropic": AnthropicBulkAdapter("http://stand-in/v1", client),
+    })
+    store = InMemoryBulkJobStore()
+    monkeypatch.setattr(bulk_simulation, "get_bulk_job_store", lambda db: store)
+    monkeypatch.setattr(sim, "db", None)
+    monkeypatch.setattr(batch_analysis, "db", None)
+    monkeypatch.setattr(BatchPlanner, "_load_shared", AsyncMock(return_value=_shared()))
+    gateway = AsyncMock(side_effect=AssertionError("bulk mode must not call the gateway"))
+    monkeypatch.setattr(sim, "provider_call", gateway)
+    # Adjudication (Growth+, divergent scores only) stays a live call at ingest
+    adjudicate = AsyncMock(return_value=None)
+    monkeypatch.setattr(sim, "_adjudicate", adjudicate)
+    monkeypatch.setattr(sim, "compute_divergences",
+                        AsyncMock(side_effect=lambda key, emb, answers, context_text=None: {n: 0.2 for n in answers}))
+
+    checkpoints, updates = {}, []
+    monkeypatch.setattr(FirestoreTaskQueue, "load_checkpoints", staticmethod(lambda *a: dict(checkpoints)))
+    monkeypatch.setattr(FirestoreTaskQueue, "checkpoint_result", staticmethod(
+        lambda org, coll, job, key, result, extra=None: checkpoints.__setitem__(key, result) or True))
+    monkeypatch.setattr(FirestoreTaskQueue, "write_results", staticmethod(lambda org, coll, job, results: len(results)))
+    monkeypatch.setattr(FirestoreTaskQueue, "update_job", staticmethod(
+        lambda org, coll, job, status, result=None, error=None: updates.append((status, result))))
+    heartbeat = []
+    monkeypatch.setattr(FirestoreTaskQueue, "heartbeat", staticmethod(lambda *a: heartbeat.append(a)))
+
+    prompts = ["What does Acme sell?", "Who leads retail analytics?", "what does  ACME sell?"]
+    request = batch_analysis.BatchSimulationRequest(prompts=prompts, orgId="org_1", requestId="job_1", mode="bulk")
+    await batch_analysis._process_batch_background(request, "job_1")
+
+    job = store.get("batch_job_1")
+    assert job["status"] == "inference" and updates == [("processing", None)]
+    assert job["stats"]["bulkRequests"] == {"openai": 4, "anthropic": 2}  # 2 answers + 2 claim sets; 2 answers
+
+    # Still running at the provider: the poller only heartbeats the owning batch job
+    await bulk_simulation.poll_bulk_jobs(store)
+    assert store.get("batch_job_1")["status"] == "inference" and heartbeat
+
+    server.finish()
+    await bulk_simulation.poll_bulk_jobs(store)
+    await bulk_simulation.poll_bulk_jobs(store)
+
+    assert store.get("batch_job_1")["status"] == "completed"
+    verify_ids = [cid for provider, cid in server.requests if cid.endswith("-verify")]
+    assert verify_ids == [f"{checkpoint_key(prompts[0])}-verify"]  # one combined judge call; the errored prompt had one answer
+    gateway.assert_not_called()
+    assert adjudicate.await_count == 2
+
+    status, summary = updates[-1]
+    assert status == "completed" and summary["planner"]["mode"] == "bulk"
+    assert (summary["promptCount"], summary["failedPrompts"], summary["totalChecks"]) == (3, 0, 6)
+    full = checkpoints[checkpoint_key(prompts[0])]
+    assert full["occurrences"] == 2 and full["bulk"] is True
+    assert [r["accuracy"] for r in full["results"]] == [92.0, 92.0]
+    partial_result = checkpoints[checkpoint_key(prompts[1])]["results"]
+    assert partial_result[0]["claimResults"] and partial_result[1]["error"]
+
+
+@pytest.mark.asyncio
+async def test_interrupted_submission_resumes_without_resubmitting_accepted_batches(monkeypatch):
+    server = StandInBatchServer()
+    rejected = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/v1/messages/batches" and not rejected:
+            rejected.append(request)
+            return httpx.Response(500, json={"error": {"type": "api_error"}})
+        return server.handler(request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(bulk_inference, "_adapters", {
+        "openai": OpenAIBulkAdapter("http://stand-in/v1", client),
+        "anthropic": AnthropicBulkAdapter("http://stand-in/v1", client),
+    })
+    store = InMemoryBulkJobStore()
+    monkeypatch.setattr(sim, "db", None)
+    monkeypatch.setattr(BatchPlanner, "_load_shared", AsyncMock(return_value=_shared()))
+
+    job = await bulk_simulation.submit_bulk("org_1", ["What does Acme sell?"], kind="test", job_id="bulk_1",
+                                            store=store)
+
+    # Created before any provider call; OpenAI's accepted batch is kept when Anthropic fails
+    assert rejected and job["status"] == "submitting"
+    assert list(job["submissions"]) == ["openai"] and job["stepFailures"] == 1
+    assert list(server.batches) == ["batch-0"]
+
+    # A retry of the owner (or the next poll) submits only the provider that has no batch yet
+    job = await bulk_simulation.submit_bulk("org_1", ["What does Acme sell?"], kind="test", job_id="bulk_1",
+                                            store=store)
+    assert job["status"] == "inference"
+    assert sorted(server.batches) == ["batch-0", "msgbatch-1"]
+    assert job["submissions"]["openai"]["batchId"] == "batch-0"
+    assert job["submissions"]["anthropic"]["batchId"] == "msgbatch-1"
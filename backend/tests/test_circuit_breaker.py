@@ -0,0 +1,132 @@
+"""
+Tests for per-model provider circuit breakers.
+Covers: closed → open → half-open → closed transitions, fail-fast in the gateway, claim-call fallback.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core import provider_gateway as pg
+from core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeOverloaded(Exception):
+    status_code = 529
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_probes_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker("gemini", "flash", failure_threshold=3, open_seconds=30, clock=clock)
+    for _ in range(3):
+        assert breaker.before_call() is False
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one probe in flight
+
+    # Failed probe re-opens with a doubled cooldown
+    breaker.record_failure(probe=True)
+    assert breaker.state == OPEN
+    clock.now += 30
+    assert breaker.state == OPEN
+    clock.now += 30
+    assert breaker.before_call() is True
+    breaker.record_success(probe=True)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["opened"] == 2
+
+
+@pytest.mark.asyncio
+async def test_gateway_fails_fast_while_open(monkeypatch):
+    monkeypatch.setattr(pg, "PROVIDER_RETRY_BASE_SECONDS", 0.0)
+    gateway = pg.ProviderGateway()
+    calls = []
+
+    async def overloaded():
+        calls.append(1)
+        raise FakeOverloaded()
+
+    # Each call is one outcome however often it retried: 5 failed calls trip the breaker
+    for _ in range(5):
+        with pytest.raises(FakeOverloaded):
+            await gateway.call("anthropic", "k", overloaded, retries=1, model="claude-x")
+    assert len(calls) == 10
+    with pytest.raises(CircuitOpenError):
+        await gateway.call("anthropic", "other-key", overloaded, model="claude-x")
+    assert len(calls) == 10
+    assert gateway.limiter("anthropic", "k").in_flight == 0
+    assert gateway.stats()["circuitBreakers"]["anthropic/claude-x"]["state"] == OPEN
+
+    # Other models of the same provider are unaffected
+    assert await gateway.call("anthropic", "k", AsyncMock(return_value="ok"), model="claude-y") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_one_keys_rate_limits_do_not_open_the_shared_breaker(monkeypatch):
+    monkeypatch.setattr(pg, "PROVIDER_RETRY_BASE_SECONDS", 0.0)
+    gateway = pg.ProviderGateway()
+
+    class FakeRateLimited(Exception):
+        status_code = 429
+
+    async def rate_limited():
+        raise FakeRateLimited()
+
+    for _ in range(10):
+        with pytest.raises(FakeRateLimited):
+            await gateway.call("openai", "tenant-key", rate_limited, retries=2, model="gpt-x")
+    assert gateway.stats()["circuitBreakers"]["openai/gpt-x"]["state"] == CLOSED
+    assert await gateway.call("openai", "other-key", AsyncMock(return_value="ok"), model="gpt-x") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_claim_call_falls_back_to_gemini_when_openai_open():
+    from api import simulation
+    from core.circuit_breaker import circuit_breakers
+    from core.model_config import OPENAI_CLAIM_MODEL
+
+    breaker = circuit_breakers.get("openai", OPENAI_CLAIM_MODEL)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    openai_client = MagicMock()
+    openai_client.chat.completions.create = AsyncMock()
+    gemini_client = MagicMock()
+    gemini_client.aio.models.generate_content = AsyncMock(return_value=MagicMock(text='{"claims": ["C1"]}'))
+
+    with patch.object(simulation, "_openai_client", return_value=openai_client), \
+         patch.object(simulation, "_gemini_client", return_value=gemini_client), \
+         patch.object(simulation, "GEMINI_AVAILABLE", True):
+        claims = await simulation.extract_claims("ctx", "q", {"openai": "sk", "gemini": "g"})
+        assert claims == ["C1"]
+        openai_client.chat.completions.create.assert_not_called()
+
+        with pytest.raises(CircuitOpenError):
+            await simulation._claim_json_call("sys", "user", {"openai": "sk"})
+
+
+def test_health_reports_breaker_state():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from core.circuit_breaker import circuit_breakers
+
+    breaker = circuit_breakers.get("gemini", "gemini-test")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    body = TestClient(app, base_url="http://localhost").get("/api/health").json()
+    assert body["providers"]["degraded"] == ["gemini/gemini-test"]
+    assert body["providers"]["circuitBreakers"]["gemini/gemini-test"]["state"] == OPEN
@@ -0,0 +1,144 @@
+"""
+Tests for sharded scheduled crawl runs.
+Covers: shard claims across instances under the global cap, per-org checkpoints and resume, progress doc,
+fingerprint change detection (sample re-check of unchanged orgs, full recompute on drift).
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.main import app  # noqa: F401  (puts `api.*` on the path)
+from api import batch_analysis
+from core.crawl_runs import InMemoryCrawlRunStore, plan_claim, plan_release, plan_shards, new_run_state
+
+
+@pytest.mark.asyncio
+async def test_instances_share_shards_under_global_cap_and_crawl_each_org_once(monkeypatch):
+    store = InMemoryCrawlRunStore()
+    org_ids = [f"org_{i}" for i in range(23)]
+    store.create_run("run_1", plan_shards(org_ids + ["org_0"], 5))
+    monkeypatch.setattr(batch_analysis, "CRAWL_MAX_ACTIVE_SHARDS", 2)
+
+    crawled, active, peak = [], set(), 0
+
+    async def crawl_org(org_id):
+        nonlocal peak
+        crawled.append(org_id)
+        active.add(org_id)
+        peak = max(peak, len(active))
+        await asyncio.sleep(0.01)
+        active.discard(org_id)
+        if org_id == "org_7":
+            return {"orgId": org_id, "status": "error", "error": "provider down"}
+        return {"orgId": org_id, "status": "skipped" if org_id == "org_9" else "success"}
+
+    monkeypatch.setattr(batch_analysis, "_crawl_org", crawl_org)
+    monkeypatch.setattr(batch_analysis, "SCHEDULED_CRAWL_CONCURRENCY", 3)
+
+    shards = await asyncio.gather(*[batch_analysis._work_crawl_run("run_1", store, holder=f"instance-{i}")
+                                    for i in range(3)])
+
+    assert sorted(crawled) == sorted(org_ids)
+    assert sum(shards) == 5
+    assert peak <= 2 * 3  # active shards x per-shard concurrency
+    run = store.get_run("run_1")
+    assert run["status"] == "completed"
+    progress = run["progress"]
+    assert (progress["orgsSucceeded"], progress["orgsFailed"], progress["orgsSkipped"]) == (21, 1, 1)
+    assert progress["shardsDone"] == 5 and progress["failures"] == [
+        {"orgId": "org_7", "shardId": "shard-0001", "error": "provider down"}]
+    # A completed run has nothing left to claim
+    assert await batch_analysis._work_crawl_run("run_1", store) == 0
+
+
+@pytest.mark.asyncio
+async def test_expired_claim_is_resumed_from_checkpoints(monkeypatch):
+    store = InMemoryCrawlRunStore()
+    store.create_run("run_1", plan_shards(["a", "b", "c", "d"], 4))
+
+    # An instance claims the shard, checkpoints two orgs and dies (its zero-length lease is already expired)
+    claim = store.claim("run_1", "crashed", ttl=0.0, max_active=1)
+    store.checkpoint("run_1", claim.shard_id, "a", {"status": "success"})
+    store.checkpoint("run_1", claim.shard_id, "b", {"status": "error", "error": "timeout"})
+
+    crawled = []
+
+    async def crawl_org(org_id):
+        crawled.append(org_id)
+        return {"orgId": org_id, "status": "success"}
+
+    monkeypatch.setattr(batch_analysis, "_crawl_org", crawl_org)
+    assert await batch_analysis._work_crawl_run("run_1", store, holder="rerun") == 1
+    assert crawled == ["c", "d"]
+
+    run = store.get_run("run_1")
+    assert run["shards"]["shard-0000"]["attempts"] == 2
+    assert (run["progress"]["orgsSucceeded"], run["progress"]["orgsFailed"]) == (3, 1)
+    # The crashed holder cannot release (and double count) the shard it lost
+    assert store.release("run_1", claim.shard_id, "crashed", {"a": {"status": "success"}})["progress"] == run["progress"]
+
+
+def test_claims_respect_global_cap_until_leases_expire():
+    state = new_run_state(plan_shards([f"o{i}" for i in range(6)], 2), now=0.0)
+    state, first = plan_claim(state, 1.0, "a", 10.0, max_active=2)
+    state, second = plan_claim(state, 1.0, "b", 10.0, max_active=2)
+    state, third = plan_claim(state, 2.0, "c", 10.0, max_active=2)
+    assert (first, second, third) == ("shard-0000", "shard-0001", None)
+    state, reclaimed = plan_claim(state, 20.0, "c", 10.0, max_active=2)
+    assert reclaimed == "shard-0000" and state["progress"]["shardsActive"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unchanged_org_is_sample_checked_and_drift_forces_full_recompute(monkeypatch):
+    mock_db = MagicMock()
+    org = mock_db.collection.return_value.document.return_value
+    org.get.return_value = MagicMock(exists=True, **{"to_dict.return_value": {
+        "name": "Acme", "subscription": {"planId": "growth"}}})
+    snapshots = org.collection.return_value
+    latest = []
+    snapshots.order_by.return_value.limit.return_value.stream.side_effect = lambda: iter(latest)
+    monkeypatch.setattr(batch_analysis, "db", mock_db)
+    monkeypatch.setattr(batch_analysis.sim, "_resolve_manifest_version", lambda org_id, version: "v3")
+
+    accuracy, ran = 80.0, []
+
+    async def run_batch_prompts(org_id, prompts, *args, **kwargs):
+        ran.extend(prompts)
+        return [{"prompt": p, "results": [{"model": "m", "accuracy": accuracy}]} for p in prompts], {}
+
+    monkeypatch.setattr(batch_analysis, "run_batch_prompts", run_batch_prompts)
+
+    first = await batch_analysis._crawl_org("org_1")
+    full = snapshots.add.call_args.args[0]
+    assert (first["mode"], first["promptsRun"], len(ran)) == ("full", 5, 5)
+    assert full["fingerprint"] and len(full["promptScores"]) == 5
+
+    # Nothing changed: one rotating prompt is re-scored and the snapshot carried forward
+    ran.clear()
+    latest[:] = [MagicMock(**{"to_dict.return_value": full})]
+    second = await batch_analysis._crawl_org("org_1")
+    carried = snapshots.add.call_args.args[0]
+    assert (second["mode"], second["promptsRun"], second["promptsSkipped"], len(ran)) == ("sampled", 1, 4, 1)
+    assert carried["computedAt"] == full["computedAt"] and carried["domainStability"] == full["domainStability"]
+
+    # The sample drifted past the tolerance: full recompute, without scoring the sampled prompt twice
+    ran.clear()
+    accuracy = 60.0
+    third = await batch_analysis._crawl_org("org_1")
+    assert third["mode"] == "full" and len(ran) == len(set(ran)) == 5
+    assert snapshots.add.call_args.args[0]["domainStability"] == 60.0
+
+    # A new manifest version changes the fingerprint: no sample, straight to a full recompute
+    ran.clear()
+    latest[:] = [MagicMock(**{"to_dict.return_value": snapshots.add.call_args.args[0]})]
+    monkeypatch.setattr(batch_analysis.sim, "_resolve_manifest_version", lambda org_id, version: "v4")
+    assert (await batch_analysis._crawl_org("org_1"))["mode"] == "full" and len(ran) == 5
+
+    state = new_run_state(plan_shards(["a", "b"], 2), now=0.0)
+    state, shard_id = plan_claim(state, 1.0, "h", 10.0, max_active=1)
+    state = plan_release(state, shard_id, "h", {
+        "a": {"status": "success", "mode": "sampled", "promptsRun": 1, "promptsSkipped": 4},
+        "b": {"status": "success", "mode": "full", "promptsRun": 5, "promptsSkipped": 0}}, 2.0)
+    progress = state["progress"]
+    assert (progress["orgsSampled"], progress["promptsSkipped"], progress["promptsSkippedPct"]) == (1, 4, 40.0)
@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core import embedding_cache as ec
+
+
+def _fake_client():
+    async def fake_create(input, model):
+        return MagicMock(data=[MagicMock(embedding=[float(len(text)), 1.0]) for text in input])
+    client = MagicMock()
+    client.embeddings.create = AsyncMock(side_effect=fake_create)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_repeat_texts_are_served_from_cache():
+    client = _fake_client()
+    first = await ec.embed_texts(client, ["ctx block", "answer", "ctx block"])
+    assert client.embeddings.create.await_count == 1
+    # Duplicates inside one call are only sent once
+    assert client.embeddings.create.await_args.kwargs["input"] == ["ctx block", "answer"]
+    assert first[0] == first[2] == [9.0, 1.0]
+
+    again = await ec.embed_texts(client, ["answer", "ctx block"])
+    assert client.embeddings.create.await_count == 1
+    assert again == [first[1], first[0]]
+
+    await ec.embed_texts(client, ["ctx block", "new"])
+    assert client.embeddings.create.await_args.kwargs["input"] == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_cache_is_keyed_by_model():
+    client = _fake_client()
+    await ec.embed_text(client, "same text", model="model-a")
+    await ec.embed_text(client, "same text", model="model-b")
+    assert client.embeddings.create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_disk_l2_survives_l1_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(ec, "_l2_store", ec.DiskEmbeddingStore(str(tmp_path)))
+    client = _fake_client()
+    vec = await ec.embed_text(client, "persisted")
+    ec.embedding_cache.clear()
+
+    assert await ec.embed_text(client, "persisted") == vec
+    assert client.embeddings.create.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_short_response_raises_and_caches_nothing():
+    client = MagicMock()
+    client.embeddings.create = AsyncMock(return_value=MagicMock(data=[MagicMock(embedding=[1.0])]))
+    with pytest.raises(ValueError):
+        await ec.embed_texts(client, ["a", "b"])
+    assert ec.embedding_cache.stats()["entries"] == 0
+
+
+def test_firestore_l2_writes_in_chunks_under_the_batch_limit():
+    db = MagicMock()
+    batches = []
+    db.batch.side_effect = lambda: batches.append(MagicMock()) or batches[-1]
+    store = ec.FirestoreEmbeddingStore(db)
+    store.set_many({("m", f"h{i}"): [0.0, 1.0] for i in range(901)})
+    assert [b.set.call_count for b in batches] == [400, 400, 101]
+    assert all(b.commit.call_count == 1 for b in batches)
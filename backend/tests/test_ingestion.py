@@ -85,3 +85,55 @@ def test_process_markdown(mock_db, mock_openai, mock_verify):
         files={"file": ("test.pdf", b"dummy pdf content", "application/pdf")}
     )
     assert response.status_code == 403, response.text
+
+
+@pytest.mark.parametrize("plan, queued", [("growth", True), ("explorer", False)])
+def test_parse_primes_manifest_index_and_queues_autopilot(monkeypatch, plan, queued):
+    """A successful /parse primes the retrieval index after the cache invalidation and queues
+    the Auto-Pilot audit only for plans with batch analysis."""
+    from api import batch_analysis, ingestion
+
+    mock_db = MagicMock()
+    org_doc = MagicMock(exists=True)
+    org_doc.to_dict.side_effect = lambda: {"name": "Acme", "subscription": {"planId": plan},
+                                           "apiKeys": {"openai": "sk-org"}}
+    mock_db.collection.return_value.document.return_value.get.return_value = org_doc
+    mock_db.collection.return_value.document.return_value.collection.return_value.limit.return_value \
+        .get.return_value = []
+    monkeypatch.setattr(ingestion, "db", mock_db)
+    monkeypatch.setattr(ingestion, "verify_user_org_access", lambda uid, org: True)
+    monkeypatch.setattr(ingestion, "get_openai_client", lambda key, factory: MagicMock())
+    monkeypatch.setattr(ingestion, "embed_texts",
+                        AsyncMock(side_effect=lambda client, texts: [[1.0, 0.0] for _ in texts]))
+    monkeypatch.setattr(ingestion, "embed_text", AsyncMock(return_value=[0.1, 0.2]))
+    monkeypatch.setattr(ingestion, "classify_industry_taxonomy", AsyncMock(return_value=("Software", ["crm"])))
+    completions = [MagicMock(choices=[MagicMock(message=MagicMock(content=text))])
+                   for text in ('{"name": "Acme"}', "# Acme - AI Protocol Manifest")]
+    monkeypatch.setattr(ingestion, "provider_call", AsyncMock(side_effect=completions))
+    monkeypatch.setattr(ingestion, "log_audit_event", MagicMock())
+    order = MagicMock()
+    monkeypatch.setattr(ingestion, "invalidate_org_caches", order.invalidate_org_caches)
+    monkeypatch.setattr(ingestion, "manifest_index_registry", order.manifest_index_registry)
+    registered = []
+    monkeypatch.setattr(batch_analysis.FirestoreTaskQueue, "register_job",
+                        staticmethod(lambda *a: registered.append(a)))
+    background = AsyncMock()
+    monkeypatch.setattr(batch_analysis, "_process_batch_background", background)
+
+    response = client.post(
+        "/api/ingestion/parse",
+        headers={"Authorization": "Bearer mock-dev-token"},
+        data={"orgId": "test_org"},
+        files={"file": ("test.pdf", b"dummy pdf content", "application/pdf")}
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert [c[0] for c in order.mock_calls] == ["invalidate_org_caches", "manifest_index_registry.put"]
+    org_id, version, index = order.manifest_index_registry.put.call_args.args
+    assert (org_id, version) == ("test_org", body["version"]) and len(index) >= 1
+    if queued:
+        assert body["autoPilotJobId"] == f"autopilot_{body['version']}"
+        assert registered[0][2] == body["autoPilotJobId"] and background.await_count == 1
+    else:
+        assert body["autoPilotJobId"] is None and not registered and background.await_count == 0
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+
+from core.manifest_index import ManifestIndex, ManifestIndexRegistry
+
+
+def _chunk_docs(embeddings):
+    docs = []
+    for i, emb in enumerate(embeddings):
+        doc = MagicMock()
+        doc.to_dict.return_value = {"text": f"chunk-{i}", "embedding": list(emb), "index": i}
+        docs.append(doc)
+    return docs
+
+
+def test_search_matches_brute_force_beyond_first_50_chunks():
+    rng = np.random.default_rng(7)
+    embeddings = rng.normal(size=(300, 64)).astype(np.float32)
+    index = ManifestIndex.from_chunk_docs(_chunk_docs(embeddings))
+    query = embeddings[250] + 0.01 * rng.normal(size=64)
+
+    sims = embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+    expected = [f"chunk-{i}" for i in np.argsort(-sims)[:5]]
+
+    results = index.search(query, k=5)
+    assert [text for _, text in results] == expected
+    assert results[0][1] == "chunk-250"
+    assert results[0][0] >= results[-1][0]
+
+
+def test_dimension_mismatch_and_empty_index_return_nothing():
+    index = ManifestIndex.from_chunk_docs(_chunk_docs(np.eye(3)))
+    assert index.search([1.0, 0.0], k=2) == []
+    assert ManifestIndex.from_chunk_docs([]).search([1.0, 0.0, 0.0]) == []
+
+
+@pytest.mark.asyncio
+async def test_registry_loads_once_and_evicts_whole_manifests():
+    small = ManifestIndex.from_chunk_docs(_chunk_docs(np.eye(4)))
+    registry = ManifestIndexRegistry(max_bytes=small.nbytes * 2)
+
+    chunks_ref = MagicMock()
+    chunks_ref.get.return_value = _chunk_docs(np.eye(4))
+    first = await registry.get_or_load("org_1", "v1", chunks_ref)
+    again = await registry.get_or_load("org_1", "v1", chunks_ref)
+    assert first is again
+    assert chunks_ref.get.call_count == 1
+
+    registry.put("org_1", "v2", small)
+    registry.put("org_2", "v1", small)
+    assert registry.get("org_1", "v1") is None  # least recently used manifest dropped whole
+    assert registry.stats()["manifests"] == 2
+
+    assert registry.invalidate_org("org_1") == 1
+    assert registry.get("org_2", "v1") is small
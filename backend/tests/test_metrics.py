@@ -0,0 +1,74 @@
+"""
+Tests for the Prometheus metrics subsystem.
+Covers: per-thread counter shards, histogram exposition, multi-worker snapshot merging, `/metrics`.
+"""
+import threading
+
+from fastapi.testclient import TestClient
+
+from core import metrics
+
+
+def test_counters_sum_thread_shards_and_histograms_render_cumulative():
+    registry = metrics.MetricsRegistry()
+    calls = registry.counter("t_calls_total", "calls", ("kind",))
+    latency = registry.histogram("t_latency_seconds", "latency", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            calls.inc("a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    assert calls.value("a") == 4000
+    text = metrics.render(registry.collect())
+    assert 't_calls_total{kind="a"} 4000' in text
+    assert 't_latency_seconds_bucket{le="0.1"} 2' in text
+    assert 't_latency_seconds_bucket{le="1"} 3' in text
+    assert 't_latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "t_latency_seconds_count 4" in text
+
+
+def test_worker_snapshots_merge_counters_and_drop_stale_gauges():
+    def snapshot(written_at, requests, in_flight, lag):
+        return {"writtenAt": written_at, "families": {
+            "req_total": {"type": "counter", "help": "", "samples": [[{"route": "/x"}, requests]]},
+            "in_flight": {"type": "gauge", "mode": "sum", "help": "", "samples": [[{}, in_flight]]},
+            "lag": {"type": "gauge", "mode": "max", "help": "", "samples": [[{}, lag]]},
+            "lat": {"type": "histogram", "help": "", "buckets": [1.0], "samples": [[{}, [1, 0, 0.5, 1]]]},
+        }}
+
+    now = 10_000.0
+    merged = metrics.merge_snapshots([
+        snapshot(now - 1, 5, 2, 0.01),
+        snapshot(now - 2, 7, 3, 0.20),
+        snapshot(now - 3600, 11, 40, 9.0),  # worker that exited an hour ago
+    ], now=now)
+
+    assert merged["req_total"]["samples"] == [[{"route": "/x"}, 23]]
+    assert merged["in_flight"]["samples"] == [[{}, 5]]
+    assert merged["lag"]["samples"] == [[{}, 0.20]]
+    assert merged["lat"]["samples"] == [[{}, [3, 0, 1.5, 3]]]
+
+
+def test_metrics_endpoint_exposes_http_and_cache_series(tmp_path, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(metrics, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    client = TestClient(app, base_url="http://localhost")
+    client.get("/api/health")
+    client.get("/api/does-not-exist")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert 'aum_http_requests_total{router="app",route="/api/health",method="GET",status="200"}' in body
+    assert 'route="unmatched"' in body
+    assert 'aum_cache_hits_total{cache="simulation"}' in body
+    assert (tmp_path / f"metrics-{__import__('os').getpid()}.json").exists()
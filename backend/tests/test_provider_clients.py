@@ -0,0 +1,81 @@
+"""
+Tests for the pooled provider client registry.
+Covers: reuse per (provider, key), LRU bound, factory swap, shutdown close.
+"""
+import asyncio
+from core.provider_clients import CLOSE_GRACE_SECONDS, ProviderClientRegistry, _key_hash
+
+
+class FakeSDKClient:
+    def __init__(self, api_key=None, http_client=None, max_retries=2):
+        self.api_key = api_key
+        self.http_client = http_client
+        self.max_retries = max_retries
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_registry_reuses_client_per_key():
+    """Same provider + key returns the same warm client; a new key gets its own."""
+    async def scenario():
+        registry = ProviderClientRegistry(max_entries=8)
+        a1 = registry.get("openai", "sk-a", FakeSDKClient)
+        a2 = registry.get("openai", "sk-a", FakeSDKClient)
+        b = registry.get("openai", "sk-b", FakeSDKClient)
+        assert a1 is a2
+        assert a1 is not b
+        # OpenAI/Anthropic clients get an injected, bounded httpx pool
+        assert a1.http_client is not None
+        # SDK-level retries are off; the provider gateway owns retry/backoff
+        assert a1.max_retries == 0
+        await registry.aclose()
+        assert a1.closed and b.closed
+
+    asyncio.run(scenario())
+
+
+def test_registry_lru_eviction_bounds_pool():
+    """Least-recently-used tenant clients are evicted past max_entries."""
+    async def scenario():
+        registry = ProviderClientRegistry(max_entries=2)
+        first = registry.get("anthropic", "k1", FakeSDKClient)
+        registry.get("anthropic", "k2", FakeSDKClient)
+        registry.get("anthropic", "k1", FakeSDKClient)  # touch k1
+        second = registry._entries[("anthropic", _key_hash("k2"))].client
+        registry.get("anthropic", "k3", FakeSDKClient)  # evicts k2
+        assert registry.stats()["clients"] == 2
+        assert registry.get("anthropic", "k1", FakeSDKClient) is first
+        await asyncio.sleep(0)
+        # k2 was used moments ago and may still be mid-request elsewhere: it drains, not closed yet
+        assert not second.closed
+        # Once idle past the grace period, the next eviction pass closes it
+        registry._draining[0].last_used -= CLOSE_GRACE_SECONDS + 1
+        third = registry._entries[("anthropic", _key_hash("k3"))].client
+        registry.get("anthropic", "k4", FakeSDKClient)  # evicts k3, which starts draining
+        await asyncio.sleep(0)
+        assert second.closed and not third.closed
+        # Shutdown closes clients that are still draining
+        await registry.aclose()
+        assert third.closed and first.closed
+
+    asyncio.run(scenario())
+
+
+def test_registry_rebuilds_when_factory_changes():
+    """A different constructor never receives a client built by another one."""
+    class OtherClient(FakeSDKClient):
+        pass
+
+    async def scenario():
+        registry = ProviderClientRegistry()
+        original = registry.get("gemini", "g-key", FakeSDKClient)
+        replacement = registry.get("gemini", "g-key", OtherClient)
+        assert isinstance(replacement, OtherClient)
+        assert replacement is not original
+        # Gemini's SDK manages its own transport, so no httpx client is injected
+        assert replacement.http_client is None
+        await registry.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,169 @@
+"""
+Tests for the adaptive provider gateway.
+Covers: AIMD backoff on 429 + retry-after, non-retryable errors, concurrency bound, priority admission.
+"""
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+
+from core import provider_gateway as pg
+
+
+class FakeRateLimitError(Exception):
+    def __init__(self, retry_after="0"):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = MagicMock(headers={"retry-after": retry_after})
+
+
+class FakeBadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(pg, "PROVIDER_RETRY_BASE_SECONDS", 0.0)
+
+
+@pytest.mark.asyncio
+async def test_throttle_halves_limit_and_retries():
+    gateway = pg.ProviderGateway()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise FakeRateLimitError(retry_after="0.01")
+        return "ok"
+
+    assert await gateway.call("openai", "sk-a", flaky) == "ok"
+    limiter = gateway.limiter("openai", "sk-a")
+    assert len(attempts) == 3
+    assert limiter.counters["throttled"] == 2
+    # Two 429s inside the cooldown window count as a single decrease, then +1/limit on success
+    assert limiter.limit == pytest.approx(pg.PROVIDER_CONCURRENCY_INITIAL / 2 + 2 / pg.PROVIDER_CONCURRENCY_INITIAL)
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_raise_immediately():
+    gateway = pg.ProviderGateway()
+    calls = []
+
+    async def bad():
+        calls.append(1)
+        raise FakeBadRequest()
+
+    with pytest.raises(FakeBadRequest):
+        await gateway.call("anthropic", "k", bad)
+    assert calls == [1]
+    assert gateway.limiter("anthropic", "k").in_flight == 0
+
+
+def test_classify_error():
+    assert pg.classify_error(FakeRateLimitError("2"))[0] == pg.THROTTLE
+    assert pg.classify_error(FakeRateLimitError("2"))[1] == pytest.approx(2.0)
+    assert pg.classify_error(asyncio.TimeoutError())[0] == pg.TRANSIENT
+    assert pg.classify_error(ValueError("bad json")) == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_limit_bounds_in_flight_and_interactive_goes_first():
+    limiter = pg.AdaptiveLimiter("test", initial=4, minimum=1, maximum=4)
+    for _ in range(4):
+        await limiter.acquire(pg.Priority.INTERACTIVE)
+
+    order = []
+
+    async def waiter(priority, label):
+        await limiter.acquire(priority)
+        order.append(label)
+
+    tasks = [asyncio.create_task(waiter(pg.Priority.BACKGROUND, "cron")),
+             asyncio.create_task(waiter(pg.Priority.BATCH, "batch")),
+             asyncio.create_task(waiter(pg.Priority.INTERACTIVE, "run"))]
+    await asyncio.sleep(0)
+    assert order == [] and limiter.in_flight == 4
+
+    for _ in range(4):
+        limiter.release()
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    assert order == ["run", "batch", "cron"]
+
+
+def test_non_interactive_work_leaves_reserved_slots():
+    limiter = pg.AdaptiveLimiter("test", initial=8, minimum=1, maximum=8)
+    assert limiter.capacity(pg.Priority.INTERACTIVE) == 8
+    assert limiter.capacity(pg.Priority.BATCH) == 6
+
+
+@pytest.mark.asyncio
+async def test_attempts_respect_request_deadline():
+    from core.deadlines import DeadlineExceeded, deadline_scope
+
+    gateway = pg.ProviderGateway()
+
+    async def hangs():
+        await asyncio.sleep(5)
+
+    with deadline_scope(0.1):
+        with pytest.raises(DeadlineExceeded):
+            await gateway.call("gemini", "k", hangs)
+    assert gateway.limiter("gemini", "k").in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_deadline_clipped_timeout_is_not_a_provider_failure():
+    from core.circuit_breaker import CircuitBreakerRegistry
+    from core.deadlines import DeadlineExceeded, deadline_scope
+
+    breakers = CircuitBreakerRegistry()
+    gateway = pg.ProviderGateway(breakers=breakers)
+    limiter = gateway.limiter("openai", "sk-a")
+    limit = limiter.limit
+
+    async def hangs():
+        await asyncio.sleep(5)
+
+    with deadline_scope(0.05):
+        with pytest.raises(DeadlineExceeded):
+            await gateway.call("openai", "sk-a", hangs, model="gpt-4o")
+    # The SLO was never reached: no AIMD decrease, no breaker failure
+    assert limiter.limit == limit and limiter.in_flight == 0
+    assert breakers.get("openai", "gpt-4o").stats()["consecutiveFailures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_when_primary_stalls():
+    gateway = pg.ProviderGateway()
+    tracker = gateway.latency("openai")
+    for _ in range(pg.PROVIDER_HEDGE_MIN_SAMPLES):
+        tracker.record(0.01)
+
+    calls = []
+
+    async def sometimes_slow():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return len(calls)
+
+    result = await asyncio.wait_for(gateway.call("openai", "sk-h", sometimes_slow, hedge=True), 1)
+    assert result == 2
+    assert gateway.hedges == {"launched": 1, "won": 1}
+    assert gateway.limiter("openai", "sk-h").in_flight == 0
+
+
+def test_limiters_are_bounded_and_busy_ones_survive(monkeypatch):
+    monkeypatch.setattr(pg, "PROVIDER_LIMITER_MAX_ENTRIES", 2)
+    gateway = pg.ProviderGateway()
+    busy = gateway.limiter("openai", "sk-busy")
+    busy.in_flight = 1
+    gateway.limiter("openai", "sk-idle")
+    gateway.limiter("openai", "sk-new")  # over the bound: the idle key goes, the busy one stays
+
+    assert gateway.stats()["limiterCount"] == 2
+    assert gateway.limiter("openai", "sk-busy") is busy
+    assert set(gateway.stats()["limiters"]) == {busy.name, gateway.limiter("openai", "sk-new").name}
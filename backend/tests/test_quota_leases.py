@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from core.quota_leases import InMemoryQuotaLeaseStore, QuotaLeaseManager, plan_grant, plan_settle, used_units
+
+
+async def _spend(manager, org_id, cycle, limit, seed=lambda: 0):
+    try:
+        return await manager.acquire(org_id, cycle, limit, seed_committed=seed)
+    except HTTPException as e:
+        assert e.status_code == 402
+        return None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_acquires_across_instances_never_overshoot():
+    store = InMemoryQuotaLeaseStore()
+    managers = [QuotaLeaseManager(store, lease_size=10, holder=f"worker-{i}") for i in range(4)]
+
+    tokens = await asyncio.gather(*[
+        _spend(managers[i % len(managers)], "org_1", "cycle", 37, seed=lambda: 5)
+        for i in range(100)
+    ])
+
+    granted = [t for t in tokens if t is not None]
+    assert len(granted) == 32  # 37 limit - 5 already in the usage ledger
+    assert used_units(store.state("org_1", "cycle")) <= 37
+
+
+@pytest.mark.asyncio
+async def test_release_returns_unused_units():
+    store = InMemoryQuotaLeaseStore()
+    first = QuotaLeaseManager(store, lease_size=10, holder="a")
+    for _ in range(3):
+        await first.acquire("org_1", "cycle", 12, seed_committed=lambda: 0)
+
+    # The first lease holds 10 of 12 units, so another instance only gets 2
+    second = QuotaLeaseManager(store, lease_size=10, holder="b")
+    assert [await _spend(second, "org_1", "cycle", 12) is not None for _ in range(3)] == [True, True, False]
+
+    await first.release_all()
+    state = store.state("org_1", "cycle")
+    assert state["committed"] == 5 and not state["leases"]  # 3 spent by a + 2 settled by b
+    assert await _spend(second, "org_1", "cycle", 12) is not None
+
+
+@pytest.mark.asyncio
+async def test_refund_gives_unit_back_to_local_lease():
+    store = InMemoryQuotaLeaseStore()
+    manager = QuotaLeaseManager(store, lease_size=1)
+    token = await manager.acquire("org_1", "cycle", 1, seed_committed=lambda: 0)
+    await manager.refund(token)
+    assert await _spend(manager, "org_1", "cycle", 1) is not None
+    assert await _spend(manager, "org_1", "cycle", 1) is None
+
+
+def test_expired_leases_are_reclaimed_as_fully_used():
+    state, granted = plan_grant(None, 1000.0, 20, 10, "lost", "crashed", 60, lambda: 4)
+    assert granted == 10
+
+    state, granted = plan_grant(state, 1100.0, 20, 10, "next", "b", 60, lambda: 0)
+    assert state["committed"] == 14 and granted == 6
+
+    # A late settle for the reclaimed lease must not double count
+    assert plan_settle(state, "lost", 2)["committed"] == 14
+    assert plan_settle(state, "next", 2)["committed"] == 16
+
+
+@pytest.mark.asyncio
+async def test_idle_lease_is_settled_before_another_instance_reclaims_it():
+    store = InMemoryQuotaLeaseStore()
+    idle = QuotaLeaseManager(store, lease_size=10, holder="a")
+    await idle.acquire("org_1", "cycle", 20, seed_committed=lambda: 0)
+
+    assert await idle.settle_expiring() == 0  # still inside its spending window
+    idle._leases[("org_1", "cycle")].expires_at = 0  # spending deadline passed, store lease not yet expired
+    assert await idle.settle_expiring() == 1
+
+    # The takeover sees only the one unit actually spent, not the whole block
+    state = store.state("org_1", "cycle")
+    assert state["committed"] == 1 and not state["leases"]
+    other = QuotaLeaseManager(store, lease_size=10, holder="b")
+    assert [await _spend(other, "org_1", "cycle", 20) is not None for _ in range(19)] == [True] * 19
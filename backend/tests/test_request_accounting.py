@@ -0,0 +1,89 @@
+"""
+Tests for per-stage request accounting.
+Covers: stage attribution across concurrent tasks, SDK token extraction, histograms, `/run` timings block.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core.provider_gateway import provider_call
+from core.request_accounting import (
+    AccountingHistograms, accounting_scope, count_firestore, extract_token_usage, record_provider_usage, stage,
+)
+
+
+def _openai_response(prompt_tokens, completion_tokens, model="gpt-test"):
+    return SimpleNamespace(model=model, usage=SimpleNamespace(prompt_tokens=prompt_tokens,
+                                                              completion_tokens=completion_tokens))
+
+
+def test_token_usage_from_each_sdk_shape():
+    assert extract_token_usage(_openai_response(10, 4)) == (10, 4)
+    assert extract_token_usage(SimpleNamespace(usage=SimpleNamespace(input_tokens=7, output_tokens=3))) == (7, 3)
+    assert extract_token_usage(SimpleNamespace(usage_metadata=SimpleNamespace(
+        prompt_token_count=5, candidates_token_count=2))) == (5, 2)
+    assert extract_token_usage(SimpleNamespace(text="no usage")) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_stages_are_attributed_separately():
+    async def infer(name, tokens):
+        with stage(f"inference:{name}"):
+            await asyncio.sleep(0.01)
+            record_provider_usage("openai", name, _openai_response(tokens, 1), 0.01)
+
+    with accounting_scope() as accounting:
+        with stage("manifest"):
+            await asyncio.to_thread(count_firestore, 2)
+        await asyncio.gather(infer("a", 100), infer("b", 50))
+        count_firestore(writes=1)  # outside any stage
+
+    summary = accounting.summary()
+    assert summary["stages"]["manifest"]["firestoreReads"] == 2
+    assert summary["stages"]["inference:a"]["inputTokens"] == 100
+    assert summary["stages"]["inference:b"]["inputTokens"] == 50
+    assert summary["stages"]["other"]["firestoreWrites"] == 1
+    assert summary["tokens"] == {"input": 150, "output": 2}
+    assert summary["firestore"] == {"reads": 2, "writes": 1}
+
+    histograms = AccountingHistograms(max_orgs=1)
+    histograms.observe("org_1", accounting)
+    histograms.observe("org_2", accounting)
+    snapshot = histograms.snapshot()
+    assert list(snapshot["orgs"]) == ["org_2"]
+    assert snapshot["orgs"]["org_2"]["latency"]["inference:a"]["count"] == 1
+    assert snapshot["models"]["a"]["tokens"]["input"] == 200
+
+
+@pytest.mark.asyncio
+async def test_run_returns_timings_block_when_requested(monkeypatch):
+    from fastapi import BackgroundTasks
+    from api import simulation
+
+    async def runner(key, system_prompt, user_prompt, api_model=None):
+        await provider_call("openai", key, AsyncMock(return_value=_openai_response(120, 30, "gpt-4o")),
+                            model="gpt-4o")
+        return "Acme is shortlisted."
+
+    request = simulation.SimulationRequest(prompt="Who leads?", orgId="org_timings", includeTimings=True)
+    plan = simulation._SimulationPlan(
+        request=request, org_plan="growth", cache_key="timings-key", manifest_version="v1",
+        manifest_content="Acme context", manifest_embedding=None, retrieved_context=None, api_keys={},
+        system_prompt="sys", model_specs=[("gpt-4o", runner, "sk-a")],
+        gemini_api_model=None, locked_models=[], quota_token=None,
+    )
+    monkeypatch.setattr(simulation, "_prepare_simulation", AsyncMock(return_value=plan))
+    monkeypatch.setattr(simulation, "get_or_extract_claims", AsyncMock(return_value=[]))
+    monkeypatch.setattr(simulation, "db", MagicMock())
+
+    body = await simulation.run_simulation(request, BackgroundTasks(), auth={})
+
+    timings = body["timings"]
+    assert timings["stages"]["inference:GPT-4o"]["inputTokens"] == 120
+    assert timings["models"]["gpt-4o"]["outputTokens"] == 30
+    assert {"claims", "adjudication"} <= set(timings["stages"])
+
+    request.includeTimings = False
+    assert "timings" not in await simulation.run_simulation(request, BackgroundTasks(), auth={})
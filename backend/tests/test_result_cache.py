@@ -0,0 +1,151 @@
+"""
+Tests for the in-process L1 result cache.
+Covers: byte-bounded LRU eviction, TTL expiry, org invalidation, zero-read simulation hits,
+claim-set reuse, semantic near-duplicate tier.
+"""
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from core.result_cache import ResultCache, simulation_result_cache, invalidate_org_caches
+
+client = TestClient(app, base_url="http://localhost")
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = ResultCache("test", max_bytes=60, max_entries=100, ttl_seconds=60)
+    cache.set("a", "org1", "x" * 20)
+    cache.set("b", "org1", "y" * 20)
+    assert cache.get("a") is not None  # touch a
+    cache.set("c", "org2", "z" * 20)  # over 60 bytes -> evicts b
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 20
+    assert cache.stats()["bytes"] <= 60
+    # Values larger than the whole budget are never stored
+    assert cache.set("huge", "org1", "w" * 100) is False
+
+
+def test_ttl_and_org_invalidation():
+    cache = ResultCache("test", max_bytes=10_000, max_entries=100, ttl_seconds=60)
+    cache.set("short", "org1", {"v": 1}, ttl_seconds=0.01)
+    cache.set("k1", "org1", {"v": 2})
+    cache.set("k2", "org2", {"v": 3})
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    assert cache.invalidate_org("org1") == 1
+    assert cache.get("k1") is None
+    assert cache.get("k2") == {"v": 3}
+
+
+@patch("api.simulation.verify_user_org_access", return_value=True)
+@patch("api.simulation.db")
+def test_simulation_l1_hit_needs_no_firestore_reads(mock_sim_db, mock_verify):
+    """A warm L1 entry is served without touching Firestore; invalidation forces a re-read."""
+    import hashlib
+    cache_key = hashlib.sha256("test_org_Test query_v1".encode("utf-8")).hexdigest()
+    simulation_result_cache.set(cache_key, "test_org", {
+        "results": [{"model": "GPT-4o"}, {"model": "Gemini 3 Flash"}, {"model": "Claude 4.5 Sonnet"}],
+        "manifestVersion": "v1",
+        "prompt": "Test query",
+        "planId": "growth",
+    })
+
+    body = {"orgId": "test_org", "manifestVersion": "v1", "prompt": "Test query"}
+    response = client.post("/api/simulation/run", headers={"Authorization": "Bearer mock-dev-token"}, json=body)
+    assert response.status_code == 200, response.text
+    assert response.json()["cached"] is True
+    assert len(response.json()["results"]) == 3
+    mock_sim_db.collection.assert_not_called()
+
+    invalidate_org_caches("test_org", "plan changed")
+    assert simulation_result_cache.get(cache_key) is None
+
+
+@pytest.mark.asyncio
+async def test_claim_sets_reused_across_runs():
+    """Claims are extracted once per (org, version, normalized prompt) then served from cache."""
+    from api import simulation
+
+    mock_db = MagicMock()
+    claim_doc = MagicMock()
+    claim_doc.exists = False
+    cache_ref = mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value
+    cache_ref.get.return_value = claim_doc
+
+    with patch.object(simulation, "db", mock_db), \
+         patch.object(simulation, "extract_claims", AsyncMock(return_value=["C1", "C2"])) as extract:
+        first = await simulation.get_or_extract_claims("org1", "v1", "ctx", "Best  Vendor?", {"openai": "sk"})
+        # Whitespace/case differences normalize to the same claim set
+        second = await simulation.get_or_extract_claims("org1", "v1", "ctx", "best vendor?", {"openai": "sk"})
+
+    assert first == second == ["C1", "C2"]
+    assert extract.await_count == 1
+    cache_ref.set.assert_called_once()
+    assert cache_ref.set.call_args.args[0]["manifestVersion"] == "v1"
+
+    # A cold process reads the persisted claim set instead of re-extracting
+    from core.result_cache import claim_set_cache
+    claim_set_cache.clear()
+    claim_doc.exists = True
+    claim_doc.to_dict.return_value = {"claims": ["C1", "C2"]}
+    with patch.object(simulation, "db", mock_db), \
+         patch.object(simulation, "extract_claims", AsyncMock()) as extract:
+        assert await simulation.get_or_extract_claims("org1", "v1", "ctx", "best vendor?", {}) == ["C1", "C2"]
+    extract.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_claim_extraction_not_cached():
+    from api import simulation
+
+    with patch.object(simulation, "db", None), \
+         patch.object(simulation, "extract_claims", AsyncMock(return_value=[])) as extract:
+        await simulation.get_or_extract_claims("org1", "v1", "ctx", "q", {})
+        await simulation.get_or_extract_claims("org1", "v1", "ctx", "q", {})
+    assert extract.await_count == 2
+
+
+def test_semantic_cache_serves_near_duplicates_above_threshold():
+    from core.semantic_cache import SemanticPromptCache
+
+    cache = SemanticPromptCache(max_per_bucket=4)
+    cache.add("org1", "v1", "How does X compare with Accenture?", [1.0, 0.0, 0.0], {"results": ["r"]})
+
+    near = cache.lookup("org1", "v1", [0.99, 0.05, 0.0], threshold=0.95, org_plan="growth")
+    assert near is not None and near.prompt == "How does X compare with Accenture?"
+    assert near.payload == {"results": ["r"]}
+    # Different manifest version, or an unrelated prompt, never matches
+    assert cache.lookup("org1", "v2", [1.0, 0.0, 0.0], threshold=0.95, org_plan="growth") is None
+    assert cache.lookup("org1", "v1", [0.0, 1.0, 0.0], threshold=0.95, org_plan="growth") is None
+
+    stats = cache.stats()
+    assert stats["lookups"] == 3 and stats["hits"] == 1
+    assert stats["byPlan"]["growth"]["hitRate"] == round(1 / 3, 4)
+
+    assert cache.invalidate_org("org1") == 1
+    assert cache.lookup("org1", "v1", [1.0, 0.0, 0.0], threshold=0.95) is None
+
+
+def test_semantic_threshold_per_plan_and_org_switch():
+    from core.semantic_cache import semantic_threshold
+
+    assert semantic_threshold("explorer") is None
+    assert semantic_threshold("growth") is not None
+    assert semantic_threshold("growth", {"semanticCacheEnabled": False}) is None
+
+
+def test_semantic_hit_response_is_flagged():
+    from api import simulation
+    from api.simulation import SimulationRequest
+    from core.semantic_cache import semantic_prompt_cache
+
+    semantic_prompt_cache.add("org1", "v1", "How does X compare to Accenture", [0.2, 0.9], {"results": [{"model": "GPT-4o"}]})
+    request = SimulationRequest(orgId="org1", manifestVersion="latest", prompt="How does X compare with Accenture?")
+
+    response = simulation._semantic_cache_response(request, "scale", {}, "v1", [0.2, 0.9])
+    assert response["cached"] == "semantic"
+    assert response["matchedPrompt"] == "How does X compare to Accenture"
+    assert response["results"] == [{"model": "GPT-4o"}]
+    # Explorer never gets semantic hits
+    assert simulation._semantic_cache_response(request, "explorer", {}, "v1", [0.2, 0.9]) is None
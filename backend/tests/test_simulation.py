@@ -6,6 +6,14 @@ from app.main import app
 client = TestClient(app, base_url="http://localhost")
 
 
+def _get_all_via_get(refs, **kwargs):
+    """Firestore `get_all` returns one snapshot per ref; route it through each mocked ref's `.get()`."""
+    for ref in refs:
+        snap = ref.get()
+        snap.reference = ref
+        yield snap
+
+
 @patch("api.simulation.verify_user_org_access")
 @patch("api.simulation.AsyncOpenAI")
 @patch("api.simulation.db")
@@ -51,6 +59,7 @@ def test_evaluate_query(mock_sim_db, mock_openai, mock_verify):
 
     mock_sim_db.collection.side_effect = db_collection_side_effect
     mock_sim_db.transaction.return_value = MagicMock()
+    mock_sim_db.get_all.side_effect = _get_all_via_get
 
     # 3. Mock OpenAI client
     mock_client = MagicMock()
@@ -152,6 +161,7 @@ def test_frontier_model_labels(mock_sim_db, mock_openai, mock_verify):
     }
     mock_org_doc.collection.return_value.document.return_value.get.return_value = MagicMock(exists=True, to_dict=lambda: {"content": "mock", "embedding": [0.1]*1536})
     mock_sim_db.collection.return_value.document.return_value.get.return_value = mock_org_doc
+    mock_sim_db.get_all.side_effect = _get_all_via_get
 
     # 2. Mock OpenAI client
     mock_client = MagicMock()
@@ -181,3 +191,232 @@ def test_frontier_model_labels(mock_sim_db, mock_openai, mock_verify):
     
     for expected in expected_labels:
         assert expected in returned_labels, f"Expected frontier label '{expected}' missing from API response. Got: {returned_labels}"
+
+
+@pytest.mark.asyncio
+async def test_verify_claims_multi_single_call():
+    """All model answers are verified in one combined call and split back per model."""
+    from api import simulation
+
+    combined = {"answers": {
+        "answer_1": [{"claim": "C1", "verdict": "visible", "detail": "a"}],
+        "answer_2": [{"claim": "C1", "verdict": "displaced", "detail": "b"}],
+    }}
+    with patch.object(simulation, "_claim_json_call", AsyncMock(return_value=combined)) as judge, \
+         patch.object(simulation, "verify_claims", AsyncMock()) as per_model:
+        verdicts = await simulation.verify_claims_multi(
+            ["C1"], {"GPT-4o": "ans one", "Claude 4.5 Sonnet": "ans two"}, {"openai": "sk-x"}
+        )
+
+    assert judge.await_count == 1
+    per_model.assert_not_awaited()
+    assert verdicts["GPT-4o"][0]["verdict"] == "visible"
+    assert verdicts["Claude 4.5 Sonnet"][0]["verdict"] == "displaced"
+
+
+@pytest.mark.asyncio
+async def test_verify_claims_multi_falls_back_per_model():
+    """Missing labels and over-budget payloads fall back to per-model verification."""
+    from api import simulation
+
+    partial = {"answers": {"answer_1": [{"claim": "C1", "verdict": "visible", "detail": ""}]}}
+    fallback = [{"claim": "C1", "verdict": "absent", "detail": ""}]
+    answers = {"GPT-4o": "one", "Gemini 3 Flash": "two"}
+
+    with patch.object(simulation, "_claim_json_call", AsyncMock(return_value=partial)), \
+         patch.object(simulation, "verify_claims", AsyncMock(return_value=fallback)) as per_model:
+        verdicts = await simulation.verify_claims_multi(["C1"], answers, {"openai": "sk-x"})
+    assert per_model.await_count == 1
+    assert verdicts["Gemini 3 Flash"] == fallback
+
+    with patch.object(simulation, "VERIFY_MULTI_TOKEN_BUDGET", 1), \
+         patch.object(simulation, "_claim_json_call", AsyncMock()) as judge, \
+         patch.object(simulation, "verify_claims", AsyncMock(return_value=fallback)) as per_model:
+        verdicts = await simulation.verify_claims_multi(["C1"], answers, {"openai": "sk-x"})
+    judge.assert_not_awaited()
+    assert per_model.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_compute_divergences_single_batched_request():
+    """Context + every answer are embedded in one request and scored in one vectorized pass."""
+    from api import simulation
+
+    vectors = {"ctx": [1.0, 0.0], "same": [2.0, 0.0], "orthogonal": [0.0, 3.0]}
+
+    async def fake_create(input, model):
+        resp = MagicMock()
+        resp.data = [MagicMock(embedding=vectors[text]) for text in input]
+        return resp
+
+    with patch("api.simulation.AsyncOpenAI") as mock_openai:
+        mock_openai.return_value.embeddings.create = AsyncMock(side_effect=fake_create)
+        divergences = await simulation.compute_divergences(
+            "sk-batch", None, {"GPT-4o": "same", "Gemini 3 Flash": "orthogonal", "Claude 4.5 Sonnet": ""},
+            context_text="ctx",
+        )
+        create = mock_openai.return_value.embeddings.create
+
+    assert create.await_count == 1
+    assert create.await_args.kwargs["input"] == ["ctx", "same", "orthogonal"]
+    assert divergences["GPT-4o"] == pytest.approx(0.0)
+    assert divergences["Gemini 3 Flash"] == pytest.approx(1.0)
+    # Empty answers are never sent to the embeddings API
+    assert divergences["Claude 4.5 Sonnet"] == simulation._EMBED_ERROR_DIVERGENCE
+
+
+@patch("api.simulation.verify_user_org_access", return_value=True)
+@patch("api.simulation.db", None)
+def test_run_stream_emits_events_in_order(mock_verify, monkeypatch):
+    """`/run/stream` emits claims, one result per model, adjudication, then the `/run` body."""
+    import json as _json
+    for env_key in ("OPENAI_API_KEY", "GEMINI_API_KEY", "ANTHROPIC_API_KEY"):
+        monkeypatch.delenv(env_key, raising=False)
+
+    response = client.post(
+        "/api/simulation/run/stream",
+        headers={"Authorization": "Bearer mock-dev-token"},
+        json={"orgId": "test_org", "manifestVersion": "latest", "prompt": "Test query"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], _json.loads(lines["data"])))
+
+    names = [name for name, _ in events]
+    assert names[0] == "claims"
+    assert names[-2:] == ["adjudication", "complete"]
+    streamed = [data["result"]["model"] for name, data in events if name == "result"]
+    complete = events[-1][1]
+    assert sorted(streamed) == sorted(r["model"] for r in complete["results"])
+    assert complete["cached"] is False and "transparency_footprint" in complete
+
+
+@pytest.mark.asyncio
+async def test_run_stream_refunds_quota_when_client_disconnects(monkeypatch):
+    """A stream closed before `complete` refunds its reserved unit; nothing billable was produced."""
+    import asyncio as _asyncio
+    from fastapi import BackgroundTasks
+    from api import simulation
+
+    async def slow_runner(key, system_prompt, user_prompt, api_model=None):
+        await _asyncio.sleep(5)
+        return "too late"
+
+    request = simulation.SimulationRequest(prompt="Who leads retail analytics?", orgId="org_stream")
+    plan = simulation._SimulationPlan(
+        request=request, org_plan="growth", cache_key="stream-key", manifest_version="v1",
+        manifest_content="Acme context", manifest_embedding=None, retrieved_context=None, api_keys={},
+        system_prompt="sys", model_specs=[("gpt-4o", slow_runner, "sk-a")],
+        gemini_api_model=None, locked_models=[], quota_token=MagicMock(org_id="org_stream"),
+    )
+    monkeypatch.setattr(simulation, "get_or_extract_claims", AsyncMock(return_value=["c1"]))
+    manager = MagicMock(refund=AsyncMock())
+    monkeypatch.setattr(simulation, "get_quota_manager", lambda db: manager)
+
+    stream = simulation._stream_simulation_events(plan, BackgroundTasks())
+    assert (await stream.__anext__()).startswith("event: claims")
+    await stream.aclose()  # client went away mid-stream
+    await _asyncio.sleep(0)
+
+    manager.refund.assert_awaited_once()
+    assert plan.quota_token is None
+
+
+@patch("api.simulation.verify_user_org_access")
+@patch("api.simulation.db")
+def test_run_reads_tenant_documents_once(mock_sim_db, mock_verify, monkeypatch):
+    """One /run reads the org doc + latest pointer in a single get_all and never re-reads the user doc."""
+    from core.security import get_auth_context
+    for env_key in ("OPENAI_API_KEY", "GEMINI_API_KEY", "ANTHROPIC_API_KEY"):
+        monkeypatch.delenv(env_key, raising=False)
+
+    reads = []
+    org_snap = MagicMock(exists=True)
+    org_snap.to_dict.return_value = {"apiKeys": {}, "subscription": {"planId": "growth", "maxSimulations": 100}}
+    latest_snap = MagicMock(exists=True)
+    latest_snap.to_dict.return_value = {"content": "ctx", "embedding": [0.1] * 8, "version": "manifest_v1"}
+
+    org_ref = MagicMock(path="organizations/test_org")
+    org_ref.get.side_effect = lambda *a, **k: reads.append("org") or org_snap
+    latest_ref = MagicMock(path="organizations/test_org/manifests/latest")
+    latest_ref.get.side_effect = lambda *a, **k: reads.append("latest") or latest_snap
+
+    def org_collection(name):
+        coll = MagicMock()
+        if name == "manifests":
+            coll.document.side_effect = lambda doc_id: latest_ref if doc_id == "latest" else MagicMock()
+        else:
+            coll.document.return_value.get.return_value = MagicMock(exists=False)
+        return coll
+
+    org_ref.collection.side_effect = org_collection
+    mock_sim_db.collection.side_effect = (
+        lambda name: MagicMock(document=MagicMock(return_value=org_ref)) if name == "organizations" else MagicMock()
+    )
+
+    def get_all(refs, **kwargs):
+        reads.append("get_all")
+        for ref in refs:
+            snap = org_snap if ref is org_ref else latest_snap
+            snap.reference = ref
+            yield snap
+
+    mock_sim_db.get_all.side_effect = get_all
+    app.dependency_overrides[get_auth_context] = lambda: {
+        "uid": "u1", "orgId": "test_org", "type": "session", "profileLoaded": True, "isPlatformAdmin": False,
+    }
+
+    response = client.post(
+        "/api/simulation/run",
+        headers={"Authorization": "Bearer mock-dev-token"},
+        json={"orgId": "test_org", "manifestVersion": "latest", "prompt": "Read budget"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["version"] == "manifest_v1"
+    assert reads == ["get_all"]
+    mock_verify.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_models_missing_deadline_return_flagged_partial_results(monkeypatch):
+    """A model that misses the request deadline is flagged and the rest still return; nothing is cached."""
+    import asyncio as _asyncio
+    import time as _time
+    from fastapi import BackgroundTasks
+    from api import simulation
+    from core.result_cache import simulation_result_cache
+
+    async def fast_runner(key, system_prompt, user_prompt, api_model=None):
+        return "Acme is a shortlisted analytics partner."
+
+    async def slow_runner(key, system_prompt, user_prompt, api_model=None):
+        await _asyncio.sleep(5)
+        return "too late"
+
+    request = simulation.SimulationRequest(prompt="Who leads retail analytics?", orgId="org_deadline")
+    plan = simulation._SimulationPlan(
+        request=request, org_plan="growth", cache_key="deadline-key", manifest_version="v1",
+        manifest_content="Acme context", manifest_embedding=None, retrieved_context=None, api_keys={},
+        system_prompt="sys", model_specs=[("gpt-4o", fast_runner, "sk-a"), ("claude-sonnet", slow_runner, "sk-c")],
+        gemini_api_model=None, locked_models=[], quota_token=None,
+    )
+    monkeypatch.setattr(simulation, "SIM_DEADLINE_SECONDS", 0.4)
+    monkeypatch.setattr(simulation, "SIM_SCORING_RESERVE_SECONDS", 0.1)
+    monkeypatch.setattr(simulation, "_prepare_simulation", AsyncMock(return_value=plan))
+    monkeypatch.setattr(simulation, "get_or_extract_claims", AsyncMock(return_value=[]))
+    monkeypatch.setattr(simulation, "db", MagicMock())
+
+    started = _time.monotonic()
+    body = await simulation.run_simulation(request, BackgroundTasks(), auth={})
+
+    assert _time.monotonic() - started < 2
+    assert body["partial"] is True
+    assert body["timedOutModels"] == ["Claude 4.5 Sonnet"]
+    by_model = {r["model"]: r for r in body["results"]}
+    assert by_model["GPT-4o"]["answer"].startswith("Acme")
+    assert by_model["Claude 4.5 Sonnet"]["timedOut"] is True
+    assert simulation_result_cache.get("deadline-key") is None
@@ -0,0 +1,72 @@
+"""
+Tests for the async stage graph scheduler.
+Covers: independent stages overlap, dependency wiring, timings, failure cancellation.
+"""
+import asyncio
+import pytest
+from core.stage_graph import StageGraph
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_overlap():
+    """Inference does not wait for claim extraction; verify waits for both."""
+    order = []
+
+    async def claims():
+        await asyncio.sleep(0.05)
+        order.append("claims")
+        return ["c1"]
+
+    async def infer():
+        order.append("infer-start")
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def verify(claims, infer_0):
+        return {"claims": claims, "answer": infer_0}
+
+    graph = StageGraph("test")
+    graph.add("claims", claims)
+    graph.add("infer:0", infer)
+    graph.add("verify", verify, deps=["claims", "infer:0"], arg_names={"infer:0": "infer_0"})
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    outputs = await graph.run()
+    elapsed = loop.time() - started
+
+    assert outputs["verify"] == {"claims": ["c1"], "answer": "answer"}
+    assert order[0] == "infer-start"  # inference started before claims finished
+    assert elapsed < 0.09  # ~one sleep, not two
+    assert set(graph.timings) == {"claims", "infer:0", "verify"}
+    assert graph.timings["verify"]["startMs"] >= graph.timings["claims"]["durationMs"]
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_pending_stages():
+    cancelled = asyncio.Event()
+
+    async def boom():
+        raise RuntimeError("provider down")
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    graph = StageGraph("test")
+    graph.add("boom", boom)
+    graph.add("slow", slow)
+    with pytest.raises(RuntimeError):
+        await graph.run()
+    assert cancelled.is_set()
+
+
+def test_unknown_dependency_rejected():
+    async def stage():
+        return None
+
+    with pytest.raises(ValueError):
+        StageGraph("test").add("verify", stage, deps=["claims"])
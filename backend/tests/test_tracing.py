@@ -0,0 +1,129 @@
+"""
+Tests for distributed tracing.
+Covers: span nesting across tasks/threads, sampling, traceparent on persisted jobs and recovery, HTTP server spans.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from core import tracing
+from core.metrics import firestore_operation
+from core.request_accounting import stage
+
+
+@pytest.fixture
+def exporter():
+    memory = tracing.InMemorySpanExporter()
+    tracing.tracer.configure(exporter=memory, sample_ratio=1.0)
+    yield memory
+    tracing.tracer.configure(exporter=None, sample_ratio=tracing.TRACE_SAMPLE_RATIO)
+
+
+def _by_name(spans):
+    return {span.name: span for span in spans}
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_tasks_threads_and_firestore(exporter):
+    def read_doc():
+        with firestore_operation("manifest_get"):
+            return "doc"
+
+    async def infer(name):
+        with stage(f"inference:{name}"):
+            await asyncio.sleep(0)
+
+    with tracing.start_span("request") as root:
+        with stage("manifest"):
+            await asyncio.to_thread(read_doc)
+        await asyncio.gather(infer("a"), infer("b"))
+    tracing.tracer.flush()
+
+    spans = _by_name(exporter.finished())
+    assert {s.context.trace_id for s in spans.values()} == {root.context.trace_id}
+    assert spans["firestore manifest_get"].parent_id == spans["stage manifest"].context.span_id
+    assert spans["stage inference:a"].parent_id == root.context.span_id
+    assert spans["stage inference:b"].parent_id == root.context.span_id
+    assert spans["request"].parent_id is None
+
+    parsed = tracing.parse_traceparent(root.traceparent)
+    assert (parsed.trace_id, parsed.span_id, parsed.sampled) == (root.context.trace_id, root.context.span_id, True)
+    assert tracing.parse_traceparent("00-zz-1-01") is None
+
+
+def test_unsampled_traces_propagate_but_are_not_exported(exporter):
+    tracing.tracer.configure(exporter=exporter, sample_ratio=0.0)
+    with tracing.start_span("outer") as outer:
+        with tracing.start_span("inner") as inner:
+            assert inner.context.trace_id == outer.context.trace_id
+            assert tracing.current_traceparent().endswith("-00")
+    # A sampled upstream parent is honoured regardless of the local ratio
+    upstream = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    with tracing.start_span("continued", parent=upstream) as span:
+        pass
+    assert tracing.tracer.flush() == 1
+    assert exporter.finished()[0].parent_id == "00f067aa0ba902b7"
+    assert span.context.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.mark.asyncio
+async def test_job_traceparent_is_persisted_and_resumed_by_recovery(exporter, monkeypatch):
+    from utils import task_queue, task_queue_recovery
+    from utils.task_queue import FirestoreTaskQueue
+    from utils.task_queue_recovery import TaskQueueRecovery
+
+    mock_db = MagicMock()
+    monkeypatch.setattr(task_queue, "db", mock_db)
+    with tracing.start_span("POST /api/ingestion/parse-url") as request_span:
+        FirestoreTaskQueue.register_job("org_1", "seoJobs", "job_1", {"url": "https://example.com"})
+    job_doc = mock_db.collection.return_value.document.return_value.collection.return_value.document.return_value
+    stored = job_doc.set.call_args[0][0]
+    assert stored["traceparent"] == request_span.traceparent
+
+    # Simulate a restart: the retry runs with no active span and continues the stored trace
+    failed = MagicMock(id="job_1")
+    failed.to_dict.return_value = {"status": "failed", "retryCount": 0, "payload": {}, **stored}
+    recovery_db = MagicMock()
+    recovery_db.collection.return_value.select.return_value.stream.return_value = [MagicMock(id="org_1")]
+    jobs = recovery_db.collection.return_value.document.return_value.collection.return_value
+    jobs.where.side_effect = lambda field, op, status: MagicMock(
+        stream=MagicMock(return_value=[failed] if status == "failed" else []))
+    monkeypatch.setattr(task_queue_recovery, "db", recovery_db)
+    monkeypatch.setattr(TaskQueueRecovery, "JOB_COLLECTIONS", ["seoJobs"])
+
+    async def retry(org_id, collection, job_id, payload):
+        monkeypatch.setattr(task_queue, "db", None)
+        return await FirestoreTaskQueue.run_persistent_task(org_id, collection, job_id, AsyncMock(return_value={}))
+
+    stats = await TaskQueueRecovery.sweep_stalled_jobs(retry_fn=retry)
+    assert stats["retried"] == 1
+    tracing.tracer.flush()
+    spans = _by_name(exporter.finished())
+    assert spans["job.retry seoJobs"].context.trace_id == request_span.context.trace_id
+    assert spans["job.retry seoJobs"].parent_id == request_span.context.span_id
+    assert spans["job seoJobs"].parent_id == spans["job.retry seoJobs"].context.span_id
+
+
+def test_http_server_span_continues_incoming_traceparent(exporter, tmp_path):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    upstream = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    response = TestClient(app, base_url="http://localhost").get("/api/health", headers={"traceparent": upstream})
+    assert response.headers["traceparent"].startswith("00-0af7651916cd43dd8448eb211c80319c-")
+    tracing.tracer.flush()
+
+    server = _by_name(exporter.finished())["GET /api/health"]
+    assert server.kind == "server"
+    assert server.parent_id == "b7ad6b7169203331"
+    assert server.attributes["http.route"] == "/api/health"
+    assert server.attributes["http.response.status_code"] == 200
+
+    # The same batch through the file exporter and the OTLP encoding
+    path = tmp_path / "spans.jsonl"
+    tracing.FileSpanExporter(str(path)).export([server])
+    assert json.loads(path.read_text())["traceId"] == "0af7651916cd43dd8448eb211c80319c"
+    encoded = tracing.otlp_payload([server])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert encoded["kind"] == 2 and encoded["parentSpanId"] == "b7ad6b7169203331"